@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de las tablas precalculadas del Elo
+====================================================
+
+Compara las búsquedas en tabla contra las fórmulas originales y verifica
+que los deltas de partidos completos sean idénticos bit a bit.
+
+Uso:
+    python benchmark_elo_tablas.py [cantidad_partidos]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import timeit
+
+from src.services.elo_config_v2 import EloConfigV2
+from src.services.elo_service_v2 import EloServiceV2
+from test_elo_tablas import partido_aleatorio, usar_formulas
+
+
+def medir(nombre, funcion, repeticiones=5):
+    """Tiempo de `funcion` con tablas y con las fórmulas originales"""
+    t_tabla = min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+    with usar_formulas(EloConfigV2):
+        t_formula = min(timeit.repeat(funcion, number=1, repeat=repeticiones))
+    print(f"{nombre:<28} fórmula {t_formula * 1000:8.1f} ms   tabla {t_tabla * 1000:8.1f} ms   x{t_formula / t_tabla:.2f}")
+
+
+def main(cantidad: int = 20000):
+    rng = random.Random(42)
+    partidos = [partido_aleatorio(rng) for _ in range(cantidad)]
+    diferencias = [
+        (p["team_a_players"][0]["rating"] + p["team_a_players"][1]["rating"]) / 2
+        - (p["team_b_players"][0]["rating"] + p["team_b_players"][1]["rating"]) / 2
+        for p in partidos
+    ]
+    experiencia = [j["partidos"] for p in partidos for j in p["team_a_players"] + p["team_b_players"]]
+
+    print(f"\n⏱️  {cantidad} partidos aleatorios\n")
+
+    medir("Expectativa", lambda: [EloConfigV2.expected_score(d) for d in diferencias])
+    medir("Factor K", lambda: [EloConfigV2.get_k_factor(n) for n in experiencia])
+    medir("Factor de margen", lambda: [
+        EloConfigV2.calculate_margin_factor(p["sets_a"], p["sets_b"], p["games_a"], p["games_b"], p["sets_detail"])
+        for p in partidos
+    ])
+
+    servicio = EloServiceV2()
+
+    def partidos_completos():
+        return [servicio.calculate_match_ratings(**p) for p in partidos]
+
+    medir("Partido completo (V2)", partidos_completos)
+
+    con_tablas = partidos_completos()
+    with usar_formulas(EloConfigV2):
+        con_formulas = partidos_completos()
+    identicos = con_tablas == con_formulas
+    print(f"\n{'✅' if identicos else '❌'} Deltas idénticos bit a bit: {identicos}")
+    return identicos
+
+
+if __name__ == "__main__":
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sys.exit(0 if main(cantidad) else 1)
@@ -0,0 +1,49 @@
+"""
+Base de datos SQLite en memoria para tests que no necesitan Postgres.
+Crea todas las tablas de los modelos y cuenta las queries ejecutadas.
+
+Uso:
+    from db_pruebas import crear_db_pruebas
+    db, contador = crear_db_pruebas()
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database.config import Base
+import src.models  # noqa: F401 (registrar tablas)
+import src.models.torneo_models  # noqa: F401
+
+
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(type_, compiler, **kw):
+    # SQLite solo autoincrementa claves INTEGER PRIMARY KEY
+    return "INTEGER"
+
+
+def crear_engine_pruebas():
+    """Engine SQLite en memoria compartido entre sesiones (StaticPool)"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def crear_db_pruebas():
+    """Sesión sobre una base nueva + contador de queries"""
+    engine = crear_engine_pruebas()
+    contador = {"queries": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def contar(*args):
+        contador["queries"] += 1
+
+    return sessionmaker(bind=engine, autoflush=False)(), contador
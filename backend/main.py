@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 from contextlib import asynccontextmanager
 from datetime import datetime
 
@@ -27,6 +28,7 @@ from src.controllers.partido_controller import router as partido_router
 from src.controllers.ranking_controller import router as ranking_router
 from src.controllers.estadisticas_controller import router as estadisticas_router
 from src.controllers.sala_controller import router as sala_router
+from src.controllers.matchmaking_controller import router as matchmaking_router
 from src.controllers.resultado_controller import router as resultado_router
 from src.controllers.torneo_controller import router as torneo_router
 from src.controllers.torneo_pago_controller import router as torneo_pago_router
@@ -58,6 +60,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Error al inicializar Firebase Admin: {e}")
 
+    # Worker de la cola de confirmaciones (aplica Elo fuera del request)
+    try:
+        from src.services.cola_confirmaciones_service import cola_confirmaciones_worker
+        await cola_confirmaciones_worker.start()
+    except Exception as e:
+        logger.error(f"❌ Error al iniciar worker de confirmaciones: {e}")
+
+    # Worker de notificaciones push (envía a FCM fuera del request)
+    try:
+        from src.services.cola_notificaciones_service import cola_notificaciones_worker
+        await cola_notificaciones_worker.start()
+    except Exception as e:
+        logger.error(f"❌ Error al iniciar worker de notificaciones: {e}")
+
+    # Pub/sub de WebSocket entre workers (eventos de salas)
+    try:
+        from src.websocket.connection_manager import manager as ws_manager
+        await ws_manager.iniciar_pubsub()
+        from src.websocket.torneo_feed import feed_torneos
+        feed_torneos.iniciar()
+    except Exception as e:
+        logger.error(f"❌ Error al iniciar pub/sub de WebSocket: {e}")
+
+    # Índice de búsqueda de usuarios (autocompletado sin ir a la base), en background
+    try:
+        from src.services.busqueda_usuarios_service import precargar_indice_busqueda
+        asyncio.get_running_loop().run_in_executor(None, precargar_indice_busqueda)
+    except Exception as e:
+        logger.error(f"❌ Error al precargar índice de búsqueda: {e}")
+
     # TEMPORALMENTE DESHABILITADO - Las tareas programadas estaban bloqueando el startup
     # Se pueden activar manualmente via /health endpoint
     try:
@@ -76,6 +108,21 @@ async def lifespan(app: FastAPI):
         logger.info("✅ Tareas programadas detenidas")
     except Exception as e:
         logger.error(f"❌ Error al detener tareas programadas: {e}")
+    try:
+        from src.services.cola_confirmaciones_service import cola_confirmaciones_worker
+        cola_confirmaciones_worker.stop()
+    except Exception as e:
+        logger.error(f"❌ Error al detener worker de confirmaciones: {e}")
+    try:
+        from src.services.cola_notificaciones_service import cola_notificaciones_worker
+        cola_notificaciones_worker.stop()
+    except Exception as e:
+        logger.error(f"❌ Error al detener worker de notificaciones: {e}")
+    try:
+        from src.websocket.connection_manager import manager as ws_manager
+        await ws_manager.detener_pubsub()
+    except Exception as e:
+        logger.error(f"❌ Error al detener pub/sub de WebSocket: {e}")
 
 
 # ---- Crear app ----
@@ -106,6 +153,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permitir todos los métodos incluyendo PATCH
     allow_headers=["*"],
+    expose_headers=["X-Siguiente-Cursor", "ETag"],  # Cursor del listado de torneos, versión de /torneos/{id}/vista
 )
 
 # ---- OPTIMIZACIÓN MOBILE: Compresión GZip ----
@@ -125,6 +173,7 @@ app.include_router(auth_router)
 app.include_router(usuario_router)
 app.include_router(categoria_router)
 app.include_router(sala_router)
+app.include_router(matchmaking_router)
 app.include_router(resultado_router)
 app.include_router(partido_router)
 app.include_router(ranking_router)
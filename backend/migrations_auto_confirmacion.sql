@@ -0,0 +1,22 @@
+-- =====================================================
+-- MIGRACIÓN: Índices para auto-confirmación por lotes
+-- Propósito: el job de auto-confirmación busca partidos pendientes
+-- viejos sin reportes (anti-join contra confirmaciones) en lotes
+-- ordenados por id_partido con FOR UPDATE SKIP LOCKED
+-- =====================================================
+
+-- Partidos pendientes de confirmación, en orden de id (keyset del job)
+CREATE INDEX IF NOT EXISTS idx_partidos_pendientes_confirmacion
+ON partidos(id_partido, creado_en)
+WHERE estado_confirmacion = 'pendiente_confirmacion' AND elo_aplicado = FALSE;
+
+-- Anti-join: ¿el partido tiene algún reporte?
+CREATE INDEX IF NOT EXISTS idx_confirmaciones_partido_tipo
+ON confirmaciones(id_partido, tipo);
+
+-- Historial de rating existente por partido (carga en bloque)
+CREATE INDEX IF NOT EXISTS idx_historial_rating_partido
+ON historial_rating(id_partido, id_usuario);
+
+ANALYZE partidos;
+ANALYZE confirmaciones;
@@ -0,0 +1,14 @@
+-- =====================================================
+-- MIGRACIÓN: Barrido de salas abandonadas
+-- Propósito: una tarea programada (un solo worker, con lock consultivo)
+-- cierra por lotes las salas que quedaron en esperando / en_juego:
+--   - sin empezar con la fecha pasada hace más de 6 h  -> 'expirada'
+--   - en juego con el partido ya confirmado             -> 'finalizada'
+--   - en juego sin resultado 48 h después de la fecha   -> 'expirada'
+-- Nuevo estado de sala: 'expirada'
+-- =====================================================
+
+-- Candidatas del barrido: solo salas activas, por id (keyset de los lotes)
+CREATE INDEX IF NOT EXISTS idx_salas_activas_barrido
+ON salas(id_sala, fecha)
+WHERE estado IN ('esperando', 'activa', 'programada', 'en_juego');
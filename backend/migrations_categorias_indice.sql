@@ -0,0 +1,14 @@
+-- =====================================================
+-- MIGRACIÓN: Índice para la corrección masiva de categorías
+-- Propósito: el mantenimiento de categorías corrige a todos los usuarios
+-- con un único UPDATE ... FROM (join por rango usuarios × categorias).
+-- La búsqueda por partido ya no consulta la tabla: usa un índice en memoria
+-- (IndiceCategorias), así que este índice solo sirve al join masivo.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_categorias_sexo_rating
+ON categorias(sexo, rating_min, rating_max);
+
+-- Usuarios agrupados por sexo para el join
+CREATE INDEX IF NOT EXISTS idx_usuarios_sexo_rating
+ON usuarios(sexo, rating);
@@ -0,0 +1,32 @@
+-- =====================================================
+-- MIGRACIÓN: Cola durable de confirmaciones (outbox)
+-- Propósito: cuando el último rival confirma, el request solo encola
+-- un trabajo; un worker aplica Elo, categorías, historial y
+-- notificaciones una única vez (clave de idempotencia por partido)
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS trabajos_confirmacion (
+    id_trabajo BIGSERIAL PRIMARY KEY,
+    clave_idempotencia VARCHAR(100) NOT NULL UNIQUE,
+    tipo VARCHAR(30) NOT NULL DEFAULT 'aplicar_elo',
+    id_partido BIGINT NOT NULL REFERENCES partidos(id_partido) ON DELETE CASCADE,
+    id_sala BIGINT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    resultado JSON NULL,
+    error TEXT NULL,
+    disponible_en TIMESTAMPTZ DEFAULT NOW(),
+    creado_en TIMESTAMPTZ DEFAULT NOW(),
+    actualizado_en TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT chk_estado_trabajo_confirmacion CHECK (estado IN ('pendiente', 'completado', 'error'))
+);
+
+COMMENT ON TABLE trabajos_confirmacion IS 'Cola durable de trabajos de confirmación (Elo, categorías, historial, notificaciones)';
+
+-- El worker toma trabajos pendientes en orden con FOR UPDATE SKIP LOCKED
+CREATE INDEX IF NOT EXISTS idx_trabajos_confirmacion_pendientes
+ON trabajos_confirmacion(disponible_en, id_trabajo)
+WHERE estado = 'pendiente';
+
+CREATE INDEX IF NOT EXISTS idx_trabajos_confirmacion_partido
+ON trabajos_confirmacion(id_partido);
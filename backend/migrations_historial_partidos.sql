@@ -0,0 +1,59 @@
+-- =====================================================
+-- MIGRACIÓN: Línea de tiempo de partidos por usuario
+-- Propósito: GET /partidos/usuario/{id} pagina por keyset sobre
+-- (fecha, id_partido) en orden descendente, sin traer todo el historial
+-- del usuario. La tabla se completa al confirmar cada partido
+-- (HistorialPartidosService.registrar); acá se carga lo ya existente.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS historial_partidos (
+    id_usuario BIGINT NOT NULL REFERENCES usuarios(id_usuario) ON DELETE CASCADE,
+    fecha TIMESTAMPTZ NOT NULL,
+    id_partido BIGINT NOT NULL REFERENCES partidos(id_partido) ON DELETE CASCADE,
+    tipo VARCHAR(20) NOT NULL,
+    equipo SMALLINT,
+    gano BOOLEAN,
+    PRIMARY KEY (id_usuario, fecha, id_partido)
+);
+
+-- Equipo y resultado de cada jugador: al corregir un resultado se resta del
+-- récord entre jugadores lo que el partido había sumado
+ALTER TABLE historial_partidos ADD COLUMN IF NOT EXISTS equipo SMALLINT;
+ALTER TABLE historial_partidos ADD COLUMN IF NOT EXISTS gano BOOLEAN;
+
+-- Rehacer las filas de un partido (re-confirmación / corrección)
+CREATE INDEX IF NOT EXISTS idx_historial_partidos_partido
+ON historial_partidos(id_partido);
+
+-- Amistosos confirmados (por los rivales o auto-confirmados a las 48 h,
+-- que quedan con estado 'pendiente'): jugadores de partido_jugadores
+INSERT INTO historial_partidos (id_usuario, fecha, id_partido, tipo, equipo, gano)
+SELECT pj.id_usuario, p.fecha, p.id_partido, COALESCE(p.tipo, 'amistoso'), pj.equipo,
+       pj.equipo = COALESCE(p.ganador_equipo,
+                            CASE WHEN r.sets_eq1 > r.sets_eq2 THEN 1
+                                 WHEN r.sets_eq2 > r.sets_eq1 THEN 2 END)
+FROM partidos p
+JOIN partido_jugadores pj ON pj.id_partido = p.id_partido
+LEFT JOIN resultados_partidos r ON r.id_partido = p.id_partido
+WHERE (p.estado IN ('confirmado', 'finalizado')
+       OR (p.estado_confirmacion = 'auto_confirmado' AND p.elo_aplicado))
+AND (p.tipo = 'amistoso' OR p.tipo IS NULL)
+ON CONFLICT (id_usuario, fecha, id_partido) DO UPDATE
+SET equipo = EXCLUDED.equipo, gano = EXCLUDED.gano;
+
+-- Torneo: historial_rating era la fuente de verdad de participación
+INSERT INTO historial_partidos (id_usuario, fecha, id_partido, tipo, equipo, gano)
+SELECT DISTINCT hr.id_usuario, p.fecha, p.id_partido, 'torneo',
+       CASE WHEN tp.id = p.pareja1_id THEN 1 ELSE 2 END,
+       CASE WHEN p.ganador_pareja_id IS NULL THEN NULL
+            ELSE p.ganador_pareja_id = tp.id END
+FROM historial_rating hr
+JOIN partidos p ON p.id_partido = hr.id_partido
+LEFT JOIN torneos_parejas tp ON tp.id IN (p.pareja1_id, p.pareja2_id)
+     AND hr.id_usuario IN (tp.jugador1_id, tp.jugador2_id)
+WHERE p.tipo = 'torneo'
+AND p.estado IN ('confirmado', 'finalizado')
+ON CONFLICT (id_usuario, fecha, id_partido) DO UPDATE
+SET equipo = EXCLUDED.equipo, gano = EXCLUDED.gano;
+
+ANALYZE historial_partidos;
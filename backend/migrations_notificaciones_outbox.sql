@@ -0,0 +1,36 @@
+-- =====================================================
+-- MIGRACIÓN: Cola de notificaciones push (outbox)
+-- Propósito: los requests (inscripciones, confirmaciones, Elo) solo
+-- encolan la notificación; un worker la envía a FCM en lotes de hasta
+-- 500, con reintentos y backoff, y limpia los tokens inválidos
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS notificaciones_pendientes (
+    id_notificacion BIGSERIAL PRIMARY KEY,
+    id_usuario BIGINT NOT NULL REFERENCES usuarios(id_usuario) ON DELETE CASCADE,
+    titulo VARCHAR(200) NOT NULL,
+    cuerpo TEXT NOT NULL,
+    data JSON NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    disponible_en TIMESTAMPTZ DEFAULT NOW(),
+    creado_en TIMESTAMPTZ DEFAULT NOW(),
+    enviado_en TIMESTAMPTZ NULL,
+    CONSTRAINT chk_estado_notificacion_pendiente CHECK (estado IN ('pendiente', 'enviada', 'sin_token', 'error'))
+);
+
+COMMENT ON TABLE notificaciones_pendientes IS 'Cola durable de notificaciones push (FCM)';
+
+-- El worker toma lotes pendientes en orden con FOR UPDATE SKIP LOCKED
+CREATE INDEX IF NOT EXISTS idx_notificaciones_pendientes_cola
+ON notificaciones_pendientes(disponible_en, id_notificacion)
+WHERE estado = 'pendiente';
+
+CREATE INDEX IF NOT EXISTS idx_notificaciones_pendientes_usuario
+ON notificaciones_pendientes(id_usuario);
+
+-- Limpieza de tokens inválidos (UPDATE ... WHERE fcm_token IN (...))
+CREATE INDEX IF NOT EXISTS idx_usuarios_fcm_token
+ON usuarios(fcm_token)
+WHERE fcm_token IS NOT NULL;
@@ -0,0 +1,14 @@
+-- =====================================================
+-- MIGRACIÓN: Índice para la serie de rating del perfil
+-- Propósito: GET /usuarios/{id}/rating-historia recorre el historial de
+-- un usuario en orden (creado_en, id_historial) y busca su último
+-- id_historial (clave del caché) sin leer la tabla entera.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_historial_rating_usuario_fecha
+ON historial_rating(id_usuario, creado_en, id_historial);
+
+CREATE INDEX IF NOT EXISTS idx_historial_rating_usuario_id
+ON historial_rating(id_usuario, id_historial);
+
+ANALYZE historial_rating;
@@ -0,0 +1,65 @@
+-- =====================================================
+-- MIGRACIÓN: Récords entre jugadores (compañeros y rivales)
+-- Propósito: "mi récord contra X" / "con Y" sin self-joins sobre todo el
+-- historial. La tabla se suma al confirmar cada partido
+-- (RelacionesJugadoresService.sumar_partido); acá se carga lo existente a
+-- partir de historial_partidos (correr después de
+-- migrations_historial_partidos.sql).
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS relaciones_jugadores (
+    id_usuario BIGINT NOT NULL REFERENCES usuarios(id_usuario) ON DELETE CASCADE,
+    id_otro BIGINT NOT NULL REFERENCES usuarios(id_usuario) ON DELETE CASCADE,
+    relacion VARCHAR(10) NOT NULL CHECK (relacion IN ('companero', 'rival')),
+    jugados INTEGER NOT NULL DEFAULT 0,
+    ganados INTEGER NOT NULL DEFAULT 0,
+    perdidos INTEGER NOT NULL DEFAULT 0,
+    ultimo_partido TIMESTAMPTZ,
+    PRIMARY KEY (id_usuario, id_otro, relacion)
+);
+
+-- Compañeros / rivales principales de un usuario
+CREATE INDEX IF NOT EXISTS idx_relaciones_jugadores_principales
+ON relaciones_jugadores(id_usuario, relacion, jugados DESC, ganados DESC);
+
+-- Carga inicial: un par (jugador, equipo, ganador) por partido ya registrado
+-- en historial_partidos (incluye los amistosos auto-confirmados)
+WITH jugadores AS (
+    SELECT p.id_partido, p.fecha, pj.id_usuario, pj.equipo,
+           COALESCE(p.ganador_equipo,
+                    CASE WHEN r.sets_eq1 > r.sets_eq2 THEN 1
+                         WHEN r.sets_eq2 > r.sets_eq1 THEN 2 END) AS ganador
+    FROM partidos p
+    JOIN partido_jugadores pj ON pj.id_partido = p.id_partido
+    LEFT JOIN resultados_partidos r ON r.id_partido = p.id_partido
+    WHERE p.tipo IS DISTINCT FROM 'torneo'
+    AND EXISTS (SELECT 1 FROM historial_partidos hp WHERE hp.id_partido = p.id_partido)
+
+    UNION ALL
+
+    SELECT p.id_partido, p.fecha, j.id_usuario,
+           CASE WHEN tp.id = p.pareja1_id THEN 1 ELSE 2 END,
+           CASE WHEN p.ganador_pareja_id = p.pareja1_id THEN 1
+                WHEN p.ganador_pareja_id = p.pareja2_id THEN 2 END
+    FROM partidos p
+    JOIN torneos_parejas tp ON tp.id IN (p.pareja1_id, p.pareja2_id)
+    CROSS JOIN LATERAL (VALUES (tp.jugador1_id), (tp.jugador2_id)) AS j(id_usuario)
+    WHERE p.tipo = 'torneo'
+    AND j.id_usuario IS NOT NULL
+    AND EXISTS (SELECT 1 FROM historial_partidos hp WHERE hp.id_partido = p.id_partido)
+)
+INSERT INTO relaciones_jugadores (id_usuario, id_otro, relacion, jugados, ganados, perdidos, ultimo_partido)
+SELECT a.id_usuario,
+       b.id_usuario,
+       CASE WHEN a.equipo = b.equipo THEN 'companero' ELSE 'rival' END,
+       COUNT(*),
+       SUM(CASE WHEN a.equipo = a.ganador THEN 1 ELSE 0 END),
+       SUM(CASE WHEN a.equipo <> a.ganador THEN 1 ELSE 0 END),
+       MAX(a.fecha)
+FROM jugadores a
+JOIN jugadores b ON b.id_partido = a.id_partido AND b.id_usuario <> a.id_usuario
+WHERE a.ganador IS NOT NULL
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+ANALYZE relaciones_jugadores;
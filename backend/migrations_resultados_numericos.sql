@@ -0,0 +1,128 @@
+-- =====================================================
+-- MIGRACIÓN: Resultado numérico en partidos
+-- Propósito: guardar sets, games, ganador y supertiebreak como columnas
+-- para que posiciones y estadísticas agreguen en SQL sin recorrer el
+-- JSON de resultado_padel / detalle_sets (con claves distintas según
+-- el origen: gamesEquipoA vs juegos_eq1).
+-- Las filas nuevas las completa ResultadoParser al cargar el resultado;
+-- este script hace el backfill de las existentes (mismas reglas).
+-- =====================================================
+
+ALTER TABLE partidos ADD COLUMN IF NOT EXISTS sets_eq1 SMALLINT NULL;
+ALTER TABLE partidos ADD COLUMN IF NOT EXISTS sets_eq2 SMALLINT NULL;
+ALTER TABLE partidos ADD COLUMN IF NOT EXISTS games_eq1 SMALLINT NULL;
+ALTER TABLE partidos ADD COLUMN IF NOT EXISTS games_eq2 SMALLINT NULL;
+ALTER TABLE partidos ADD COLUMN IF NOT EXISTS supertiebreak_eq1 SMALLINT NULL;
+ALTER TABLE partidos ADD COLUMN IF NOT EXISTS supertiebreak_eq2 SMALLINT NULL;
+
+COMMENT ON COLUMN partidos.games_eq1 IS 'Games del equipo 1 sin contar puntos de supertiebreak';
+COMMENT ON COLUMN partidos.supertiebreak_eq1 IS 'Puntos del supertiebreak del equipo 1 (NULL si no hubo)';
+
+
+-- ============ BACKFILL ============
+-- Reglas (iguales a ResultadoParser):
+-- - Un set lo gana quien tiene más games
+-- - Es supertiebreak si viene marcado (esSuperTiebreak) o si tiene más de 7 games
+-- - El supertiebreak cuenta como set pero sus puntos no suman games
+-- - El supertiebreak en formato antiguo (objeto "supertiebreak") se agrega como set
+
+-- 1. Partidos de salas: resultados_partidos.detalle_sets
+WITH sets AS (
+    SELECT
+        r.id_partido,
+        COALESCE(s->>'juegos_eq1', s->>'gamesEquipoA', s->>'equipo1', s->>'games_a', '0')::int AS ga,
+        COALESCE(s->>'juegos_eq2', s->>'gamesEquipoB', s->>'equipo2', s->>'games_b', '0')::int AS gb,
+        COALESCE((s->>'esSuperTiebreak')::boolean, false) AS marcado_stb
+    FROM resultados_partidos r
+    CROSS JOIN LATERAL json_array_elements(r.detalle_sets) AS s
+    WHERE json_typeof(r.detalle_sets) = 'array'
+),
+totales AS (
+    SELECT
+        id_partido,
+        COUNT(*) FILTER (WHERE ga > gb) AS sets_eq1,
+        COUNT(*) FILTER (WHERE gb > ga) AS sets_eq2,
+        COALESCE(SUM(ga) FILTER (WHERE NOT (marcado_stb OR GREATEST(ga, gb) > 7)), 0) AS games_eq1,
+        COALESCE(SUM(gb) FILTER (WHERE NOT (marcado_stb OR GREATEST(ga, gb) > 7)), 0) AS games_eq2,
+        MAX(ga) FILTER (WHERE marcado_stb OR GREATEST(ga, gb) > 7) AS supertiebreak_eq1,
+        MAX(gb) FILTER (WHERE marcado_stb OR GREATEST(ga, gb) > 7) AS supertiebreak_eq2
+    FROM sets
+    GROUP BY id_partido
+)
+UPDATE partidos p
+SET sets_eq1 = t.sets_eq1,
+    sets_eq2 = t.sets_eq2,
+    games_eq1 = t.games_eq1,
+    games_eq2 = t.games_eq2,
+    supertiebreak_eq1 = t.supertiebreak_eq1,
+    supertiebreak_eq2 = t.supertiebreak_eq2,
+    ganador_equipo = COALESCE(
+        p.ganador_equipo,
+        CASE WHEN t.sets_eq1 > t.sets_eq2 THEN 1 WHEN t.sets_eq2 > t.sets_eq1 THEN 2 END
+    )
+FROM totales t
+WHERE t.id_partido = p.id_partido
+  AND p.sets_eq1 IS NULL;
+
+-- 2. Partidos de torneo: partidos.resultado_padel
+WITH sets AS (
+    SELECT
+        p.id_partido,
+        COALESCE(s->>'gamesEquipoA', s->>'juegos_eq1', '0')::int AS ga,
+        COALESCE(s->>'gamesEquipoB', s->>'juegos_eq2', '0')::int AS gb,
+        COALESCE((s->>'esSuperTiebreak')::boolean, false) AS marcado_stb
+    FROM partidos p
+    CROSS JOIN LATERAL json_array_elements(p.resultado_padel->'sets') AS s
+    WHERE p.resultado_padel IS NOT NULL
+      AND json_typeof(p.resultado_padel->'sets') = 'array'
+    UNION ALL
+    SELECT
+        p.id_partido,
+        COALESCE(p.resultado_padel->'supertiebreak'->>'puntosEquipoA', '0')::int,
+        COALESCE(p.resultado_padel->'supertiebreak'->>'puntosEquipoB', '0')::int,
+        true
+    FROM partidos p
+    WHERE p.resultado_padel IS NOT NULL
+      AND json_typeof(p.resultado_padel->'supertiebreak') = 'object'
+      AND COALESCE((p.resultado_padel->'supertiebreak'->>'completado')::boolean, false)
+),
+totales AS (
+    SELECT
+        id_partido,
+        COUNT(*) FILTER (WHERE ga > gb) AS sets_eq1,
+        COUNT(*) FILTER (WHERE gb > ga) AS sets_eq2,
+        COALESCE(SUM(ga) FILTER (WHERE NOT (marcado_stb OR GREATEST(ga, gb) > 7)), 0) AS games_eq1,
+        COALESCE(SUM(gb) FILTER (WHERE NOT (marcado_stb OR GREATEST(ga, gb) > 7)), 0) AS games_eq2,
+        MAX(ga) FILTER (WHERE marcado_stb OR GREATEST(ga, gb) > 7) AS supertiebreak_eq1,
+        MAX(gb) FILTER (WHERE marcado_stb OR GREATEST(ga, gb) > 7) AS supertiebreak_eq2
+    FROM sets
+    GROUP BY id_partido
+)
+UPDATE partidos p
+SET sets_eq1 = t.sets_eq1,
+    sets_eq2 = t.sets_eq2,
+    games_eq1 = t.games_eq1,
+    games_eq2 = t.games_eq2,
+    supertiebreak_eq1 = t.supertiebreak_eq1,
+    supertiebreak_eq2 = t.supertiebreak_eq2,
+    ganador_equipo = COALESCE(
+        p.ganador_equipo,
+        CASE WHEN t.sets_eq1 > t.sets_eq2 THEN 1 WHEN t.sets_eq2 > t.sets_eq1 THEN 2 END
+    )
+FROM totales t
+WHERE t.id_partido = p.id_partido;
+
+
+-- ============ ÍNDICES ============
+-- Tabla de posiciones: partidos confirmados de una zona
+CREATE INDEX IF NOT EXISTS idx_partidos_zona_confirmados
+ON partidos(zona_id)
+WHERE estado = 'confirmado';
+
+
+-- Verificación: partidos con resultado cargado y sin columnas numéricas
+SELECT COUNT(*) AS pendientes_backfill
+FROM partidos p
+WHERE p.sets_eq1 IS NULL
+  AND (p.resultado_padel IS NOT NULL
+       OR EXISTS (SELECT 1 FROM resultados_partidos r WHERE r.id_partido = p.id_partido));
@@ -0,0 +1,31 @@
+-- =====================================================
+-- MIGRACIÓN: Lugar único por jugador en cada sala
+-- Propósito: unirse a una sala leía la cantidad de jugadores y después
+-- insertaba con orden = cantidad + 1; con uniones concurrentes las salas
+-- se llenaban de más o repetían orden. Ahora la unión bloquea la sala y
+-- esta restricción impide que dos jugadores ocupen el mismo lugar.
+-- =====================================================
+
+-- 1. Renumerar los órdenes repetidos que ya existan (por orden de llegada)
+WITH numerados AS (
+    SELECT id_sala, id_usuario,
+           ROW_NUMBER() OVER (PARTITION BY id_sala ORDER BY orden, unido_en, id_usuario) AS nuevo_orden
+    FROM sala_jugadores
+)
+UPDATE sala_jugadores sj
+SET orden = n.nuevo_orden
+FROM numerados n
+WHERE sj.id_sala = n.id_sala
+  AND sj.id_usuario = n.id_usuario
+  AND sj.orden IS DISTINCT FROM n.nuevo_orden;
+
+-- 2. Restricción única (id_sala, orden)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_sala_jugadores_orden'
+    ) THEN
+        ALTER TABLE sala_jugadores
+        ADD CONSTRAINT uq_sala_jugadores_orden UNIQUE (id_sala, orden);
+    END IF;
+END $$;
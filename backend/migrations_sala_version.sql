@@ -0,0 +1,9 @@
+-- =====================================================
+-- MIGRACIÓN: Versión del estado de cada sala
+-- Propósito: GET /salas/{id} y los WebSocket nuevos se sirven de un
+-- estado en memoria por sala. Cada cambio (unirse, equipos, inicio,
+-- resultado, confirmación, cierre) sube la versión en la misma
+-- transacción; los workers descartan las copias de versión menor.
+-- =====================================================
+
+ALTER TABLE salas ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
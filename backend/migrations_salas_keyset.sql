@@ -0,0 +1,24 @@
+-- =====================================================
+-- MIGRACIÓN: Índices para los listados paginados de salas
+-- Propósito: GET /salas/feed pagina por keyset sobre (creado_en, id_sala)
+-- en orden descendente. Cada vista recorre su índice desde el cursor
+-- sin OFFSET ni ordenamiento en memoria.
+-- (migrations_indices_salas_performance.sql apuntaba a las tablas
+-- "sala" / "sala_jugador"; las reales son "salas" / "sala_jugadores")
+-- =====================================================
+
+-- Salas abiertas y activas: filtro por estado + orden del keyset
+CREATE INDEX IF NOT EXISTS idx_salas_estado_keyset
+ON salas(estado, creado_en DESC, id_sala DESC);
+
+-- Mis salas / mis finalizadas: las salas de un usuario
+-- (la PK de sala_jugadores empieza por id_sala y no sirve para esto)
+CREATE INDEX IF NOT EXISTS idx_sala_jugadores_usuario
+ON sala_jugadores(id_usuario, id_sala);
+
+-- Rating del creador para "salas abiertas cerca de mi rating"
+CREATE INDEX IF NOT EXISTS idx_usuarios_rating
+ON usuarios(rating);
+
+ANALYZE salas;
+ANALYZE sala_jugadores;
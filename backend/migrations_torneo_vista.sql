@@ -0,0 +1,19 @@
+-- =====================================================
+-- MIGRACIÓN: Versión de torneos para GET /torneos/{id}/vista
+-- Propósito: la vista completa del torneo (categorías, parejas, zonas,
+-- tablas, partidos y playoffs) lleva un ETag con la versión del torneo.
+-- La versión sube en la misma transacción que cualquier cambio del
+-- torneo, sus categorías, parejas, zonas, asignaciones o partidos; si el
+-- cliente ya tiene la versión actual se responde 304.
+-- =====================================================
+
+ALTER TABLE torneos ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+-- Asignaciones de parejas de todas las zonas del torneo en una query
+CREATE INDEX IF NOT EXISTS idx_torneo_zona_parejas_zona
+ON torneo_zona_parejas(zona_id);
+
+-- Partidos del torneo (vista y cambios en bloque por torneo)
+CREATE INDEX IF NOT EXISTS idx_partidos_torneo
+ON partidos(id_torneo)
+WHERE id_torneo IS NOT NULL;
@@ -0,0 +1,22 @@
+-- =====================================================
+-- MIGRACIÓN: Índices para el listado público de torneos
+-- Propósito: GET /torneos pagina por keyset sobre (created_at, id) en
+-- orden descendente (con o sin filtro de estado / categoría) y cuenta las
+-- parejas inscriptas de la página con una query agrupada por torneo_id.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_torneos_keyset
+ON torneos(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_torneos_estado_keyset
+ON torneos(estado, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_torneos_categoria_keyset
+ON torneos(categoria, created_at DESC, id DESC);
+
+-- Conteo de parejas inscriptas / confirmadas por torneo
+CREATE INDEX IF NOT EXISTS idx_torneos_parejas_torneo_estado
+ON torneos_parejas(torneo_id, estado);
+
+ANALYZE torneos;
+ANALYZE torneos_parejas;
@@ -4,26 +4,63 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from .jwt_handler import JWTHandler
 from .firebase_handler import FirebaseHandler
+from .cache_auth import cache_auth
 from ..database.config import get_db
 from ..models.driveplus_models import Usuario
 
 security = HTTPBearer()
 
+def _verificar_token(token: str) -> Optional[dict]:
+    """Claims del token (JWT propio o Firebase), cacheados hasta su vencimiento"""
+    claims = cache_auth.claims(token)
+    if claims is not None:
+        return claims
+    
+    # Intentar primero con JWT tradicional, después con Firebase
+    claims = JWTHandler.verify_token(token) or FirebaseHandler.verify_token(token)
+    if claims:
+        cache_auth.guardar_claims(token, claims)
+    return claims
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> Usuario:
     """
     Obtener usuario actual desde token JWT o Firebase token
-    Soporta ambos sistemas de autenticación
+    Soporta ambos sistemas de autenticación (token y usuario cacheados,
+    ver cache_auth)
     """
     
     token = credentials.credentials
-    
-    # Intentar primero con JWT tradicional
-    payload = JWTHandler.verify_token(token)
+    payload = _verificar_token(token)
     user_id = None
     
+    if payload and payload.get("firebase"):
+        # Es un token de Firebase
+        firebase_email = payload.get("firebase_email")
+        
+        if not firebase_email:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de Firebase inválido: email no encontrado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        # Buscar usuario por email (Firebase)
+        user = cache_auth.usuario(email=firebase_email)
+        if user is None:
+            user = db.query(Usuario).filter(Usuario.email == firebase_email).first()
+            if user is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Usuario no encontrado. Por favor, completa tu perfil primero.",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            cache_auth.guardar_usuario(user)
+        return user
+    
     if payload:
         # Es un token JWT tradicional
         user_id = payload.get("sub")
@@ -32,31 +69,6 @@ async def get_current_user(
                 user_id = int(user_id)
             except ValueError:
                 user_id = None
-    else:
-        # Intentar con Firebase token
-        firebase_payload = FirebaseHandler.verify_token(token)
-        
-        if firebase_payload:
-            # Es un token de Firebase
-            firebase_email = firebase_payload.get("firebase_email")
-            
-            if firebase_email:
-                # Buscar usuario por email (Firebase)
-                user = db.query(Usuario).filter(Usuario.email == firebase_email).first()
-                if user:
-                    return user
-                else:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail="Usuario no encontrado. Por favor, completa tu perfil primero.",
-                        headers={"WWW-Authenticate": "Bearer"},
-                    )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token de Firebase inválido: email no encontrado",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
     
     # Validación para tokens JWT tradicionales
     if user_id is None:
@@ -66,13 +78,16 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+    user = cache_auth.usuario(id_usuario=user_id)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario no encontrado",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        user = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Usuario no encontrado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        cache_auth.guardar_usuario(user)
     
     return user
 
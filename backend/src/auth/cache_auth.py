@@ -0,0 +1,194 @@
+"""
+Caché del usuario autenticado
+
+get_current_user verificaba el token en cada request (para Firebase,
+verify_id_token con los certificados de Google) y después hacía un SELECT
+de usuarios. Ahora guarda en memoria, acotado y con TTL:
+
+- token (hash SHA-256) -> claims verificados, hasta el `exp` del token y
+  como mucho TTL_TOKEN_SEGUNDOS
+- id_usuario -> foto de las columnas de usuarios (email -> id para Firebase),
+  como mucho TTL_USUARIO_SEGUNDOS
+
+La foto se entrega como un Usuario desprendido (detached), sin query y sin
+pasar por la sesión del request: así un db.query(Usuario) posterior del
+mismo request (Elo, inscripciones, categorías) lee la base y no la foto.
+Es de solo lectura: los endpoints que modifican al usuario lo recargan con
+recargar_usuario().
+
+Invalidación: cualquier UPDATE / DELETE de un Usuario por la sesión (ORM o
+update(Usuario) en bloque) descarta su foto al hacer commit. Otros workers
+la ven vieja como mucho TTL_USUARIO_SEGUNDOS.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from ..models.driveplus_models import Usuario
+
+MAX_TOKENS = 10000
+MAX_USUARIOS = 10000
+TTL_TOKEN_SEGUNDOS = 300
+TTL_USUARIO_SEGUNDOS = 60
+
+# Clave en session.info con los ids modificados en la transacción (None = todos)
+CLAVE_MODIFICADOS = "usuarios_modificados"
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class CacheAuth:
+    """Claims por token y fotos de usuarios, LRU con vencimiento"""
+
+    def __init__(self, max_tokens: int = MAX_TOKENS, max_usuarios: int = MAX_USUARIOS):
+        self.max_tokens = max_tokens
+        self.max_usuarios = max_usuarios
+        self._tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._usuarios: "OrderedDict[int, tuple]" = OrderedDict()
+        self._por_email: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------------------------- tokens ----------------------------
+
+    def claims(self, token: str) -> Optional[Dict]:
+        clave = hash_token(token)
+        with self._lock:
+            entrada = self._tokens.get(clave)
+            if entrada is None:
+                return None
+            claims, vence = entrada
+            if time.time() >= vence:
+                del self._tokens[clave]
+                return None
+            self._tokens.move_to_end(clave)
+            return claims
+
+    def guardar_claims(self, token: str, claims: Dict) -> None:
+        """Guarda claims ya verificados; nunca más allá del `exp` del token"""
+        vence = time.time() + TTL_TOKEN_SEGUNDOS
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            vence = min(vence, exp)
+        if vence <= time.time():
+            return
+
+        with self._lock:
+            clave = hash_token(token)
+            self._tokens[clave] = (claims, vence)
+            self._tokens.move_to_end(clave)
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+
+    # ---------------------------- usuarios ----------------------------
+
+    def _foto(self, id_usuario: int) -> Optional[Dict]:
+        entrada = self._usuarios.get(id_usuario)
+        if entrada is None:
+            return None
+        foto, vence = entrada
+        if time.monotonic() >= vence:
+            self._quitar(id_usuario)
+            return None
+        self._usuarios.move_to_end(id_usuario)
+        return foto
+
+    def _quitar(self, id_usuario: int) -> None:
+        entrada = self._usuarios.pop(id_usuario, None)
+        if entrada is not None:
+            self._por_email.pop(entrada[0]["email"], None)
+
+    def usuario(self, id_usuario: int = None, email: str = None) -> Optional[Usuario]:
+        """Usuario desprendido (solo lectura) desde la foto, o None si no está"""
+        with self._lock:
+            if id_usuario is None:
+                id_usuario = self._por_email.get(email)
+            foto = self._foto(id_usuario) if id_usuario is not None else None
+        if foto is None:
+            return None
+
+        usuario = Usuario(**foto)
+        make_transient_to_detached(usuario)
+        return usuario
+
+    def guardar_usuario(self, usuario: Usuario) -> None:
+        foto = {atributo.key: getattr(usuario, atributo.key) for atributo in inspect(Usuario).column_attrs}
+        with self._lock:
+            self._quitar(usuario.id_usuario)
+            self._usuarios[usuario.id_usuario] = (foto, time.monotonic() + TTL_USUARIO_SEGUNDOS)
+            self._por_email[foto["email"]] = usuario.id_usuario
+            while len(self._usuarios) > self.max_usuarios:
+                _, (foto_vieja, _vence) = self._usuarios.popitem(last=False)
+                self._por_email.pop(foto_vieja["email"], None)
+
+    def invalidar_usuarios(self, ids: Optional[Set[int]]) -> None:
+        """Descarta las fotos de `ids` (None: todas)"""
+        with self._lock:
+            if ids is None:
+                self._usuarios.clear()
+                self._por_email.clear()
+                return
+            for id_usuario in ids:
+                self._quitar(id_usuario)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._usuarios.clear()
+            self._por_email.clear()
+
+
+cache_auth = CacheAuth()
+
+
+def recargar_usuario(db: Session, usuario: Usuario) -> Usuario:
+    """
+    El usuario del request adjuntado a `db` con los valores de la base, para
+    modificarlo (si ya estaba en la sesión devuelve el mismo objeto)
+    """
+    return db.get(Usuario, usuario.id_usuario)
+
+
+# ------------------------- invalidación -------------------------
+
+def _marcar(session: Optional[Session], id_usuario: Optional[int]) -> None:
+    if session is None:
+        return
+    if id_usuario is None:
+        session.info[CLAVE_MODIFICADOS] = None
+        return
+    modificados = session.info.setdefault(CLAVE_MODIFICADOS, set())
+    if modificados is not None:
+        modificados.add(id_usuario)
+
+
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def _usuario_modificado(mapper, connection, usuario):
+    _marcar(object_session(usuario), usuario.id_usuario)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _update_en_bloque(estado):
+    if estado.is_update or estado.is_delete:
+        tabla = getattr(estado.statement, "table", None)
+        if tabla is not None and getattr(tabla, "name", None) == Usuario.__tablename__:
+            _marcar(estado.session, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session):
+    if CLAVE_MODIFICADOS in session.info:
+        cache_auth.invalidar_usuarios(session.info.pop(CLAVE_MODIFICADOS))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _despues_de_rollback(session, transaccion_previa):
+    if transaccion_previa.parent is None:
+        session.info.pop(CLAVE_MODIFICADOS, None)
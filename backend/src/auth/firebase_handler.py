@@ -105,6 +105,7 @@ class FirebaseHandler:
                 "firebase_email": decoded_token.get("email"),
                 "email_verified": decoded_token.get("email_verified", False),
                 "firebase": True,  # Marca para identificar que es token de Firebase
+                "exp": decoded_token.get("exp"),  # Vencimiento (para el caché de auth)
             }
         except Exception as e:
             print(f"⚠️  Error al verificar token de Firebase: {e}")
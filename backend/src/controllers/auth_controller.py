@@ -11,6 +11,7 @@ from ..schemas.auth import UserLogin, UserRegister, Token, UserResponse, Firebas
 from ..auth.jwt_handler import JWTHandler
 from ..auth.firebase_handler import FirebaseHandler
 from ..auth.auth_utils import get_current_user
+from ..services.busqueda_usuarios_service import indice_busqueda_usuarios
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
@@ -54,6 +55,7 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        indice_busqueda_usuarios.refrescar_usuarios(db, [db_user.id_usuario])
         
         # Crear token JWT para el usuario
         access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
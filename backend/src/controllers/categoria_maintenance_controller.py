@@ -2,12 +2,18 @@
 Controlador para mantenimiento automático de categorías
 """
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Dict, List
 
 from ..database.config import get_db
 from ..models.driveplus_models import Usuario, Categoria
-from ..services.categoria_service import actualizar_categoria_usuario, obtener_categoria_por_rating
+from ..services.categoria_service import (
+    corregir_categorias_masivo, invalidar_indice_categorias,
+    listar_categorias_incorrectas, obtener_indice_categorias
+)
+from ..services.matchmaking_service import indice_matchmaking
+from ..services.busqueda_usuarios_service import indice_busqueda_usuarios
 from ..auth.auth_utils import get_current_user
 
 router = APIRouter(prefix="/admin/categorias", tags=["Admin - Categorías"])
@@ -52,37 +58,24 @@ async def verificar_categorias_sin_corregir(
         )
     
     try:
+        indice = obtener_indice_categorias(db)
         usuarios_incorrectos = []
-        usuarios = db.query(Usuario).all()
-        
-        for usuario in usuarios:
-            if not usuario.sexo:
-                continue
-                
-            categoria_correcta = obtener_categoria_por_rating(
-                db, usuario.rating or 1200, usuario.sexo
-            )
-            
-            if categoria_correcta and usuario.id_categoria != categoria_correcta.id_categoria:
-                categoria_actual = None
-                if usuario.id_categoria:
-                    categoria_actual = db.query(Categoria).filter(
-                        Categoria.id_categoria == usuario.id_categoria
-                    ).first()
-                
-                usuarios_incorrectos.append({
-                    "id_usuario": usuario.id_usuario,
-                    "nombre_usuario": usuario.nombre_usuario,
-                    "rating": usuario.rating,
-                    "categoria_actual": categoria_actual.nombre if categoria_actual else "Ninguna",
-                    "categoria_correcta": categoria_correcta.nombre
-                })
-        
+
+        for fila in listar_categorias_incorrectas(db):
+            categoria_actual = indice.por_id(fila["id_categoria_actual"])
+            usuarios_incorrectos.append({
+                "id_usuario": fila["id_usuario"],
+                "nombre_usuario": fila["nombre_usuario"],
+                "rating": fila["rating"],
+                "categoria_actual": categoria_actual.nombre if categoria_actual else "Ninguna",
+                "categoria_correcta": indice.por_id(fila["id_categoria_correcta"]).nombre
+            })
+
         return {
             "usuarios_con_categoria_incorrecta": len(usuarios_incorrectos),
             "detalles": usuarios_incorrectos
         }
-        
+
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -92,56 +85,48 @@ async def verificar_categorias_sin_corregir(
 async def ejecutar_correccion_categorias(db: Session) -> Dict:
     """
     Función interna para ejecutar la corrección de categorías
+    (un único UPDATE ... FROM en lugar de una query por usuario)
     """
-    usuarios_corregidos = []
-    usuarios_sin_cambios = 0
-    errores = []
-    
     try:
-        usuarios = db.query(Usuario).all()
-        
-        for usuario in usuarios:
-            try:
-                if not usuario.sexo:
-                    errores.append(f"Usuario {usuario.nombre_usuario} no tiene sexo definido")
-                    continue
-                
-                categoria_anterior_id = usuario.id_categoria
-                categoria_anterior = None
-                if categoria_anterior_id:
-                    categoria_anterior = db.query(Categoria).filter(
-                        Categoria.id_categoria == categoria_anterior_id
-                    ).first()
-                
-                # Actualizar categoría
-                categoria_nueva = actualizar_categoria_usuario(db, usuario)
-                
-                if categoria_nueva and categoria_anterior_id != categoria_nueva.id_categoria:
-                    usuarios_corregidos.append({
-                        "id_usuario": usuario.id_usuario,
-                        "nombre_usuario": usuario.nombre_usuario,
-                        "rating": usuario.rating,
-                        "categoria_anterior": categoria_anterior.nombre if categoria_anterior else "Ninguna",
-                        "categoria_nueva": categoria_nueva.nombre
-                    })
-                else:
-                    usuarios_sin_cambios += 1
-                    
-            except Exception as e:
-                errores.append(f"Error con usuario {usuario.nombre_usuario}: {str(e)}")
-        
+        # Recargar las bandas: el mantenimiento también refresca el índice en memoria
+        invalidar_indice_categorias()
+        indice = obtener_indice_categorias(db)
+
+        sin_sexo = [
+            nombre for (nombre,) in
+            db.query(Usuario.nombre_usuario).filter(Usuario.sexo.is_(None)).all()
+        ]
+        errores = [f"Usuario {nombre} no tiene sexo definido" for nombre in sin_sexo]
+        total_con_sexo = db.query(func.count(Usuario.id_usuario)).filter(
+            Usuario.sexo.is_not(None)
+        ).scalar()
+
+        usuarios_corregidos = []
+        for fila in corregir_categorias_masivo(db):
+            categoria_anterior = indice.por_id(fila["id_categoria_anterior"])
+            usuarios_corregidos.append({
+                "id_usuario": fila["id_usuario"],
+                "nombre_usuario": fila["nombre_usuario"],
+                "rating": fila["rating"],
+                "categoria_anterior": categoria_anterior.nombre if categoria_anterior else "Ninguna",
+                "categoria_nueva": indice.por_id(fila["id_categoria_nueva"]).nombre
+            })
+
         # Confirmar cambios
         db.commit()
-        
+        if usuarios_corregidos:
+            indice_matchmaking.refrescar_jugadores(db, [u["id_usuario"] for u in usuarios_corregidos])
+            indice_busqueda_usuarios.refrescar_usuarios(db, [u["id_usuario"] for u in usuarios_corregidos])
+
         return {
             "success": True,
             "usuarios_corregidos": len(usuarios_corregidos),
-            "usuarios_sin_cambios": usuarios_sin_cambios,
+            "usuarios_sin_cambios": total_con_sexo - len(usuarios_corregidos),
             "errores": len(errores),
             "detalles_correcciones": usuarios_corregidos,
             "detalles_errores": errores
         }
-        
+
     except Exception as e:
         db.rollback()
         raise e
@@ -23,7 +23,8 @@ async def health_check():
         
         return {
             "status": "ok",
-            "scheduled_tasks": "running" if scheduler_service.running else "stopped"
+            "scheduled_tasks": "running" if scheduler_service.running else "stopped",
+            "ultima_auto_confirmacion": scheduler_service.last_auto_confirmacion
         }
     except Exception as e:
         return {
@@ -0,0 +1,49 @@
+"""
+Matchmaking: salas abiertas y jugadores libres cerca de mi rating
+"""
+from dataclasses import asdict
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database.config import get_db
+from ..models.driveplus_models import Usuario
+from ..auth.auth_utils import get_current_user
+from ..services.matchmaking_service import obtener_indice_matchmaking
+
+router = APIRouter(prefix="/matchmaking", tags=["Matchmaking"])
+
+
+@router.get("/salas")
+async def buscar_salas_abiertas(
+    margen: int = Query(150, ge=0, le=1000),
+    ciudad: Optional[str] = None,
+    id_categoria: Optional[int] = None,
+    limite: int = Query(20, ge=1, le=100),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Salas esperando jugadores con rating promedio dentro de ±margen del mío"""
+    salas = obtener_indice_matchmaking(db).buscar_salas(
+        current_user.rating or 1200, margen, ciudad, id_categoria,
+        id_usuario=current_user.id_usuario, limite=limite
+    )
+    return [asdict(sala) for sala in salas]
+
+
+@router.get("/jugadores")
+async def buscar_jugadores_libres(
+    margen: int = Query(150, ge=0, le=1000),
+    ciudad: Optional[str] = None,
+    id_categoria: Optional[int] = None,
+    limite: int = Query(20, ge=1, le=100),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Jugadores que no están en ninguna sala activa, con rating dentro de ±margen del mío"""
+    jugadores = obtener_indice_matchmaking(db).buscar_jugadores(
+        current_user.rating or 1200, margen, ciudad, id_categoria,
+        id_usuario=current_user.id_usuario, limite=limite
+    )
+    return [asdict(jugador) for jugador in jugadores]
@@ -4,11 +4,16 @@ from typing import List, Optional
 from datetime import datetime
 
 from ..database.config import get_db
-from ..models.driveplus_models import Partido, PartidoJugador, ResultadoPartido, Usuario, Club, HistorialRating, PerfilUsuario, Categoria
+from ..models.driveplus_models import Partido, PartidoJugador, ResultadoPartido, Usuario, Club, HistorialRating, Categoria
 from ..schemas.partido import PartidoCreate, PartidoResponse, PartidoCompleto, ResultadoCreate
 from ..auth.auth_utils import get_current_user
 from ..services.elo_service import EloService
 from ..services.categoria_service import actualizar_categoria_usuario
+from ..services.historial_partidos_service import (
+    HistorialPartidosService, LIMITE_POR_DEFECTO as LIMITE_HISTORIAL, LIMITE_MAXIMO as LIMITE_MAXIMO_HISTORIAL
+)
+from ..utils.padel_validator import PadelValidator
+from ..utils.resultado_parser import ResultadoParser
 
 router = APIRouter(prefix="/partidos", tags=["Partidos"])
 
@@ -223,6 +228,16 @@ async def reportar_resultado(
             detail="Solo los jugadores del partido pueden reportar resultados"
         )
     
+    # Parsear el detalle de sets (WO y retiros pueden quedar incompletos)
+    numerico = ResultadoParser.parsear(resultado_data.detalle_sets, validar=False)
+    if numerico["sets"] and (resultado_data.desenlace or "normal") == "normal":
+        es_valido, errores = PadelValidator.validar_resultado_completo(numerico["sets"])
+        if not es_valido:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Resultado inválido: {'; '.join(errores)}"
+            )
+    
     try:
         # Crear resultado
         db_resultado = ResultadoPartido(
@@ -236,6 +251,14 @@ async def reportar_resultado(
         
         db.add(db_resultado)
         
+        # Sin detalle de sets, usar los sets informados
+        if not numerico["sets"]:
+            numerico["sets_eq1"] = resultado_data.sets_eq1
+            numerico["sets_eq2"] = resultado_data.sets_eq2
+            if resultado_data.sets_eq1 != resultado_data.sets_eq2:
+                numerico["ganador_equipo"] = 1 if resultado_data.sets_eq1 > resultado_data.sets_eq2 else 2
+        ResultadoParser.aplicar_a_partido(partido, numerico)
+        
         # Cambiar estado del partido a "reportado"
         partido.estado = "reportado"
         
@@ -319,8 +342,8 @@ async def confirmar_resultado(
 ):
     """Confirmar resultado reportado (sin calcular Elo aún)"""
     
-    # Verificar que el partido existe
-    partido = db.query(Partido).filter(Partido.id_partido == partido_id).first()
+    # Verificar que el partido existe (bloqueado: dos confirmaciones simultáneas se serializan)
+    partido = db.query(Partido).filter(Partido.id_partido == partido_id).with_for_update().first()
     
     if not partido:
         raise HTTPException(
@@ -368,6 +391,7 @@ async def confirmar_resultado(
     try:
         # Solo cambiar estado del partido a "confirmado"
         partido.estado = "confirmado"
+        HistorialPartidosService.registrar(db, partido)
         
         db.commit()
         
@@ -650,306 +674,39 @@ async def calcular_elo_partido(
 @router.get("/usuario/{usuario_id}")
 async def partidos_usuario(
     usuario_id: int,
-    limit: int = Query(50, ge=1, le=100),
+    limit: int = Query(50, ge=1, le=LIMITE_MAXIMO_HISTORIAL),
     db: Session = Depends(get_db)
 ):
-    """Obtener partidos de un usuario específico con historial completo (solo confirmados con resultado) - OPTIMIZADO"""
-    
-    # Verificar que el usuario existe
-    usuario = db.query(Usuario).filter(Usuario.id_usuario == usuario_id).first()
-    
-    if not usuario:
+    """Últimos partidos confirmados de un usuario con su detalle (primera página del historial)"""
+    if not db.query(Usuario.id_usuario).filter(Usuario.id_usuario == usuario_id).first():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuario no encontrado"
         )
     
-    from sqlalchemy import and_, or_, text
-    
-    # 1. Obtener partidos amistosos (usando partido_jugadores)
-    partidos_amistosos = db.query(Partido).join(
-        PartidoJugador, Partido.id_partido == PartidoJugador.id_partido
-    ).filter(
-        and_(
-            PartidoJugador.id_usuario == usuario_id,
-            Partido.estado.in_(["confirmado", "finalizado"]),
-            or_(Partido.tipo == "amistoso", Partido.tipo.is_(None))
-        )
-    ).all()
-    
-    # 2. Obtener partidos de torneo donde el usuario REALMENTE participó
-    # Usar historial_rating que es la fuente de verdad de participación
-    partidos_torneo_ids = db.execute(text("""
-        SELECT DISTINCT hr.id_partido 
-        FROM historial_rating hr
-        JOIN partidos p ON hr.id_partido = p.id_partido
-        WHERE hr.id_usuario = :uid
-        AND p.tipo = 'torneo'
-        AND p.estado IN ('confirmado', 'finalizado')
-    """), {'uid': usuario_id}).fetchall()
-    
-    torneo_ids = [p[0] for p in partidos_torneo_ids]
-    
-    partidos_torneo = []
-    if torneo_ids:
-        partidos_torneo = db.query(Partido).filter(
-            Partido.id_partido.in_(torneo_ids)
-        ).all()
-    
-    # Combinar y ordenar por fecha
-    partidos = partidos_amistosos + partidos_torneo
-    partidos = sorted(partidos, key=lambda p: p.fecha or p.creado_en, reverse=True)[:limit]
-    
-    if not partidos:
-        return []
-    
-    partido_ids = [p.id_partido for p in partidos]
-    
-    # OPTIMIZACIÓN: Cargar todos los datos necesarios de una vez
-    # Obtener todos los jugadores de todos los partidos en una sola consulta
-    todos_jugadores = db.query(PartidoJugador).filter(
-        PartidoJugador.id_partido.in_(partido_ids)
-    ).all()
-    
-    # Agrupar jugadores por partido
-    jugadores_por_partido = {}
-    usuario_ids = set()
-    for jugador in todos_jugadores:
-        if jugador.id_partido not in jugadores_por_partido:
-            jugadores_por_partido[jugador.id_partido] = []
-        jugadores_por_partido[jugador.id_partido].append(jugador)
-        usuario_ids.add(jugador.id_usuario)
-    
-    # Obtener todos los usuarios y perfiles en una sola consulta
-    usuarios_dict = {u.id_usuario: u for u in db.query(Usuario).filter(Usuario.id_usuario.in_(usuario_ids)).all()}
-    perfiles_dict = {p.id_usuario: p for p in db.query(PerfilUsuario).filter(PerfilUsuario.id_usuario.in_(usuario_ids)).all()}
-    
-    # Obtener todos los resultados en una sola consulta
-    resultados_dict = {r.id_partido: r for r in db.query(ResultadoPartido).filter(ResultadoPartido.id_partido.in_(partido_ids)).all()}
-    
-    # Obtener todo el historial de rating en una sola consulta
-    historial_dict = {h.id_partido: h for h in db.query(HistorialRating).filter(
-        and_(
-            HistorialRating.id_partido.in_(partido_ids),
-            HistorialRating.id_usuario == usuario_id
-        )
-    ).all()}
-    
-    # Obtener IDs de clubs únicos
-    club_ids = [p.id_club for p in partidos if p.id_club]
-    clubs_dict = {}
-    if club_ids:
-        clubs_dict = {c.id_club: c for c in db.query(Club).filter(Club.id_club.in_(club_ids)).all()}
-    
-    # Pre-cargar datos de parejas de torneo
-    parejas_torneo_dict = {}
-    pareja_ids_torneo = set()
-    for partido in partidos:
-        if partido.tipo == 'torneo':
-            if partido.pareja1_id:
-                pareja_ids_torneo.add(partido.pareja1_id)
-            if partido.pareja2_id:
-                pareja_ids_torneo.add(partido.pareja2_id)
-    
-    if pareja_ids_torneo:
-        # Convertir a lista para la consulta
-        pareja_ids_list = list(pareja_ids_torneo)
-        parejas_data = db.execute(text("""
-            SELECT id, jugador1_id, jugador2_id FROM torneos_parejas WHERE id = ANY(:ids)
-        """), {'ids': pareja_ids_list}).fetchall()
-        for p in parejas_data:
-            parejas_torneo_dict[p[0]] = {'jugador1_id': p[1], 'jugador2_id': p[2]}
-            usuario_ids.add(p[1])
-            usuario_ids.add(p[2])
-        
-        # Recargar usuarios y perfiles con los nuevos IDs
-        usuarios_dict = {u.id_usuario: u for u in db.query(Usuario).filter(Usuario.id_usuario.in_(usuario_ids)).all()}
-        perfiles_dict = {p.id_usuario: p for p in db.query(PerfilUsuario).filter(PerfilUsuario.id_usuario.in_(usuario_ids)).all()}
-    
-    # Construir respuesta completa
-    partidos_completos = []
-    for partido in partidos:
-        jugadores_info = []
-        
-        if partido.tipo == 'torneo':
-            # Para partidos de torneo, obtener jugadores de las parejas
-            pareja1 = parejas_torneo_dict.get(partido.pareja1_id)
-            pareja2 = parejas_torneo_dict.get(partido.pareja2_id)
-            
-            if pareja1:
-                for jid in [pareja1['jugador1_id'], pareja1['jugador2_id']]:
-                    usuario_jugador = usuarios_dict.get(jid)
-                    perfil_jugador = perfiles_dict.get(jid)
-                    if usuario_jugador:
-                        jugadores_info.append({
-                            "id_usuario": usuario_jugador.id_usuario,
-                            "nombre_usuario": usuario_jugador.nombre_usuario,
-                            "nombre": perfil_jugador.nombre if perfil_jugador else "",
-                            "apellido": perfil_jugador.apellido if perfil_jugador else "",
-                            "equipo": 1,
-                            "rating": usuario_jugador.rating
-                        })
-            
-            if pareja2:
-                for jid in [pareja2['jugador1_id'], pareja2['jugador2_id']]:
-                    usuario_jugador = usuarios_dict.get(jid)
-                    perfil_jugador = perfiles_dict.get(jid)
-                    if usuario_jugador:
-                        jugadores_info.append({
-                            "id_usuario": usuario_jugador.id_usuario,
-                            "nombre_usuario": usuario_jugador.nombre_usuario,
-                            "nombre": perfil_jugador.nombre if perfil_jugador else "",
-                            "apellido": perfil_jugador.apellido if perfil_jugador else "",
-                            "equipo": 2,
-                            "rating": usuario_jugador.rating
-                        })
-        else:
-            # Para partidos amistosos, usar partido_jugadores
-            jugadores = jugadores_por_partido.get(partido.id_partido, [])
-            for jugador in jugadores:
-                usuario_jugador = usuarios_dict.get(jugador.id_usuario)
-                perfil_jugador = perfiles_dict.get(jugador.id_usuario)
-                
-                if usuario_jugador:
-                    jugadores_info.append({
-                        "id_usuario": usuario_jugador.id_usuario,
-                        "nombre_usuario": usuario_jugador.nombre_usuario,
-                        "nombre": perfil_jugador.nombre if perfil_jugador else "",
-                        "apellido": perfil_jugador.apellido if perfil_jugador else "",
-                        "equipo": jugador.equipo,
-                        "rating": usuario_jugador.rating
-                    })
-        
-        # Obtener resultado - diferente según tipo de partido
-        resultado = resultados_dict.get(partido.id_partido)
-        
-        # Formatear resultado para incluir detalle_sets correctamente
-        resultado_dict = None
-        
-        # Para partidos de torneo, el resultado está en resultado_padel (JSON)
-        if partido.tipo == 'torneo' and partido.resultado_padel:
-            resultado_padel = partido.resultado_padel
-            sets = resultado_padel.get('sets', [])
-            
-            # Contar sets ganados
-            sets_eq1 = sum(1 for s in sets if s.get('ganador') == 'equipoA')
-            sets_eq2 = sum(1 for s in sets if s.get('ganador') == 'equipoB')
-            
-            # Normalizar detalle_sets
-            detalle_sets_normalizado = []
-            for idx, set_data in enumerate(sets, 1):
-                detalle_sets_normalizado.append({
-                    "set": idx,
-                    "juegos_eq1": set_data.get('gamesEquipoA', 0),
-                    "juegos_eq2": set_data.get('gamesEquipoB', 0),
-                    "tiebreak_eq1": set_data.get('tiebreakEquipoA'),
-                    "tiebreak_eq2": set_data.get('tiebreakEquipoB')
-                })
-            
-            resultado_dict = {
-                "id_partido": partido.id_partido,
-                "sets_eq1": sets_eq1,
-                "sets_eq2": sets_eq2,
-                "detalle_sets": detalle_sets_normalizado,
-                "confirmado": True,
-                "desenlace": "normal"
-            }
-        elif resultado:
-            # Normalizar detalle_sets a formato consistente
-            detalle_sets_normalizado = []
-            if resultado.detalle_sets and isinstance(resultado.detalle_sets, list):
-                for idx, set_data in enumerate(resultado.detalle_sets, 1):
-                    # Formato 1: {'games_eq1': 6, 'games_eq2': 4}
-                    if 'games_eq1' in set_data and 'games_eq2' in set_data:
-                        detalle_sets_normalizado.append({
-                            "set": idx,
-                            "juegos_eq1": set_data['games_eq1'],
-                            "juegos_eq2": set_data['games_eq2'],
-                            "tiebreak_eq1": set_data.get('tiebreak_eq1'),
-                            "tiebreak_eq2": set_data.get('tiebreak_eq2')
-                        })
-                    # Formato 2: {'puntos_eq1': 6, 'puntos_eq2': 4, 'set_numero': 1}
-                    elif 'puntos_eq1' in set_data and 'puntos_eq2' in set_data:
-                        detalle_sets_normalizado.append({
-                            "set": set_data.get('set_numero', idx),
-                            "juegos_eq1": set_data['puntos_eq1'],
-                            "juegos_eq2": set_data['puntos_eq2'],
-                            "tiebreak_eq1": set_data.get('tiebreak_eq1'),
-                            "tiebreak_eq2": set_data.get('tiebreak_eq2')
-                        })
-                    # Formato 3: {'set1': {'puntos_eq1': 6, 'puntos_eq2': 4}}
-                    elif f'set{idx}' in set_data:
-                        set_info = set_data[f'set{idx}']
-                        detalle_sets_normalizado.append({
-                            "set": idx,
-                            "juegos_eq1": set_info.get('puntos_eq1', 0),
-                            "juegos_eq2": set_info.get('puntos_eq2', 0),
-                            "tiebreak_eq1": set_info.get('tiebreak_eq1'),
-                            "tiebreak_eq2": set_info.get('tiebreak_eq2')
-                        })
-                    # Formato 4: Ya está en formato correcto
-                    elif 'juegos_eq1' in set_data and 'juegos_eq2' in set_data:
-                        detalle_sets_normalizado.append({
-                            "set": set_data.get('set', idx),
-                            "juegos_eq1": set_data['juegos_eq1'],
-                            "juegos_eq2": set_data['juegos_eq2'],
-                            "tiebreak_eq1": set_data.get('tiebreak_eq1'),
-                            "tiebreak_eq2": set_data.get('tiebreak_eq2')
-                        })
-            
-            resultado_dict = {
-                "id_partido": resultado.id_partido,
-                "id_reportador": resultado.id_reportador,
-                "sets_eq1": resultado.sets_eq1,
-                "sets_eq2": resultado.sets_eq2,
-                "detalle_sets": detalle_sets_normalizado,
-                "confirmado": resultado.confirmado,
-                "desenlace": resultado.desenlace,
-                "creado_en": resultado.creado_en
-            }
-        
-        # Obtener historial de rating desde el diccionario
-        historial_rating = historial_dict.get(partido.id_partido)
-        
-        historial_rating_dict = None
-        if historial_rating:
-            historial_rating_dict = {
-                "rating_antes": historial_rating.rating_antes,
-                "delta": historial_rating.delta,
-                "rating_despues": historial_rating.rating_despues
-            }
-        
-        # Obtener club desde el diccionario
-        club = None
-        if partido.id_club:
-            club_obj = clubs_dict.get(partido.id_club)
-            if club_obj:
-                club = {
-                    "id_club": club_obj.id_club,
-                    "nombre": club_obj.nombre,
-                    "ciudad": club_obj.ciudad,
-                    "pais": club_obj.pais
-                }
-        
-        # Obtener creador desde el diccionario
-        creador = usuarios_dict.get(partido.id_creador)
-        
-        partidos_completos.append({
-            "id_partido": partido.id_partido,
-            "fecha": partido.fecha,
-            "estado": partido.estado,
-            "tipo": partido.tipo if hasattr(partido, 'tipo') else "amistoso",
-            "id_creador": partido.id_creador,
-            "creado_en": partido.creado_en,
-            "id_club": partido.id_club,
-            "jugadores": jugadores_info,
-            "resultado": resultado_dict,
-            "club": club,
-            "creador": {
-                "id_usuario": creador.id_usuario,
-                "nombre_usuario": creador.nombre_usuario
-            } if creador else {},
-            "historial_rating": historial_rating_dict
-        })
-    
-    return partidos_completos
+    filas, _ = HistorialPartidosService.pagina(db, usuario_id, limite=limit)
+    return HistorialPartidosService.detalle(db, usuario_id, [f.id_partido for f in filas])
+
+@router.get("/usuario/{usuario_id}/historial")
+async def historial_partidos_usuario(
+    usuario_id: int,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_HISTORIAL, ge=1, le=LIMITE_MAXIMO_HISTORIAL),
+    detalle: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Historial de partidos paginado: pasar `siguiente_cursor` como `cursor`
+    para la página siguiente. Con `detalle=false` devuelve solo
+    id_partido / fecha / tipo (el detalle se pide con GET /partidos/{id}).
+    """
+    try:
+        filas, siguiente = HistorialPartidosService.pagina(db, usuario_id, cursor, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if detalle:
+        partidos = HistorialPartidosService.detalle(db, usuario_id, [f.id_partido for f in filas])
+    else:
+        partidos = [{"id_partido": f.id_partido, "fecha": f.fecha, "tipo": f.tipo} for f in filas]
+    return {"partidos": partidos, "siguiente_cursor": siguiente}
@@ -7,6 +7,7 @@ from ..database.config import get_db
 from ..models.driveplus_models import Usuario
 from ..schemas.resultado_padel import ResultadoPadelCreate, ResultadoPadelResponse, ConfirmacionRequest
 from ..services.confirmacion_service import ConfirmacionService
+from ..services.cola_confirmaciones_service import ColaConfirmacionesService, cola_confirmaciones_worker
 from ..services.anti_trampa_service import AntiTrampaService
 from ..auth.auth_utils import get_current_user
 
@@ -94,12 +95,18 @@ async def confirmar_resultado(
             db=db
         )
         
+        # Si todos confirmaron, despertar al worker que aplica el Elo
+        if resultado_confirmado.get('elo_en_cola'):
+            cola_confirmaciones_worker.notificar()
+        
         # Devolver toda la información del servicio
         return {
             "success": resultado_confirmado.get('success', True),
             "message": resultado_confirmado.get('mensaje', 'Resultado confirmado'),
             "confirmaciones_totales": resultado_confirmado.get('confirmaciones_totales', 0),
             "elo_aplicado": resultado_confirmado.get('elo_aplicado', False),
+            "elo_en_cola": resultado_confirmado.get('elo_en_cola', False),
+            "trabajo": resultado_confirmado.get('trabajo'),
             "elo_changes": resultado_confirmado.get('elo_changes'),
             "cambio_elo_usuario": resultado_confirmado.get('cambio_elo_usuario'),
             "jugadores_faltantes": resultado_confirmado.get('jugadores_faltantes', [])
@@ -117,6 +124,43 @@ async def confirmar_resultado(
         )
 
 
+@router.get("/trabajos/{id_trabajo}", response_model=dict)
+async def obtener_estado_trabajo(
+    id_trabajo: int,
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener el estado de un trabajo de confirmación encolado
+    (para hacer polling hasta que el Elo quede aplicado).
+    """
+    from ..models.confirmacion import TrabajoConfirmacion
+    from ..models.driveplus_models import PartidoJugador
+    
+    trabajo = db.query(TrabajoConfirmacion).filter(
+        TrabajoConfirmacion.id_trabajo == id_trabajo
+    ).first()
+    
+    if not trabajo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trabajo no encontrado"
+        )
+    
+    es_jugador = db.query(PartidoJugador).filter(
+        PartidoJugador.id_partido == trabajo.id_partido,
+        PartidoJugador.id_usuario == current_user.id_usuario
+    ).first()
+    
+    if not es_jugador:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No eres parte de este partido"
+        )
+    
+    return ColaConfirmacionesService.estado_trabajo(trabajo)
+
+
 @router.get("/{id_sala}/estado", response_model=dict)
 async def obtener_estado_confirmaciones(
     id_sala: str,
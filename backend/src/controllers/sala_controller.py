@@ -1,21 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from ..database.config import get_db
 from ..models.sala import Sala, SalaJugador
-from ..models.driveplus_models import Usuario, PerfilUsuario, Partido, PartidoJugador, ResultadoPartido
-from ..models.confirmacion import Confirmacion
-from ..schemas.sala import SalaCreate, SalaResponse, SalaJoin, SalaCompleta
+from ..models.driveplus_models import Usuario, PerfilUsuario
+from ..schemas.sala import SalaCreate, SalaResponse, SalaJoin, SalaCompleta, SalasPagina
+from ..services.sala_service import (
+    SalaService, invalidar_salas_abiertas, formatear_resultado, LIMITE_POR_DEFECTO, LIMITE_MAXIMO
+)
 from ..auth.auth_utils import get_current_user
+from ..services.matchmaking_service import indice_matchmaking
+from ..websocket.estado_salas import estado_salas
 from ..utils.logger import Loggers
 
 logger = Loggers.sala()
 
 router = APIRouter(prefix="/salas", tags=["Salas"])
 
+
+async def _estado_sala_cambiado(db: Session, id_sala: int):
+    """
+    Para cambios hechos por otros servicios (confirmaciones, reportes):
+    sube la versión y descarta el estado en memoria en todos los workers
+    """
+    try:
+        version = SalaService.incrementar_version(db, id_sala)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Error actualizando versión de sala {id_sala}: {e}")
+        return
+    estado_salas.descartar(id_sala, version)
+    await estado_salas.publicar(id_sala, version)
+
+
+def _sala_cambiada(db: Session, id_sala: int):
+    """Después del commit: descartar páginas de salas abiertas y actualizar el matchmaking"""
+    invalidar_salas_abiertas()
+    try:
+        indice_matchmaking.refrescar_salas(db, [id_sala])
+    except Exception as e:
+        logger.warning(f"Error actualizando matchmaking de sala {id_sala}: {e}")
+
+
 @router.post("/", response_model=SalaResponse)
 async def crear_sala(
     sala_data: SalaCreate,
@@ -53,6 +82,7 @@ async def crear_sala(
         db.add(db_jugador)
         
         db.commit()
+        _sala_cambiada(db, db_sala.id_sala)
         db.refresh(db_sala)
         
         return SalaResponse(
@@ -83,69 +113,46 @@ async def unirse_sala(
     """Unirse a una sala con código de invitación (OPTIMIZADO)"""
     
     try:
-        # OPTIMIZACIÓN 1: Query única con joins para obtener toda la info necesaria
-        sala_info = db.query(
-            Sala.id_sala,
-            Sala.codigo_invitacion,
-            Sala.max_jugadores,
-            Sala.estado,
-            func.count(SalaJugador.id_usuario).label('jugadores_actuales'),
-            func.sum(case((SalaJugador.id_usuario == current_user.id_usuario, 1), else_=0)).label('ya_esta')
-        ).outerjoin(
-            SalaJugador, Sala.id_sala == SalaJugador.id_sala
-        ).filter(
-            Sala.codigo_invitacion == join_data.codigo_invitacion.upper()
-        ).group_by(
-            Sala.id_sala, Sala.codigo_invitacion, Sala.max_jugadores, Sala.estado
-        ).first()
-        
-        if not sala_info:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Sala no encontrada"
-            )
-        
-        # Verificaciones usando datos de la query única
-        if sala_info.jugadores_actuales >= sala_info.max_jugadores:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La sala está llena"
-            )
-        
-        if sala_info.ya_esta > 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Ya estás en esta sala"
-            )
-        
-        # OPTIMIZACIÓN 2: Agregar jugador con orden correcto
-        db_jugador = SalaJugador(
-            id_sala=sala_info.id_sala,
-            id_usuario=current_user.id_usuario,
-            orden=sala_info.jugadores_actuales + 1
-        )
-        db.add(db_jugador)
-        db.commit()
-        
+        # Lugar reservado en forma atómica (sala bloqueada + única (id_sala, orden))
+        try:
+            sala, orden = SalaService.unirse(db, join_data.codigo_invitacion, current_user.id_usuario)
+        except LookupError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        _sala_cambiada(db, sala.id_sala)
+
+        perfil = db.query(PerfilUsuario).filter(PerfilUsuario.id_usuario == current_user.id_usuario).first()
+        nuevo_jugador = {
+            "id_usuario": current_user.id_usuario,
+            "nombre_usuario": current_user.nombre_usuario,
+            "nombre": perfil.nombre if perfil else "",
+            "apellido": perfil.apellido if perfil else "",
+            "rating": current_user.rating,
+            "equipo": None,
+            "orden": orden
+        }
+
+        def agregar_jugador(estado):
+            estado.jugadores = sorted(estado.jugadores + [nuevo_jugador], key=lambda j: j["orden"])
+            estado.jugadores_actuales = len(estado.jugadores)
+
+        estado_salas.modificar(sala.id_sala, sala.version, agregar_jugador)
+        await estado_salas.publicar(sala.id_sala, sala.version)
+
         # OPTIMIZACIÓN 3: Notificar via WebSocket de forma asíncrona
         from ..websocket.connection_manager import manager
         try:
-            await manager.broadcast_to_room(
-                f"sala_{sala_info.id_sala}",
-                {
-                    "type": "jugador_unido",
-                    "jugador": {
-                        "id": str(current_user.id_usuario),
-                        "nombre": current_user.nombre_usuario,
-                        "rating": current_user.rating or 1500
-                    }
-                }
-            )
+            await manager.notify_jugador_unido(str(sala.id_sala), {
+                "id": str(current_user.id_usuario),
+                "nombre": current_user.nombre_usuario,
+                "rating": current_user.rating or 1500
+            })
         except Exception as ws_error:
             logger.warning(f"Error enviando WebSocket: {ws_error}")
         
-        # OPTIMIZACIÓN 4: Retornar sala optimizada (reutilizar función optimizada)
-        return await obtener_sala_optimizada(sala_info.id_sala, current_user, db)
+        # Sala actualizada (con el nuevo jugador), armada en el mismo request
+        return SalaService.construir_salas_completas(db, [sala])[0]
         
     except HTTPException:
         db.rollback()
@@ -158,292 +165,71 @@ async def unirse_sala(
             detail=f"Error al unirse a la sala: {str(e)}"
         )
 
+@router.get("/feed", response_model=SalasPagina)
+async def feed_salas(
+    vista: str = Query("mias", pattern="^(mias|abiertas|finalizadas)$"),
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Salas paginadas por vista: mias (activas donde juego), abiertas (cerca
+    de mi rating) o finalizadas (mías). Pasar `siguiente_cursor` como
+    `cursor` para la página siguiente.
+    """
+    try:
+        if vista == "abiertas":
+            return SalaService.listar_abiertas(db, current_user.rating, cursor, limite)
+        if vista == "finalizadas":
+            return SalaService.listar_finalizadas(db, current_user.id_usuario, cursor, limite)
+        return SalaService.listar_mias(db, current_user.id_usuario, cursor, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.get("/{sala_id}", response_model=SalaCompleta)
 async def obtener_sala(
     sala_id: int,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obtener información completa de una sala"""
+    """Obtener información completa de una sala (desde el estado en memoria si está)"""
+    estado = estado_salas.obtener(db, sala_id)
     
-    sala = db.query(Sala).filter(Sala.id_sala == sala_id).first()
-    
-    if not sala:
+    if not estado:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sala no encontrada"
         )
     
-    # Obtener jugadores
-    jugadores_sala = db.query(SalaJugador).filter(
-        SalaJugador.id_sala == sala_id
-    ).order_by(SalaJugador.orden).all()
-    
-    jugadores = []
-    for sj in jugadores_sala:
-        usuario = db.query(Usuario).filter(Usuario.id_usuario == sj.id_usuario).first()
-        perfil = db.query(PerfilUsuario).filter(PerfilUsuario.id_usuario == sj.id_usuario).first()
-        
-        if usuario:
-            jugadores.append({
-                "id_usuario": usuario.id_usuario,
-                "nombre_usuario": usuario.nombre_usuario,
-                "nombre": perfil.nombre if perfil else "",
-                "apellido": perfil.apellido if perfil else "",
-                "rating": usuario.rating,
-                "equipo": sj.equipo,
-                "orden": sj.orden
-            })
-    
-    # Obtener resultado del partido si existe
-    from ..models.driveplus_models import Partido, ResultadoPartido
-    resultado = None
-    estado_confirmacion = None
-    
-    if sala.id_partido:
-        partido = db.query(Partido).filter(Partido.id_partido == sala.id_partido).first()
-        if partido:
-            estado_confirmacion = partido.estado_confirmacion
-            
-            # Buscar resultado en resultados_partidos (UNIFICADO)
-            resultado_db = db.query(ResultadoPartido).filter(
-                ResultadoPartido.id_partido == partido.id_partido
-            ).first()
-            
-            if resultado_db:
-                # Convertir a formato que espera el frontend
-                resultado = {
-                    "formato": "best_of_3",
-                    "sets": [
-                        {
-                            "gamesEquipoA": set_data.get("juegos_eq1", 0),
-                            "gamesEquipoB": set_data.get("juegos_eq2", 0),
-                            "ganador": "equipoA" if set_data.get("juegos_eq1", 0) > set_data.get("juegos_eq2", 0) else "equipoB",
-                            "completado": True
-                        }
-                        for set_data in resultado_db.detalle_sets
-                    ],
-                    "ganador": "equipoA" if partido.ganador_equipo == 1 else "equipoB",
-                    "completado": True
-                }
-    
-    return SalaCompleta(
-        id_sala=str(sala.id_sala),
-        nombre=sala.nombre,
-        fecha=sala.fecha,
-        estado=sala.estado,
-        codigo_invitacion=sala.codigo_invitacion,
-        id_creador=sala.id_creador,
-        jugadores_actuales=len(jugadores),
-        max_jugadores=sala.max_jugadores,
-        creado_en=sala.creado_en,
-        jugadores=jugadores,
-        resultado=resultado,
-        estado_confirmacion=estado_confirmacion
-    )
+    return estado
 
 @router.get("/", response_model=List[SalaCompleta])
 async def listar_salas(
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar todas las salas activas y las últimas 10 finalizadas donde el usuario participó (OPTIMIZADO)"""
-    
+    """
+    Salas del usuario: sus salas activas, la primera página de salas abiertas
+    cercanas a su rating y sus últimas 10 finalizadas.
+    Para paginar cada vista usar GET /salas/feed.
+    """
     try:
-        # OPTIMIZACIÓN 1: Query única con joins para salas activas
-        salas_activas_query = db.query(Sala).filter(
-            Sala.estado.in_(['esperando', 'activa', 'programada', 'en_juego'])
-        ).order_by(Sala.creado_en.desc())
-        
-        # OPTIMIZACIÓN 2: Query única con joins para salas finalizadas del usuario
-        salas_finalizadas_query = db.query(Sala).join(
-            SalaJugador, Sala.id_sala == SalaJugador.id_sala
-        ).filter(
-            Sala.estado == 'finalizada',
-            SalaJugador.id_usuario == current_user.id_usuario
-        ).order_by(Sala.creado_en.desc()).limit(10)
-        
-        # Ejecutar ambas queries
-        salas_activas = salas_activas_query.all()
-        salas_finalizadas = salas_finalizadas_query.all()
-        
-        # Combinar y deduplicar
-        salas_dict = {s.id_sala: s for s in salas_activas}
-        for s in salas_finalizadas:
-            if s.id_sala not in salas_dict:
-                salas_dict[s.id_sala] = s
-        
-        salas = list(salas_dict.values())
-        
+        mias = SalaService.listar_mias(db, current_user.id_usuario, limite=LIMITE_MAXIMO)["salas"]
+        abiertas = SalaService.listar_abiertas(db, current_user.rating)["salas"]
+        finalizadas = SalaService.listar_finalizadas(db, current_user.id_usuario, limite=10)["salas"]
     except Exception as e:
         logger.error(f"Error al obtener salas: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener salas: {str(e)}"
         )
-    
-    if not salas:
-        return []
-    
-    # OPTIMIZACIÓN 3: Batch query para todos los datos relacionados
-    salas_ids = [s.id_sala for s in salas]
-    partidos_ids = [s.id_partido for s in salas if s.id_partido]
-    
-    # Query 1: Todos los jugadores con usuarios y perfiles en una sola query
-    jugadores_data = db.query(
-        SalaJugador.id_sala,
-        SalaJugador.id_usuario,
-        SalaJugador.equipo,
-        SalaJugador.orden,
-        Usuario.nombre_usuario,
-        Usuario.rating,
-        PerfilUsuario.nombre,
-        PerfilUsuario.apellido
-    ).join(
-        Usuario, SalaJugador.id_usuario == Usuario.id_usuario
-    ).outerjoin(
-        PerfilUsuario, Usuario.id_usuario == PerfilUsuario.id_usuario
-    ).filter(
-        SalaJugador.id_sala.in_(salas_ids)
-    ).order_by(SalaJugador.id_sala, SalaJugador.orden).all()
-    
-    # Query 2: Todos los partidos relacionados
-    partidos_data = {}
-    if partidos_ids:
-        partidos = db.query(Partido).filter(Partido.id_partido.in_(partidos_ids)).all()
-        partidos_data = {p.id_partido: p for p in partidos}
-    
-    # Query 3: Todos los resultados de partidos
-    resultados_data = {}
-    if partidos_ids:
-        resultados = db.query(ResultadoPartido).filter(
-            ResultadoPartido.id_partido.in_(partidos_ids)
-        ).all()
-        resultados_data = {r.id_partido: r for r in resultados}
-    
-    # Query 4: Todos los cambios de ELO
-    cambios_elo_data = {}
-    if partidos_ids:
-        cambios_elo = db.query(PartidoJugador).filter(
-            PartidoJugador.id_partido.in_(partidos_ids)
-        ).all()
-        
-        for cambio in cambios_elo:
-            if cambio.id_partido not in cambios_elo_data:
-                cambios_elo_data[cambio.id_partido] = []
-            cambios_elo_data[cambio.id_partido].append({
-                "id_usuario": cambio.id_usuario,
-                "rating_antes": cambio.rating_antes,
-                "rating_despues": cambio.rating_despues,
-                "cambio_elo": cambio.cambio_elo
-            })
-    
-    # Query 5: Todas las confirmaciones
-    confirmaciones_data = {}
-    if partidos_ids:
-        confirmaciones = db.query(Confirmacion).filter(
-            Confirmacion.id_partido.in_(partidos_ids),
-            Confirmacion.tipo == 'confirmacion'
-        ).all()
-        
-        for conf in confirmaciones:
-            if conf.id_partido not in confirmaciones_data:
-                confirmaciones_data[conf.id_partido] = []
-            confirmaciones_data[conf.id_partido].append(conf.id_usuario)
-    
-    # OPTIMIZACIÓN 4: Procesar datos en memoria (mucho más rápido que queries)
-    jugadores_por_sala = {}
-    for row in jugadores_data:
-        id_sala = row.id_sala
-        if id_sala not in jugadores_por_sala:
-            jugadores_por_sala[id_sala] = []
-        
-        # Construir nombre completo
-        nombre_completo = f"{row.nombre} {row.apellido}".strip() if row.nombre else row.nombre_usuario
-        
-        jugadores_por_sala[id_sala].append({
-            "id": str(row.id_usuario),
-            "nombre": nombre_completo,
-            "nombre_usuario": row.nombre_usuario,
-            "rating": row.rating or 1500,
-            "equipo": row.equipo,
-            "esCreador": False  # Se actualizará después
-        })
-    
-    
-    # OPTIMIZACIÓN 5: Construir resultado final (procesamiento en memoria)
-    resultado = []
-    for sala in salas:
-        try:
-            jugadores = jugadores_por_sala.get(sala.id_sala, [])
-            
-            # Marcar al creador
-            for jugador in jugadores:
-                if int(jugador["id"]) == sala.id_creador:
-                    jugador["esCreador"] = True
-            
-            # Obtener datos del partido si existe (usando datos pre-cargados)
-            resultado_partido = None
-            estado_confirmacion = None
-            cambios_elo = None
-            elo_aplicado = False
-            usuarios_confirmados = []
-            
-            if sala.id_partido:
-                # Usar datos pre-cargados (no más queries)
-                partido = partidos_data.get(sala.id_partido)
-                if partido:
-                    estado_confirmacion = partido.estado_confirmacion
-                    elo_aplicado = getattr(partido, 'elo_aplicado', False)
-                
-                # Resultado del partido
-                resultado_db = resultados_data.get(sala.id_partido)
-                if resultado_db:
-                    resultado_partido = {
-                        "formato": "best_of_3",
-                        "sets": [
-                            {
-                                "gamesEquipoA": set_data.get("juegos_eq1", 0),
-                                "gamesEquipoB": set_data.get("juegos_eq2", 0),
-                                "ganador": "equipoA" if set_data.get("juegos_eq1", 0) > set_data.get("juegos_eq2", 0) else "equipoB",
-                                "completado": True
-                            }
-                            for set_data in resultado_db.detalle_sets
-                        ],
-                        "ganador": "equipoA" if partido and partido.ganador_equipo == 1 else "equipoB",
-                        "completado": True
-                    }
-                
-                # Cambios de ELO
-                cambios_elo = cambios_elo_data.get(sala.id_partido)
-                
-                # Usuarios confirmados
-                usuarios_confirmados = confirmaciones_data.get(sala.id_partido, [])
-            
-            sala_completa = SalaCompleta(
-                id_sala=str(sala.id_sala),
-                nombre=sala.nombre,
-                fecha=sala.fecha,
-                estado=sala.estado,
-                codigo_invitacion=sala.codigo_invitacion,
-                id_creador=sala.id_creador,
-                jugadores_actuales=len(jugadores),
-                max_jugadores=sala.max_jugadores,
-                creado_en=sala.creado_en,
-                jugadores=jugadores,
-                resultado=resultado_partido,
-                estado_confirmacion=estado_confirmacion,
-                cambios_elo=cambios_elo,
-                elo_aplicado=elo_aplicado,
-                usuarios_confirmados=usuarios_confirmados
-            )
-            resultado.append(sala_completa)
-            
-        except Exception as e:
-            logger.error(f"Error al procesar sala {sala.id_sala}: {str(e)}")
-            continue
-    
-    return resultado
+
+    # Combinar y deduplicar (una sala propia también puede estar abierta)
+    salas = {}
+    for sala in mias + abiertas + finalizadas:
+        salas.setdefault(sala.id_sala, sala)
+    return list(salas.values())
 
 @router.post("/{sala_id}/asignar-equipos")
 async def asignar_equipos(
@@ -476,8 +262,19 @@ async def asignar_equipos(
                 SalaJugador.id_usuario == int(jugador_id)
             ).update({"equipo": equipo})
         
+        version = SalaService.incrementar_version(db, sala_id)
         db.commit()
         
+        equipos_por_jugador = {int(jugador_id): equipo for jugador_id, equipo in equipos.items()}
+        
+        def asignar(estado):
+            for jugador in estado.jugadores:
+                if jugador["id_usuario"] in equipos_por_jugador:
+                    jugador["equipo"] = equipos_por_jugador[jugador["id_usuario"]]
+        
+        estado_salas.modificar(sala_id, version, asignar)
+        await estado_salas.publicar(sala_id, version)
+        
         return {"message": "Equipos asignados correctamente"}
         
     except Exception as e:
@@ -585,8 +382,17 @@ async def iniciar_partido(
         # Actualizar sala
         sala.estado = "en_juego"
         sala.id_partido = db_partido.id_partido
+        version = SalaService.incrementar_version(db, sala_id)
         
         db.commit()
+        _sala_cambiada(db, sala_id)
+        
+        def iniciar(estado):
+            estado.estado = "en_juego"
+            estado.estado_confirmacion = "sin_resultado"
+        
+        estado_salas.modificar(sala_id, version, iniciar)
+        await estado_salas.publicar(sala_id, version)
         
         return {
             "message": "Partido iniciado",
@@ -638,7 +444,7 @@ async def cargar_resultado(
     
     # Validar resultado con Pydantic
     try:
-        resultado = ResultadoPadelSchema(**resultado_data)
+        ResultadoPadelSchema(**resultado_data)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -648,35 +454,17 @@ async def cargar_resultado(
     try:
         # VALIDACIONES ROBUSTAS
         from ..utils.padel_validator import PadelValidator
+        from ..utils.resultado_parser import ResultadoParser
         
-        # Convertir formato del marcador a formato para validación
-        sets_para_validar = []
-        for set_info in resultado.sets:
-            sets_para_validar.append({
-                'juegos_eq1': set_info.gamesEquipoA,
-                'juegos_eq2': set_info.gamesEquipoB,
-                'esSuperTiebreak': getattr(set_info, 'esSuperTiebreak', False)
-            })
-        
-        # Preparar supertiebreak si existe (formato antiguo)
-        supertiebreak_para_validar = None
-        if resultado.supertiebreak and resultado.supertiebreak.completado:
-            supertiebreak_para_validar = {
-                'puntos_eq1': resultado.supertiebreak.puntosEquipoA,
-                'puntos_eq2': resultado.supertiebreak.puntosEquipoB
-            }
-        
-        # Validar resultado completo
-        es_valido, errores = PadelValidator.validar_resultado_completo(
-            sets_para_validar, 
-            supertiebreak_para_validar
-        )
-        
-        if not es_valido:
+        # Parsear y validar resultado completo (cualquier formato de supertiebreak)
+        try:
+            numerico = ResultadoParser.parsear(resultado_data)
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Resultado inválido: {'; '.join(errores)}"
+                detail=str(e)
             )
+        sets_para_validar = numerico["sets"]
         
         # Validar que sea razonable (detectar posibles trampas)
         es_razonable, advertencias = PadelValidator.validar_resultado_razonable(sets_para_validar)
@@ -724,32 +512,22 @@ async def cargar_resultado(
             db.flush()
         
         # Convertir formato del marcador a formato unificado
-        sets_data = resultado.sets
-        sets_eq1 = 0
-        sets_eq2 = 0
+        sets_eq1 = numerico["sets_eq1"]
+        sets_eq2 = numerico["sets_eq2"]
         detalle_sets = []
         
-        for idx, set_info in enumerate(sets_data, 1):
-            games_eq1 = set_info.gamesEquipoA
-            games_eq2 = set_info.gamesEquipoB
-            
-            # Contar sets ganados
-            if games_eq1 > games_eq2:
-                sets_eq1 += 1
-            elif games_eq2 > games_eq1:
-                sets_eq2 += 1
-            
+        # El supertiebreak en formato antiguo queda solo en las columnas
+        # supertiebreak_eq*: detalle_sets guarda los sets jugados
+        sets_jugados = [s for s in sets_para_validar if not s.get("aparte")]
+        for idx, set_info in enumerate(sets_jugados, 1):
             # Formato unificado
             detalle_set = {
                 "set": idx,
-                "juegos_eq1": games_eq1,
-                "juegos_eq2": games_eq2
+                "juegos_eq1": set_info["juegos_eq1"],
+                "juegos_eq2": set_info["juegos_eq2"]
             }
-            
-            # Agregar tiebreak si existe
-            if hasattr(set_info, 'tiebreakEquipoA') and set_info.tiebreakEquipoA is not None:
-                detalle_set["tiebreak_eq1"] = set_info.tiebreakEquipoA
-                detalle_set["tiebreak_eq2"] = set_info.tiebreakEquipoB
+            if set_info["esSuperTiebreak"]:
+                detalle_set["esSuperTiebreak"] = True
             
             detalle_sets.append(detalle_set)
         
@@ -766,14 +544,24 @@ async def cargar_resultado(
         
         db.add(nuevo_resultado)
         
-        # Actualizar partido
-        partido.ganador_equipo = 1 if resultado.ganador == "equipoA" else 2
+        # Actualizar partido (sets, games, ganador y supertiebreak numéricos)
+        ResultadoParser.aplicar_a_partido(partido, numerico)
         partido.estado_confirmacion = "pendiente_confirmacion"
         partido.estado = "pendiente"
+        version = SalaService.incrementar_version(db, sala_id)
         
         db.commit()
         db.refresh(nuevo_resultado)
         
+        resultado_frontend = formatear_resultado(detalle_sets, partido.ganador_equipo)
+        
+        def cargar(estado):
+            estado.resultado = resultado_frontend
+            estado.estado_confirmacion = "pendiente_confirmacion"
+        
+        estado_salas.modificar(sala_id, version, cargar)
+        await estado_salas.publicar(sala_id, version)
+        
         return {
             "success": True,
             "mensaje": "Resultado guardado. Esperando confirmación de rivales.",
@@ -875,10 +663,12 @@ async def confirmar_resultado(
             db
         )
         
-        # Si el Elo fue aplicado (todos confirmaron), finalizar la sala
-        if resultado.get('elo_aplicado'):
-            sala.estado = 'finalizada'
-            db.commit()
+        await _estado_sala_cambiado(db, sala_id)
+        
+        # Si todos confirmaron, el worker aplica el Elo y finaliza la sala
+        if resultado.get('elo_en_cola'):
+            from ..services.cola_confirmaciones_service import cola_confirmaciones_worker
+            cola_confirmaciones_worker.notificar()
         
         return resultado
         
@@ -932,6 +722,7 @@ async def reportar_resultado(
             motivo,
             db
         )
+        await _estado_sala_cambiado(db, sala_id)
         
         return resultado
         
@@ -1047,8 +838,12 @@ async def eliminar_sala(
         ).delete()
         
         # Eliminar la sala
+        version = (sala.version or 1) + 1
         db.delete(sala)
         db.commit()
+        _sala_cambiada(db, id_sala)
+        estado_salas.descartar(id_sala, version)
+        await estado_salas.publicar(id_sala, version)
         
         return {
             "message": "Sala eliminada exitosamente",
@@ -1063,142 +858,3 @@ async def eliminar_sala(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al eliminar sala: {str(e)}"
         )
-
-# ============================================
-# FUNCIONES AUXILIARES OPTIMIZADAS
-# ============================================
-
-async def obtener_sala_optimizada(
-    sala_id: int,
-    current_user: Usuario,
-    db: Session
-) -> SalaCompleta:
-    """Obtener información completa de una sala de forma optimizada"""
-    
-    # Query única para obtener sala con jugadores
-    sala_data = db.query(
-        Sala.id_sala,
-        Sala.nombre,
-        Sala.fecha,
-        Sala.estado,
-        Sala.codigo_invitacion,
-        Sala.id_creador,
-        Sala.max_jugadores,
-        Sala.creado_en,
-        Sala.id_partido
-    ).filter(Sala.id_sala == sala_id).first()
-    
-    if not sala_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Sala no encontrada"
-        )
-    
-    # Query optimizada para jugadores
-    jugadores_data = db.query(
-        SalaJugador.id_usuario,
-        SalaJugador.equipo,
-        SalaJugador.orden,
-        Usuario.nombre_usuario,
-        Usuario.rating,
-        PerfilUsuario.nombre,
-        PerfilUsuario.apellido
-    ).join(
-        Usuario, SalaJugador.id_usuario == Usuario.id_usuario
-    ).outerjoin(
-        PerfilUsuario, Usuario.id_usuario == PerfilUsuario.id_usuario
-    ).filter(
-        SalaJugador.id_sala == sala_id
-    ).order_by(SalaJugador.orden).all()
-    
-    # Procesar jugadores
-    jugadores = []
-    for row in jugadores_data:
-        nombre_completo = f"{row.nombre} {row.apellido}".strip() if row.nombre else row.nombre_usuario
-        jugadores.append({
-            "id": str(row.id_usuario),
-            "nombre": nombre_completo,
-            "nombre_usuario": row.nombre_usuario,
-            "rating": row.rating or 1500,
-            "equipo": row.equipo,
-            "esCreador": row.id_usuario == sala_data.id_creador
-        })
-    
-    # Datos del partido (si existe)
-    resultado_partido = None
-    estado_confirmacion = None
-    cambios_elo = None
-    elo_aplicado = False
-    usuarios_confirmados = []
-    
-    if sala_data.id_partido:
-        from ..models.driveplus_models import Partido, ResultadoPartido, PartidoJugador
-        from ..models.confirmacion import Confirmacion
-        
-        # Obtener datos del partido
-        partido = db.query(Partido).filter(Partido.id_partido == sala_data.id_partido).first()
-        if partido:
-            estado_confirmacion = partido.estado_confirmacion
-            elo_aplicado = getattr(partido, 'elo_aplicado', False)
-            
-            # Resultado
-            resultado_db = db.query(ResultadoPartido).filter(
-                ResultadoPartido.id_partido == sala_data.id_partido
-            ).first()
-            
-            if resultado_db:
-                resultado_partido = {
-                    "formato": "best_of_3",
-                    "sets": [
-                        {
-                            "gamesEquipoA": set_data.get("juegos_eq1", 0),
-                            "gamesEquipoB": set_data.get("juegos_eq2", 0),
-                            "ganador": "equipoA" if set_data.get("juegos_eq1", 0) > set_data.get("juegos_eq2", 0) else "equipoB",
-                            "completado": True
-                        }
-                        for set_data in resultado_db.detalle_sets
-                    ],
-                    "ganador": "equipoA" if partido.ganador_equipo == 1 else "equipoB",
-                    "completado": True
-                }
-            
-            # Cambios ELO
-            cambios_elo_db = db.query(PartidoJugador).filter(
-                PartidoJugador.id_partido == sala_data.id_partido
-            ).all()
-            
-            if cambios_elo_db:
-                cambios_elo = [
-                    {
-                        "id_usuario": cambio.id_usuario,
-                        "rating_antes": cambio.rating_antes,
-                        "rating_despues": cambio.rating_despues,
-                        "cambio_elo": cambio.cambio_elo
-                    }
-                    for cambio in cambios_elo_db
-                ]
-            
-            # Confirmaciones
-            confirmaciones = db.query(Confirmacion).filter(
-                Confirmacion.id_partido == sala_data.id_partido,
-                Confirmacion.tipo == 'confirmacion'
-            ).all()
-            usuarios_confirmados = [conf.id_usuario for conf in confirmaciones]
-    
-    return SalaCompleta(
-        id_sala=str(sala_data.id_sala),
-        nombre=sala_data.nombre,
-        fecha=sala_data.fecha,
-        estado=sala_data.estado,
-        codigo_invitacion=sala_data.codigo_invitacion,
-        id_creador=sala_data.id_creador,
-        jugadores_actuales=len(jugadores),
-        max_jugadores=sala_data.max_jugadores,
-        creado_en=sala_data.creado_en,
-        jugadores=jugadores,
-        resultado=resultado_partido,
-        estado_confirmacion=estado_confirmacion,
-        cambios_elo=cambios_elo,
-        elo_aplicado=elo_aplicado,
-        usuarios_confirmados=usuarios_confirmados
-    )
\ No newline at end of file
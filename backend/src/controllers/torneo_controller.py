@@ -1,7 +1,7 @@
 """
 Controller para endpoints de torneos
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -9,6 +9,11 @@ from pydantic import BaseModel
 from ..database.config import get_db
 from ..services.torneo_service import TorneoService
 from ..services.torneo_inscripcion_service import TorneoInscripcionService
+from ..services.torneo_listado_service import (
+    TorneoListadoService, LIMITE_POR_DEFECTO as LIMITE_TORNEOS, LIMITE_MAXIMO as LIMITE_MAXIMO_TORNEOS
+)
+from ..services.torneo_vista_service import TorneoVistaService, etag_vista, etag_coincide
+from ..services.torneo_snapshot_service import TorneoSnapshotService
 from ..schemas.torneo_schemas import (
     TorneoCreate, TorneoUpdate, TorneoResponse,
     EstadisticasTorneoResponse,
@@ -28,6 +33,15 @@ class BajaParejaRequest(BaseModel):
     motivo: Optional[str] = None
 
 
+def _snapshot(torneo_id: int, vista: str, request: Optional[Request]) -> Optional[Response]:
+    """Respuesta precomprimida si el torneo está finalizado y tiene snapshot"""
+    if request is None:  # llamada interna (p. ej. al armar el snapshot)
+        return None
+    return TorneoSnapshotService.respuesta(
+        torneo_id, vista, request.headers.get("accept-encoding"), request.headers.get("if-none-match")
+    )
+
+
 # ============================================
 # ENDPOINTS ESPECÍFICOS (DEBEN IR ANTES QUE LOS DINÁMICOS)
 # ============================================
@@ -236,67 +250,36 @@ def listar_torneos_alternativo():
 @router.get("")
 @router.get("/")
 def listar_torneos(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(LIMITE_TORNEOS, ge=1, le=LIMITE_MAXIMO_TORNEOS),
     estado: Optional[str] = None,
     categoria: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Lista todos los torneos con filtros opcionales
     
-    - **skip**: Número de registros a saltar (paginación)
     - **limit**: Número máximo de registros a devolver
     - **estado**: Filtrar por estado (inscripcion, fase_grupos, etc.)
     - **categoria**: Filtrar por categoría
+    - **cursor**: Página siguiente (valor del header X-Siguiente-Cursor)
+    - **skip**: Número de registros a saltar (compatibilidad; preferir cursor)
     """
     try:
-        # Simplificar temporalmente para debug
-        from ..models.torneo_models import Torneo
-        
-        query = db.query(Torneo)
-        
-        if estado:
-            query = query.filter(Torneo.estado == estado)
-        
-        if categoria:
-            query = query.filter(Torneo.categoria == categoria)
-        
-        # Usar created_at en lugar de fecha_inicio para el ordenamiento
-        torneos = query.order_by(Torneo.created_at.desc()).offset(skip).limit(limit).all()
-        
-        # Convertir a formato simple para evitar problemas de serialización
-        resultado = []
-        for torneo in torneos:
-            # Contar parejas inscritas correctamente
-            from ..models.torneo_models import TorneoPareja
-            parejas_count = db.query(TorneoPareja).filter(
-                TorneoPareja.torneo_id == torneo.id,
-                TorneoPareja.estado.in_(['inscripta', 'confirmada'])
-            ).count()
-            
-            resultado.append({
-                "id": torneo.id,
-                "nombre": torneo.nombre,
-                "descripcion": torneo.descripcion,
-                "tipo": torneo.tipo,
-                "categoria": torneo.categoria,
-                "genero": torneo.genero or 'masculino',
-                "estado": torneo.estado,
-                "fecha_inicio": torneo.fecha_inicio.isoformat() if torneo.fecha_inicio else None,
-                "fecha_fin": torneo.fecha_fin.isoformat() if torneo.fecha_fin else None,
-                "lugar": torneo.lugar,
-                "created_at": torneo.created_at.isoformat() if torneo.created_at else None,
-                "parejas_inscritas": parejas_count  # ✅ Ahora calcula correctamente
-            })
-        
-        return resultado
-        
+        torneos, siguiente = TorneoListadoService.listar(db, estado, categoria, cursor, limit, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Error al listar torneos: {str(e)}"
         )
+    
+    if siguiente:
+        response.headers["X-Siguiente-Cursor"] = siguiente
+    return torneos
 
 
 @router.get("/mis-torneos")
@@ -410,6 +393,42 @@ async def obtener_torneo(
     }
 
 
+@router.get("/{torneo_id}/vista")
+def obtener_vista_torneo(
+    torneo_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Todo lo que muestra la pantalla del torneo en una respuesta: torneo,
+    categorías, parejas, zonas con su tabla, partidos y playoffs.
+    
+    Los nombres van una sola vez en `nombres` / `jugadores` y las
+    disponibilidades horarias sin repetir en `disponibilidades`. Con
+    If-None-Match igual al ETag de la versión actual responde 304.
+    """
+    snapshot = _snapshot(torneo_id, "vista", request)
+    if snapshot is not None:
+        return snapshot
+    
+    version = TorneoVistaService.version(db, torneo_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Torneo no encontrado")
+    
+    etag = etag_vista(torneo_id, version)
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    vista = TorneoVistaService.obtener(db, torneo_id, version)
+    if vista is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Torneo no encontrado")
+    
+    response.headers["ETag"] = etag_vista(torneo_id, vista["version"])
+    response.headers["Cache-Control"] = "no-cache"
+    return vista
+
+
 @router.put("/{torneo_id}", response_model=TorneoResponse)
 def actualizar_torneo(
     torneo_id: int,
@@ -1209,12 +1228,17 @@ def generar_zonas(
 @router.get("/{torneo_id}/zonas")
 def listar_zonas(
     torneo_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    request: Request = None
 ):
     """Lista todas las zonas del torneo con sus parejas"""
     from ..services.torneo_zona_service import TorneoZonaService
     from ..models.driveplus_models import PerfilUsuario
     
+    snapshot = _snapshot(torneo_id, "zonas", request)
+    if snapshot is not None:
+        return snapshot
+    
     try:
         zonas = TorneoZonaService.listar_zonas(db, torneo_id)
         
@@ -1554,7 +1578,8 @@ def listar_partidos_torneo(
     torneo_id: int,
     zona_id: Optional[int] = None,
     categoria_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    request: Request = None
 ):
     """
     Lista todos los partidos del torneo
@@ -1565,6 +1590,11 @@ def listar_partidos_torneo(
     from ..models.driveplus_models import Partido, PerfilUsuario
     from ..models.torneo_models import TorneoPareja
     
+    if zona_id is None and categoria_id is None:
+        snapshot = _snapshot(torneo_id, "partidos", request)
+        if snapshot is not None:
+            return snapshot
+    
     try:
         query = db.query(Partido).filter(Partido.id_torneo == torneo_id)
         
@@ -1821,7 +1851,8 @@ def generar_playoffs(
 def listar_partidos_playoffs(
     torneo_id: int,
     categoria_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    request: Request = None
 ):
     """
     Lista todos los partidos de playoffs agrupados por fase y categoría
@@ -1834,6 +1865,11 @@ def listar_partidos_playoffs(
     from ..models.driveplus_models import PerfilUsuario
     from ..models.torneo_models import TorneoPareja, TorneoCategoria
     
+    if not categoria_id:
+        snapshot = _snapshot(torneo_id, "playoffs", request)
+        if snapshot is not None:
+            return snapshot
+    
     try:
         if categoria_id:
             # Caso específico: una sola categoría
@@ -2597,6 +2633,13 @@ def programar_partidos_automatico(
         
         db.commit()
         
+        # Feed en vivo: horarios asignados
+        from ..websocket.torneo_feed import feed_torneos, delta_partido
+        feed_torneos.publicar(torneo_id, [
+            delta_partido(p, "reprogramacion", ("cancha_id", "fecha_hora"))
+            for p in partidos if p.cancha_id
+        ])
+        
         # Construir mensaje
         mensaje = f"Se programaron {partidos_programados} partidos"
         if partidos_playoffs_pendientes > 0:
@@ -2705,6 +2748,11 @@ def reprogramar_partido(
         
         db.commit()
         
+        from ..websocket.torneo_feed import feed_torneos, delta_partido
+        feed_torneos.publicar(torneo_id, [
+            delta_partido(partido, "reprogramacion", ("cancha_id", "fecha_hora"))
+        ])
+        
         return {
             "message": "Partido reprogramado",
             "partido_id": partido_id,
@@ -2843,3 +2891,13 @@ def eliminar_bloqueo(
     db.commit()
     
     return {"message": "Bloqueo eliminado"}
+
+
+# ============================================
+# SNAPSHOTS DE TORNEOS FINALIZADOS
+# ============================================
+
+# Mismo contenido que cada endpoint sin filtros
+TorneoSnapshotService.registrar("partidos", lambda db, torneo_id: listar_partidos_torneo(torneo_id, None, None, db))
+TorneoSnapshotService.registrar("zonas", lambda db, torneo_id: listar_zonas(torneo_id, db))
+TorneoSnapshotService.registrar("playoffs", lambda db, torneo_id: listar_partidos_playoffs(torneo_id, None, db))
@@ -1,7 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
@@ -10,7 +9,16 @@ from ..database.config import get_db
 from ..models.driveplus_models import Usuario, PerfilUsuario, Categoria
 from ..schemas.auth import UserResponse
 from ..auth.auth_utils import get_current_user
+from ..auth.cache_auth import recargar_usuario
 from ..auth.firebase_handler import FirebaseHandler
+from ..services.busqueda_usuarios_service import indice_busqueda_usuarios, obtener_indice_busqueda
+from ..services.relaciones_jugadores_service import (
+    RelacionesJugadoresService, COMPANERO, RIVAL, LIMITE_POR_DEFECTO as LIMITE_RELACIONES,
+    LIMITE_MAXIMO as LIMITE_MAXIMO_RELACIONES
+)
+from ..services.rating_historia_service import (
+    RatingHistoriaService, PUNTOS_POR_DEFECTO, PUNTOS_MINIMO, PUNTOS_MAXIMO
+)
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 security = HTTPBearer()
@@ -171,6 +179,7 @@ async def completar_perfil(
         db.commit()
         db.refresh(current_user)
         db.refresh(perfil)
+        indice_busqueda_usuarios.refrescar_usuarios(db, [current_user.id_usuario])
         
         return UserResponse(
             id_usuario=current_user.id_usuario,
@@ -314,7 +323,8 @@ async def actualizar_perfil(
         
         db.commit()
         db.refresh(perfil)
-        db.refresh(current_user)
+        current_user = recargar_usuario(db, current_user)
+        indice_busqueda_usuarios.refrescar_usuarios(db, [current_user.id_usuario])
         
         return UserResponse(
             id_usuario=current_user.id_usuario,
@@ -360,7 +370,8 @@ async def registrar_fcm_token(
     Registrar o actualizar el token FCM del usuario para notificaciones push
     """
     try:
-        current_user.fcm_token = datos.fcm_token
+        usuario = recargar_usuario(db, current_user)
+        usuario.fcm_token = datos.fcm_token
         db.commit()
         
         return {
@@ -383,52 +394,65 @@ async def buscar_usuarios(
     db: Session = Depends(get_db)
 ):
     """
-    Busca usuarios por nombre, apellido o nombre de usuario (OPTIMIZADO)
+    Busca usuarios por nombre, apellido o nombre de usuario, sin importar
+    acentos ni mayúsculas. Orden: usuario exacto, prefijo, contiene, similar.
     """
     if not q or len(q) < 2:
         return []
     
-    query_lower = f"%{q.lower()}%"
+    usuarios = obtener_indice_busqueda(db).buscar(q, limite=limit, solo_con_perfil=True)
     
-    # OPTIMIZACIÓN: Query única con joins incluyendo categoría
-    resultados = db.query(
-        Usuario.id_usuario,
-        Usuario.nombre_usuario,
-        Usuario.rating,
-        Usuario.partidos_jugados,
-        Usuario.id_categoria,
-        PerfilUsuario.nombre,
-        PerfilUsuario.apellido,
-        PerfilUsuario.ciudad,
-        PerfilUsuario.url_avatar,
-        Categoria.nombre.label('categoria_nombre')
-    ).join(
-        PerfilUsuario, Usuario.id_usuario == PerfilUsuario.id_usuario
-    ).outerjoin(
-        Categoria, Usuario.id_categoria == Categoria.id_categoria
-    ).filter(
-        (PerfilUsuario.nombre.ilike(query_lower)) | 
-        (PerfilUsuario.apellido.ilike(query_lower)) |
-        (Usuario.nombre_usuario.ilike(query_lower))
-    ).limit(limit).all()
+    return [
+        {
+            "id_usuario": u.id_usuario,
+            "nombre_usuario": u.nombre_usuario,
+            "nombre": u.nombre,
+            "apellido": u.apellido,
+            "nombre_completo": f"{u.nombre} {u.apellido}",
+            "rating": u.rating,
+            "partidos_jugados": u.partidos_jugados,
+            "categoria": u.categoria,
+            "ciudad": u.ciudad,
+            "foto_perfil": u.url_avatar
+        }
+        for u in usuarios
+    ]
+
+
+@router.get("/autocompletar")
+async def autocompletar_usuarios(
+    q: Optional[str] = None,
+    limit: int = 5,
+    exclude_ids: Optional[str] = None,
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Autocompletado de compañeros para la inscripción (una consulta por tecla).
+    Se resuelve en memoria y tolera un error de tipeo en nombre o apellido.
+    exclude_ids: IDs a excluir separados por coma (p. ej. los ya elegidos)
+    """
+    if not q or len(q.strip()) < 2:
+        return []
+    
+    excluidos = {int(i) for i in (exclude_ids or "").split(",") if i.strip().isdigit()}
+    excluidos.add(current_user.id_usuario)
     
-    # Procesar resultados en memoria
-    resultado = []
-    for row in resultados:
-        resultado.append({
-            "id_usuario": row.id_usuario,
-            "nombre_usuario": row.nombre_usuario,
-            "nombre": row.nombre,
-            "apellido": row.apellido,
-            "nombre_completo": f"{row.nombre} {row.apellido}",
-            "rating": row.rating or 1200,
-            "partidos_jugados": row.partidos_jugados or 0,
-            "categoria": row.categoria_nombre,
-            "ciudad": row.ciudad,
-            "foto_perfil": row.url_avatar
-        })
+    usuarios = obtener_indice_busqueda(db).autocompletar(q, limite=max(1, min(limit, 20)), excluir=excluidos)
     
-    return resultado
+    return [
+        {
+            "id_usuario": u.id_usuario,
+            "nombre_usuario": u.nombre_usuario,
+            "nombre": u.nombre,
+            "apellido": u.apellido,
+            "nombre_completo": f"{u.nombre} {u.apellido}",
+            "rating": u.rating,
+            "categoria": u.categoria,
+            "foto_perfil": u.url_avatar
+        }
+        for u in usuarios
+    ]
 
 
 @router.get("/@{username}/perfil")
@@ -619,6 +643,53 @@ async def obtener_estadisticas_usuario(
     }
 
 
+@router.get("/{user_id}/rating-historia")
+async def obtener_rating_historia(
+    user_id: int,
+    puntos: int = Query(PUNTOS_POR_DEFECTO, ge=PUNTOS_MINIMO, le=PUNTOS_MAXIMO),
+    desde: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Evolución del rating para gráficos: a lo sumo `puntos` puntos elegidos
+    con LTTB sobre todo el historial (o desde `desde`)
+    """
+    if not db.query(Usuario.id_usuario).filter(Usuario.id_usuario == user_id).first():
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    
+    return RatingHistoriaService.obtener(db, user_id, puntos, desde)
+
+
+@router.get("/{user_id}/companeros")
+async def obtener_companeros(
+    user_id: int,
+    limit: int = Query(LIMITE_RELACIONES, ge=1, le=LIMITE_MAXIMO_RELACIONES),
+    db: Session = Depends(get_db)
+):
+    """Compañeros con los que más jugó el usuario y su récord juntos"""
+    return RelacionesJugadoresService.principales(db, user_id, COMPANERO, limit)
+
+
+@router.get("/{user_id}/rivales")
+async def obtener_rivales(
+    user_id: int,
+    limit: int = Query(LIMITE_RELACIONES, ge=1, le=LIMITE_MAXIMO_RELACIONES),
+    db: Session = Depends(get_db)
+):
+    """Rivales contra los que más jugó el usuario y su récord contra cada uno"""
+    return RelacionesJugadoresService.principales(db, user_id, RIVAL, limit)
+
+
+@router.get("/{user_id}/cara-a-cara/{otro_id}")
+async def obtener_cara_a_cara(
+    user_id: int,
+    otro_id: int,
+    db: Session = Depends(get_db)
+):
+    """Récord del usuario contra otro jugador y junto a él"""
+    return RelacionesJugadoresService.cara_a_cara(db, user_id, otro_id)
+
+
 # ============================================
 # ENDPOINTS ADICIONALES PARA PERFIL PÚBLICO
 # ============================================
@@ -710,58 +781,33 @@ async def buscar_usuarios_publico(
     db: Session = Depends(get_db)
 ):
     """
-    Búsqueda pública de usuarios por nombre, apellido o username (OPTIMIZADO)
+    Búsqueda pública de usuarios por nombre, apellido o username, sin
+    importar acentos ni mayúsculas (índice en memoria, resultados ordenados)
     Endpoint público - no requiere autenticación
     """
     try:
         if not q or len(q.strip()) < 2:
             return []
         
-        search_term = f"%{q.strip().lower()}%"
-        
-        # OPTIMIZACIÓN: Query única con joins incluyendo categoría
-        # IMPORTANTE: Usar outerjoin para perfil_usuario porque algunos usuarios pueden no tener perfil
-        resultados = db.query(
-            Usuario.id_usuario,
-            Usuario.nombre_usuario,
-            Usuario.rating,
-            Usuario.partidos_jugados,
-            Usuario.id_categoria,
-            Usuario.creado_en,
-            PerfilUsuario.nombre,
-            PerfilUsuario.apellido,
-            PerfilUsuario.ciudad,
-            PerfilUsuario.url_avatar,
-            Categoria.nombre.label('categoria_nombre')
-        ).outerjoin(
-            PerfilUsuario, Usuario.id_usuario == PerfilUsuario.id_usuario
-        ).outerjoin(
-            Categoria, Usuario.id_categoria == Categoria.id_categoria
-        ).filter(
-            or_(
-                Usuario.nombre_usuario.ilike(search_term),
-                PerfilUsuario.nombre.ilike(search_term),
-                PerfilUsuario.apellido.ilike(search_term)
-            )
-        ).limit(limit).all()
+        # Incluye usuarios sin perfil (se muestran como "Usuario")
+        usuarios = obtener_indice_busqueda(db).buscar(q, limite=limit)
         
-        # Procesar resultados en memoria
         resultado = []
-        for row in resultados:
-            nombre = row.nombre or "Usuario"
-            apellido = row.apellido or ""
+        for u in usuarios:
+            nombre = u.nombre or "Usuario"
+            apellido = u.apellido or ""
             resultado.append({
-                "id_usuario": row.id_usuario,
-                "nombre_usuario": row.nombre_usuario,
+                "id_usuario": u.id_usuario,
+                "nombre_usuario": u.nombre_usuario,
                 "nombre": nombre,
                 "apellido": apellido,
                 "nombre_completo": f"{nombre} {apellido}".strip(),
-                "rating": row.rating or 1200,
-                "partidos_jugados": row.partidos_jugados or 0,
-                "categoria": row.categoria_nombre,
-                "ciudad": row.ciudad or "",
-                "foto_perfil": row.url_avatar,
-                "fecha_registro": row.creado_en.isoformat() if row.creado_en else None
+                "rating": u.rating,
+                "partidos_jugados": u.partidos_jugados,
+                "categoria": u.categoria,
+                "ciudad": u.ciudad or "",
+                "foto_perfil": u.url_avatar,
+                "fecha_registro": u.creado_en.isoformat() if u.creado_en else None
             })
         
         return resultado
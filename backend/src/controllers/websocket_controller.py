@@ -1,24 +1,44 @@
 """
-WebSocket Controller para actualizaciones en tiempo real de salas
+WebSocket Controller para actualizaciones en tiempo real de salas y torneos
 """
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 import logging
 
-from ..database.config import get_db
-from ..models.sala import Sala
+from ..database.config import SessionLocal
+from ..models.driveplus_models import Partido
+from ..models.torneo_models import Torneo, TorneoZona
+from ..services.torneo_zona_service import TorneoZonaService
 from ..websocket.connection_manager import manager
+from ..websocket.estado_salas import estado_salas
+from ..websocket.pubsub import canal_sala, canal_torneo
+from ..websocket.torneo_feed import feed_torneos, delta_partido, deltas_tabla
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
 
+def _estado_sala(sala_id: int):
+    """
+    Estado de la sala desde memoria; si falta, lo arma con una sesión propia
+    que se cierra enseguida. El socket puede quedar abierto horas: no debe
+    retener una conexión del pool.
+    """
+    estado = estado_salas.en_memoria(sala_id)
+    if estado is not None:
+        return estado
+    db = SessionLocal()
+    try:
+        return estado_salas.obtener(db, sala_id)
+    finally:
+        db.close()
+
+
 @router.websocket("/salas/{sala_id}")
 async def websocket_sala_endpoint(
     websocket: WebSocket,
-    sala_id: int,
-    db: Session = Depends(get_db)
+    sala_id: int
 ):
     """
     WebSocket endpoint para actualizaciones en tiempo real de una sala
@@ -31,16 +51,16 @@ async def websocket_sala_endpoint(
     - resultado_reportado: Cuando se reporta el resultado
     - resultado_confirmado: Cuando se confirma el resultado
     """
-    sala_id_str = str(sala_id)
+    canal = canal_sala(sala_id)
     
-    # Verificar que la sala existe
-    sala = db.query(Sala).filter(Sala.id_sala == sala_id).first()
-    if not sala:
+    # Estado actual de la sala (memoria o sesión corta, fuera del event loop)
+    estado = await run_in_threadpool(_estado_sala, sala_id)
+    if estado is None:
         await websocket.close(code=4004, reason="Sala no encontrada")
         return
     
     # Conectar el cliente
-    await manager.connect(websocket, sala_id_str)
+    await manager.connect(websocket, canal)
     
     try:
         # Enviar estado inicial de la sala
@@ -49,6 +69,11 @@ async def websocket_sala_endpoint(
             "message": f"Conectado a sala {sala_id}",
             "sala_id": sala_id
         }, websocket)
+        await manager.send_personal_message({
+            "type": "estado",
+            "version": estado.version,
+            "sala": estado.model_dump(mode="json")
+        }, websocket)
         
         # Mantener la conexión abierta y escuchar mensajes
         while True:
@@ -62,8 +87,78 @@ async def websocket_sala_endpoint(
                 }, websocket)
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket, sala_id_str)
+        manager.disconnect(websocket, canal)
         logger.info(f"Cliente desconectado de sala {sala_id}")
     except Exception as e:
         logger.error(f"Error en WebSocket: {e}")
-        manager.disconnect(websocket, sala_id_str)
+        manager.disconnect(websocket, canal)
+
+
+def _torneo_existe(torneo_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Torneo.id).filter(Torneo.id == torneo_id).first() is not None
+    finally:
+        db.close()
+
+
+def _estado_base_torneo(torneo_id: int) -> list:
+    """
+    Estado completo del torneo como deltas (partidos, tablas y estado).
+    Se carga una vez por worker mientras haya clientes mirando el torneo.
+    """
+    db = SessionLocal()
+    try:
+        torneo = db.query(Torneo).filter(Torneo.id == torneo_id).first()
+        deltas = [{"e": "torneo", "id": torneo_id, "k": "torneo", "v": {"estado": torneo.estado}}]
+
+        partidos = db.query(Partido).filter(Partido.id_torneo == torneo_id).all()
+        deltas += [delta_partido(p, "resultado") for p in partidos]
+
+        zonas = db.query(TorneoZona.id).filter(TorneoZona.torneo_id == torneo_id).all()
+        for (zona_id,) in zonas:
+            tabla = TorneoZonaService.obtener_tabla_posiciones(db, zona_id)["tabla"]
+            deltas += deltas_tabla(zona_id, tabla)
+        return deltas
+    finally:
+        db.close()
+
+
+@router.websocket("/torneos/{torneo_id}")
+async def websocket_torneo_endpoint(
+    websocket: WebSocket,
+    torneo_id: int
+):
+    """
+    WebSocket endpoint con el estado en vivo de un torneo
+
+    Mensajes:
+    - snapshot: estado completo + seq (al conectar)
+    - deltas: cambios agrupados cada 250 ms con seq creciente
+      (resultados, posiciones, avance del cuadro, reprogramaciones)
+    """
+    canal = canal_torneo(torneo_id)
+
+    if not await run_in_threadpool(_torneo_existe, torneo_id):
+        await websocket.close(code=4004, reason="Torneo no encontrado")
+        return
+
+    # Primero conectar y después armar el snapshot: lo que llegue antes
+    # del snapshot ya está incluido en él
+    await manager.connect(websocket, canal)
+
+    try:
+        await feed_torneos.preparar(torneo_id, _estado_base_torneo)
+        await manager.send_personal_message(feed_torneos.snapshot(torneo_id), websocket)
+
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await manager.send_personal_message({"type": "pong"}, websocket)
+
+    except WebSocketDisconnect:
+        manager.disconnect(websocket, canal)
+        logger.info(f"Cliente desconectado del torneo {torneo_id}")
+    except Exception as e:
+        logger.error(f"Error en WebSocket de torneo: {e}")
+        manager.disconnect(websocket, canal)
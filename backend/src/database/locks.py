@@ -0,0 +1,42 @@
+"""
+Locks consultivos de Postgres para tareas que debe correr un solo worker
+
+Se usa pg_try_advisory_xact_lock dentro de una transacción abierta en una
+conexión propia: el lock dura lo que dura el bloque `with` y se libera
+solo si el proceso muere. A diferencia del lock de sesión, funciona
+detrás de un pooler en modo transacción (el endpoint "-pooler" de Neon).
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from .config import engine as engine_por_defecto
+
+# Claves de los locks (una por tarea)
+LOCK_BARRIDO_SALAS = 731001
+
+
+@contextmanager
+def lock_consultivo(clave: int, engine=None):
+    """
+    Intenta tomar el lock sin esperar.
+
+    Uso:
+        with lock_consultivo(LOCK_BARRIDO_SALAS) as obtenido:
+            if not obtenido:
+                return  # lo está corriendo otro worker
+            ...
+
+    Con una base que no es Postgres (tests, SQLite) siempre se obtiene.
+    """
+    engine = engine or engine_por_defecto
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    with engine.connect() as conexion:
+        with conexion.begin():
+            obtenido = conexion.execute(
+                text("SELECT pg_try_advisory_xact_lock(:clave)"), {"clave": clave}
+            ).scalar()
+            yield bool(obtenido)
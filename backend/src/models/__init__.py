@@ -7,13 +7,16 @@ from .driveplus_models import (
     PartidoJugador,
     ResultadoPartido,
     HistorialRating,
+    HistorialPartido,
+    RelacionJugadores,
     EventoPartido,
     FlagSospechoso,
     CategoriaCheckpoint
 )
 from .sala import Sala, SalaJugador
-from .confirmacion import Confirmacion
+from .confirmacion import Confirmacion, TrabajoConfirmacion
 from .historial_enfrentamiento import HistorialEnfrentamiento
+from .notificacion import NotificacionPendiente
 
 # Exportar todos los modelos
 __all__ = [
@@ -25,11 +28,15 @@ __all__ = [
     "PartidoJugador",
     "ResultadoPartido",
     "HistorialRating",
+    "HistorialPartido",
+    "RelacionJugadores",
     "EventoPartido",
     "FlagSospechoso",
     "CategoriaCheckpoint",
     "Sala",
     "SalaJugador",
     "Confirmacion",
-    "HistorialEnfrentamiento"
+    "TrabajoConfirmacion",
+    "HistorialEnfrentamiento",
+    "NotificacionPendiente"
 ]
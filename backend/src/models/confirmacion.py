@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, ForeignKey, CheckConstraint, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database.config import Base
@@ -67,3 +67,29 @@ class ConfirmacionUsuario(Base):
     __table_args__ = (
         {'comment': 'Confirmaciones de usuarios para resultados de pádel'}
     )
+
+
+class TrabajoConfirmacion(Base):
+    """Trabajo encolado (outbox) para aplicar Elo y efectos de una confirmación"""
+    __tablename__ = "trabajos_confirmacion"
+    
+    id_trabajo = Column(BigInteger, primary_key=True, index=True)
+    clave_idempotencia = Column(String(100), unique=True, nullable=False)  # ej. 'elo_partido:123'
+    tipo = Column(String(30), nullable=False, default='aplicar_elo')
+    id_partido = Column(BigInteger, ForeignKey("partidos.id_partido", ondelete="CASCADE"), nullable=False, index=True)
+    id_sala = Column(BigInteger, nullable=True)  # Para notificar por WebSocket
+    estado = Column(String(20), nullable=False, default='pendiente')
+    intentos = Column(Integer, nullable=False, default=0)
+    resultado = Column(JSON, nullable=True)  # Cambios de Elo aplicados
+    error = Column(Text, nullable=True)
+    disponible_en = Column(DateTime(timezone=True), server_default=func.now())  # Backoff de reintentos
+    creado_en = Column(DateTime(timezone=True), server_default=func.now())
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relaciones
+    partido = relationship("Partido")
+    
+    __table_args__ = (
+        CheckConstraint("estado IN ('pendiente', 'completado', 'error')", name='chk_estado_trabajo_confirmacion'),
+        {'comment': 'Cola durable de trabajos de confirmación (Elo, categorías, historial, notificaciones)'}
+    )
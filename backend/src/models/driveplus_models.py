@@ -102,6 +102,14 @@ class Partido(Base):
     elo_aplicado = Column(Boolean, default=False, nullable=False)
     creado_por = Column(BigInteger, ForeignKey("usuarios.id_usuario"), nullable=True)
     
+    # Resultado numérico (lo completa ResultadoParser al cargar el resultado)
+    sets_eq1 = Column(SmallInteger, nullable=True)
+    sets_eq2 = Column(SmallInteger, nullable=True)
+    games_eq1 = Column(SmallInteger, nullable=True)  # Sin contar puntos de supertiebreak
+    games_eq2 = Column(SmallInteger, nullable=True)
+    supertiebreak_eq1 = Column(SmallInteger, nullable=True)  # Puntos del supertiebreak (NULL si no hubo)
+    supertiebreak_eq2 = Column(SmallInteger, nullable=True)
+    
     # Campos adicionales para torneos
     fase = Column(String(20), nullable=True)  # zona, 16avos, 8vos, 4tos, semis, final
     numero_partido = Column(Integer, nullable=True)
@@ -174,6 +182,29 @@ class HistorialRating(Base):
     usuario = relationship("Usuario", back_populates="historial_rating")
     partido = relationship("Partido", back_populates="historial_rating")
 
+class HistorialPartido(Base):
+    """Línea de tiempo de partidos jugados por usuario (una fila por jugador y partido confirmado)"""
+    __tablename__ = "historial_partidos"
+    
+    id_usuario = Column(BigInteger, ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), primary_key=True)
+    fecha = Column(DateTime(timezone=True), primary_key=True)
+    id_partido = Column(BigInteger, ForeignKey("partidos.id_partido", ondelete="CASCADE"), primary_key=True, index=True)
+    tipo = Column(String(20), nullable=False)
+    equipo = Column(SmallInteger, nullable=True)  # 1 o 2
+    gano = Column(Boolean, nullable=True)  # None: partido sin ganador
+
+class RelacionJugadores(Base):
+    """Récord acumulado de un jugador con otro, como compañero o como rival (una fila por sentido)"""
+    __tablename__ = "relaciones_jugadores"
+    
+    id_usuario = Column(BigInteger, ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), primary_key=True)
+    id_otro = Column(BigInteger, ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), primary_key=True)
+    relacion = Column(String(10), primary_key=True)  # companero, rival
+    jugados = Column(Integer, default=0, nullable=False)
+    ganados = Column(Integer, default=0, nullable=False)
+    perdidos = Column(Integer, default=0, nullable=False)
+    ultimo_partido = Column(DateTime(timezone=True), nullable=True)
+
 class EventoPartido(Base):
     """Modelo de Evento de Partido basado en tu tabla 'eventos_partido'"""
     __tablename__ = "eventos_partido"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, ForeignKey, CheckConstraint, JSON
+from sqlalchemy.sql import func
+from ..database.config import Base
+
+
+class NotificacionPendiente(Base):
+    """Notificación push encolada (outbox): la envía un worker, no el request"""
+    __tablename__ = "notificaciones_pendientes"
+    
+    id_notificacion = Column(BigInteger, primary_key=True, index=True)
+    id_usuario = Column(BigInteger, ForeignKey("usuarios.id_usuario", ondelete="CASCADE"), nullable=False, index=True)
+    titulo = Column(String(200), nullable=False)
+    cuerpo = Column(Text, nullable=False)
+    data = Column(JSON, nullable=True)  # Valores string (requisito de FCM)
+    estado = Column(String(20), nullable=False, default='pendiente')
+    intentos = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    disponible_en = Column(DateTime(timezone=True), server_default=func.now())  # Backoff de reintentos
+    creado_en = Column(DateTime(timezone=True), server_default=func.now())
+    enviado_en = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        CheckConstraint(
+            "estado IN ('pendiente', 'enviada', 'sin_token', 'error')",
+            name='chk_estado_notificacion_pendiente'
+        ),
+        {'comment': 'Cola durable de notificaciones push (FCM)'}
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, JSON, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, JSON, BigInteger, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database.config import Base
@@ -12,11 +12,12 @@ class Sala(Base):
     nombre = Column(String(200), nullable=False)
     codigo_invitacion = Column(String(10), unique=True, index=True, nullable=False)
     fecha = Column(DateTime(timezone=True), nullable=False)
-    estado = Column(String(20), default="esperando", nullable=False)  # esperando, en_juego, finalizada
+    estado = Column(String(20), default="esperando", nullable=False)  # esperando, en_juego, finalizada, expirada
     id_creador = Column(BigInteger, ForeignKey("usuarios.id_usuario"), nullable=False)
     max_jugadores = Column(Integer, default=4, nullable=False)
     id_partido = Column(BigInteger, ForeignKey("partidos.id_partido"), nullable=True)
     creado_en = Column(DateTime(timezone=True), server_default=func.now())
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # sube con cada cambio de estado
     
     # Relaciones
     creador = relationship("Usuario", foreign_keys=[id_creador])
@@ -31,6 +32,10 @@ class Sala(Base):
 class SalaJugador(Base):
     """Modelo de relación entre Sala y Jugadores"""
     __tablename__ = "sala_jugadores"
+    __table_args__ = (
+        # Un lugar (orden) por jugador: dos uniones concurrentes no pueden tomar el mismo
+        UniqueConstraint('id_sala', 'orden', name='uq_sala_jugadores_orden'),
+    )
     
     id_sala = Column(BigInteger, ForeignKey("salas.id_sala"), primary_key=True)
     id_usuario = Column(BigInteger, ForeignKey("usuarios.id_usuario"), primary_key=True)
@@ -99,6 +99,9 @@ class Torneo(Base):
     # Horarios disponibles del torneo
     horarios_disponibles = Column(JSON, nullable=True, comment="Horarios en los que se pueden programar partidos")
     
+    # Sube con cada cambio del torneo, sus categorías, parejas, zonas o partidos (ETag de /vista)
+    version = Column(Integer, default=1, server_default="1", nullable=False)
+    
     created_at = Column(DateTime, server_default=func.current_timestamp())
     updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
     
@@ -36,3 +36,9 @@ class SalaCompleta(SalaResponse):
     cambios_elo: Optional[List[dict]] = None
     elo_aplicado: Optional[bool] = False
     usuarios_confirmados: Optional[List[int]] = []  # IDs de usuarios que ya confirmaron
+    version: Optional[int] = None  # versión del estado (sube con cada cambio de la sala)
+
+class SalasPagina(BaseModel):
+    """Página de salas con cursor para pedir la siguiente"""
+    salas: List[SalaCompleta] = []
+    siguiente_cursor: Optional[str] = None
@@ -1,52 +1,230 @@
 """
 Servicio para gestión de categorías
+
+Las bandas de rating de cada categoría (`Categoria.rating_min/max` por sexo)
+casi no cambian, así que se cachean en memoria como un índice de intervalos
+ordenado por rating_min: la búsqueda de la categoría de un rating es un
+bisect, sin queries, y se puede llamar por cada jugador de cada partido.
+
+La corrección masiva (mantenimiento programado / admin) no recorre usuarios:
+es un único UPDATE ... FROM con join por rango contra `categorias`.
 """
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
-from typing import Optional
 from ..models.driveplus_models import Categoria, Usuario
 
+# Segundos que se reutiliza el índice antes de recargar las bandas
+TTL_INDICE_CATEGORIAS = 600
+
+
+@dataclass(frozen=True)
+class BandaCategoria:
+    """Copia inmutable de una categoría (segura de compartir entre sesiones)"""
+    id_categoria: int
+    nombre: str
+    sexo: str
+    rating_min: Optional[int]
+    rating_max: Optional[int]
+
 
-def actualizar_categoria_usuario(db: Session, usuario: Usuario) -> Optional[Categoria]:
+class IndiceCategorias:
+    """
+    Índice de intervalos de rating por sexo
+
+    Misma regla que la query original: la categoría debe contener el rating
+    (un límite NULL es abierto) y, si hay varias, gana la de mayor rating_min
+    (NULL cuenta como el menor; a igual rating_min, el menor id).
+    """
+
+    def __init__(self, categorias: List[BandaCategoria]):
+        self._bandas: Dict[str, List[BandaCategoria]] = {}
+        self._minimos: Dict[str, List[float]] = {}
+        self._por_id: Dict[int, BandaCategoria] = {}
+
+        ordenadas = sorted(categorias, key=lambda c: (
+            c.sexo,
+            c.rating_min if c.rating_min is not None else float("-inf"),
+            -c.id_categoria
+        ))
+        for banda in ordenadas:
+            self._bandas.setdefault(banda.sexo, []).append(banda)
+            self._minimos.setdefault(banda.sexo, []).append(
+                banda.rating_min if banda.rating_min is not None else float("-inf")
+            )
+            self._por_id[banda.id_categoria] = banda
+
+    def buscar(self, rating, sexo: str) -> Optional[BandaCategoria]:
+        """Categoría que corresponde a un rating y sexo (None si no hay)"""
+        bandas = self._bandas.get(sexo)
+        if not bandas:
+            return None
+
+        if rating is None:
+            # En SQL la comparación con NULL es falsa: solo sirven bandas abiertas
+            abiertas = [b for b in bandas if b.rating_min is None and b.rating_max is None]
+            return abiertas[-1] if abiertas else None
+
+        # Candidatas: rating_min <= rating; se recorren de mayor a menor rating_min
+        # (con bandas que no se solapan, la primera ya es la correcta)
+        i = bisect_right(self._minimos[sexo], rating)
+        while i > 0:
+            i -= 1
+            banda = bandas[i]
+            if banda.rating_max is None or banda.rating_max >= rating:
+                return banda
+        return None
+
+    def por_id(self, id_categoria) -> Optional[BandaCategoria]:
+        return self._por_id.get(id_categoria)
+
+
+_indice: Optional[IndiceCategorias] = None
+_indice_cargado_en = 0.0
+_lock_indice = threading.Lock()
+
+
+def obtener_indice_categorias(db: Session) -> IndiceCategorias:
+    """Índice de categorías cacheado (una sola query al cargar o vencer el TTL)"""
+    global _indice, _indice_cargado_en
+
+    indice = _indice
+    if indice is not None and time.monotonic() - _indice_cargado_en < TTL_INDICE_CATEGORIAS:
+        return indice
+
+    with _lock_indice:
+        if _indice is None or time.monotonic() - _indice_cargado_en >= TTL_INDICE_CATEGORIAS:
+            filas = db.query(
+                Categoria.id_categoria, Categoria.nombre, Categoria.sexo,
+                Categoria.rating_min, Categoria.rating_max
+            ).all()
+            _indice = IndiceCategorias([BandaCategoria(*fila) for fila in filas])
+            _indice_cargado_en = time.monotonic()
+        return _indice
+
+
+def invalidar_indice_categorias() -> None:
+    """Descarta el índice cacheado (llamar si se modifican las categorías)"""
+    global _indice
+    with _lock_indice:
+        _indice = None
+
+
+def actualizar_categoria_usuario(db: Session, usuario: Usuario) -> Optional[BandaCategoria]:
     """
     Actualiza la categoría de un usuario según su rating actual
-    
+
     Args:
         db: Sesión de base de datos
         usuario: Usuario a actualizar
-        
+
     Returns:
         La nueva categoría asignada o None si no se encontró
     """
-    # Buscar la categoría que corresponde al rating y sexo del usuario
-    nueva_categoria = db.query(Categoria).filter(
-        Categoria.sexo == usuario.sexo,
-        (Categoria.rating_min.is_(None) | (Categoria.rating_min <= usuario.rating)),
-        (Categoria.rating_max.is_(None) | (Categoria.rating_max >= usuario.rating))
-    ).order_by(Categoria.rating_min.desc()).first()
-    
+    # Buscar la categoría que corresponde al rating y sexo del usuario (en memoria)
+    nueva_categoria = obtener_indice_categorias(db).buscar(usuario.rating, usuario.sexo)
+
     if nueva_categoria:
         usuario.id_categoria = nueva_categoria.id_categoria
         return nueva_categoria
-    
+
     return None
 
 
-def obtener_categoria_por_rating(db: Session, rating: int, sexo: str) -> Optional[Categoria]:
+def obtener_categoria_por_rating(db: Session, rating: int, sexo: str) -> Optional[BandaCategoria]:
     """
     Obtiene la categoría que corresponde a un rating y sexo específicos
-    
+
     Args:
         db: Sesión de base de datos
         rating: Rating del jugador
         sexo: Sexo del jugador ('M' o 'F')
-        
+
     Returns:
         La categoría correspondiente o None si no se encontró
     """
-    categoria = db.query(Categoria).filter(
-        Categoria.sexo == sexo,
-        (Categoria.rating_min.is_(None) | (Categoria.rating_min <= rating)),
-        (Categoria.rating_max.is_(None) | (Categoria.rating_max >= rating))
-    ).order_by(Categoria.rating_min.desc()).first()
-    
-    return categoria
+    return obtener_indice_categorias(db).buscar(rating, sexo)
+
+
+def _select_categorias_correctas():
+    """
+    SELECT (id_usuario, id_categoria_actual, id_categoria_correcta) de los
+    usuarios cuya categoría no coincide con su rating.
+    Join por rango contra categorias; ROW_NUMBER se queda con la de mayor
+    rating_min (misma regla que IndiceCategorias).
+    """
+    orden = func.row_number().over(
+        partition_by=Usuario.id_usuario,
+        order_by=(Categoria.rating_min.desc().nulls_last(), Categoria.id_categoria.asc())
+    )
+    candidatas = select(
+        Usuario.id_usuario.label("id_usuario"),
+        Usuario.id_categoria.label("id_categoria_actual"),
+        Categoria.id_categoria.label("id_categoria_correcta"),
+        orden.label("orden")
+    ).join(
+        Categoria,
+        (Categoria.sexo == Usuario.sexo)
+        & (Categoria.rating_min.is_(None) | (Categoria.rating_min <= Usuario.rating))
+        & (Categoria.rating_max.is_(None) | (Categoria.rating_max >= Usuario.rating))
+    ).where(Usuario.sexo.is_not(None)).subquery()
+
+    return select(
+        candidatas.c.id_usuario,
+        candidatas.c.id_categoria_actual,
+        candidatas.c.id_categoria_correcta
+    ).where(
+        candidatas.c.orden == 1,
+        candidatas.c.id_categoria_actual.is_distinct_from(candidatas.c.id_categoria_correcta)
+    )
+
+
+def listar_categorias_incorrectas(db: Session) -> List[Dict]:
+    """Usuarios con categoría que no corresponde a su rating (una query)"""
+    incorrectas = _select_categorias_correctas().subquery()
+    filas = db.execute(
+        select(
+            Usuario.id_usuario, Usuario.nombre_usuario, Usuario.rating,
+            incorrectas.c.id_categoria_actual, incorrectas.c.id_categoria_correcta
+        ).join(incorrectas, incorrectas.c.id_usuario == Usuario.id_usuario)
+        .order_by(Usuario.id_usuario)
+    ).all()
+    return [fila._asdict() for fila in filas]
+
+
+def corregir_categorias_masivo(db: Session) -> List[Dict]:
+    """
+    Corrige la categoría de todos los usuarios en un único
+    UPDATE ... FROM (join por rango). No hace commit.
+
+    Returns:
+        Filas corregidas: id_usuario, nombre_usuario, rating,
+        id_categoria_anterior, id_categoria_nueva
+    """
+    # El detalle se lee antes del UPDATE (RETURNING no puede ver la categoría anterior)
+    corregidas = [
+        {
+            "id_usuario": fila["id_usuario"],
+            "nombre_usuario": fila["nombre_usuario"],
+            "rating": fila["rating"],
+            "id_categoria_anterior": fila["id_categoria_actual"],
+            "id_categoria_nueva": fila["id_categoria_correcta"]
+        }
+        for fila in listar_categorias_incorrectas(db)
+    ]
+    if not corregidas:
+        return []
+
+    incorrectas = _select_categorias_correctas().subquery()
+    usuarios = Usuario.__table__
+    db.execute(
+        update(usuarios)
+        .where(usuarios.c.id_usuario == incorrectas.c.id_usuario)
+        .values(id_categoria=incorrectas.c.id_categoria_correcta)
+    )
+    return corregidas
@@ -0,0 +1,300 @@
+"""
+Cola durable de confirmaciones de resultados (outbox en Postgres)
+
+Cuando el último rival confirma un resultado, el request solo encola un
+trabajo en `trabajos_confirmacion` (en la misma transacción que la
+confirmación) y responde. Un worker local toma los trabajos con
+FOR UPDATE SKIP LOCKED y aplica Elo, categorías e historial en una única
+transacción junto con el cambio de estado del trabajo, así que cada
+partido se aplica una sola vez aunque haya doble tap o varios workers.
+Las notificaciones push se encolan en esa misma transacción (las envía
+cola_notificaciones_service) y las de WebSocket salen después del commit.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database.config import SessionLocal
+from ..models.confirmacion import TrabajoConfirmacion
+from ..models.driveplus_models import Partido
+from ..models.sala import Sala
+from ..utils.cache import invalidate_ranking_cache
+from .historial_partidos_service import HistorialPartidosService
+
+logger = logging.getLogger(__name__)
+
+
+class ColaConfirmacionesService:
+    """Encolado y procesamiento de trabajos de confirmación"""
+
+    MAX_INTENTOS = 5
+    BACKOFF_BASE_SEGUNDOS = 5
+
+    @staticmethod
+    def clave_elo_partido(id_partido: int) -> str:
+        """Clave de idempotencia del trabajo que aplica Elo a un partido"""
+        return f"elo_partido:{id_partido}"
+
+    @staticmethod
+    def encolar_aplicacion_elo(id_partido: int, db: Session, id_sala: Optional[int] = None) -> TrabajoConfirmacion:
+        """
+        Encola (una sola vez por partido) el trabajo que aplica el Elo.
+        No hace commit: el trabajo queda en la misma transacción que la
+        confirmación que lo dispara.
+
+        Returns:
+            El trabajo nuevo o el que ya existía para ese partido
+        """
+        clave = ColaConfirmacionesService.clave_elo_partido(id_partido)
+
+        existente = db.query(TrabajoConfirmacion).filter(
+            TrabajoConfirmacion.clave_idempotencia == clave
+        ).first()
+        if existente:
+            return existente
+
+        trabajo = TrabajoConfirmacion(
+            clave_idempotencia=clave,
+            tipo='aplicar_elo',
+            id_partido=id_partido,
+            id_sala=id_sala,
+            estado='pendiente',
+            intentos=0
+        )
+        try:
+            with db.begin_nested():
+                db.add(trabajo)
+        except IntegrityError:
+            # Otro request encoló el mismo partido en paralelo
+            return db.query(TrabajoConfirmacion).filter(
+                TrabajoConfirmacion.clave_idempotencia == clave
+            ).first()
+
+        return trabajo
+
+    @staticmethod
+    def estado_trabajo(trabajo: TrabajoConfirmacion) -> Dict:
+        """Representación del trabajo para el cliente (polling o WebSocket)"""
+        return {
+            "id_trabajo": trabajo.id_trabajo,
+            "id_partido": trabajo.id_partido,
+            "estado": trabajo.estado,
+            "intentos": trabajo.intentos,
+            "resultado": trabajo.resultado,
+            "error": trabajo.error
+        }
+
+    @staticmethod
+    def procesar_siguiente(db: Session) -> Optional[Dict]:
+        """
+        Toma el siguiente trabajo pendiente y lo procesa en una transacción.
+
+        Returns:
+            Dict con el estado del trabajo y los cambios aplicados,
+            o None si no había trabajos pendientes
+        """
+        trabajo = db.query(TrabajoConfirmacion).filter(
+            TrabajoConfirmacion.estado == 'pendiente',
+            TrabajoConfirmacion.disponible_en <= func.now()
+        ).order_by(TrabajoConfirmacion.id_trabajo).limit(1).with_for_update(skip_locked=True).first()
+
+        if not trabajo:
+            db.rollback()
+            return None
+
+        id_trabajo = trabajo.id_trabajo
+
+        try:
+            cambios = ColaConfirmacionesService._aplicar_elo(trabajo, db)
+            trabajo.estado = 'completado'
+            trabajo.intentos += 1
+            trabajo.error = None
+            # JSON solo admite claves string
+            trabajo.resultado = {str(k): v for k, v in cambios.items()} if cambios else None
+            version_sala = None
+            if cambios:
+                # Push en la misma transacción: se envían solo si el Elo quedó aplicado
+                from .notification_service import NotificationService
+                NotificationService.encolar_elo_actualizado(db, cambios)
+                if trabajo.id_sala:
+                    # La sala quedó finalizada: nueva versión de su estado
+                    from .sala_service import SalaService
+                    version_sala = SalaService.incrementar_version(db, trabajo.id_sala)
+            info = {
+                "trabajo": ColaConfirmacionesService.estado_trabajo(trabajo),
+                "id_sala": trabajo.id_sala,
+                "cambios": cambios,
+                "version_sala": version_sala
+            }
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error procesando trabajo de confirmación {id_trabajo}: {e}")
+            return ColaConfirmacionesService._registrar_fallo(id_trabajo, str(e), db)
+
+        if cambios:
+            invalidate_ranking_cache()
+
+        return info
+
+    @staticmethod
+    def _aplicar_elo(trabajo: TrabajoConfirmacion, db: Session) -> Optional[Dict]:
+        """Aplica el Elo del partido del trabajo (sin commit)"""
+        from .confirmacion_service import ConfirmacionService
+
+        # Bloquear el partido: serializa contra la auto-confirmación y otros workers
+        partido = db.query(Partido).filter(
+            Partido.id_partido == trabajo.id_partido
+        ).with_for_update().first()
+
+        if not partido:
+            raise ValueError("Partido no encontrado")
+
+        if partido.elo_aplicado:
+            return None  # Ya se aplicó (p. ej. auto-confirmación)
+
+        contexto = ConfirmacionService._cargar_contexto_elo([partido], db)
+        cambios = ConfirmacionService._aplicar_elo_con_contexto(partido, contexto, db)
+
+        partido.estado_confirmacion = 'confirmado'
+        partido.estado = 'confirmado'
+        HistorialPartidosService.registrar(
+            db, partido, [(j.id_usuario, j.equipo) for j in contexto["jugadores"].get(partido.id_partido, [])]
+        )
+
+        if trabajo.id_sala:
+            sala = db.query(Sala).filter(Sala.id_sala == trabajo.id_sala).first()
+            if sala:
+                sala.estado = 'finalizada'
+
+        return cambios
+
+    @staticmethod
+    def _registrar_fallo(id_trabajo: int, error: str, db: Session) -> Dict:
+        """Suma un intento fallido y reprograma el trabajo con backoff exponencial"""
+        trabajo = db.query(TrabajoConfirmacion).filter(
+            TrabajoConfirmacion.id_trabajo == id_trabajo
+        ).first()
+
+        trabajo.intentos += 1
+        trabajo.error = error
+        if trabajo.intentos >= ColaConfirmacionesService.MAX_INTENTOS:
+            trabajo.estado = 'error'
+        else:
+            espera = ColaConfirmacionesService.BACKOFF_BASE_SEGUNDOS * (2 ** (trabajo.intentos - 1))
+            trabajo.disponible_en = datetime.now(timezone.utc) + timedelta(seconds=espera)
+
+        info = {
+            "trabajo": ColaConfirmacionesService.estado_trabajo(trabajo),
+            "id_sala": trabajo.id_sala,
+            "cambios": None
+        }
+        db.commit()
+        return info
+
+
+class ColaConfirmacionesWorker:
+    """Worker local que vacía la cola de confirmaciones en background"""
+
+    INTERVALO_SEGUNDOS = 5
+
+    def __init__(self):
+        self.running = False
+        self._despertar: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Inicia el worker (NO BLOQUEANTE)"""
+        if self.running:
+            return
+
+        self.running = True
+        self._despertar = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+        logger.info("✅ Worker de cola de confirmaciones iniciado")
+
+    def stop(self):
+        """Detiene el worker"""
+        self.running = False
+        if self._despertar:
+            self._despertar.set()
+        logger.info("🛑 Deteniendo worker de cola de confirmaciones")
+
+    def notificar(self):
+        """Avisar que hay un trabajo nuevo para no esperar al próximo intervalo"""
+        if self._despertar:
+            self._despertar.set()
+
+    async def _loop(self):
+        while self.running:
+            try:
+                await self.procesar_pendientes()
+            except Exception as e:
+                logger.error(f"Error en worker de confirmaciones: {e}")
+
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.INTERVALO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+
+    async def procesar_pendientes(self, limite: int = 50) -> int:
+        """Procesa hasta `limite` trabajos y ejecuta sus efectos post-commit"""
+        procesados = 0
+        while procesados < limite:
+            # Las queries son sync: correrlas fuera del event loop
+            info = await asyncio.to_thread(self._procesar_uno)
+            if info is None:
+                break
+            procesados += 1
+            await self._ejecutar_efectos(info)
+        return procesados
+
+    @staticmethod
+    def _procesar_uno() -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            info = ColaConfirmacionesService.procesar_siguiente(db)
+            if info and info.get("cambios"):
+                # Sala finalizada y ratings nuevos (releídos con la misma sesión)
+                from .matchmaking_service import indice_matchmaking
+                from .busqueda_usuarios_service import indice_busqueda_usuarios
+                try:
+                    indice_matchmaking.refrescar_salas(db, [info["id_sala"]])
+                    indice_matchmaking.refrescar_jugadores(db, info["cambios"].keys())
+                    indice_busqueda_usuarios.refrescar_usuarios(db, info["cambios"].keys())
+                except Exception as e:
+                    logger.warning(f"Error actualizando matchmaking: {e}")
+            return info
+        finally:
+            db.close()
+
+    @staticmethod
+    async def _ejecutar_efectos(info: Dict):
+        """Aviso al worker de push y WebSocket de un trabajo ya commiteado"""
+        if info.get("cambios"):
+            from .cola_notificaciones_service import cola_notificaciones_worker
+            cola_notificaciones_worker.notificar()
+
+        if info.get("version_sala"):
+            from ..websocket.estado_salas import estado_salas
+            await estado_salas.publicar(info["id_sala"], info["version_sala"])
+
+        if info.get("id_sala"):
+            from ..websocket.connection_manager import manager
+            try:
+                await manager.notify_resultado_confirmado(str(info["id_sala"]), {
+                    "trabajo": info["trabajo"],
+                    "elo_changes": info["trabajo"]["resultado"]
+                })
+            except Exception as e:
+                logger.warning(f"Error notificando confirmación por WebSocket: {e}")
+
+
+# Instancia global del worker
+cola_confirmaciones_worker = ColaConfirmacionesWorker()
@@ -0,0 +1,335 @@
+"""
+Cola durable de notificaciones push (outbox en Postgres)
+
+Los flujos de inscripción, confirmación y Elo solo encolan filas en
+`notificaciones_pendientes`; la latencia del request ya no incluye los
+round-trips a FCM. Un worker local toma lotes de hasta 500 con
+FOR UPDATE SKIP LOCKED, carga los tokens en una sola query y los envía
+en un solo llamado por lote (multicast si el contenido es el mismo).
+Los errores transitorios se reintentan con backoff exponencial y los
+tokens que FCM declara inválidos se borran de `usuarios`.
+
+El transporte es intercambiable: TransporteFCM en producción,
+TransporteStub en tests o en local (PUSH_TRANSPORTE=stub).
+"""
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from ..database.config import SessionLocal
+from ..models.driveplus_models import Usuario
+from ..models.notificacion import NotificacionPendiente
+
+logger = logging.getLogger(__name__)
+
+# Máximo de mensajes por llamado a FCM (send_each / multicast)
+TAMANO_LOTE_FCM = 500
+
+# Resultados posibles de un envío
+ENVIO_OK = "ok"
+ENVIO_TOKEN_INVALIDO = "token_invalido"
+ENVIO_REINTENTAR = "reintentar"
+
+
+@dataclass(frozen=True)
+class MensajePush:
+    token: str
+    titulo: str
+    cuerpo: str
+    data: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ResultadoPush:
+    estado: str  # ENVIO_OK | ENVIO_TOKEN_INVALIDO | ENVIO_REINTENTAR
+    detalle: Optional[str] = None
+
+
+class TransporteFCM:
+    """Envío real por Firebase Cloud Messaging"""
+
+    def enviar(self, mensajes: List[MensajePush]) -> List[ResultadoPush]:
+        from firebase_admin import messaging
+
+        resultados: List[Optional[ResultadoPush]] = [None] * len(mensajes)
+
+        # Mismo contenido para varios tokens -> un multicast; el resto, send_each
+        grupos: Dict[tuple, List[int]] = {}
+        for i, m in enumerate(mensajes):
+            grupos.setdefault((m.titulo, m.cuerpo, tuple(sorted(m.data.items()))), []).append(i)
+
+        individuales = []
+        for (titulo, cuerpo, data), indices in grupos.items():
+            if len(indices) == 1:
+                individuales.append(indices[0])
+                continue
+            respuesta = self._llamar(messaging.send_each_for_multicast, messaging.MulticastMessage(
+                notification=messaging.Notification(title=titulo, body=cuerpo),
+                data=dict(data),
+                tokens=[mensajes[i].token for i in indices]
+            ), len(indices))
+            for i, r in zip(indices, respuesta):
+                resultados[i] = r
+
+        if individuales:
+            respuesta = self._llamar(messaging.send_each, [
+                messaging.Message(
+                    notification=messaging.Notification(title=mensajes[i].titulo, body=mensajes[i].cuerpo),
+                    data=mensajes[i].data,
+                    token=mensajes[i].token
+                )
+                for i in individuales
+            ], len(individuales))
+            for i, r in zip(individuales, respuesta):
+                resultados[i] = r
+
+        return resultados
+
+    @staticmethod
+    def _llamar(funcion, mensajes, cantidad: int) -> List[ResultadoPush]:
+        try:
+            respuesta = funcion(mensajes)
+        except Exception as e:
+            # Falla el lote completo (red, credenciales, cuota): reintentar todo
+            return [ResultadoPush(ENVIO_REINTENTAR, str(e))] * cantidad
+        return [TransporteFCM._clasificar(r) for r in respuesta.responses]
+
+    @staticmethod
+    def _clasificar(respuesta) -> ResultadoPush:
+        if respuesta.success:
+            return ResultadoPush(ENVIO_OK)
+
+        from firebase_admin import exceptions, messaging
+        error = respuesta.exception
+        if isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError,
+                              exceptions.InvalidArgumentError)):
+            return ResultadoPush(ENVIO_TOKEN_INVALIDO, str(error))
+        return ResultadoPush(ENVIO_REINTENTAR, str(error))
+
+
+class TransporteStub:
+    """Transporte local: registra los lotes y simula tokens inválidos o caídas"""
+
+    def __init__(self, tokens_invalidos: Optional[Set[str]] = None, fallos_transitorios: int = 0):
+        self.tokens_invalidos = set(tokens_invalidos or ())
+        self.fallos_transitorios = fallos_transitorios
+        self.lotes: List[List[MensajePush]] = []
+
+    @property
+    def enviados(self) -> List[MensajePush]:
+        return [m for lote in self.lotes for m in lote]
+
+    def enviar(self, mensajes: List[MensajePush]) -> List[ResultadoPush]:
+        if self.fallos_transitorios > 0:
+            self.fallos_transitorios -= 1
+            return [ResultadoPush(ENVIO_REINTENTAR, "FCM no disponible")] * len(mensajes)
+        self.lotes.append(list(mensajes))
+        return [
+            ResultadoPush(ENVIO_TOKEN_INVALIDO, "Token no registrado")
+            if m.token in self.tokens_invalidos else ResultadoPush(ENVIO_OK)
+            for m in mensajes
+        ]
+
+
+def crear_transporte():
+    """Transporte según PUSH_TRANSPORTE ("fcm" | "stub")"""
+    if os.getenv("PUSH_TRANSPORTE", "fcm") == "stub":
+        return TransporteStub()
+    return TransporteFCM()
+
+
+class ColaNotificacionesService:
+    """Encolado y envío por lotes de notificaciones push"""
+
+    MAX_INTENTOS = 5
+    BACKOFF_BASE_SEGUNDOS = 30
+
+    @staticmethod
+    def encolar(
+        db: Session,
+        ids_usuarios: List[int],
+        titulo: str,
+        cuerpo: str,
+        data: Optional[Dict] = None
+    ) -> List[NotificacionPendiente]:
+        """
+        Encola la misma notificación para varios usuarios.
+        No hace commit: queda en la transacción del flujo que la dispara.
+        """
+        # FCM requiere que todos los valores de data sean strings
+        data_str = {k: str(v) if v is not None else "" for k, v in (data or {}).items()}
+        notificaciones = [
+            NotificacionPendiente(id_usuario=id_usuario, titulo=titulo, cuerpo=cuerpo,
+                                  data=data_str, estado='pendiente', intentos=0)
+            for id_usuario in ids_usuarios
+        ]
+        db.add_all(notificaciones)
+        return notificaciones
+
+    @staticmethod
+    def procesar_lote(db: Session, transporte, limite: int = TAMANO_LOTE_FCM) -> Optional[Dict]:
+        """
+        Toma hasta `limite` notificaciones pendientes y las envía en un lote.
+
+        Returns:
+            Conteo por resultado, o None si no había pendientes
+        """
+        pendientes = db.query(
+            NotificacionPendiente.id_notificacion,
+            NotificacionPendiente.id_usuario,
+            NotificacionPendiente.titulo,
+            NotificacionPendiente.cuerpo,
+            NotificacionPendiente.data,
+            NotificacionPendiente.intentos
+        ).filter(
+            NotificacionPendiente.estado == 'pendiente',
+            NotificacionPendiente.disponible_en <= func.now()
+        ).order_by(NotificacionPendiente.id_notificacion).limit(limite).with_for_update(skip_locked=True).all()
+
+        if not pendientes:
+            db.rollback()
+            return None
+
+        # Tokens de todos los destinatarios en una sola query
+        tokens = dict(db.query(Usuario.id_usuario, Usuario.fcm_token).filter(
+            Usuario.id_usuario.in_({n.id_usuario for n in pendientes}),
+            Usuario.fcm_token.isnot(None)
+        ).all())
+
+        conteo = {"enviadas": 0, "sin_token": 0, "reintentos": 0, "errores": 0, "tokens_eliminados": 0}
+        ahora = datetime.now(timezone.utc)
+        cambios = []
+
+        def cambio(notificacion, estado, intentos, error=None, disponible_en=None, enviado_en=None):
+            # Mismas claves en todos: un solo UPDATE por lote (executemany)
+            cambios.append({
+                "id_notificacion": notificacion.id_notificacion, "estado": estado,
+                "intentos": intentos, "error": error,
+                "disponible_en": disponible_en or ahora, "enviado_en": enviado_en
+            })
+
+        a_enviar = []
+        for notificacion in pendientes:
+            if tokens.get(notificacion.id_usuario):
+                a_enviar.append(notificacion)
+            else:
+                cambio(notificacion, 'sin_token', notificacion.intentos)
+                conteo["sin_token"] += 1
+
+        mensajes = [
+            MensajePush(token=tokens[n.id_usuario], titulo=n.titulo, cuerpo=n.cuerpo, data=n.data or {})
+            for n in a_enviar
+        ]
+        resultados = transporte.enviar(mensajes) if mensajes else []
+
+        tokens_invalidos = set()
+        for notificacion, mensaje, resultado in zip(a_enviar, mensajes, resultados):
+            intentos = notificacion.intentos + 1
+            if resultado.estado == ENVIO_OK:
+                cambio(notificacion, 'enviada', intentos, enviado_en=ahora)
+                conteo["enviadas"] += 1
+            elif resultado.estado == ENVIO_TOKEN_INVALIDO:
+                cambio(notificacion, 'sin_token', intentos, resultado.detalle)
+                tokens_invalidos.add(mensaje.token)
+                conteo["sin_token"] += 1
+            elif intentos >= ColaNotificacionesService.MAX_INTENTOS:
+                cambio(notificacion, 'error', intentos, resultado.detalle)
+                conteo["errores"] += 1
+            else:
+                espera = ColaNotificacionesService.BACKOFF_BASE_SEGUNDOS * (2 ** (intentos - 1))
+                cambio(notificacion, 'pendiente', intentos, resultado.detalle,
+                       disponible_en=ahora + timedelta(seconds=espera))
+                conteo["reintentos"] += 1
+
+        db.execute(update(NotificacionPendiente), cambios)
+
+        if tokens_invalidos:
+            # Podar tokens muertos (solo si el usuario no registró uno nuevo)
+            conteo["tokens_eliminados"] = db.execute(
+                update(Usuario).where(Usuario.fcm_token.in_(tokens_invalidos)).values(fcm_token=None)
+            ).rowcount
+
+        db.commit()
+        return conteo
+
+
+class ColaNotificacionesWorker:
+    """Worker local que vacía la cola de notificaciones en background"""
+
+    INTERVALO_SEGUNDOS = 5
+
+    def __init__(self, transporte=None):
+        self.transporte = transporte if transporte is not None else crear_transporte()
+        self.running = False
+        self._despertar: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """Inicia el worker (NO BLOQUEANTE)"""
+        if self.running:
+            return
+
+        self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._despertar = asyncio.Event()
+        self._task = asyncio.create_task(self._bucle())
+        logger.info("✅ Worker de notificaciones push iniciado")
+
+    def stop(self):
+        """Detiene el worker"""
+        self.running = False
+        if self._despertar:
+            self._despertar.set()
+        logger.info("🛑 Deteniendo worker de notificaciones push")
+
+    def notificar(self):
+        """
+        Avisar que hay notificaciones nuevas. Se puede llamar desde
+        endpoints sync (threadpool), por eso pasa por el event loop.
+        """
+        if self._despertar and self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._despertar.set)
+
+    async def _bucle(self):
+        while self.running:
+            try:
+                await self.procesar_pendientes()
+            except Exception as e:
+                logger.error(f"Error en worker de notificaciones: {e}")
+
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.INTERVALO_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+
+    async def procesar_pendientes(self, max_lotes: int = 10) -> int:
+        """Envía hasta `max_lotes` lotes; devuelve la cantidad de lotes procesados"""
+        lotes = 0
+        while lotes < max_lotes:
+            # Queries y FCM son sync: correrlos fuera del event loop
+            conteo = await asyncio.to_thread(self._procesar_lote)
+            if conteo is None:
+                break
+            lotes += 1
+            if conteo["tokens_eliminados"]:
+                logger.info(f"🧹 {conteo['tokens_eliminados']} tokens FCM inválidos eliminados")
+        return lotes
+
+    def _procesar_lote(self) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            return ColaNotificacionesService.procesar_lote(db, self.transporte)
+        finally:
+            db.close()
+
+
+# Instancia global del worker
+cola_notificaciones_worker = ColaNotificacionesWorker()
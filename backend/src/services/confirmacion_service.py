@@ -2,8 +2,10 @@
 Servicio de Confirmaciones
 Maneja el flujo de confirmación de resultados de partidos
 """
+import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
@@ -14,11 +16,14 @@ from ..services.elo_service import EloService
 from ..services.categoria_service import actualizar_categoria_usuario
 from ..utils.cache import invalidate_ranking_cache
 
+logger = logging.getLogger(__name__)
+
 
 class ConfirmacionService:
     """Servicio para manejar confirmaciones de resultados"""
     
     HORAS_AUTO_CONFIRMACION = 48
+    TAMANO_LOTE_AUTO_CONFIRMACION = 50
     
     @staticmethod
     def obtener_estado_confirmaciones(id_partido: int, id_usuario_actual: int, db: Session) -> Dict:
@@ -91,8 +96,10 @@ class ConfirmacionService:
             Dict con resultado de la confirmación
         """
         from ..models.driveplus_models import ResultadoPartido
+        from .cola_confirmaciones_service import ColaConfirmacionesService
         
-        partido = db.query(Partido).filter(Partido.id_partido == id_partido).first()
+        # Bloquear el partido: dos confirmaciones simultáneas (doble tap) se serializan
+        partido = db.query(Partido).filter(Partido.id_partido == id_partido).with_for_update().first()
         if not partido:
             raise ValueError("Partido no encontrado")
         
@@ -148,33 +155,13 @@ class ConfirmacionService:
             )
         ).count()
         
-        # Si todos confirmaron (3 rivales), aplicar Elo
-        elo_changes = None
+        # Si todos confirmaron (3 rivales), encolar la aplicación del Elo.
+        # El worker aplica Elo, categorías, historial y notificaciones una sola vez.
+        trabajo = None
         if total_confirmaciones >= 3:
-            elo_changes = ConfirmacionService._aplicar_elo(partido, db)
-            partido.estado_confirmacion = 'confirmado'
-            partido.estado = 'confirmado'  # Actualizar también el estado principal
-            
-            # Enviar notificaciones push a todos los jugadores
-            try:
-                from .notification_service import NotificationService
-                
-                # Obtener todos los jugadores del partido
-                todos_jugadores = db.query(PartidoJugador).filter(
-                    PartidoJugador.id_partido == id_partido
-                ).all()
-                
-                ids_usuarios = [j.id_usuario for j in todos_jugadores]
-                
-                # Enviar notificaciones
-                NotificationService.enviar_notificacion_elo_actualizado(
-                    usuarios=ids_usuarios,
-                    cambios_elo=elo_changes,
-                    db=db
-                )
-            except Exception as e:
-                # No fallar si las notificaciones fallan
-                print(f"Error enviando notificaciones: {e}")
+            trabajo = ColaConfirmacionesService.encolar_aplicacion_elo(
+                id_partido, db, id_sala=partido.id_sala
+            )
         
         # Obtener jugadores que faltan por confirmar
         jugadores_faltantes = []
@@ -196,41 +183,34 @@ class ConfirmacionService:
             ids_confirmados.add(partido.creado_por)  # El creador no confirma
             
             # Encontrar quiénes faltan
-            for jugador in todos_jugadores:
-                if jugador.id_usuario not in ids_confirmados:
-                    usuario = db.query(Usuario).filter(Usuario.id_usuario == jugador.id_usuario).first()
+            for pj in todos_jugadores:
+                if pj.id_usuario not in ids_confirmados:
+                    usuario = db.query(Usuario).filter(Usuario.id_usuario == pj.id_usuario).first()
                     if usuario:
                         jugadores_faltantes.append(usuario.nombre_usuario)
         
-        # Calcular cambio de Elo para el usuario actual
-        cambio_elo_usuario = None
-        if elo_changes:
-            # Si se aplicó el Elo, obtener el cambio real
-            cambio_elo_usuario = elo_changes.get(id_usuario, {}).get('cambio', 0)
-        else:
-            # Si no se aplicó aún, dar estimación
-            jugador_actual = db.query(PartidoJugador).filter(
-                and_(
-                    PartidoJugador.id_partido == id_partido,
-                    PartidoJugador.id_usuario == id_usuario
-                )
-            ).first()
-            
-            if jugador_actual:
-                # Estimación: ganadores +8, perdedores -8 (cambio individual en amistosos)
-                gano = (partido.ganador_equipo == jugador_actual.equipo)
-                cambio_elo_usuario = 8 if gano else -8
+        # Estimación del cambio de Elo para el usuario actual (el real lo aplica el worker)
+        # Estimación: ganadores +8, perdedores -8 (cambio individual en amistosos)
+        gano = (partido.ganador_equipo == jugador.equipo)
+        cambio_elo_usuario = 8 if gano else -8
+        
+        estado_trabajo = None
+        if trabajo:
+            db.flush()
+            estado_trabajo = ColaConfirmacionesService.estado_trabajo(trabajo)
         
         db.commit()
         
         return {
             "success": True,
             "confirmaciones_totales": total_confirmaciones,
-            "elo_aplicado": total_confirmaciones >= 3,
-            "elo_changes": elo_changes,
+            "elo_aplicado": False,
+            "elo_en_cola": trabajo is not None,
+            "trabajo": estado_trabajo,
+            "elo_changes": None,
             "cambio_elo_usuario": cambio_elo_usuario,
             "jugadores_faltantes": jugadores_faltantes,
-            "mensaje": "Resultado confirmado" if total_confirmaciones < 3 else "Todos confirmaron. Elo actualizado."
+            "mensaje": "Resultado confirmado" if total_confirmaciones < 3 else "Todos confirmaron. El Elo se está aplicando."
         }
     
     @staticmethod
@@ -295,10 +275,135 @@ class ConfirmacionService:
         if partido.elo_aplicado:
             return None  # Ya se aplicó
         
-        # Obtener jugadores del partido
-        jugadores = db.query(PartidoJugador).filter(
-            PartidoJugador.id_partido == partido.id_partido
-        ).all()
+        contexto = ConfirmacionService._cargar_contexto_elo([partido], db)
+        resultado = ConfirmacionService._aplicar_elo_con_contexto(partido, contexto, db)
+        
+        # Invalidar caché de rankings (los ratings cambiaron)
+        invalidate_ranking_cache()
+        
+        db.commit()
+        
+        return resultado
+    
+    @staticmethod
+    def _aplicar_elo_lote(partidos: List[Partido], db: Session) -> Tuple[Dict[int, Dict], Dict[int, str]]:
+        """
+        Aplica Elo a varios partidos reutilizando una única carga de datos.
+        
+        Cada partido se aplica dentro de un savepoint, junto con su alta en el
+        historial y los récords entre jugadores: si uno falla, el resto del
+        lote sigue adelante. No hace commit (lo decide quien llama).
+        
+        Returns:
+            Tuple (cambios por id_partido, errores por id_partido)
+        """
+        pendientes = [p for p in partidos if not p.elo_aplicado]
+        if not pendientes:
+            return {}, {}
+        
+        from .historial_partidos_service import HistorialPartidosService
+        
+        contexto = ConfirmacionService._cargar_contexto_elo(pendientes, db)
+        
+        cambios = {}
+        errores = {}
+        for partido in pendientes:
+            try:
+                with db.begin_nested():
+                    cambios_partido = ConfirmacionService._aplicar_elo_con_contexto(
+                        partido, contexto, db
+                    )
+                    HistorialPartidosService.registrar(db, partido, [
+                        (j.id_usuario, j.equipo) for j in contexto["jugadores"].get(partido.id_partido, [])
+                    ])
+                    cambios[partido.id_partido] = cambios_partido
+            except Exception as e:
+                errores[partido.id_partido] = str(e)
+        
+        if cambios:
+            invalidate_ranking_cache()
+        
+        return cambios, errores
+    
+    @staticmethod
+    def _cargar_contexto_elo(partidos: List[Partido], db: Session) -> Dict:
+        """
+        Carga en bloque todo lo que necesita el cálculo de Elo de varios partidos:
+        jugadores, usuarios (bloqueados para escritura), resultados, historial
+        de rating existente e historial de enfrentamientos.
+        
+        Returns:
+            Dict con los datos indexados por id_partido / id_usuario
+        """
+        from ..models.driveplus_models import ResultadoPartido, HistorialRating
+        
+        ids_partidos = [p.id_partido for p in partidos]
+        
+        jugadores_por_partido = {id_partido: [] for id_partido in ids_partidos}
+        for jugador in db.query(PartidoJugador).filter(
+            PartidoJugador.id_partido.in_(ids_partidos)
+        ).all():
+            jugadores_por_partido[jugador.id_partido].append(jugador)
+        
+        ids_usuarios = sorted({
+            j.id_usuario for jugadores in jugadores_por_partido.values() for j in jugadores
+        })
+        
+        # Orden fijo por id para que dos workers no se bloqueen mutuamente
+        usuarios = {}
+        if ids_usuarios:
+            usuarios = {
+                u.id_usuario: u
+                for u in db.query(Usuario).filter(
+                    Usuario.id_usuario.in_(ids_usuarios)
+                ).order_by(Usuario.id_usuario).with_for_update().all()
+            }
+        
+        resultados = {
+            r.id_partido: r
+            for r in db.query(ResultadoPartido).filter(
+                ResultadoPartido.id_partido.in_(ids_partidos)
+            ).all()
+        }
+        
+        historial_existente = {
+            (h.id_partido, h.id_usuario)
+            for h in db.query(HistorialRating.id_partido, HistorialRating.id_usuario).filter(
+                HistorialRating.id_partido.in_(ids_partidos)
+            ).all()
+        }
+        
+        enfrentamientos = {
+            h.id_partido: h
+            for h in db.query(HistorialEnfrentamiento).filter(
+                HistorialEnfrentamiento.id_partido.in_(ids_partidos)
+            ).all()
+        }
+        
+        return {
+            "jugadores": jugadores_por_partido,
+            "usuarios": usuarios,
+            "resultados": resultados,
+            "historial_existente": historial_existente,
+            "enfrentamientos": enfrentamientos
+        }
+    
+    @staticmethod
+    def _aplicar_elo_con_contexto(partido: Partido, contexto: Dict, db: Session) -> Dict:
+        """
+        Calcula y aplica el Elo de un partido usando datos precargados
+        (ver _cargar_contexto_elo). No hace commit.
+        
+        Returns:
+            Dict con cambios de Elo por jugador
+        """
+        from ..models.driveplus_models import HistorialRating
+        
+        if partido.elo_aplicado:
+            return None  # Ya se aplicó
+        
+        jugadores = contexto["jugadores"].get(partido.id_partido, [])
+        usuarios = contexto["usuarios"]
         
         if len(jugadores) != 4:
             raise ValueError("El partido debe tener 4 jugadores")
@@ -307,52 +412,32 @@ class ConfirmacionService:
         equipo1 = [j for j in jugadores if j.equipo == 1]
         equipo2 = [j for j in jugadores if j.equipo == 2]
         
-        # Obtener ratings actuales
-        ratings_equipo1 = []
-        ratings_equipo2 = []
-        
-        for j in equipo1:
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == j.id_usuario).first()
-            ratings_equipo1.append(usuario.rating)
-            j.rating_antes = usuario.rating
-        
-        for j in equipo2:
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == j.id_usuario).first()
-            ratings_equipo2.append(usuario.rating)
-            j.rating_antes = usuario.rating
-        
-        # Preparar datos para el servicio Elo
+        # Ratings actuales (si un usuario jugó otro partido del mismo lote,
+        # el objeto ya tiene el rating actualizado)
         team_a_players = []
         team_b_players = []
         
-        for j in equipo1:
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == j.id_usuario).first()
-            team_a_players.append({
-                'id': usuario.id_usuario,  # El servicio Elo espera 'id'
-                'id_usuario': usuario.id_usuario,
-                'rating': usuario.rating,
-                'partidos': usuario.partidos_jugados
-            })
-        
-        for j in equipo2:
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == j.id_usuario).first()
-            team_b_players.append({
-                'id': usuario.id_usuario,  # El servicio Elo espera 'id'
-                'id_usuario': usuario.id_usuario,
-                'rating': usuario.rating,
-                'partidos': usuario.partidos_jugados
-            })
+        for equipo, team_players in ((equipo1, team_a_players), (equipo2, team_b_players)):
+            for j in equipo:
+                usuario = usuarios[j.id_usuario]
+                j.rating_antes = usuario.rating
+                team_players.append({
+                    'id': usuario.id_usuario,  # El servicio Elo espera 'id'
+                    'id_usuario': usuario.id_usuario,
+                    'rating': usuario.rating,
+                    'partidos': usuario.partidos_jugados
+                })
         
         # Extraer datos del resultado (UNIFICADO - desde resultados_partidos)
-        from ..models.driveplus_models import ResultadoPartido
-        
-        resultado_db = db.query(ResultadoPartido).filter(
-            ResultadoPartido.id_partido == partido.id_partido
-        ).first()
+        resultado_db = contexto["resultados"].get(partido.id_partido)
         
         if not resultado_db:
             raise ValueError("El partido no tiene resultado cargado")
         
+        # Calcular games totales desde detalle_sets
+        games_a = sum(set_data.get('juegos_eq1', 0) for set_data in resultado_db.detalle_sets)
+        games_b = sum(set_data.get('juegos_eq2', 0) for set_data in resultado_db.detalle_sets)
+        
         # MAPEAR CORRECTAMENTE EQUIPOS PARA ELO (FIX CRÍTICO)
         # Problema: equipo1/equipo2 != equipoA/equipoB necesariamente
         # Solución: Determinar correspondencia basándose en jugadores
@@ -361,7 +446,6 @@ class ConfirmacionService:
         resultado_json = partido.resultado_padel or {}
         jugadores_resultado = resultado_json.get('jugadores', {})
         jugadores_equipoA = jugadores_resultado.get('equipoA', [])
-        jugadores_equipoB = jugadores_resultado.get('equipoB', [])
         
         # Determinar si equipo1 corresponde a equipoA o equipoB
         equipo1_es_equipoA = False
@@ -386,10 +470,6 @@ class ConfirmacionService:
             games_equipo1 = games_b
             games_equipo2 = games_a
         
-        # Calcular games totales desde detalle_sets
-        games_a = sum(set_data.get('juegos_eq1', 0) for set_data in resultado_db.detalle_sets)
-        games_b = sum(set_data.get('juegos_eq2', 0) for set_data in resultado_db.detalle_sets)
-        
         # Convertir detalle_sets al formato que espera el servicio Elo
         sets_detail = [
             {
@@ -414,150 +494,145 @@ class ConfirmacionService:
             match_date=partido.fecha
         )
         
-        # Convertir resultado al formato esperado
-        cambios_elo = {}
-        for i, player_change in enumerate(cambios_elo_result['team_a']['players']):
-            cambios_elo[f'jugador_a_{i}'] = {
-                'anterior': player_change['old_rating'],
-                'nuevo': player_change['new_rating'],
-                'cambio': player_change['rating_change']
-            }
-        
-        for i, player_change in enumerate(cambios_elo_result['team_b']['players']):
-            cambios_elo[f'jugador_b_{i}'] = {
-                'anterior': player_change['old_rating'],
-                'nuevo': player_change['new_rating'],
-                'cambio': player_change['rating_change']
-            }
-        
         # Aplicar cambios (convertir a enteros) - CORREGIDO
         resultado = {}
         
-        for i, j in enumerate(equipo1):
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == j.id_usuario).first()
-            cambio_key = f'jugador_a_{i}'
-            cambio = cambios_elo[cambio_key]
-            
-            # Convertir a enteros (SIN INVERTIR - el ELO ya está corregido)
-            cambio_elo_int = int(round(cambio['cambio']))  # CORREGIDO: Sin inversión
-            nuevo_rating = int(usuario.rating) + cambio_elo_int
-            
-            usuario.rating = nuevo_rating
-            j.rating_despues = nuevo_rating
-            j.cambio_elo = cambio_elo_int
-            
-            # Actualizar categoría según el nuevo rating
-            actualizar_categoria_usuario(db, usuario)
-            
-            resultado[j.id_usuario] = {
-                'anterior': int(cambio['anterior']),
-                'nuevo': nuevo_rating,
-                'cambio': cambio_elo_int
-            }
-        
-        for i, j in enumerate(equipo2):
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == j.id_usuario).first()
-            cambio_key = f'jugador_b_{i}'
-            cambio = cambios_elo[cambio_key]
-            
-            # Convertir a enteros (SIN INVERTIR - el ELO ya está corregido)
-            cambio_elo_int = int(round(cambio['cambio']))  # CORREGIDO: Sin inversión
-            nuevo_rating = int(usuario.rating) + cambio_elo_int
-            
-            usuario.rating = nuevo_rating
-            j.rating_despues = nuevo_rating
-            j.cambio_elo = cambio_elo_int
-            
-            # Actualizar categoría según el nuevo rating
-            actualizar_categoria_usuario(db, usuario)
-            
-            resultado[j.id_usuario] = {
-                'anterior': int(cambio['anterior']),
-                'nuevo': nuevo_rating,
-                'cambio': cambio_elo_int
-            }
+        for equipo, cambios_equipo in (
+            (equipo1, cambios_elo_result['team_a']['players']),
+            (equipo2, cambios_elo_result['team_b']['players'])
+        ):
+            for j, cambio in zip(equipo, cambios_equipo):
+                usuario = usuarios[j.id_usuario]
+                
+                # Convertir a enteros (SIN INVERTIR - el ELO ya está corregido)
+                cambio_elo_int = int(round(cambio['rating_change']))
+                nuevo_rating = int(usuario.rating) + cambio_elo_int
+                
+                usuario.rating = nuevo_rating
+                j.rating_despues = nuevo_rating
+                j.cambio_elo = cambio_elo_int
+                
+                # Actualizar categoría según el nuevo rating
+                actualizar_categoria_usuario(db, usuario)
+                
+                resultado[j.id_usuario] = {
+                    'anterior': int(cambio['old_rating']),
+                    'nuevo': nuevo_rating,
+                    'cambio': cambio_elo_int
+                }
         
         # Marcar Elo como aplicado
         partido.elo_aplicado = True
         
-        # Invalidar caché de rankings (los ratings cambiaron)
-        invalidate_ranking_cache()
-        
         # CRÍTICO: Crear entradas en historial_rating para TODOS los jugadores
-        from ..models.driveplus_models import HistorialRating
-        
+        historial_existente = contexto["historial_existente"]
         for jugador in jugadores:
-            # Verificar si ya existe entrada (por si acaso)
-            historial_existente = db.query(HistorialRating).filter(
-                and_(
-                    HistorialRating.id_partido == partido.id_partido,
-                    HistorialRating.id_usuario == jugador.id_usuario
-                )
-            ).first()
-            
-            if not historial_existente:
-                # Crear nueva entrada
-                historial_rating = HistorialRating(
+            clave = (partido.id_partido, jugador.id_usuario)
+            if clave not in historial_existente:
+                db.add(HistorialRating(
                     id_usuario=jugador.id_usuario,
                     id_partido=partido.id_partido,
                     rating_antes=jugador.rating_antes,
                     delta=jugador.cambio_elo,
                     rating_despues=jugador.rating_despues
-                )
-                db.add(historial_rating)
+                ))
+                historial_existente.add(clave)
         
         # Actualizar historial de enfrentamientos
-        historial = db.query(HistorialEnfrentamiento).filter(
-            HistorialEnfrentamiento.id_partido == partido.id_partido
-        ).first()
-        
+        historial = contexto["enfrentamientos"].get(partido.id_partido)
         if historial:
             historial.elo_aplicado = True
         
-        db.commit()
-        
         return resultado
     
     @staticmethod
-    def auto_confirmar_partidos_antiguos(db: Session) -> int:
+    def auto_confirmar_partidos_antiguos(db: Session, tamano_lote: int = None) -> Dict:
         """
-        Auto-confirma partidos que tienen más de 48 horas sin reportes
+        Auto-confirma partidos que tienen más de 48 horas sin reportes.
+        
+        Procesa los partidos en lotes, cada uno en su propia transacción.
+        Las filas se toman con FOR UPDATE SKIP LOCKED, así que varios workers
+        pueden repartirse el backlog sin pisarse.
         
         Returns:
-            Cantidad de partidos auto-confirmados
+            Dict con métricas de la ejecución
         """
+        from sqlalchemy import exists
+        
+        tamano_lote = tamano_lote or ConfirmacionService.TAMANO_LOTE_AUTO_CONFIRMACION
         fecha_limite = datetime.now() - timedelta(hours=ConfirmacionService.HORAS_AUTO_CONFIRMACION)
+        inicio = time.monotonic()
+        
+        metricas = {
+            "lotes": 0,
+            "procesados": 0,
+            "auto_confirmados": 0,
+            "errores": 0,
+            "duracion_segundos": 0.0
+        }
         
-        # Buscar partidos pendientes de confirmación antiguos
-        partidos = db.query(Partido).filter(
-            and_(
-                Partido.estado_confirmacion == 'pendiente_confirmacion',
-                Partido.creado_en <= fecha_limite
-            )
-        ).all()
+        tiene_reporte = exists().where(and_(
+            Confirmacion.id_partido == Partido.id_partido,
+            Confirmacion.tipo == 'reporte'
+        ))
         
-        count = 0
-        for partido in partidos:
-            # Verificar que no haya reportes
-            reportes = db.query(Confirmacion).filter(
-                and_(
-                    Confirmacion.id_partido == partido.id_partido,
-                    Confirmacion.tipo == 'reporte'
-                )
-            ).count()
+        # Keyset por id_partido: los partidos que fallan no se vuelven a tomar
+        ultimo_id = 0
+        while True:
+            try:
+                partidos = db.query(Partido).filter(
+                    Partido.estado_confirmacion == 'pendiente_confirmacion',
+                    Partido.creado_en <= fecha_limite,
+                    Partido.elo_aplicado.is_(False),
+                    Partido.id_partido > ultimo_id,
+                    ~tiene_reporte
+                ).order_by(Partido.id_partido).limit(tamano_lote).with_for_update(skip_locked=True).all()
+                
+                if not partidos:
+                    db.rollback()
+                    break
+                
+                ultimo_id = partidos[-1].id_partido
+                cambios, errores = ConfirmacionService._aplicar_elo_lote(partidos, db)
+                
+                for partido in partidos:
+                    if partido.id_partido in cambios:
+                        partido.estado_confirmacion = 'auto_confirmado'
+                
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error en lote de auto-confirmación (desde partido {ultimo_id}): {e}")
+                metricas["errores"] += 1
+                break
+            
+            for id_partido, error in errores.items():
+                logger.warning(f"Error auto-confirmando partido {id_partido}: {error}")
             
-            if reportes == 0:
-                # Auto-confirmar
+            if cambios:
+                from .matchmaking_service import indice_matchmaking
+                from .busqueda_usuarios_service import indice_busqueda_usuarios
+                jugadores = {id_usuario for c in cambios.values() if c for id_usuario in c}
                 try:
-                    ConfirmacionService._aplicar_elo(partido, db)
-                    partido.estado_confirmacion = 'auto_confirmado'
-                    count += 1
+                    indice_matchmaking.refrescar_jugadores(db, jugadores)
+                    indice_busqueda_usuarios.refrescar_usuarios(db, jugadores)
                 except Exception as e:
-                    print(f"Error auto-confirmando partido {partido.id_partido}: {e}")
-                    continue
+                    logger.warning(f"Error actualizando matchmaking: {e}")
+            
+            metricas["lotes"] += 1
+            metricas["procesados"] += len(partidos)
+            metricas["auto_confirmados"] += len(cambios)
+            metricas["errores"] += len(errores)
+            logger.info(
+                f"Auto-confirmación lote {metricas['lotes']}: {len(cambios)}/{len(partidos)} confirmados "
+                f"(acumulado {metricas['auto_confirmados']}, errores {metricas['errores']})"
+            )
+            
+            if len(partidos) < tamano_lote:
+                break
         
-        db.commit()
-        return count
+        metricas["duracion_segundos"] = round(time.monotonic() - inicio, 3)
+        return metricas
 
 
     def __init__(self, db: Session):
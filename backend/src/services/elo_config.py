@@ -6,6 +6,8 @@ Todos los parámetros son ajustables para optimizar el sistema según las necesi
 from typing import Dict, Tuple
 from enum import Enum
 
+from . import elo_tablas
+
 class Desenlace(str, Enum):
     """
     Enum para los diferentes tipos de desenlace de partido
@@ -262,6 +264,36 @@ class EloConfig:
         except Exception:
             return False
     
+    # === TABLAS PRECALCULADAS (ver elo_tablas) ===
+    
+    _TABLA_EXPECTATIVAS = {}
+    _TABLA_K = {}
+    
+    @classmethod
+    def compilar_tablas(cls) -> None:
+        """
+        Recalcula las tablas de expectativa y factor K.
+        Llamar después de modificar ELO_SCALE o K_FACTORS.
+        """
+        cls._TABLA_EXPECTATIVAS = elo_tablas.compilar_expectativas(cls.ELO_SCALE)
+        cls._TABLA_K = elo_tablas.compilar_k_factors(cls.K_FACTORS)
+    
+    @classmethod
+    def expected_score(cls, rating_diff: float) -> float:
+        """
+        Expectativa de victoria del equipo con `rating_diff` puntos a favor
+        
+        Args:
+            rating_diff: Rating del equipo menos rating del oponente
+            
+        Returns:
+            float: Expectativa entre 0 y 1
+        """
+        expected = cls._TABLA_EXPECTATIVAS.get(rating_diff)
+        if expected is None:
+            expected = elo_tablas.expectativa_formula(rating_diff, cls.ELO_SCALE)
+        return expected
+    
     @classmethod
     def get_k_factor(cls, partidos_jugados: int) -> int:
         """
@@ -273,12 +305,10 @@ class EloConfig:
         Returns:
             int: Factor K correspondiente
         """
-        for level, config in cls.K_FACTORS.items():
-            if partidos_jugados <= config["max_partidos"]:
-                return config["k_value"]
-        
-        # Fallback al valor experto
-        return cls.K_FACTORS["experto"]["k_value"]
+        k = cls._TABLA_K.get(partidos_jugados)
+        if k is None:
+            k = elo_tablas.k_factor_formula(cls.K_FACTORS, partidos_jugados)
+        return k
     
     @classmethod
     def get_role_caps(cls, team_rating: float, opponent_rating: float) -> Tuple[float, float]:
@@ -404,6 +434,8 @@ class EloConfig:
             "is_valid": cls.validate_config()
         }
 
+EloConfig.compilar_tablas()
+
 # Configuraciones predefinidas para diferentes tipos de torneos
 class TournamentConfigs:
     """
@@ -497,6 +529,8 @@ def apply_custom_config(config_dict: Dict) -> None:
             setattr(EloConfig, key, value)
         else:
             print(f"Advertencia: Parámetro '{key}' no reconocido")
+    
+    EloConfig.compilar_tablas()
 
 # === NUEVAS FUNCIONES DE CONFIGURACIÓN ===
 
@@ -29,6 +29,8 @@ from typing import Tuple
 from enum import Enum
 import math
 
+from . import elo_tablas
+
 class Desenlace(str, Enum):
     """Tipos de desenlace de partido"""
     NORMAL = "normal"
@@ -144,6 +146,15 @@ class EloConfigV2:
     MARGIN_WEIGHT_DOMINANT = 0.20  # 20% por sets dominantes
     MARGIN_WEIGHT_TIEBREAK = 0.15  # 15% por tie-breaks (negativo)
     
+    # Escalones de cada componente (el máximo de cada uno es su peso).
+    # Los usan la fórmula y la tabla precalculada: llamar a compilar_tablas()
+    # después de modificarlos.
+    MARGIN_SCORE_SETS = (MARGIN_WEIGHT_SETS, 0.10, 0.0)          # 2-0, 2-1, otro
+    MARGIN_GAMES_RATIOS = (0.50, 0.35, 0.20, 0.10)                # proporción mínima de games de diferencia
+    MARGIN_SCORE_GAMES = (MARGIN_WEIGHT_GAMES, 0.28, 0.18, 0.08, 0.0)  # por escalón, el último es <10%
+    MARGIN_SCORE_DOMINANT = (0.0, 0.12, MARGIN_WEIGHT_DOMINANT)   # 0, 1 o 2 sets dominantes
+    MARGIN_SCORE_TIEBREAK = (0.0, 0.08, MARGIN_WEIGHT_TIEBREAK)   # 0, 1 o 2 tie-breaks
+    
     # ============================================================================
     # MULTIPLICADOR DE SORPRESA (NUEVO)
     # ============================================================================
@@ -182,13 +193,55 @@ class EloConfigV2:
     # MÉTODOS AUXILIARES
     # ============================================================================
     
+    # ============================================================================
+    # TABLAS PRECALCULADAS (ver elo_tablas)
+    # ============================================================================
+    _TABLA_EXPECTATIVAS = {}
+    _TABLA_K = {}
+    _TABLA_MARGEN = None
+    _CAPS_POR_ROL = {}
+    
+    @classmethod
+    def compilar_tablas(cls) -> None:
+        """Recalcula las tablas. Llamar después de modificar parámetros."""
+        cls._TABLA_EXPECTATIVAS = elo_tablas.compilar_expectativas(cls.ELO_SCALE)
+        cls._TABLA_K = elo_tablas.compilar_k_factors(cls.K_FACTORS)
+        cls._TABLA_MARGEN = elo_tablas.TablaMargen(
+            cls.MARGIN_FACTOR_MIN,
+            cls.MARGIN_FACTOR_MAX,
+            cls.DOMINANT_SET_THRESHOLD,
+            cls.CLOSE_SET_THRESHOLD,
+            cls.MARGIN_SCORE_SETS,
+            cls.MARGIN_GAMES_RATIOS,
+            cls.MARGIN_SCORE_GAMES,
+            cls.MARGIN_SCORE_DOMINANT,
+            cls.MARGIN_SCORE_TIEBREAK
+        )
+        cls._CAPS_POR_ROL = {}
+        for match_type in ("amistoso", "torneo", "final", "cuartos", "semi", "zona"):
+            caps = cls.get_caps_for_match_type(match_type)
+            cls._CAPS_POR_ROL[match_type] = (
+                (caps["underdog_win"], caps["underdog_loss"]),
+                (caps["favorite_win"], caps["favorite_loss"]),
+                ((caps["underdog_win"] + caps["favorite_win"]) / 2,
+                 (caps["underdog_loss"] + caps["favorite_loss"]) / 2)
+            )
+    
+    @classmethod
+    def expected_score(cls, rating_diff: float) -> float:
+        """Expectativa del equipo con `rating_diff` puntos a favor"""
+        expected = cls._TABLA_EXPECTATIVAS.get(rating_diff)
+        if expected is None:
+            expected = elo_tablas.expectativa_formula(rating_diff, cls.ELO_SCALE)
+        return expected
+    
     @classmethod
     def get_k_factor(cls, partidos_jugados: int) -> int:
         """Obtiene el factor K según la experiencia del jugador"""
-        for level, config in cls.K_FACTORS.items():
-            if partidos_jugados <= config["max_partidos"]:
-                return config["k_value"]
-        return cls.K_FACTORS["experto"]["k_value"]
+        k = cls._TABLA_K.get(partidos_jugados)
+        if k is None:
+            k = elo_tablas.k_factor_formula(cls.K_FACTORS, partidos_jugados)
+        return k
     
     @classmethod
     def get_caps_for_match_type(cls, match_type: str) -> dict:
@@ -211,6 +264,21 @@ class EloConfigV2:
         games_a: int,
         games_b: int,
         sets_detail: list = None
+    ) -> float:
+        """
+        Factor de margen desde la tabla precalculada.
+        Devuelve lo mismo que calculate_margin_factor_formula.
+        """
+        return cls._TABLA_MARGEN.factor(sets_a, sets_b, games_a, games_b, sets_detail)
+    
+    @classmethod
+    def calculate_margin_factor_formula(
+        cls,
+        sets_a: int,
+        sets_b: int,
+        games_a: int,
+        games_b: int,
+        sets_detail: list = None
     ) -> float:
         """
         Calcula el factor de margen basado en cómo fue la victoria
@@ -235,28 +303,22 @@ class EloConfigV2:
         # 1. COMPONENTE: Diferencia de sets (30%)
         sets_diff = abs(sets_a - sets_b)
         if sets_diff == 2:  # 2-0
-            score += 0.30
+            score += cls.MARGIN_SCORE_SETS[0]
         elif sets_diff == 1:  # 2-1
-            score += 0.10
+            score += cls.MARGIN_SCORE_SETS[1]
         else:  # Empate (no debería pasar)
-            score += 0.0
+            score += cls.MARGIN_SCORE_SETS[2]
         
         # 2. COMPONENTE: Diferencia de games (35%)
+        # Escalones de MARGIN_GAMES_RATIOS: 50%+ (ej: 12-0), 35-50% (ej: 12-4),
+        # 20-35% (ej: 12-8), 10-20% (ej: 13-11) y <10% muy ajustado
         total_games = games_a + games_b
         if total_games > 0:
             games_diff = abs(games_a - games_b)
-            games_ratio = games_diff / total_games
-            
-            if games_ratio >= 0.50:  # 50%+ de diferencia (ej: 12-0)
-                score += 0.35
-            elif games_ratio >= 0.35:  # 35-50% (ej: 12-4)
-                score += 0.28
-            elif games_ratio >= 0.20:  # 20-35% (ej: 12-8)
-                score += 0.18
-            elif games_ratio >= 0.10:  # 10-20% (ej: 13-11)
-                score += 0.08
-            else:  # <10% muy ajustado
-                score += 0.0
+            escalon = elo_tablas.indice_games(games_diff, total_games, cls.MARGIN_GAMES_RATIOS)
+        else:
+            escalon = len(cls.MARGIN_GAMES_RATIOS)
+        score += cls.MARGIN_SCORE_GAMES[escalon]
         
         # 3. COMPONENTE: Sets dominantes (20%)
         # 4. COMPONENTE: Tie-breaks (15%, negativo)
@@ -285,15 +347,15 @@ class EloConfigV2:
             
             # Aplicar bonus por sets dominantes
             if dominant_count == 2:  # Doble rosco
-                score += 0.20
+                score += cls.MARGIN_SCORE_DOMINANT[2]
             elif dominant_count == 1:
-                score += 0.12
+                score += cls.MARGIN_SCORE_DOMINANT[1]
             
             # Aplicar penalización por tie-breaks
             if tiebreak_count == 2:  # Doble tie-break
-                score -= 0.15
+                score -= cls.MARGIN_SCORE_TIEBREAK[2]
             elif tiebreak_count == 1:
-                score -= 0.08
+                score -= cls.MARGIN_SCORE_TIEBREAK[1]
         
         # 5. CONVERTIR SCORE A FACTOR
         # Score va de ~-0.15 (doble TB) a ~0.85 (paliza total)
@@ -389,26 +451,17 @@ class EloConfigV2:
         Returns:
             Tuple[cap_win, cap_loss]
         """
-        caps = cls.get_caps_for_match_type(match_type)
+        caps_underdog, caps_favorito, caps_parejos = cls._CAPS_POR_ROL.get(
+            match_type, cls._CAPS_POR_ROL["torneo"]
+        )
         
-        is_underdog = cls.is_underdog(team_rating, opponent_rating)
-        is_favorite = cls.is_favorite(team_rating, opponent_rating)
-        
-        if is_underdog:
-            if won:
-                return caps["underdog_win"], caps["underdog_loss"]
-            else:
-                return caps["underdog_win"], caps["underdog_loss"]
-        elif is_favorite:
-            if won:
-                return caps["favorite_win"], caps["favorite_loss"]
-            else:
-                return caps["favorite_win"], caps["favorite_loss"]
+        if cls.is_underdog(team_rating, opponent_rating):
+            return caps_underdog
+        elif cls.is_favorite(team_rating, opponent_rating):
+            return caps_favorito
         else:
             # Equipos parejos: usar promedio
-            avg_win = (caps["underdog_win"] + caps["favorite_win"]) / 2
-            avg_loss = (caps["underdog_loss"] + caps["favorite_loss"]) / 2
-            return avg_win, avg_loss
+            return caps_parejos
     
     @classmethod
     def k_with_volatility(cls, k_base: float, volatility: float) -> float:
@@ -430,6 +483,9 @@ class EloConfigV2:
         }
 
 
+EloConfigV2.compilar_tablas()
+
+
 def clamp(x: float, lo: float, hi: float) -> float:
     """Limita un valor entre un mínimo y máximo"""
     return max(lo, min(hi, x))
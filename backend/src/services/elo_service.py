@@ -1,4 +1,3 @@
-import math
 from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 from .elo_config import EloConfig, Desenlace, clamp
@@ -54,7 +53,7 @@ class EloService:
             Tuple[float, float]: (expectativa_equipo_a, expectativa_equipo_b)
         """
         rating_diff = team_a_rating - team_b_rating
-        expected_a = 1.0 / (1.0 + math.pow(10, -rating_diff / EloConfig.ELO_SCALE))
+        expected_a = EloConfig.expected_score(rating_diff)
         expected_b = 1.0 - expected_a
         
         return expected_a, expected_b
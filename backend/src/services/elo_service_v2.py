@@ -29,7 +29,6 @@ DIFERENCIAS CLAVE:
 - La distribución es 50/50 en vez de por peso inverso
 """
 
-import math
 from typing import Dict, Any, List, Tuple
 from datetime import datetime
 from .elo_config_v2 import EloConfigV2, Desenlace, clamp
@@ -60,7 +59,7 @@ class EloServiceV2:
         E_a = 1 / (1 + 10^(-(Ra - Rb) / 400))
         """
         rating_diff = team_a_rating - team_b_rating
-        expected_a = 1.0 / (1.0 + math.pow(10, -rating_diff / self.config.ELO_SCALE))
+        expected_a = self.config.expected_score(rating_diff)
         expected_b = 1.0 - expected_a
         
         return expected_a, expected_b
@@ -0,0 +1,183 @@
+"""
+Tablas precalculadas para el algoritmo Elo
+
+Las configuraciones (EloConfig / EloConfigV2) compilan estas tablas al
+importarse y cada vez que cambian sus parámetros (apply_custom_config o
+compilar_tablas). Así el cálculo de un partido no evalúa potencias ni
+recorre los rangos de experiencia en cada llamada, algo que importa al
+re-simular historiales completos.
+
+Las tablas guardan exactamente el valor que daría la fórmula original
+(misma expresión, mismos operandos), por lo que los deltas resultantes
+son idénticos bit a bit. Los valores fuera de la tabla se calculan con
+la fórmula.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+# Pasos por punto de rating: el rating de equipo es el promedio de dos
+# ratings enteros, así que las diferencias son múltiplos de 0.5
+RESOLUCION_DIFERENCIA = 2
+
+# Diferencia máxima tabulada (más allá la expectativa es ~0 o ~1)
+RANGO_DIFERENCIA = 1600
+
+# Games máximos tabulados para el componente de games del factor de margen
+MAX_GAMES_TABLA = 80
+
+# Games por set tabulados (0..7) para clasificar sets
+MAX_GAMES_SET = 7
+
+
+def expectativa_formula(rating_diff: float, escala: float) -> float:
+    """Expectativa Elo del equipo A (fórmula original)"""
+    return 1.0 / (1.0 + math.pow(10, -rating_diff / escala))
+
+
+def k_factor_formula(k_factors: Dict, partidos_jugados: int) -> int:
+    """Factor K por experiencia recorriendo los rangos (fórmula original)"""
+    for level, config in k_factors.items():
+        if partidos_jugados <= config["max_partidos"]:
+            return config["k_value"]
+    return k_factors["experto"]["k_value"]
+
+
+def compilar_expectativas(escala: float) -> Dict[float, float]:
+    """
+    Expectativa del equipo A para cada diferencia de rating en
+    [-RANGO_DIFERENCIA, RANGO_DIFERENCIA] con paso 1 / RESOLUCION_DIFERENCIA.
+    Es un dict: 100 y 100.0 son la misma clave y dan el mismo resultado.
+    """
+    total = RANGO_DIFERENCIA * RESOLUCION_DIFERENCIA
+    tabla = {}
+    for i in range(-total, total + 1):
+        diff = i / RESOLUCION_DIFERENCIA
+        tabla[diff] = expectativa_formula(diff, escala)
+    return tabla
+
+
+def compilar_k_factors(k_factors: Dict) -> Dict[int, int]:
+    """
+    Factor K para cada cantidad de partidos desde 0 hasta el último umbral
+    finito + 1. Por encima de eso se usa la fórmula.
+    """
+    umbrales = [
+        config["max_partidos"] for config in k_factors.values()
+        if config["max_partidos"] != float('inf')
+    ]
+    limite = int(max(umbrales)) + 1 if umbrales else 0
+    return {p: k_factor_formula(k_factors, p) for p in range(limite + 1)}
+
+
+# === FACTOR DE MARGEN (EloConfigV2) ===
+# Los escalones de cada componente (MARGIN_SCORE_* y MARGIN_GAMES_RATIOS)
+# se definen en EloConfigV2 y llegan como parámetros.
+
+# Clases de set
+SET_OTRO = 0
+SET_DOMINANTE = 1
+SET_TIEBREAK = 2
+SET_RENIDO = 3
+
+
+def indice_games(games_diff: int, total_games: int, umbrales: Tuple[float, ...]) -> int:
+    """Escalón según la proporción de games de diferencia (len(umbrales) si no llega a ninguno)"""
+    games_ratio = games_diff / total_games
+    for i, umbral in enumerate(umbrales):
+        if games_ratio >= umbral:
+            return i
+    return len(umbrales)
+
+
+def clasificar_set(ga: int, gb: int, umbral_dominante: int, umbral_renido: int) -> int:
+    """Clase del set (dominante, tie-break, reñido u otro)"""
+    winner_games = max(ga, gb)
+    loser_games = min(ga, gb)
+    if winner_games == 6 and loser_games <= umbral_dominante:
+        return SET_DOMINANTE
+    elif (ga == 7 and gb == 6) or (gb == 7 and ga == 6):
+        return SET_TIEBREAK
+    elif winner_games == 6 and loser_games >= umbral_renido:
+        return SET_RENIDO
+    return SET_OTRO
+
+
+class TablaMargen:
+    """
+    Factor de margen precalculado para cada combinación de componentes
+    (sets, games, sets dominantes, tie-breaks) más las tablas auxiliares
+    para obtener el índice de games y la clase de cada set.
+    """
+
+    def __init__(self, factor_min: float, factor_max: float, umbral_dominante: int, umbral_renido: int,
+                 score_sets: Tuple[float, ...], umbrales_games: Tuple[float, ...], score_games: Tuple[float, ...],
+                 score_dominantes: Tuple[float, ...], score_tiebreaks: Tuple[float, ...]):
+        self.umbral_dominante = umbral_dominante
+        self.umbral_renido = umbral_renido
+        self.umbrales_games = umbrales_games
+        self.sin_games = len(umbrales_games)
+
+        self.factores: Dict[Tuple[int, int, int, int], float] = {}
+        for s, score_s in enumerate(score_sets):
+            for g, score_g in enumerate(score_games):
+                for d, score_d in enumerate(score_dominantes):
+                    for t, score_t in enumerate(score_tiebreaks):
+                        # Mismo orden de sumas que la fórmula; 0 sets
+                        # dominantes o tie-breaks no suman (d == 0, t == 0)
+                        score = 0.0
+                        score += score_s
+                        score += score_g
+                        if d:
+                            score += score_d
+                        if t:
+                            score -= score_t
+                        normalized = (score + 0.15) / 1.0
+                        factor = factor_min + normalized * (factor_max - factor_min)
+                        self.factores[(s, g, d, t)] = max(factor_min, min(factor_max, factor))
+
+        # indices_games[total][diff]
+        self.indices_games: List[List[int]] = [[]] + [
+            [indice_games(diff, total, umbrales_games) for diff in range(total + 1)]
+            for total in range(1, MAX_GAMES_TABLA + 1)
+        ]
+
+        # clases_set[ga][gb]
+        self.clases_set: List[List[int]] = [
+            [clasificar_set(ga, gb, umbral_dominante, umbral_renido) for gb in range(MAX_GAMES_SET + 1)]
+            for ga in range(MAX_GAMES_SET + 1)
+        ]
+
+    def factor(self, sets_a: int, sets_b: int, games_a: int, games_b: int, sets_detail: Optional[list]) -> float:
+        sets_diff = abs(sets_a - sets_b)
+        s = 0 if sets_diff == 2 else 1 if sets_diff == 1 else 2
+
+        total_games = games_a + games_b
+        if total_games > 0:
+            games_diff = abs(games_a - games_b)
+            if type(total_games) is int and total_games <= MAX_GAMES_TABLA and games_diff <= total_games:
+                g = self.indices_games[total_games][games_diff]
+            else:
+                g = indice_games(games_diff, total_games, self.umbrales_games)
+        else:
+            g = self.sin_games
+
+        d = t = 0
+        if sets_detail:
+            dominant_count = 0
+            tiebreak_count = 0
+            for set_info in sets_detail:
+                ga = set_info.get("games_a", 0)
+                gb = set_info.get("games_b", 0)
+                if type(ga) is int and type(gb) is int and 0 <= ga <= MAX_GAMES_SET and 0 <= gb <= MAX_GAMES_SET:
+                    clase = self.clases_set[ga][gb]
+                else:
+                    clase = clasificar_set(ga, gb, self.umbral_dominante, self.umbral_renido)
+                if clase == SET_DOMINANTE:
+                    dominant_count += 1
+                elif clase == SET_TIEBREAK:
+                    tiebreak_count += 1
+            # Solo 1 o 2 suman (igual que la fórmula original)
+            d = dominant_count if dominant_count <= 2 else 0
+            t = tiebreak_count if tiebreak_count <= 2 else 0
+
+        return self.factores[(s, g, d, t)]
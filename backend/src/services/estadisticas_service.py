@@ -0,0 +1,119 @@
+"""
+Estadísticas de un jugador en una sola query
+
+Antes se traían los partidos del usuario y, por cada uno, su resultado y su
+equipo (N+1: cientos de queries para quien juega mucho) y los torneos
+quedaban en 0. Ahora un único SELECT agrupa por tipo de partido:
+
+- partidos de sala / amistosos (partido_jugadores + resultados_partidos):
+  jugado si está reportado/confirmado o tiene resultado; ganado si su
+  equipo tiene más sets.
+- partidos de torneo (por las parejas del usuario): jugado si tiene
+  ganador (sin contar byes); ganado si ganó su pareja; título si además es
+  la final.
+- torneos participados: torneos distintos de sus parejas (sin bajas).
+"""
+from typing import Dict
+
+from sqlalchemy import BigInteger, and_, case, cast, distinct, func, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from ..models.driveplus_models import Partido, PartidoJugador, ResultadoPartido
+from ..models.torneo_models import TorneoPareja
+
+ESTADOS_JUGADO = ("reportado", "confirmado")
+TIPO_TORNEO = "torneo"
+
+
+def _porcentaje(ganados: int, jugados: int) -> float:
+    return round(ganados / jugados * 100, 1) if jugados > 0 else 0
+
+
+class EstadisticasService:
+
+    @staticmethod
+    def _query_estadisticas(id_usuario: int):
+        """SELECT único: una fila por tipo de partido (jugados, ganados, títulos, torneos)"""
+        mis_parejas = select(TorneoPareja.id, TorneoPareja.torneo_id).where(
+            or_(TorneoPareja.jugador1_id == id_usuario, TorneoPareja.jugador2_id == id_usuario),
+            TorneoPareja.estado != "baja"
+        ).cte("mis_parejas")
+
+        ganado_sala = or_(
+            and_(PartidoJugador.equipo == 1, ResultadoPartido.sets_eq1 > ResultadoPartido.sets_eq2),
+            and_(PartidoJugador.equipo == 2, ResultadoPartido.sets_eq2 > ResultadoPartido.sets_eq1)
+        )
+        partidos_sala = select(
+            Partido.tipo.label("tipo"),
+            literal(1).label("jugado"),
+            case((ganado_sala, 1), else_=0).label("ganado"),
+            literal(0).label("titulo"),
+            cast(None, BigInteger).label("id_torneo")
+        ).select_from(PartidoJugador).join(
+            Partido, Partido.id_partido == PartidoJugador.id_partido
+        ).outerjoin(
+            ResultadoPartido, ResultadoPartido.id_partido == Partido.id_partido
+        ).where(
+            PartidoJugador.id_usuario == id_usuario,
+            or_(Partido.estado.in_(ESTADOS_JUGADO), ResultadoPartido.id_partido.isnot(None))
+        )
+
+        gano_pareja = Partido.ganador_pareja_id == mis_parejas.c.id
+        partidos_torneo = select(
+            literal(TIPO_TORNEO).label("tipo"),
+            literal(1).label("jugado"),
+            case((gano_pareja, 1), else_=0).label("ganado"),
+            case((and_(gano_pareja, Partido.fase == "final"), 1), else_=0).label("titulo"),
+            cast(None, BigInteger).label("id_torneo")
+        ).select_from(Partido).join(
+            mis_parejas, or_(Partido.pareja1_id == mis_parejas.c.id, Partido.pareja2_id == mis_parejas.c.id)
+        ).where(
+            Partido.ganador_pareja_id.isnot(None),
+            Partido.estado != "bye"
+        )
+
+        torneos = select(
+            literal(TIPO_TORNEO).label("tipo"),
+            literal(0).label("jugado"),
+            literal(0).label("ganado"),
+            literal(0).label("titulo"),
+            mis_parejas.c.torneo_id.label("id_torneo")
+        )
+
+        filas = union_all(partidos_sala, partidos_torneo, torneos).subquery("filas")
+        return select(
+            filas.c.tipo,
+            func.sum(filas.c.jugado).label("jugados"),
+            func.sum(filas.c.ganado).label("ganados"),
+            func.sum(filas.c.titulo).label("titulos"),
+            func.count(distinct(filas.c.id_torneo)).label("torneos")
+        ).group_by(filas.c.tipo)
+
+    @staticmethod
+    def obtener_estadisticas(db: Session, id_usuario: int) -> Dict:
+        """Totales, títulos, torneos y porcentaje de victorias por tipo de partido"""
+        por_tipo = {}
+        jugados = ganados = titulos = torneos = 0
+        for fila in db.execute(EstadisticasService._query_estadisticas(id_usuario)):
+            tipo_jugados, tipo_ganados = int(fila.jugados or 0), int(fila.ganados or 0)
+            jugados += tipo_jugados
+            ganados += tipo_ganados
+            titulos += int(fila.titulos or 0)
+            torneos += int(fila.torneos or 0)
+            if tipo_jugados:
+                por_tipo[fila.tipo] = {
+                    "partidos_jugados": tipo_jugados,
+                    "partidos_ganados": tipo_ganados,
+                    "partidos_perdidos": tipo_jugados - tipo_ganados,
+                    "porcentaje_victoria": _porcentaje(tipo_ganados, tipo_jugados)
+                }
+
+        return {
+            "partidos_jugados": jugados,
+            "partidos_ganados": ganados,
+            "partidos_perdidos": jugados - ganados,
+            "porcentaje_victoria": _porcentaje(ganados, jugados),
+            "torneos_participados": torneos,
+            "titulos": titulos,
+            "por_tipo": por_tipo
+        }
@@ -0,0 +1,321 @@
+"""
+Historial de partidos de un usuario paginado por keyset
+
+Antes GET /partidos/usuario/{id} traía todos los amistosos y todos los
+partidos de torneo del usuario, los ordenaba en Python y recién ahí cortaba
+a `limit`: un perfil con años de partidos pagaba todo su historial en cada
+visita. Ahora hay una línea de tiempo por usuario (historial_partidos, clave
+(id_usuario, fecha, id_partido)) que se completa al confirmar cada partido:
+
+- amistosos: al confirmar el resultado (controller o cola de confirmaciones),
+  con los jugadores de partido_jugadores
+- torneo: al cargar el resultado, con los jugadores de las dos parejas
+
+Cada fila guarda el equipo del jugador y si ganó: al registrar un partido
+se suma a los récords entre jugadores (relaciones_jugadores_service) y, si
+ya estaba registrado con otro ganador o jugadores, primero se resta lo
+sumado antes.
+
+Una página es un rango del índice desde el cursor (base64 de
+"fecha|id_partido", el mismo formato que los listados de salas) y el detalle
+(jugadores, resultado, club, Elo) se arma solo para los partidos de esa
+página, con una query por tabla.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, tuple_
+from sqlalchemy.orm import Session
+
+from ..models.driveplus_models import (
+    Club, HistorialPartido, HistorialRating, Partido, PartidoJugador, PerfilUsuario,
+    ResultadoPartido, Usuario
+)
+from ..models.torneo_models import TorneoPareja
+from .relaciones_jugadores_service import RelacionesJugadoresService
+from .sala_service import codificar_cursor, decodificar_cursor
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 100
+
+
+def _normalizar_sets(detalle_sets) -> List[Dict]:
+    """detalle_sets de resultados_partidos (cualquiera de sus formatos) al formato de la respuesta"""
+    normalizados = []
+    if not detalle_sets or not isinstance(detalle_sets, list):
+        return normalizados
+
+    for idx, set_data in enumerate(detalle_sets, 1):
+        # Formato 1: {'games_eq1': 6, 'games_eq2': 4}
+        if 'games_eq1' in set_data and 'games_eq2' in set_data:
+            numero, eq1, eq2, origen = idx, set_data['games_eq1'], set_data['games_eq2'], set_data
+        # Formato 2: {'puntos_eq1': 6, 'puntos_eq2': 4, 'set_numero': 1}
+        elif 'puntos_eq1' in set_data and 'puntos_eq2' in set_data:
+            numero, eq1, eq2, origen = set_data.get('set_numero', idx), set_data['puntos_eq1'], set_data['puntos_eq2'], set_data
+        # Formato 3: {'set1': {'puntos_eq1': 6, 'puntos_eq2': 4}}
+        elif f'set{idx}' in set_data:
+            origen = set_data[f'set{idx}']
+            numero, eq1, eq2 = idx, origen.get('puntos_eq1', 0), origen.get('puntos_eq2', 0)
+        # Formato 4: Ya está en formato correcto
+        elif 'juegos_eq1' in set_data and 'juegos_eq2' in set_data:
+            numero, eq1, eq2, origen = set_data.get('set', idx), set_data['juegos_eq1'], set_data['juegos_eq2'], set_data
+        else:
+            continue
+        normalizados.append({
+            "set": numero,
+            "juegos_eq1": eq1,
+            "juegos_eq2": eq2,
+            "tiebreak_eq1": origen.get('tiebreak_eq1'),
+            "tiebreak_eq2": origen.get('tiebreak_eq2')
+        })
+    return normalizados
+
+
+def _resultado_torneo(partido: Partido) -> Dict:
+    """Resultado de un partido de torneo (resultado_padel JSON)"""
+    sets = partido.resultado_padel.get('sets', [])
+    return {
+        "id_partido": partido.id_partido,
+        "sets_eq1": sum(1 for s in sets if s.get('ganador') == 'equipoA'),
+        "sets_eq2": sum(1 for s in sets if s.get('ganador') == 'equipoB'),
+        "detalle_sets": [
+            {
+                "set": idx,
+                "juegos_eq1": set_data.get('gamesEquipoA', 0),
+                "juegos_eq2": set_data.get('gamesEquipoB', 0),
+                "tiebreak_eq1": set_data.get('tiebreakEquipoA'),
+                "tiebreak_eq2": set_data.get('tiebreakEquipoB')
+            }
+            for idx, set_data in enumerate(sets, 1)
+        ],
+        "confirmado": True,
+        "desenlace": "normal"
+    }
+
+
+class HistorialPartidosService:
+    """Línea de tiempo de partidos por usuario: alta al confirmar, lectura paginada"""
+
+    @staticmethod
+    def _jugadores_y_ganador(db: Session, partido: Partido) -> Tuple[List[Tuple[int, int]], Optional[int]]:
+        """(id_usuario, equipo) de cada jugador y equipo ganador (1, 2 o None)"""
+        if partido.tipo == 'torneo':
+            jugadores = []
+            for pareja in db.query(TorneoPareja.id, TorneoPareja.jugador1_id, TorneoPareja.jugador2_id).filter(
+                TorneoPareja.id.in_([partido.pareja1_id, partido.pareja2_id])
+            ).all():
+                equipo = 1 if pareja.id == partido.pareja1_id else 2
+                jugadores += [(id_jugador, equipo) for id_jugador in (pareja.jugador1_id, pareja.jugador2_id) if id_jugador]
+            ganador = {partido.pareja1_id: 1, partido.pareja2_id: 2}.get(partido.ganador_pareja_id)
+            return jugadores, ganador
+
+        jugadores = [
+            (fila.id_usuario, fila.equipo) for fila in db.query(PartidoJugador.id_usuario, PartidoJugador.equipo).filter(
+                PartidoJugador.id_partido == partido.id_partido
+            ).all()
+        ]
+        return jugadores, partido.ganador_equipo
+
+    @staticmethod
+    def registrar(db: Session, partido: Partido, jugadores: Optional[Iterable[Tuple[int, int]]] = None) -> None:
+        """
+        Agrega (o rehace) las filas del partido en la línea de tiempo de sus
+        jugadores y mantiene sus récords entre jugadores: si el partido ya
+        estaba registrado con otro ganador o jugadores (resultado corregido),
+        resta lo sumado antes y suma lo nuevo. `jugadores` son pares
+        (id_usuario, equipo); si no se pasan se leen del partido. Sin commit:
+        va en la misma transacción que la confirmación.
+        """
+        ganador = partido.ganador_equipo
+        if jugadores is None:
+            jugadores, ganador = HistorialPartidosService._jugadores_y_ganador(db, partido)
+        jugadores = list(jugadores)
+        if ganador is None and partido.tipo != 'torneo':
+            resultado = db.query(ResultadoPartido.sets_eq1, ResultadoPartido.sets_eq2).filter(
+                ResultadoPartido.id_partido == partido.id_partido
+            ).first()
+            if resultado and resultado.sets_eq1 != resultado.sets_eq2:
+                ganador = 1 if resultado.sets_eq1 > resultado.sets_eq2 else 2
+
+        anteriores = db.query(HistorialPartido.id_usuario, HistorialPartido.equipo, HistorialPartido.gano).filter(
+            HistorialPartido.id_partido == partido.id_partido
+        ).all()
+
+        db.execute(delete(HistorialPartido).where(HistorialPartido.id_partido == partido.id_partido))
+        equipos = dict(jugadores)
+        filas = [
+            {"id_usuario": id_usuario, "fecha": partido.fecha, "id_partido": partido.id_partido,
+             "tipo": partido.tipo or "amistoso", "equipo": equipos[id_usuario],
+             "gano": equipos[id_usuario] == ganador if ganador in (1, 2) else None}
+            for id_usuario in sorted(equipos)
+        ]
+        if filas:
+            db.execute(insert(HistorialPartido), filas)
+
+        if not anteriores:
+            RelacionesJugadoresService.sumar_partido(db, jugadores, ganador, partido.fecha)
+            return
+
+        # Filas sin equipo (cargadas antes de guardar el equipo): no se sabe
+        # qué se sumó, así que los récords quedan como están
+        if any(fila.equipo is None for fila in anteriores):
+            return
+
+        jugadores_antes = sorted((fila.id_usuario, fila.equipo) for fila in anteriores)
+        ganador_antes = next((fila.equipo for fila in anteriores if fila.gano), None)
+        if jugadores_antes == sorted(equipos.items()) and ganador_antes == (ganador if ganador in (1, 2) else None):
+            return
+        RelacionesJugadoresService.restar_partido(db, jugadores_antes, ganador_antes)
+        RelacionesJugadoresService.sumar_partido(db, jugadores, ganador, partido.fecha)
+
+    @staticmethod
+    def pagina(db: Session, id_usuario: int, cursor: Optional[str] = None,
+               limite: int = LIMITE_POR_DEFECTO) -> Tuple[List[HistorialPartido], Optional[str]]:
+        """
+        Una página de la línea de tiempo, de la más reciente a la más vieja.
+
+        Raises:
+            ValueError: si el cursor no es válido
+        """
+        query = db.query(HistorialPartido).filter(HistorialPartido.id_usuario == id_usuario)
+        if cursor:
+            fecha, id_partido = decodificar_cursor(cursor)
+            query = query.filter(tuple_(HistorialPartido.fecha, HistorialPartido.id_partido) < (fecha, id_partido))
+
+        filas = query.order_by(
+            HistorialPartido.fecha.desc(), HistorialPartido.id_partido.desc()
+        ).limit(limite + 1).all()
+
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = codificar_cursor(filas[-1].fecha, filas[-1].id_partido)
+        return filas, siguiente
+
+    @staticmethod
+    def detalle(db: Session, id_usuario: int, ids_partidos: List[int]) -> List[Dict]:
+        """Partidos completos (jugadores, resultado, club, Elo del usuario) en el orden recibido"""
+        if not ids_partidos:
+            return []
+
+        partidos = {p.id_partido: p for p in db.query(Partido).filter(Partido.id_partido.in_(ids_partidos)).all()}
+        ids_torneo = [i for i, p in partidos.items() if p.tipo == 'torneo']
+        ids_sala = [i for i in partidos if i not in set(ids_torneo)]
+
+        # Jugadores: partido_jugadores (sala) o las parejas (torneo)
+        jugadores_por_partido: Dict[int, List[Tuple[int, int]]] = {}
+        if ids_sala:
+            for jugador in db.query(PartidoJugador.id_partido, PartidoJugador.id_usuario, PartidoJugador.equipo).filter(
+                PartidoJugador.id_partido.in_(ids_sala)
+            ).all():
+                jugadores_por_partido.setdefault(jugador.id_partido, []).append((jugador.id_usuario, jugador.equipo))
+
+        ids_parejas = {
+            id_pareja for i in ids_torneo
+            for id_pareja in (partidos[i].pareja1_id, partidos[i].pareja2_id) if id_pareja
+        }
+        parejas = {}
+        if ids_parejas:
+            parejas = {
+                p.id: (p.jugador1_id, p.jugador2_id)
+                for p in db.query(TorneoPareja.id, TorneoPareja.jugador1_id, TorneoPareja.jugador2_id).filter(
+                    TorneoPareja.id.in_(ids_parejas)
+                ).all()
+            }
+        for i in ids_torneo:
+            for equipo, id_pareja in ((1, partidos[i].pareja1_id), (2, partidos[i].pareja2_id)):
+                for id_jugador in parejas.get(id_pareja, ()):
+                    jugadores_por_partido.setdefault(i, []).append((id_jugador, equipo))
+
+        # Usuarios y perfiles (jugadores y creadores) en una sola query
+        ids_usuarios = {id_jugador for jugadores in jugadores_por_partido.values() for id_jugador, _ in jugadores}
+        ids_usuarios |= {p.id_creador for p in partidos.values()}
+        usuarios = {
+            fila.id_usuario: fila
+            for fila in db.query(
+                Usuario.id_usuario, Usuario.nombre_usuario, Usuario.rating, PerfilUsuario.nombre, PerfilUsuario.apellido
+            ).outerjoin(
+                PerfilUsuario, PerfilUsuario.id_usuario == Usuario.id_usuario
+            ).filter(Usuario.id_usuario.in_(ids_usuarios)).all()
+        }
+
+        resultados = {
+            r.id_partido: r
+            for r in db.query(ResultadoPartido).filter(ResultadoPartido.id_partido.in_(ids_partidos)).all()
+        }
+        historial = {
+            h.id_partido: h
+            for h in db.query(HistorialRating).filter(
+                HistorialRating.id_partido.in_(ids_partidos),
+                HistorialRating.id_usuario == id_usuario
+            ).all()
+        }
+        ids_clubes = {p.id_club for p in partidos.values() if p.id_club}
+        clubes = {}
+        if ids_clubes:
+            clubes = {c.id_club: c for c in db.query(Club).filter(Club.id_club.in_(ids_clubes)).all()}
+
+        completos = []
+        for id_partido in ids_partidos:
+            partido = partidos.get(id_partido)
+            if not partido:
+                continue
+
+            jugadores_info = []
+            for id_jugador, equipo in jugadores_por_partido.get(id_partido, []):
+                jugador = usuarios.get(id_jugador)
+                if jugador:
+                    jugadores_info.append({
+                        "id_usuario": jugador.id_usuario,
+                        "nombre_usuario": jugador.nombre_usuario,
+                        "nombre": jugador.nombre or "",
+                        "apellido": jugador.apellido or "",
+                        "equipo": equipo,
+                        "rating": jugador.rating
+                    })
+
+            resultado = resultados.get(id_partido)
+            resultado_dict = None
+            if partido.tipo == 'torneo' and partido.resultado_padel:
+                resultado_dict = _resultado_torneo(partido)
+            elif resultado:
+                resultado_dict = {
+                    "id_partido": resultado.id_partido,
+                    "id_reportador": resultado.id_reportador,
+                    "sets_eq1": resultado.sets_eq1,
+                    "sets_eq2": resultado.sets_eq2,
+                    "detalle_sets": _normalizar_sets(resultado.detalle_sets),
+                    "confirmado": resultado.confirmado,
+                    "desenlace": resultado.desenlace,
+                    "creado_en": resultado.creado_en
+                }
+
+            rating = historial.get(id_partido)
+            club = clubes.get(partido.id_club)
+            creador = usuarios.get(partido.id_creador)
+            completos.append({
+                "id_partido": partido.id_partido,
+                "fecha": partido.fecha,
+                "estado": partido.estado,
+                "tipo": partido.tipo or "amistoso",
+                "id_creador": partido.id_creador,
+                "creado_en": partido.creado_en,
+                "id_club": partido.id_club,
+                "jugadores": jugadores_info,
+                "resultado": resultado_dict,
+                "club": {
+                    "id_club": club.id_club,
+                    "nombre": club.nombre,
+                    "ciudad": club.ciudad,
+                    "pais": club.pais
+                } if club else None,
+                "creador": {
+                    "id_usuario": creador.id_usuario,
+                    "nombre_usuario": creador.nombre_usuario
+                } if creador else {},
+                "historial_rating": {
+                    "rating_antes": rating.rating_antes,
+                    "delta": rating.delta,
+                    "rating_despues": rating.rating_despues
+                } if rating else None
+            })
+        return completos
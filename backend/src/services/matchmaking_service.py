@@ -0,0 +1,315 @@
+"""
+Índice de matchmaking por rating
+
+Hasta ahora los jugadores encontraban partido compartiendo códigos de
+invitación; las únicas búsquedas eran el listado de salas o el ILIKE de
+usuarios. Este índice en memoria responde "salas abiertas" y "jugadores
+libres" dentro de ±margen del rating de quien pregunta (filtrables por
+ciudad y categoría) con un bisect sobre listas ordenadas por rating, sin
+tocar la base.
+
+Se mantiene con eventos:
+- crear / unirse / iniciar / eliminar sala  -> refrescar_salas([id_sala])
+- confirmación de resultado (sala finalizada y ratings nuevos)
+  -> refrescar_salas + refrescar_jugadores
+Cada refresco relee solo las filas afectadas. Como cada worker tiene su
+propio índice, además se recarga completo cada TTL_INDICE_MATCHMAKING
+segundos, en un thread y sirviendo el índice anterior mientras tanto (los
+eventos de otros workers llegan a lo sumo con ese atraso).
+
+Un jugador está "libre" si no está en ninguna sala activa.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..database.config import SessionLocal
+from ..models.driveplus_models import Usuario, PerfilUsuario
+from ..models.sala import Sala, SalaJugador
+from .sala_service import ESTADOS_ACTIVOS
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre recargas completas del índice
+TTL_INDICE_MATCHMAKING = 300
+
+
+@dataclass(frozen=True)
+class JugadorMatch:
+    id_usuario: int
+    nombre_usuario: str
+    nombre: Optional[str]
+    apellido: Optional[str]
+    rating: int
+    ciudad: Optional[str]
+    id_categoria: Optional[int]
+
+
+@dataclass(frozen=True)
+class SalaMatch:
+    id_sala: int
+    nombre: str
+    codigo_invitacion: str
+    fecha: Optional[datetime]
+    id_creador: int
+    rating: int  # promedio de los jugadores de la sala
+    jugadores_actuales: int
+    max_jugadores: int
+    ciudad: Optional[str]  # la del creador
+    id_categoria: Optional[int]  # la del creador
+
+
+def _normalizar_ciudad(ciudad: Optional[str]) -> Optional[str]:
+    return ciudad.strip().lower() if ciudad and ciudad.strip() else None
+
+
+class IndiceRating:
+    """Entradas ordenadas por (rating, id) con búsqueda por rango en O(log n)"""
+
+    def __init__(self):
+        self._claves: List[Tuple[int, int]] = []
+        self._entradas: Dict[int, object] = {}
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, id_entrada):
+        return id_entrada in self._entradas
+
+    def poner(self, id_entrada: int, entrada):
+        self.quitar(id_entrada)
+        self._entradas[id_entrada] = entrada
+        insort(self._claves, (entrada.rating, id_entrada))
+
+    def quitar(self, id_entrada: int):
+        anterior = self._entradas.pop(id_entrada, None)
+        if anterior is not None:
+            i = bisect_left(self._claves, (anterior.rating, id_entrada))
+            del self._claves[i]
+
+    def rango(self, rating_min: int, rating_max: int) -> Iterable:
+        """Entradas con rating_min <= rating <= rating_max, de menor a mayor rating"""
+        desde = bisect_left(self._claves, (rating_min, float("-inf")))
+        hasta = bisect_right(self._claves, (rating_max, float("inf")))
+        for i in range(desde, hasta):
+            yield self._entradas[self._claves[i][1]]
+
+
+class IndiceMatchmaking:
+    """Salas abiertas y jugadores libres indexados por rating"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.cargado_en: Optional[float] = None
+        self._vaciar()
+
+    def _vaciar(self):
+        self._salas = IndiceRating()
+        self._libres = IndiceRating()
+        self._jugadores: Dict[int, JugadorMatch] = {}
+        self._miembros: Dict[int, Set[int]] = {}  # salas activas -> jugadores
+        self._salas_de: Dict[int, Set[int]] = {}  # jugador -> salas activas
+        self._datos_sala: Dict[int, Tuple] = {}   # salas esperando -> fila de la sala
+
+    @property
+    def cargado(self) -> bool:
+        return self.cargado_en is not None
+
+    def vencido(self) -> bool:
+        return self.cargado_en is None or time.monotonic() - self.cargado_en >= TTL_INDICE_MATCHMAKING
+
+    def invalidar(self):
+        """Fuerza una recarga completa en la próxima búsqueda"""
+        with self._lock:
+            self.cargado_en = None
+
+    # ---------- Carga y refrescos ----------
+
+    @staticmethod
+    def _query_jugadores(db: Session):
+        return db.query(
+            Usuario.id_usuario, Usuario.nombre_usuario, PerfilUsuario.nombre, PerfilUsuario.apellido,
+            Usuario.rating, PerfilUsuario.ciudad, Usuario.id_categoria
+        ).outerjoin(PerfilUsuario, PerfilUsuario.id_usuario == Usuario.id_usuario)
+
+    @staticmethod
+    def _query_salas(db: Session):
+        return db.query(
+            Sala.id_sala, Sala.nombre, Sala.codigo_invitacion, Sala.fecha,
+            Sala.id_creador, Sala.max_jugadores, Sala.estado
+        )
+
+    def cargar(self, db: Session):
+        """Recarga completa: 3 queries (jugadores, salas activas, sus miembros)"""
+        jugadores = self._query_jugadores(db).all()
+        salas = self._query_salas(db).filter(Sala.estado.in_(ESTADOS_ACTIVOS)).all()
+        miembros = db.query(SalaJugador.id_sala, SalaJugador.id_usuario).join(
+            Sala, Sala.id_sala == SalaJugador.id_sala
+        ).filter(Sala.estado.in_(ESTADOS_ACTIVOS)).all()
+
+        with self._lock:
+            self._vaciar()
+            for fila in jugadores:
+                self._jugadores[fila.id_usuario] = JugadorMatch(*fila[:4], fila.rating or 1200, *fila[5:])
+            for id_sala, id_usuario in miembros:
+                self._miembros.setdefault(id_sala, set()).add(id_usuario)
+                self._salas_de.setdefault(id_usuario, set()).add(id_sala)
+            for fila in salas:
+                self._miembros.setdefault(fila.id_sala, set())
+                if fila.estado == 'esperando':
+                    self._datos_sala[fila.id_sala] = tuple(fila)
+                    self._indexar_sala(fila.id_sala)
+            for id_usuario in self._jugadores:
+                self._indexar_jugador(id_usuario)
+            self.cargado_en = time.monotonic()
+
+    def refrescar_salas(self, db: Session, ids_salas: Iterable[int]):
+        """Relee salas (creada, unión, inicio, fin o eliminación) y sus jugadores"""
+        ids_salas = {i for i in ids_salas if i}
+        if not ids_salas or not self.cargado:
+            return
+        salas = {f.id_sala: f for f in self._query_salas(db).filter(Sala.id_sala.in_(ids_salas)).all()}
+        miembros: Dict[int, Set[int]] = {}
+        for id_sala, id_usuario in db.query(SalaJugador.id_sala, SalaJugador.id_usuario).filter(
+            SalaJugador.id_sala.in_(ids_salas)
+        ).all():
+            miembros.setdefault(id_sala, set()).add(id_usuario)
+
+        with self._lock:
+            afectados: Set[int] = set()
+            for id_sala in ids_salas:
+                anteriores = self._miembros.pop(id_sala, set())
+                for id_usuario in anteriores:
+                    self._salas_de.get(id_usuario, set()).discard(id_sala)
+                afectados |= anteriores
+                self._datos_sala.pop(id_sala, None)
+                self._salas.quitar(id_sala)
+
+                fila = salas.get(id_sala)
+                if fila is None or fila.estado not in ESTADOS_ACTIVOS:
+                    continue
+                actuales = miembros.get(id_sala, set())
+                self._miembros[id_sala] = actuales
+                for id_usuario in actuales:
+                    self._salas_de.setdefault(id_usuario, set()).add(id_sala)
+                afectados |= actuales
+                if fila.estado == 'esperando':
+                    self._datos_sala[id_sala] = tuple(fila)
+                    self._indexar_sala(id_sala)
+
+            for id_usuario in afectados:
+                self._indexar_jugador(id_usuario)
+
+    def refrescar_jugadores(self, db: Session, ids_usuarios: Iterable[int]):
+        """Relee rating, categoría y ciudad de jugadores (p. ej. después del Elo)"""
+        ids_usuarios = set(ids_usuarios)
+        if not ids_usuarios or not self.cargado:
+            return
+        filas = self._query_jugadores(db).filter(Usuario.id_usuario.in_(ids_usuarios)).all()
+
+        with self._lock:
+            salas_afectadas: Set[int] = set()
+            for fila in filas:
+                self._jugadores[fila.id_usuario] = JugadorMatch(*fila[:4], fila.rating or 1200, *fila[5:])
+                self._indexar_jugador(fila.id_usuario)
+                salas_afectadas |= self._salas_de.get(fila.id_usuario, set())
+            for id_sala in salas_afectadas:
+                self._indexar_sala(id_sala)
+
+    def _indexar_jugador(self, id_usuario: int):
+        jugador = self._jugadores.get(id_usuario)
+        if jugador is None or self._salas_de.get(id_usuario):
+            self._libres.quitar(id_usuario)
+        else:
+            self._libres.poner(id_usuario, jugador)
+
+    def _indexar_sala(self, id_sala: int):
+        datos = self._datos_sala.get(id_sala)
+        miembros = self._miembros.get(id_sala, set())
+        if datos is None or len(miembros) >= datos[5]:
+            self._salas.quitar(id_sala)
+            return
+        id_sala, nombre, codigo, fecha, id_creador, max_jugadores, _ = datos
+        ratings = [self._jugadores[j].rating for j in miembros if j in self._jugadores]
+        creador = self._jugadores.get(id_creador)
+        self._salas.poner(id_sala, SalaMatch(
+            id_sala=id_sala, nombre=nombre, codigo_invitacion=codigo, fecha=fecha,
+            id_creador=id_creador,
+            rating=round(sum(ratings) / len(ratings)) if ratings else (creador.rating if creador else 1200),
+            jugadores_actuales=len(miembros), max_jugadores=max_jugadores,
+            ciudad=creador.ciudad if creador else None,
+            id_categoria=creador.id_categoria if creador else None
+        ))
+
+    # ---------- Búsquedas ----------
+
+    def _buscar(self, indice: IndiceRating, rating: int, margen: int, ciudad: Optional[str],
+                id_categoria: Optional[int], excluir, limite: int) -> List:
+        ciudad = _normalizar_ciudad(ciudad)
+        with self._lock:
+            candidatos = [
+                e for e in indice.rango(rating - margen, rating + margen)
+                if (ciudad is None or _normalizar_ciudad(e.ciudad) == ciudad)
+                and (id_categoria is None or e.id_categoria == id_categoria)
+                and not excluir(e)
+            ]
+        # Los más cercanos al rating primero
+        return heapq.nsmallest(limite, candidatos, key=lambda e: (abs(e.rating - rating), e.rating))
+
+    def buscar_salas(self, rating: int, margen: int, ciudad: Optional[str] = None,
+                     id_categoria: Optional[int] = None, id_usuario: Optional[int] = None,
+                     limite: int = 20) -> List[SalaMatch]:
+        """Salas esperando con lugar libre, sin las del propio usuario"""
+        with self._lock:
+            propias = set(self._salas_de.get(id_usuario, ()))
+        return self._buscar(self._salas, rating, margen, ciudad, id_categoria,
+                            lambda s: s.id_sala in propias, limite)
+
+    def buscar_jugadores(self, rating: int, margen: int, ciudad: Optional[str] = None,
+                         id_categoria: Optional[int] = None, id_usuario: Optional[int] = None,
+                         limite: int = 20) -> List[JugadorMatch]:
+        """Jugadores que no están en ninguna sala activa, sin el propio usuario"""
+        return self._buscar(self._libres, rating, margen, ciudad, id_categoria,
+                            lambda j: j.id_usuario == id_usuario, limite)
+
+
+# Instancia global del índice
+indice_matchmaking = IndiceMatchmaking()
+_lock_carga = threading.Lock()
+
+
+def _recargar_en_segundo_plano():
+    """Recarga completa con su propia sesión; libera _lock_carga al terminar"""
+    db = SessionLocal()
+    try:
+        indice_matchmaking.cargar(db)
+    except Exception as e:
+        logger.error(f"❌ Error recargando índice de matchmaking: {e}")
+    finally:
+        db.close()
+        _lock_carga.release()
+
+
+def obtener_indice_matchmaking(db: Session) -> IndiceMatchmaking:
+    """
+    Índice cargado. Solo se carga dentro del request si nunca se cargó; si
+    venció el TTL se recarga en un thread y mientras tanto se sigue
+    respondiendo con el índice anterior.
+    """
+    if not indice_matchmaking.cargado:
+        with _lock_carga:
+            if not indice_matchmaking.cargado:
+                indice_matchmaking.cargar(db)
+    elif indice_matchmaking.vencido() and _lock_carga.acquire(blocking=False):
+        if indice_matchmaking.vencido():
+            threading.Thread(target=_recargar_en_segundo_plano, daemon=True).start()
+        else:
+            _lock_carga.release()
+    return indice_matchmaking
@@ -1,17 +1,49 @@
 """
 Servicio de Notificaciones Push
-Maneja el envío de notificaciones push a través de Firebase Cloud Messaging
+Encola las notificaciones en `notificaciones_pendientes`; el envío a
+Firebase Cloud Messaging lo hace el worker de cola_notificaciones_service
+(en lotes, fuera del request)
 """
 from typing import List, Dict
-import firebase_admin
-from firebase_admin import messaging
 from sqlalchemy.orm import Session
-from ..models.driveplus_models import Usuario
+from .cola_notificaciones_service import ColaNotificacionesService, cola_notificaciones_worker
 
 
 class NotificationService:
     """Servicio para enviar notificaciones push"""
     
+    @staticmethod
+    def encolar_elo_actualizado(db: Session, cambios_elo: Dict[int, Dict]) -> int:
+        """
+        Encola las notificaciones de cambio de Elo sin hacer commit
+        (para usarlo dentro de la transacción que aplica el Elo)
+        
+        Returns:
+            Cantidad de notificaciones encoladas
+        """
+        for id_usuario, cambio_info in cambios_elo.items():
+            cambio = cambio_info.get('cambio', 0)
+            nuevo_rating = cambio_info.get('nuevo', 0)
+            
+            # Determinar título y mensaje según si ganó o perdió
+            if cambio > 0:
+                titulo = "¡Felicitaciones! 🎉"
+                cuerpo = f"Tu rating subió {cambio} puntos. Nuevo rating: {nuevo_rating}"
+                icono = "🎉"
+            else:
+                titulo = "Partido finalizado"
+                cuerpo = f"Tu rating cambió {cambio} puntos. Nuevo rating: {nuevo_rating}"
+                icono = "📊"
+            
+            ColaNotificacionesService.encolar(db, [id_usuario], titulo, cuerpo, {
+                'tipo': 'elo_actualizado',
+                'cambio_elo': cambio,
+                'nuevo_rating': nuevo_rating,
+                'icono': icono
+            })
+        
+        return len(cambios_elo)
+    
     @staticmethod
     def enviar_notificacion_elo_actualizado(
         usuarios: List[int],
@@ -19,7 +51,7 @@ class NotificationService:
         db: Session
     ) -> Dict:
         """
-        Envía notificaciones push a los jugadores cuando el Elo se actualiza
+        Encola notificaciones push a los jugadores cuando el Elo se actualiza
         
         Args:
             usuarios: Lista de IDs de usuarios
@@ -27,63 +59,22 @@ class NotificationService:
             db: Sesión de base de datos
             
         Returns:
-            Dict con resultado del envío
+            Dict con resultado del encolado
         """
         try:
-            mensajes_enviados = 0
-            errores = []
-            
-            for id_usuario in usuarios:
-                # Obtener usuario y su FCM token
-                usuario = db.query(Usuario).filter(Usuario.id_usuario == id_usuario).first()
-                
-                if not usuario or not hasattr(usuario, 'fcm_token') or not usuario.fcm_token:
-                    continue
-                
-                # Obtener cambio de Elo del usuario
-                cambio_info = cambios_elo.get(id_usuario, {})
-                cambio = cambio_info.get('cambio', 0)
-                nuevo_rating = cambio_info.get('nuevo', 0)
-                
-                # Determinar título y mensaje según si ganó o perdió
-                if cambio > 0:
-                    titulo = "¡Felicitaciones! 🎉"
-                    cuerpo = f"Tu rating subió {cambio} puntos. Nuevo rating: {nuevo_rating}"
-                    icono = "🎉"
-                else:
-                    titulo = "Partido finalizado"
-                    cuerpo = f"Tu rating cambió {cambio} puntos. Nuevo rating: {nuevo_rating}"
-                    icono = "📊"
-                
-                # Crear mensaje de notificación
-                message = messaging.Message(
-                    notification=messaging.Notification(
-                        title=titulo,
-                        body=cuerpo,
-                    ),
-                    data={
-                        'tipo': 'elo_actualizado',
-                        'cambio_elo': str(cambio),
-                        'nuevo_rating': str(nuevo_rating),
-                        'icono': icono
-                    },
-                    token=usuario.fcm_token
-                )
-                
-                try:
-                    # Enviar notificación
-                    response = messaging.send(message)
-                    mensajes_enviados += 1
-                except Exception as e:
-                    errores.append(f"Error enviando a {usuario.nombre_usuario}: {str(e)}")
+            encoladas = NotificationService.encolar_elo_actualizado(
+                db, {id_usuario: cambios_elo.get(id_usuario, {}) for id_usuario in usuarios}
+            )
+            db.commit()
+            cola_notificaciones_worker.notificar()
             
             return {
                 "success": True,
-                "mensajes_enviados": mensajes_enviados,
-                "errores": errores
+                "mensajes_encolados": encoladas
             }
             
         except Exception as e:
+            db.rollback()
             return {
                 "success": False,
                 "error": str(e)
@@ -96,38 +87,18 @@ class NotificationService:
         db: Session
     ) -> Dict:
         """
-        Envía notificación cuando hay un resultado pendiente de confirmación
+        Encola notificación cuando hay un resultado pendiente de confirmación
         """
-        try:
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == id_usuario).first()
-            
-            if not usuario or not hasattr(usuario, 'fcm_token') or not usuario.fcm_token:
-                return {"success": False, "error": "Usuario sin token FCM"}
-            
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title="Resultado pendiente de confirmación",
-                    body=f"Hay un resultado en '{nombre_sala}' esperando tu confirmación",
-                ),
-                data={
-                    'tipo': 'resultado_pendiente',
-                    'nombre_sala': nombre_sala
-                },
-                token=usuario.fcm_token
-            )
-            
-            response = messaging.send(message)
-            
-            return {
-                "success": True,
-                "message_id": response
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
+        return NotificationService.enviar_notificacion(
+            db=db,
+            user_id=id_usuario,
+            titulo="Resultado pendiente de confirmación",
+            mensaje=f"Hay un resultado en '{nombre_sala}' esperando tu confirmación",
+            data={
+                'tipo': 'resultado_pendiente',
+                'nombre_sala': nombre_sala
             }
+        )
     
     @staticmethod
     def enviar_notificacion(
@@ -138,7 +109,7 @@ class NotificationService:
         data: Dict = None
     ) -> Dict:
         """
-        Envía una notificación push genérica a un usuario
+        Encola una notificación push genérica a un usuario
         
         Args:
             db: Sesión de base de datos
@@ -148,43 +119,21 @@ class NotificationService:
             data: Datos adicionales (opcional)
             
         Returns:
-            Dict con resultado del envío
+            Dict con resultado del encolado
         """
         try:
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
-            
-            if not usuario:
-                return {"success": False, "error": "Usuario no encontrado"}
-            
-            if not hasattr(usuario, 'fcm_token') or not usuario.fcm_token:
-                print(f"Usuario {user_id} no tiene token FCM configurado")
-                return {"success": False, "error": "Usuario sin token FCM"}
-            
-            # Convertir data a strings (FCM requiere strings)
-            data_str = {}
-            if data:
-                for key, value in data.items():
-                    data_str[key] = str(value) if value is not None else ""
-            
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title=titulo,
-                    body=mensaje,
-                ),
-                data=data_str,
-                token=usuario.fcm_token
-            )
-            
-            response = messaging.send(message)
-            print(f"Notificación enviada a usuario {user_id}: {response}")
+            notificacion, = ColaNotificacionesService.encolar(db, [user_id], titulo, mensaje, data)
+            db.commit()
+            cola_notificaciones_worker.notificar()
             
             return {
                 "success": True,
-                "message_id": response
+                "id_notificacion": notificacion.id_notificacion
             }
             
         except Exception as e:
-            print(f"Error enviando notificación a usuario {user_id}: {e}")
+            db.rollback()
+            print(f"Error encolando notificación a usuario {user_id}: {e}")
             return {
                 "success": False,
                 "error": str(e)
@@ -0,0 +1,115 @@
+"""
+Serie de rating de un usuario reducida para gráficos
+
+Los gráficos del perfil bajaban todo historial_rating para dibujar una
+línea: miles de puntos para quien juega mucho. Ahora el servidor recorre el
+historial en orden del índice (id_usuario, creado_en, id_historial) y lo
+reduce a `puntos` con Largest-Triangle-Three-Buckets (LTTB), que conserva
+la forma de la curva (picos y caídas) con un tamaño de respuesta fijo.
+
+La serie reducida se cachea con la clave (usuario, último id_historial,
+puntos, desde): un partido nuevo cambia el último id y la clave vieja deja
+de usarse sola, sin invalidar nada. Averiguar el último id es una lectura
+del mismo índice.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.driveplus_models import HistorialRating
+from ..utils.cache import cache, CACHE_TTL
+
+PUNTOS_POR_DEFECTO = 100
+PUNTOS_MINIMO = 3
+PUNTOS_MAXIMO = 1000
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], umbral: int) -> List[int]:
+    """
+    Índices de los puntos que elige Largest-Triangle-Three-Buckets.
+
+    Conserva el primero y el último; el resto se divide en `umbral - 2`
+    baldes y de cada uno se toma el punto que forma el triángulo más grande
+    con el elegido anterior y el promedio del balde siguiente.
+    """
+    n = len(xs)
+    if umbral >= n or umbral < PUNTOS_MINIMO:
+        return list(range(n))
+
+    elegidos = [0]
+    tamano = (n - 2) / (umbral - 2)
+    a = 0
+    for i in range(umbral - 2):
+        inicio = int(i * tamano) + 1
+        fin = int((i + 1) * tamano) + 1
+
+        # Promedio del balde siguiente (el último punto para el último balde)
+        sig_inicio, sig_fin = fin, min(int((i + 2) * tamano) + 1, n)
+        if sig_inicio >= n - 1 or i == umbral - 3:
+            prom_x, prom_y = xs[n - 1], ys[n - 1]
+        else:
+            cantidad = sig_fin - sig_inicio
+            prom_x = sum(xs[sig_inicio:sig_fin]) / cantidad
+            prom_y = sum(ys[sig_inicio:sig_fin]) / cantidad
+
+        ax, ay = xs[a], ys[a]
+        mejor, mejor_area = inicio, -1.0
+        for j in range(inicio, fin):
+            area = abs((ax - prom_x) * (ys[j] - ay) - (ax - xs[j]) * (prom_y - ay))
+            if area > mejor_area:
+                mejor, mejor_area = j, area
+        elegidos.append(mejor)
+        a = mejor
+
+    elegidos.append(n - 1)
+    return elegidos
+
+
+class RatingHistoriaService:
+    """Historial de rating reducido y cacheado por último id_historial"""
+
+    @staticmethod
+    def _filtro(id_usuario: int, desde: Optional[datetime]):
+        filtros = [HistorialRating.id_usuario == id_usuario]
+        if desde:
+            filtros.append(HistorialRating.creado_en >= desde)
+        return filtros
+
+    @staticmethod
+    def obtener(db: Session, id_usuario: int, puntos: int = PUNTOS_POR_DEFECTO,
+                desde: Optional[datetime] = None) -> Dict:
+        """Serie de a lo sumo `puntos` puntos (fecha, rating, id_partido), de la más vieja a la más nueva"""
+        filtros = RatingHistoriaService._filtro(id_usuario, desde)
+        ultimo_id = db.query(func.max(HistorialRating.id_historial)).filter(*filtros).scalar()
+
+        clave = f"rating_historia:{id_usuario}:{ultimo_id}:{puntos}:{desde.isoformat() if desde else ''}"
+        respuesta = cache.get(clave)
+        if respuesta is not None:
+            return respuesta
+
+        filas: List[Tuple] = []
+        if ultimo_id is not None:
+            filas = db.query(
+                HistorialRating.creado_en, HistorialRating.rating_despues, HistorialRating.id_partido
+            ).filter(*filtros).order_by(
+                HistorialRating.creado_en, HistorialRating.id_historial
+            ).all()
+
+        xs = [fila.creado_en.timestamp() if fila.creado_en else float(i) for i, fila in enumerate(filas)]
+        ys = [float(fila.rating_despues) for fila in filas]
+        respuesta = {
+            "id_usuario": id_usuario,
+            "total": len(filas),
+            "puntos": [
+                {
+                    "fecha": filas[i].creado_en,
+                    "rating": filas[i].rating_despues,
+                    "id_partido": filas[i].id_partido
+                }
+                for i in lttb(xs, ys, puntos)
+            ]
+        }
+        cache.set(clave, respuesta, CACHE_TTL["rating_historia"])
+        return respuesta
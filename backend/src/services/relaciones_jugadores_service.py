@@ -0,0 +1,156 @@
+"""
+Récords entre jugadores: con qué compañeros y contra qué rivales
+
+"Mi récord contra X" y "mi récord con Y" salían de self-joins sobre todo
+partido_jugadores / historial_enfrentamientos. Ahora relaciones_jugadores
+guarda, por cada par ordenado de jugadores y relación (companero / rival),
+jugados, ganados, perdidos y la fecha del último partido. Se suma una vez
+por partido confirmado, en la misma transacción que lo agrega al historial
+(HistorialPartidosService.registrar), y las lecturas son un rango del
+índice (id_usuario, relacion, jugados) o una búsqueda por clave primaria.
+Si el partido se vuelve a registrar con otro ganador o jugadores (corrección
+de resultado), se resta lo que había sumado antes y se suma lo nuevo.
+
+Cada partido de 4 jugadores toca 12 filas: 2 parejas de compañeros y 4
+cruces de rivales, cada uno en los dos sentidos.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.driveplus_models import PerfilUsuario, RelacionJugadores, Usuario
+
+COMPANERO = "companero"
+RIVAL = "rival"
+RELACIONES = (COMPANERO, RIVAL)
+
+LIMITE_POR_DEFECTO = 10
+LIMITE_MAXIMO = 50
+
+
+def _record(fila: Optional[RelacionJugadores]) -> Dict:
+    jugados = fila.jugados if fila else 0
+    ganados = fila.ganados if fila else 0
+    return {
+        "jugados": jugados,
+        "ganados": ganados,
+        "perdidos": fila.perdidos if fila else 0,
+        "porcentaje_victoria": round(ganados / jugados * 100, 1) if jugados else 0,
+        "ultimo_partido": fila.ultimo_partido if fila else None
+    }
+
+
+class RelacionesJugadoresService:
+    """Agregados por par de jugadores: alta incremental y lecturas por índice"""
+
+    @staticmethod
+    def sumar_partido(db: Session, jugadores: Iterable[Tuple[int, int]], ganador: Optional[int],
+                      fecha: datetime) -> None:
+        """
+        Suma un partido confirmado. `jugadores` son pares (id_usuario, equipo)
+        y `ganador` el equipo ganador (1 o 2); sin ganador no se suma nada.
+        Sin commit.
+        """
+        RelacionesJugadoresService._acumular(db, jugadores, ganador, fecha, 1)
+
+    @staticmethod
+    def restar_partido(db: Session, jugadores: Iterable[Tuple[int, int]], ganador: Optional[int]) -> None:
+        """
+        Deshace lo que sumó `sumar_partido` con los mismos jugadores y ganador.
+        Las filas que quedan sin partidos se borran. Sin commit.
+        """
+        RelacionesJugadoresService._acumular(db, jugadores, ganador, None, -1)
+
+    @staticmethod
+    def _acumular(db: Session, jugadores: Iterable[Tuple[int, int]], ganador: Optional[int],
+                  fecha: Optional[datetime], signo: int) -> None:
+        jugadores = list(jugadores)
+        if ganador not in (1, 2) or len(jugadores) < 2:
+            return
+
+        cambios = {}
+        for id_usuario, equipo in jugadores:
+            for id_otro, equipo_otro in jugadores:
+                if id_usuario != id_otro:
+                    relacion = COMPANERO if equipo == equipo_otro else RIVAL
+                    cambios[(id_usuario, id_otro, relacion)] = equipo == ganador
+
+        ids = sorted({id_usuario for id_usuario, _ in jugadores})
+        existentes = {
+            (fila.id_usuario, fila.id_otro, fila.relacion): fila
+            for fila in db.query(RelacionJugadores).filter(
+                RelacionJugadores.id_usuario.in_(ids),
+                RelacionJugadores.id_otro.in_(ids)
+            ).with_for_update().all()
+        }
+
+        for (id_usuario, id_otro, relacion), gano in cambios.items():
+            fila = existentes.get((id_usuario, id_otro, relacion))
+            if fila is None:
+                if signo < 0:
+                    continue
+                fila = RelacionJugadores(id_usuario=id_usuario, id_otro=id_otro, relacion=relacion,
+                                         jugados=0, ganados=0, perdidos=0)
+                db.add(fila)
+            fila.jugados += signo
+            if gano:
+                fila.ganados += signo
+            else:
+                fila.perdidos += signo
+            if signo < 0:
+                if fila.jugados <= 0:
+                    db.delete(fila)
+            elif fila.ultimo_partido is None or fecha > fila.ultimo_partido:
+                fila.ultimo_partido = fecha
+
+        if signo < 0:
+            # Las sesiones no hacen autoflush: un sumar_partido posterior tiene
+            # que ver las filas ya restadas o borradas
+            db.flush()
+
+    @staticmethod
+    def principales(db: Session, id_usuario: int, relacion: str,
+                    limite: int = LIMITE_POR_DEFECTO) -> List[Dict]:
+        """Compañeros o rivales con más partidos jugados junto al usuario"""
+        filas = db.query(
+            RelacionJugadores, Usuario.nombre_usuario, Usuario.rating, PerfilUsuario.nombre, PerfilUsuario.apellido
+        ).join(
+            Usuario, Usuario.id_usuario == RelacionJugadores.id_otro
+        ).outerjoin(
+            PerfilUsuario, PerfilUsuario.id_usuario == RelacionJugadores.id_otro
+        ).filter(
+            RelacionJugadores.id_usuario == id_usuario,
+            RelacionJugadores.relacion == relacion
+        ).order_by(
+            RelacionJugadores.jugados.desc(), RelacionJugadores.ganados.desc(), RelacionJugadores.id_otro
+        ).limit(limite).all()
+
+        return [
+            {
+                "id_usuario": relacion_fila.id_otro,
+                "nombre_usuario": nombre_usuario,
+                "nombre": nombre or "",
+                "apellido": apellido or "",
+                "rating": rating,
+                **_record(relacion_fila)
+            }
+            for relacion_fila, nombre_usuario, rating, nombre, apellido in filas
+        ]
+
+    @staticmethod
+    def cara_a_cara(db: Session, id_usuario: int, id_otro: int) -> Dict:
+        """Récord del usuario contra y junto a otro jugador"""
+        filas = {
+            fila.relacion: fila
+            for fila in db.query(RelacionJugadores).filter(
+                RelacionJugadores.id_usuario == id_usuario,
+                RelacionJugadores.id_otro == id_otro
+            ).all()
+        }
+        return {
+            "id_usuario": id_usuario,
+            "id_otro": id_otro,
+            "como_rivales": _record(filas.get(RIVAL)),
+            "como_companeros": _record(filas.get(COMPANERO))
+        }
@@ -0,0 +1,461 @@
+"""
+Listados de salas paginados y acotados al usuario
+
+El listado anterior traía todas las salas activas de la plataforma (con sus
+jugadores, partidos, resultados, Elo y confirmaciones) para cada usuario:
+el costo crecía con la actividad total, no con la del usuario. Ahora hay
+tres vistas, cada una paginada por keyset sobre (creado_en, id_sala):
+
+- mias: salas activas donde el usuario juega
+- abiertas: salas esperando jugadores, de creadores con rating cercano
+- finalizadas: salas finalizadas del usuario, de la más reciente a la más vieja
+
+El cursor es opaco (base64 de "creado_en|id_sala"); la página siguiente
+continúa en el índice desde la última fila, sin OFFSET.
+
+La página de salas abiertas es la misma para todos los usuarios de una
+misma banda de rating, así que se cachea unos segundos.
+
+Unirse a una sala bloquea la fila de la sala (FOR UPDATE) mientras se
+elige el lugar; la restricción única (id_sala, orden) es la red de
+seguridad: si dos uniones igual chocan, la perdedora reintenta.
+
+El barrido periódico (barrer_salas) saca del conjunto activo las salas
+abandonadas, para que su tamaño siga a la actividad real:
+- esperando / activa / programada con la fecha pasada hace más de
+  HORAS_ESPERA_VENCIDA -> expirada
+- en_juego con el partido ya confirmado (p. ej. auto-confirmado) -> finalizada
+- en_juego sin resultado cargado HORAS_JUEGO_VENCIDO después de la fecha -> expirada
+"""
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, exists, func, or_, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.sala import Sala, SalaJugador
+from ..models.driveplus_models import Usuario, PerfilUsuario, Partido, PartidoJugador, ResultadoPartido
+from ..models.confirmacion import Confirmacion
+from ..schemas.sala import SalaCompleta
+from ..utils.cache import cache, CACHE_TTL
+
+ESTADOS_ACTIVOS = ('esperando', 'activa', 'programada', 'en_juego')
+ESTADOS_ESPERA = ('esperando', 'activa', 'programada')
+
+# Barrido de salas abandonadas
+HORAS_ESPERA_VENCIDA = 6
+HORAS_JUEGO_VENCIDO = 48
+TAMANO_LOTE_BARRIDO = 500
+
+# Ancho de la banda de rating para "salas abiertas" (se muestran la banda
+# del usuario y las dos vecinas)
+ANCHO_BANDA_RATING = 200
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 50
+
+# Reintentos de unirse ante un choque con la restricción única
+MAX_REINTENTOS_UNIRSE = 5
+
+
+def codificar_cursor(creado_en: datetime, id_sala: int) -> str:
+    texto = f"{creado_en.isoformat()}|{id_sala}"
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError si el cursor no es válido"""
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        creado_en, id_sala = texto.rsplit("|", 1)
+        return datetime.fromisoformat(creado_en), int(id_sala)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def formatear_resultado(detalle_sets: List[Dict], ganador_equipo: Optional[int]) -> Dict:
+    """Resultado de resultados_partidos en el formato que espera el frontend"""
+    return {
+        "formato": "best_of_3",
+        "sets": [
+            {
+                "gamesEquipoA": set_data.get("juegos_eq1", 0),
+                "gamesEquipoB": set_data.get("juegos_eq2", 0),
+                "ganador": "equipoA" if set_data.get("juegos_eq1", 0) > set_data.get("juegos_eq2", 0) else "equipoB",
+                "completado": True
+            }
+            for set_data in detalle_sets
+        ],
+        "ganador": "equipoA" if ganador_equipo == 1 else "equipoB",
+        "completado": True
+    }
+
+
+def invalidar_salas_abiertas():
+    """Descarta las páginas cacheadas de salas abiertas (crear/unirse/iniciar/eliminar)"""
+    cache.delete_pattern("salas_abiertas:")
+
+
+class SalaService:
+    """Vistas paginadas de salas y unión atómica"""
+
+    @staticmethod
+    def _paginar(db: Session, query, cursor: Optional[str], limite: int) -> Tuple[List[Sala], Optional[str]]:
+        """Aplica el keyset (creado_en, id_sala) descendente y arma el próximo cursor"""
+        if cursor:
+            creado_en, id_sala = decodificar_cursor(cursor)
+            query = query.filter(tuple_(Sala.creado_en, Sala.id_sala) < (creado_en, id_sala))
+
+        salas = query.order_by(Sala.creado_en.desc(), Sala.id_sala.desc()).limit(limite + 1).all()
+
+        siguiente = None
+        if len(salas) > limite:
+            salas = salas[:limite]
+            siguiente = codificar_cursor(salas[-1].creado_en, salas[-1].id_sala)
+        return salas, siguiente
+
+    @staticmethod
+    def listar_mias(db: Session, id_usuario: int, cursor: Optional[str] = None,
+                    limite: int = LIMITE_POR_DEFECTO) -> Dict:
+        """Salas activas donde juega el usuario"""
+        query = db.query(Sala).join(
+            SalaJugador, SalaJugador.id_sala == Sala.id_sala
+        ).filter(
+            SalaJugador.id_usuario == id_usuario,
+            Sala.estado.in_(ESTADOS_ACTIVOS)
+        )
+        salas, siguiente = SalaService._paginar(db, query, cursor, limite)
+        return {"salas": SalaService.construir_salas_completas(db, salas), "siguiente_cursor": siguiente}
+
+    @staticmethod
+    def listar_finalizadas(db: Session, id_usuario: int, cursor: Optional[str] = None,
+                           limite: int = LIMITE_POR_DEFECTO) -> Dict:
+        """Salas finalizadas del usuario, de la más reciente a la más vieja"""
+        query = db.query(Sala).join(
+            SalaJugador, SalaJugador.id_sala == Sala.id_sala
+        ).filter(
+            SalaJugador.id_usuario == id_usuario,
+            Sala.estado == 'finalizada'
+        )
+        salas, siguiente = SalaService._paginar(db, query, cursor, limite)
+        return {"salas": SalaService.construir_salas_completas(db, salas), "siguiente_cursor": siguiente}
+
+    @staticmethod
+    def listar_abiertas(db: Session, rating: Optional[int], cursor: Optional[str] = None,
+                        limite: int = LIMITE_POR_DEFECTO) -> Dict:
+        """
+        Salas esperando jugadores con lugar libre, creadas por jugadores de
+        rating cercano. La página es compartida por banda de rating y se
+        cachea CACHE_TTL["salas_abiertas"] segundos.
+        """
+        banda = int(rating or 1500) // ANCHO_BANDA_RATING
+        cache_key = f"salas_abiertas:{banda}:{cursor or ''}:{limite}"
+        pagina = cache.get(cache_key)
+        if pagina is not None:
+            return pagina
+
+        ocupados = db.query(func.count(SalaJugador.id_usuario)).filter(
+            SalaJugador.id_sala == Sala.id_sala
+        ).correlate(Sala).scalar_subquery()
+
+        query = db.query(Sala).join(
+            Usuario, Usuario.id_usuario == Sala.id_creador
+        ).filter(
+            Sala.estado == 'esperando',
+            Usuario.rating >= (banda - 1) * ANCHO_BANDA_RATING,
+            Usuario.rating < (banda + 2) * ANCHO_BANDA_RATING,
+            ocupados < Sala.max_jugadores
+        )
+        salas, siguiente = SalaService._paginar(db, query, cursor, limite)
+        pagina = {"salas": SalaService.construir_salas_completas(db, salas), "siguiente_cursor": siguiente}
+
+        cache.set(cache_key, pagina, CACHE_TTL["salas_abiertas"])
+        return pagina
+
+    @staticmethod
+    def unirse(db: Session, codigo_invitacion: str, id_usuario: int) -> Tuple[Sala, int]:
+        """
+        Ocupa un lugar en la sala de forma atómica y hace commit.
+
+        Returns:
+            (sala, orden del lugar ocupado); la versión de la sala ya subió
+
+        Raises:
+            LookupError: la sala no existe
+            ValueError: la sala está llena o el usuario ya está en ella
+        """
+        for _ in range(MAX_REINTENTOS_UNIRSE):
+            # Bloquea la sala: las uniones concurrentes a la misma sala se serializan
+            sala = db.query(Sala).filter(
+                Sala.codigo_invitacion == codigo_invitacion.upper()
+            ).with_for_update().first()
+            if not sala:
+                db.rollback()
+                raise LookupError("Sala no encontrada")
+
+            ocupados = db.query(SalaJugador.id_usuario, SalaJugador.orden).filter(
+                SalaJugador.id_sala == sala.id_sala
+            ).all()
+            if any(o.id_usuario == id_usuario for o in ocupados):
+                db.rollback()
+                raise ValueError("Ya estás en esta sala")
+            if len(ocupados) >= sala.max_jugadores:
+                db.rollback()
+                raise ValueError("La sala está llena")
+
+            # Primer lugar libre (si alguien salió, se reutiliza su orden)
+            usados = {o.orden for o in ocupados}
+            orden = next(n for n in range(1, sala.max_jugadores + 1) if n not in usados)
+
+            db.add(SalaJugador(id_sala=sala.id_sala, id_usuario=id_usuario, orden=orden))
+            sala.version = (sala.version or 1) + 1  # la fila está bloqueada
+            try:
+                db.commit()
+                return sala, orden
+            except IntegrityError:
+                # Otra unión tomó el mismo lugar (o el mismo usuario entró dos veces)
+                db.rollback()
+
+        raise ValueError("La sala está muy concurrida, intentá de nuevo")
+
+    @staticmethod
+    def barrer_salas(db: Session, ahora: Optional[datetime] = None,
+                     tamano_lote: int = TAMANO_LOTE_BARRIDO) -> Dict:
+        """
+        Cierra las salas abandonadas por lotes: un SELECT ... FOR UPDATE
+        SKIP LOCKED y un único UPDATE por lote, con commit por lote.
+
+        Returns:
+            {"expiradas": n, "finalizadas": n, "cerradas": [(id_sala, estado_nuevo, version), ...]}
+        """
+        ahora = ahora or datetime.now(timezone.utc)
+        limite_espera = ahora - timedelta(hours=HORAS_ESPERA_VENCIDA)
+        limite_juego = ahora - timedelta(hours=HORAS_JUEGO_VENCIDO)
+
+        confirmado = Partido.estado_confirmacion.in_(('confirmado', 'auto_confirmado'))
+        sin_resultado = ~exists().where(ResultadoPartido.id_partido == Sala.id_partido)
+        nuevo_estado = case((confirmado, 'finalizada'), else_='expirada')
+
+        resumen = {"expiradas": 0, "finalizadas": 0, "cerradas": []}
+        ultimo_id = 0
+        while True:
+            filas = db.query(Sala.id_sala, nuevo_estado.label("nuevo_estado")).outerjoin(
+                Partido, Partido.id_partido == Sala.id_partido
+            ).filter(
+                Sala.id_sala > ultimo_id,
+                or_(
+                    and_(Sala.estado.in_(ESTADOS_ESPERA), Sala.fecha < limite_espera),
+                    and_(Sala.estado == 'en_juego', or_(
+                        confirmado,
+                        and_(Sala.fecha < limite_juego, sin_resultado)
+                    ))
+                )
+            ).order_by(Sala.id_sala).limit(tamano_lote).with_for_update(of=Sala, skip_locked=True).all()
+
+            if not filas:
+                db.rollback()
+                break
+
+            ultimo_id = filas[-1].id_sala
+            finalizadas = [f.id_sala for f in filas if f.nuevo_estado == 'finalizada']
+            versiones = dict(db.execute(
+                update(Sala)
+                .where(Sala.id_sala.in_([f.id_sala for f in filas]))
+                .values(
+                    estado=case((Sala.id_sala.in_(finalizadas or [0]), 'finalizada'), else_='expirada'),
+                    version=Sala.version + 1
+                )
+                .returning(Sala.id_sala, Sala.version)
+                .execution_options(synchronize_session=False)
+            ).all())
+            db.commit()
+
+            resumen["finalizadas"] += len(finalizadas)
+            resumen["expiradas"] += len(filas) - len(finalizadas)
+            resumen["cerradas"].extend((f.id_sala, f.nuevo_estado, versiones[f.id_sala]) for f in filas)
+
+            if len(filas) < tamano_lote:
+                break
+
+        return resumen
+
+    @staticmethod
+    def incrementar_version(db: Session, id_sala: int) -> int:
+        """
+        Sube la versión del estado de la sala (sin commit) y devuelve la nueva.
+        El UPDATE toma el lock de la fila: dos cambios concurrentes no
+        pueden quedar con la misma versión.
+        """
+        return db.execute(
+            update(Sala).where(Sala.id_sala == id_sala)
+            .values(version=Sala.version + 1)
+            .returning(Sala.version)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+
+    @staticmethod
+    def construir_estado(db: Session, id_sala: int) -> Optional[SalaCompleta]:
+        """
+        Estado completo de una sala (formato de GET /salas/{id}), con su
+        versión. None si la sala no existe.
+        """
+        sala = db.query(Sala).filter(Sala.id_sala == id_sala).first()
+        if not sala:
+            return None
+
+        jugadores = [
+            {
+                "id_usuario": row.id_usuario,
+                "nombre_usuario": row.nombre_usuario,
+                "nombre": row.nombre or "",
+                "apellido": row.apellido or "",
+                "rating": row.rating,
+                "equipo": row.equipo,
+                "orden": row.orden
+            }
+            for row in db.query(
+                SalaJugador.id_usuario, SalaJugador.equipo, SalaJugador.orden,
+                Usuario.nombre_usuario, Usuario.rating, PerfilUsuario.nombre, PerfilUsuario.apellido
+            ).join(
+                Usuario, SalaJugador.id_usuario == Usuario.id_usuario
+            ).outerjoin(
+                PerfilUsuario, Usuario.id_usuario == PerfilUsuario.id_usuario
+            ).filter(SalaJugador.id_sala == id_sala).order_by(SalaJugador.orden).all()
+        ]
+
+        resultado = None
+        estado_confirmacion = None
+        if sala.id_partido:
+            fila = db.query(Partido.estado_confirmacion, Partido.ganador_equipo, ResultadoPartido.detalle_sets).outerjoin(
+                ResultadoPartido, ResultadoPartido.id_partido == Partido.id_partido
+            ).filter(Partido.id_partido == sala.id_partido).first()
+            if fila:
+                estado_confirmacion = fila.estado_confirmacion
+                if fila.detalle_sets is not None:
+                    resultado = formatear_resultado(fila.detalle_sets, fila.ganador_equipo)
+
+        return SalaCompleta(
+            id_sala=str(sala.id_sala),
+            nombre=sala.nombre,
+            fecha=sala.fecha,
+            estado=sala.estado,
+            codigo_invitacion=sala.codigo_invitacion,
+            id_creador=sala.id_creador,
+            jugadores_actuales=len(jugadores),
+            max_jugadores=sala.max_jugadores,
+            creado_en=sala.creado_en,
+            jugadores=jugadores,
+            resultado=resultado,
+            estado_confirmacion=estado_confirmacion,
+            version=sala.version
+        )
+
+    @staticmethod
+    def construir_salas_completas(db: Session, salas: List[Sala]) -> List[SalaCompleta]:
+        """
+        Arma SalaCompleta para una página de salas con una query por tipo de
+        dato (jugadores, partidos, resultados, Elo, confirmaciones).
+        """
+        if not salas:
+            return []
+
+        salas_ids = [s.id_sala for s in salas]
+        partidos_ids = [s.id_partido for s in salas if s.id_partido]
+
+        # Jugadores con usuarios y perfiles en una sola query
+        jugadores_data = db.query(
+            SalaJugador.id_sala,
+            SalaJugador.id_usuario,
+            SalaJugador.equipo,
+            SalaJugador.orden,
+            Usuario.nombre_usuario,
+            Usuario.rating,
+            PerfilUsuario.nombre,
+            PerfilUsuario.apellido
+        ).join(
+            Usuario, SalaJugador.id_usuario == Usuario.id_usuario
+        ).outerjoin(
+            PerfilUsuario, Usuario.id_usuario == PerfilUsuario.id_usuario
+        ).filter(
+            SalaJugador.id_sala.in_(salas_ids)
+        ).order_by(SalaJugador.id_sala, SalaJugador.orden).all()
+
+        partidos_data = {}
+        resultados_data = {}
+        cambios_elo_data = {}
+        confirmaciones_data = {}
+        if partidos_ids:
+            partidos_data = {
+                p.id_partido: p
+                for p in db.query(Partido).filter(Partido.id_partido.in_(partidos_ids)).all()
+            }
+            resultados_data = {
+                r.id_partido: r
+                for r in db.query(ResultadoPartido).filter(ResultadoPartido.id_partido.in_(partidos_ids)).all()
+            }
+            for cambio in db.query(PartidoJugador).filter(PartidoJugador.id_partido.in_(partidos_ids)).all():
+                cambios_elo_data.setdefault(cambio.id_partido, []).append({
+                    "id_usuario": cambio.id_usuario,
+                    "rating_antes": cambio.rating_antes,
+                    "rating_despues": cambio.rating_despues,
+                    "cambio_elo": cambio.cambio_elo
+                })
+            for conf in db.query(Confirmacion).filter(
+                Confirmacion.id_partido.in_(partidos_ids),
+                Confirmacion.tipo == 'confirmacion'
+            ).all():
+                confirmaciones_data.setdefault(conf.id_partido, []).append(conf.id_usuario)
+
+        creadores = {s.id_sala: s.id_creador for s in salas}
+        jugadores_por_sala: Dict[int, List[Dict]] = {}
+        for row in jugadores_data:
+            nombre_completo = f"{row.nombre} {row.apellido}".strip() if row.nombre else row.nombre_usuario
+            jugadores_por_sala.setdefault(row.id_sala, []).append({
+                "id": str(row.id_usuario),
+                "nombre": nombre_completo,
+                "nombre_usuario": row.nombre_usuario,
+                "rating": row.rating or 1500,
+                "equipo": row.equipo,
+                "esCreador": row.id_usuario == creadores[row.id_sala]
+            })
+
+        resultado = []
+        for sala in salas:
+            jugadores = jugadores_por_sala.get(sala.id_sala, [])
+            resultado_partido = None
+            estado_confirmacion = None
+            elo_aplicado = False
+
+            partido = partidos_data.get(sala.id_partido) if sala.id_partido else None
+            if partido:
+                estado_confirmacion = partido.estado_confirmacion
+                elo_aplicado = getattr(partido, 'elo_aplicado', False)
+
+            resultado_db = resultados_data.get(sala.id_partido) if sala.id_partido else None
+            if resultado_db:
+                resultado_partido = formatear_resultado(
+                    resultado_db.detalle_sets, partido.ganador_equipo if partido else None
+                )
+
+            resultado.append(SalaCompleta(
+                id_sala=str(sala.id_sala),
+                nombre=sala.nombre,
+                fecha=sala.fecha,
+                estado=sala.estado,
+                codigo_invitacion=sala.codigo_invitacion,
+                id_creador=sala.id_creador,
+                jugadores_actuales=len(jugadores),
+                max_jugadores=sala.max_jugadores,
+                creado_en=sala.creado_en,
+                jugadores=jugadores,
+                resultado=resultado_partido,
+                estado_confirmacion=estado_confirmacion,
+                cambios_elo=cambios_elo_data.get(sala.id_partido) if sala.id_partido else None,
+                elo_aplicado=elo_aplicado,
+                usuarios_confirmados=confirmaciones_data.get(sala.id_partido, []) if sala.id_partido else [],
+                version=sala.version
+            ))
+
+        return resultado
@@ -8,9 +8,10 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from ..database.config import SessionLocal
+from ..database.locks import lock_consultivo, LOCK_BARRIDO_SALAS
 from ..models.driveplus_models import Usuario, Categoria
-from ..services.categoria_service import actualizar_categoria_usuario
 from ..controllers.categoria_maintenance_controller import ejecutar_correccion_categorias
+from ..services.confirmacion_service import ConfirmacionService
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,8 @@ class ScheduledTasksService:
     def __init__(self):
         self.running = False
         self.last_categoria_check: Optional[datetime] = None
+        self.last_auto_confirmacion: Optional[dict] = None
+        self.last_barrido_salas: Optional[dict] = None
     
     async def start_scheduler(self):
         """Inicia el programador de tareas (NO BLOQUEANTE)"""
@@ -63,6 +66,12 @@ class ScheduledTasksService:
         if self.should_run_categoria_check(now):
             await self.run_categoria_maintenance()
             self.last_categoria_check = now
+        
+        # Auto-confirmar resultados viejos en cada vuelta (cada 1 hora)
+        await self.run_auto_confirmacion()
+        
+        # Después de auto-confirmar: cerrar salas abandonadas o ya confirmadas
+        await self.run_barrido_salas()
     
     def should_run_categoria_check(self, now: datetime) -> bool:
         """Determina si debe ejecutar la verificación de categorías"""
@@ -93,6 +102,78 @@ class ScheduledTasksService:
         finally:
             db.close()
 
+    async def run_auto_confirmacion(self):
+        """Ejecuta la auto-confirmación por lotes de resultados sin reportes"""
+        logger.info("🔧 Iniciando auto-confirmación de resultados pendientes")
+        
+        def _ejecutar():
+            db = SessionLocal()
+            try:
+                return ConfirmacionService.auto_confirmar_partidos_antiguos(db)
+            finally:
+                db.close()
+        
+        try:
+            # En un thread para no bloquear el event loop mientras procesa lotes
+            metricas = await asyncio.to_thread(_ejecutar)
+            self.last_auto_confirmacion = {**metricas, "fecha": datetime.now().isoformat()}
+            logger.info(
+                f"✅ Auto-confirmación completada: {metricas['auto_confirmados']} partidos en "
+                f"{metricas['lotes']} lotes, {metricas['errores']} errores, {metricas['duracion_segundos']}s"
+            )
+        except Exception as e:
+            logger.error(f"❌ Error en auto-confirmación de resultados: {e}")
+
+    async def run_barrido_salas(self):
+        """Expira salas abandonadas y avisa a sus suscriptores WebSocket"""
+        from .sala_service import SalaService, invalidar_salas_abiertas
+        from .matchmaking_service import indice_matchmaking
+        from ..websocket.connection_manager import manager
+        from ..websocket.estado_salas import estado_salas
+        
+        def _ejecutar():
+            # Un solo worker barre: el resto ve el lock tomado y sigue
+            with lock_consultivo(LOCK_BARRIDO_SALAS) as obtenido:
+                if not obtenido:
+                    return None
+                db = SessionLocal()
+                try:
+                    resumen = SalaService.barrer_salas(db)
+                    if resumen["cerradas"]:
+                        indice_matchmaking.refrescar_salas(db, [id_sala for id_sala, _, _ in resumen["cerradas"]])
+                    return resumen
+                finally:
+                    db.close()
+        
+        try:
+            resumen = await asyncio.to_thread(_ejecutar)
+        except Exception as e:
+            logger.error(f"❌ Error en barrido de salas: {e}")
+            return
+        
+        if resumen is None:
+            logger.info("⏭️ Barrido de salas en curso en otro worker")
+            return
+        
+        if resumen["cerradas"]:
+            invalidar_salas_abiertas()
+        for id_sala, estado, version in resumen["cerradas"]:
+            await estado_salas.publicar(id_sala, version)
+            try:
+                await manager.notify_sala_cerrada(str(id_sala), {"estado": estado})
+            except Exception as e:
+                logger.warning(f"Error notificando cierre de sala {id_sala}: {e}")
+        
+        self.last_barrido_salas = {
+            "expiradas": resumen["expiradas"],
+            "finalizadas": resumen["finalizadas"],
+            "fecha": datetime.now().isoformat()
+        }
+        logger.info(
+            f"✅ Barrido de salas: {resumen['expiradas']} expiradas, "
+            f"{resumen['finalizadas']} finalizadas"
+        )
+
 # Instancia global del servicio
 scheduler_service = ScheduledTasksService()
 
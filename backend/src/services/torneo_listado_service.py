@@ -0,0 +1,142 @@
+"""
+Listado público de torneos paginado, con conteo agrupado y caché
+
+GET /torneos hacía un COUNT de torneos_parejas por cada torneo de la página
+(hasta 100) y no usaba el caché. Ahora:
+
+- la página sale por keyset sobre (created_at, id) descendente: el cursor
+  es opaco (mismo formato que los listados de salas) y va en el header
+  X-Siguiente-Cursor, así la respuesta sigue siendo la lista de siempre
+- las parejas inscriptas de toda la página salen de una sola query
+  agrupada por torneo_id
+- cada página (filtros + cursor + límite) se cachea CACHE_TTL
+  ["torneos_activos"] segundos bajo el prefijo de invalidate_torneo_cache
+
+Cualquier alta / cambio / baja de un Torneo o una TorneoPareja por la
+sesión (ORM o update en bloque) descarta las páginas al hacer commit.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, tuple_
+from sqlalchemy.orm import Session, object_session
+
+from ..models.torneo_models import Torneo, TorneoPareja
+from ..utils.cache import cache, CACHE_TTL, invalidate_torneo_cache
+from .sala_service import codificar_cursor, decodificar_cursor
+
+ESTADOS_PAREJA_INSCRIPTA = ('inscripta', 'confirmada')
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 100
+
+# Clave en session.info: hubo cambios en torneos o parejas en la transacción
+CLAVE_TORNEOS_MODIFICADOS = "torneos_modificados"
+TABLAS_LISTADO = (Torneo.__tablename__, TorneoPareja.__tablename__)
+
+
+def _torneo_dict(torneo: Torneo, parejas_inscritas: int) -> Dict:
+    return {
+        "id": torneo.id,
+        "nombre": torneo.nombre,
+        "descripcion": torneo.descripcion,
+        "tipo": torneo.tipo,
+        "categoria": torneo.categoria,
+        "genero": torneo.genero or 'masculino',
+        "estado": torneo.estado,
+        "fecha_inicio": torneo.fecha_inicio.isoformat() if torneo.fecha_inicio else None,
+        "fecha_fin": torneo.fecha_fin.isoformat() if torneo.fecha_fin else None,
+        "lugar": torneo.lugar,
+        "created_at": torneo.created_at.isoformat() if torneo.created_at else None,
+        "parejas_inscritas": parejas_inscritas
+    }
+
+
+class TorneoListadoService:
+    """Páginas del listado público de torneos"""
+
+    @staticmethod
+    def contar_parejas(db: Session, ids_torneos: List[int]) -> Dict[int, int]:
+        """Parejas inscriptas o confirmadas por torneo, en una query agrupada"""
+        if not ids_torneos:
+            return {}
+        return dict(
+            db.query(TorneoPareja.torneo_id, func.count(TorneoPareja.id)).filter(
+                TorneoPareja.torneo_id.in_(ids_torneos),
+                TorneoPareja.estado.in_(ESTADOS_PAREJA_INSCRIPTA)
+            ).group_by(TorneoPareja.torneo_id).all()
+        )
+
+    @staticmethod
+    def listar(db: Session, estado: Optional[str] = None, categoria: Optional[str] = None,
+               cursor: Optional[str] = None, limite: int = LIMITE_POR_DEFECTO,
+               saltar: int = 0) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Una página de torneos (del más nuevo al más viejo) y el cursor de la siguiente.
+
+        Raises:
+            ValueError: si el cursor no es válido
+        """
+        clave = f"torneos_activos:lista:{estado or ''}:{categoria or ''}:{cursor or ''}:{limite}:{saltar}"
+        pagina = cache.get(clave)
+        if pagina is not None:
+            return pagina
+
+        query = db.query(Torneo)
+        if estado:
+            query = query.filter(Torneo.estado == estado)
+        if categoria:
+            query = query.filter(Torneo.categoria == categoria)
+        if cursor:
+            creado, id_torneo = decodificar_cursor(cursor)
+            query = query.filter(tuple_(Torneo.created_at, Torneo.id) < (creado, id_torneo))
+
+        query = query.order_by(Torneo.created_at.desc(), Torneo.id.desc())
+        if saltar:
+            query = query.offset(saltar)  # compatibilidad con ?skip=
+        torneos = query.limit(limite + 1).all()
+
+        siguiente = None
+        if len(torneos) > limite:
+            torneos = torneos[:limite]
+            siguiente = codificar_cursor(torneos[-1].created_at, torneos[-1].id)
+
+        parejas = TorneoListadoService.contar_parejas(db, [t.id for t in torneos])
+        pagina = ([_torneo_dict(t, parejas.get(t.id, 0)) for t in torneos], siguiente)
+        cache.set(clave, pagina, CACHE_TTL["torneos_activos"])
+        return pagina
+
+
+# ------------------------- invalidación -------------------------
+
+def _marcar(session: Optional[Session]) -> None:
+    if session is not None:
+        session.info[CLAVE_TORNEOS_MODIFICADOS] = True
+
+
+def _torneo_o_pareja_modificado(mapper, connection, objeto):
+    _marcar(object_session(objeto))
+
+
+for _modelo in (Torneo, TorneoPareja):
+    for _evento in ("after_insert", "after_update", "after_delete"):
+        event.listen(_modelo, _evento, _torneo_o_pareja_modificado)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _cambio_en_bloque(estado):
+    if estado.is_update or estado.is_delete or estado.is_insert:
+        tabla = getattr(estado.statement, "table", None)
+        if tabla is not None and getattr(tabla, "name", None) in TABLAS_LISTADO:
+            _marcar(estado.session)
+
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session):
+    if session.info.pop(CLAVE_TORNEOS_MODIFICADOS, False):
+        invalidate_torneo_cache()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _despues_de_rollback(session, transaccion_previa):
+    if transaccion_previa.parent is None:
+        session.info.pop(CLAVE_TORNEOS_MODIFICADOS, None)
@@ -408,6 +408,9 @@ class TorneoPlayoffService:
                 if finales_pendientes == 0:
                     torneo.estado = EstadoTorneo.FINALIZADO
                     db.commit()
+                    
+                    from ..services.torneo_snapshot_service import TorneoSnapshotService
+                    TorneoSnapshotService.publicar_seguro(db, partido.id_torneo)
             return None
         
         # Determinar siguiente fase
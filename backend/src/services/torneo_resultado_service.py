@@ -11,6 +11,8 @@ logger = logging.getLogger(__name__)
 from ..models.driveplus_models import Partido
 from ..models.torneo_models import TorneoPareja, TorneoZona
 from ..services.categoria_service import actualizar_categoria_usuario
+from ..services.historial_partidos_service import HistorialPartidosService
+from ..utils.resultado_parser import ResultadoParser
 
 
 class TorneoResultadoService:
@@ -50,6 +52,7 @@ class TorneoResultadoService:
         
         # Validar resultado
         TorneoResultadoService._validar_resultado(resultado_data)
+        numerico = ResultadoParser.parsear(resultado_data)
         
         # Determinar ganador
         ganador_pareja_id = TorneoResultadoService._determinar_ganador(
@@ -58,8 +61,10 @@ class TorneoResultadoService:
         
         # Actualizar partido
         partido.resultado_padel = resultado_data
+        ResultadoParser.aplicar_a_partido(partido, numerico)
         partido.estado = 'confirmado'  # Usar 'confirmado' en lugar de 'finalizado'
         partido.ganador_pareja_id = ganador_pareja_id
+        HistorialPartidosService.registrar(db, partido)
         
         # Aplicar ELO y actualizar estadísticas de jugadores
         try:
@@ -75,6 +80,9 @@ class TorneoResultadoService:
         db.commit()
         db.refresh(partido)
         
+        # Feed en vivo: resultado y posiciones de la zona
+        TorneoResultadoService._publicar_resultado(db, partido)
+        
         # Si es partido de playoffs, avanzar ganador a siguiente fase
         if partido.fase and partido.fase != 'zona':
             TorneoResultadoService._avanzar_ganador_playoff(db, partido, ganador_pareja_id)
@@ -85,6 +93,24 @@ class TorneoResultadoService:
         
         return partido
     
+    @staticmethod
+    def _publicar_resultado(db: Session, partido: Partido) -> None:
+        """Publica en /ws/torneos el resultado y, si es de zona, la tabla actualizada"""
+        from ..websocket.torneo_feed import feed_torneos, delta_partido, deltas_tabla
+        if not feed_torneos.activo:
+            return
+        
+        try:
+            deltas = [delta_partido(partido, "resultado")]
+            if partido.zona_id:
+                from ..services.torneo_zona_service import TorneoZonaService
+                tabla = TorneoZonaService.obtener_tabla_posiciones(db, partido.zona_id)["tabla"]
+                deltas += deltas_tabla(partido.zona_id, tabla)
+            feed_torneos.publicar(partido.id_torneo, deltas)
+        except Exception as e:
+            # El feed nunca debe romper la carga del resultado
+            logger.warning(f"Error publicando resultado en feed de torneo: {e}")
+    
     @staticmethod
     def _verificar_auto_playoffs(db: Session, torneo_id: int) -> bool:
         """
@@ -142,11 +168,30 @@ class TorneoResultadoService:
                 clasificados_por_zona=2
             )
             logger.info(f"Playoffs auto-generados exitosamente para torneo {torneo_id}")
+            TorneoResultadoService._publicar_cuadro(db, torneo_id)
             return True
         except Exception as e:
             logger.error(f"Error auto-generando playoffs: {e}")
             return False
     
+    @staticmethod
+    def _publicar_cuadro(db: Session, torneo_id: int) -> None:
+        """Publica en /ws/torneos el cuadro de playoffs recién generado"""
+        from ..models.torneo_models import Torneo
+        from ..websocket.torneo_feed import feed_torneos, delta_partido
+        if not feed_torneos.activo:
+            return
+        
+        partidos = db.query(Partido).filter(
+            Partido.id_torneo == torneo_id,
+            Partido.fase != 'zona',
+            Partido.fase.isnot(None)
+        ).all()
+        estado = db.query(Torneo.estado).filter(Torneo.id == torneo_id).scalar()
+        feed_torneos.publicar(torneo_id, [delta_partido(p, "cuadro") for p in partidos] + [
+            {"e": "torneo", "id": torneo_id, "k": "torneo", "v": {"estado": estado}}
+        ])
+    
     @staticmethod
     def _avanzar_ganador_playoff(
         db: Session,
@@ -175,6 +220,10 @@ class TorneoResultadoService:
                 torneo.estado = 'finalizado'  # String en lugar de Enum
                 db.commit()
                 logger.info(f"Torneo {partido.id_torneo} marcado como finalizado")
+                from ..websocket.torneo_feed import feed_torneos
+                feed_torneos.publicar(partido.id_torneo, [
+                    {"e": "torneo", "id": partido.id_torneo, "k": "torneo", "v": {"estado": "finalizado"}}
+                ])
             return None
         
         # Determinar siguiente fase
@@ -228,6 +277,9 @@ class TorneoResultadoService:
         db.commit()
         db.refresh(partido_siguiente)
         
+        from ..websocket.torneo_feed import feed_torneos, delta_partido
+        feed_torneos.publicar(partido.id_torneo, [delta_partido(partido_siguiente, "cuadro")])
+        
         logger.info(f"Partido siguiente actualizado: pareja1={partido_siguiente.pareja1_id}, pareja2={partido_siguiente.pareja2_id}")
         
         # Verificar si el partido siguiente ya tiene ambas parejas y una es de bye
@@ -419,12 +471,12 @@ class TorneoResultadoService:
         resultado = partido.resultado_padel
         sets = resultado.get('sets', [])
         
-        # Calcular estadísticas
-        total_games_a = sum(s.get('gamesEquipoA', 0) for s in sets)
-        total_games_b = sum(s.get('gamesEquipoB', 0) for s in sets)
-        
-        sets_a = sum(1 for s in sets if s.get('ganador') == 'equipoA')
-        sets_b = sum(1 for s in sets if s.get('ganador') == 'equipoB')
+        # Estadísticas desde las columnas numéricas
+        numerico = ResultadoParser.desde_partido(partido)
+        total_games_a = numerico["games_eq1"]
+        total_games_b = numerico["games_eq2"]
+        sets_a = numerico["sets_eq1"]
+        sets_b = numerico["sets_eq2"]
         
         return {
             "partido_id": partido_id,
@@ -467,6 +519,7 @@ class TorneoResultadoService:
         
         # Validar nuevo resultado
         TorneoResultadoService._validar_resultado(nuevo_resultado)
+        numerico = ResultadoParser.parsear(nuevo_resultado)
         
         # Determinar nuevo ganador
         ganador_pareja_id = TorneoResultadoService._determinar_ganador(
@@ -475,11 +528,20 @@ class TorneoResultadoService:
         
         # Actualizar
         partido.resultado_padel = nuevo_resultado
+        ResultadoParser.aplicar_a_partido(partido, numerico)
         partido.ganador_pareja_id = ganador_pareja_id
+        # Si cambió el ganador, los récords entre jugadores se rehacen
+        HistorialPartidosService.registrar(db, partido)
         
         db.commit()
         db.refresh(partido)
         
+        TorneoResultadoService._publicar_resultado(db, partido)
+        
+        # Corrección sobre un torneo finalizado: rearmar su snapshot
+        from ..services.torneo_snapshot_service import TorneoSnapshotService
+        TorneoSnapshotService.republicar_si_existe(db, partido.id_torneo)
+        
         return partido
 
     @staticmethod
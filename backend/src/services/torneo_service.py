@@ -185,6 +185,8 @@ class TorneoService:
         if not torneo:
             raise ValueError("Torneo no encontrado")
         
+        estaba_finalizado = getattr(torneo.estado, "value", torneo.estado) == EstadoTorneo.FINALIZADO.value
+        
         # Actualizar campos
         if torneo_data.nombre is not None:
             torneo.nombre = torneo_data.nombre
@@ -217,6 +219,14 @@ class TorneoService:
         db.commit()
         db.refresh(torneo)
         
+        # Torneo finalizado editado: rearmar su snapshot, o descartarlo si se reabrió
+        if estaba_finalizado:
+            from ..services.torneo_snapshot_service import TorneoSnapshotService
+            if getattr(torneo.estado, "value", torneo.estado) == EstadoTorneo.FINALIZADO.value:
+                TorneoSnapshotService.republicar_si_existe(db, torneo_id)
+            else:
+                TorneoSnapshotService.descartar(torneo_id)
+        
         return torneo
     
     @staticmethod
@@ -399,4 +409,9 @@ class TorneoService:
         db.commit()
         db.refresh(torneo)
         
+        # Torneo cerrado: sus vistas públicas se sirven desde un snapshot
+        if nuevo_estado == EstadoTorneo.FINALIZADO.value:
+            from ..services.torneo_snapshot_service import TorneoSnapshotService
+            TorneoSnapshotService.publicar_seguro(db, torneo_id)
+        
         return torneo
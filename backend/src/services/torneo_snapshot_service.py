@@ -0,0 +1,191 @@
+"""
+Snapshots inmutables de torneos finalizados
+
+Un torneo finalizado no cambia, pero /torneos/{id}/partidos, /zonas,
+/playoffs y /vista seguían yendo a la base en cada visita. Cuando el torneo
+pasa a finalizado se renderiza una vez cada vista pública (el mismo JSON que
+devuelve el endpoint sin filtros) y se guarda precomprimida en disco:
+
+    {TORNEO_SNAPSHOTS_DIR}/torneo_{id}/{vista}.json.gz   (y .json.br si hay brotli)
+    {TORNEO_SNAPSHOTS_DIR}/torneo_{id}/meta.json        ETag por vista
+
+Los endpoints la sirven tal cual (Content-Encoding según Accept-Encoding,
+ETag y Cache-Control largo) sin tocar la base. Solo se reconstruye si un
+organizador corrige un resultado (corregir_resultado) o edita el torneo, y
+se descarta si el torneo deja de estar finalizado. Los archivos se
+escriben a un temporal y se renombran: un worker nunca lee uno a medias.
+El directorio puede ser un bucket montado para compartirlo entre instancias.
+"""
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from .torneo_vista_service import TorneoVistaService, etag_coincide
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli se publica solo gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_DIR = os.getenv("TORNEO_SNAPSHOTS_DIR", "snapshots/torneos")
+
+# Se publica dentro del request que finaliza el torneo: la calidad 11 (la
+# default) tarda decenas de veces más que 5 y comprime apenas un poco mejor
+CALIDAD_BROTLI = 5
+
+# Un día: el ETag permite revalidar si hubo una corrección
+CACHE_CONTROL_SNAPSHOT = "public, max-age=86400"
+
+# nombre de la vista -> función (db, torneo_id) que arma el mismo contenido que el endpoint
+RENDERIZADORES: Dict[str, Callable[[Session, int], object]] = {
+    "vista": lambda db, torneo_id: TorneoVistaService.armar(db, torneo_id),
+}
+
+
+def _directorio(torneo_id: int) -> str:
+    return os.path.join(SNAPSHOTS_DIR, f"torneo_{torneo_id}")
+
+
+def _escribir(ruta: str, contenido: bytes) -> None:
+    # Un temporal propio por escritura: dos publicaciones simultáneas (fin
+    # automático del playoff y cambiar_estado, u otro worker) no se pisan
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix=".tmp-")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(contenido)
+        os.chmod(temporal, 0o644)  # mkstemp lo crea 0600
+        os.replace(temporal, ruta)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporal)
+        raise
+
+
+def _serializar(contenido) -> bytes:
+    """Los mismos bytes que JSONResponse"""
+    return json.dumps(
+        jsonable_encoder(contenido), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class TorneoSnapshotService:
+    """Publicación y lectura de snapshots de torneos finalizados"""
+
+    _metas: Dict[int, tuple] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def registrar(nombre: str, renderizador: Callable[[Session, int], object]) -> None:
+        """Agrega una vista al snapshot (los controllers registran sus listados)"""
+        RENDERIZADORES[nombre] = renderizador
+
+    @staticmethod
+    def publicar(db: Session, torneo_id: int) -> Dict[str, str]:
+        """
+        Renderiza y guarda todas las vistas del torneo. Devuelve {vista: etag}.
+        Una vista que falla al renderizar queda afuera (se sigue sirviendo de la base).
+        """
+        directorio = _directorio(torneo_id)
+        os.makedirs(directorio, exist_ok=True)
+
+        etags = {}
+        for nombre, renderizar in RENDERIZADORES.items():
+            try:
+                crudo = _serializar(renderizar(db, torneo_id))
+            except Exception as e:
+                logger.warning(f"Snapshot torneo {torneo_id}: no se pudo renderizar '{nombre}': {e}")
+                continue
+            _escribir(os.path.join(directorio, f"{nombre}.json.gz"), gzip.compress(crudo, compresslevel=9))
+            if brotli is not None:
+                _escribir(os.path.join(directorio, f"{nombre}.json.br"), brotli.compress(crudo, quality=CALIDAD_BROTLI))
+            etags[nombre] = f'"snap-{torneo_id}-{hashlib.sha256(crudo).hexdigest()[:16]}"'
+
+        # meta.json al final: hasta acá los lectores siguen con los ETag anteriores
+        _escribir(os.path.join(directorio, "meta.json"), json.dumps({"etags": etags}).encode())
+        return etags
+
+    @staticmethod
+    def publicar_seguro(db: Session, torneo_id: int) -> None:
+        """publicar() sin propagar errores: el snapshot es una optimización"""
+        try:
+            TorneoSnapshotService.publicar(db, torneo_id)
+        except Exception as e:
+            logger.error(f"Error publicando snapshot del torneo {torneo_id}: {e}")
+
+    @staticmethod
+    def republicar_si_existe(db: Session, torneo_id: int) -> None:
+        """Reconstruye el snapshot después de una corrección (si el torneo ya tenía uno)"""
+        if torneo_id is not None and TorneoSnapshotService._meta(torneo_id) is not None:
+            TorneoSnapshotService.publicar_seguro(db, torneo_id)
+
+    @staticmethod
+    def descartar(torneo_id: int) -> None:
+        """Borra el snapshot (torneo reabierto): las vistas vuelven a la base"""
+        shutil.rmtree(_directorio(torneo_id), ignore_errors=True)
+        with TorneoSnapshotService._lock:
+            TorneoSnapshotService._metas.pop(torneo_id, None)
+
+    @staticmethod
+    def _meta(torneo_id: int) -> Optional[Dict]:
+        """meta.json del torneo, releído solo si cambió en disco"""
+        ruta = os.path.join(_directorio(torneo_id), "meta.json")
+        try:
+            modificado = os.stat(ruta).st_mtime_ns
+        except OSError:
+            return None
+        with TorneoSnapshotService._lock:
+            guardado = TorneoSnapshotService._metas.get(torneo_id)
+            if guardado and guardado[0] == modificado:
+                return guardado[1]
+        try:
+            with open(ruta, "rb") as archivo:
+                meta = json.loads(archivo.read())
+        except (OSError, ValueError):
+            return None
+        with TorneoSnapshotService._lock:
+            TorneoSnapshotService._metas[torneo_id] = (modificado, meta)
+        return meta
+
+    @staticmethod
+    def respuesta(torneo_id: int, nombre: str, accept_encoding: Optional[str] = None,
+                  if_none_match: Optional[str] = None) -> Optional[Response]:
+        """Response con el snapshot de la vista, o None si el torneo no tiene"""
+        meta = TorneoSnapshotService._meta(torneo_id)
+        etag = meta["etags"].get(nombre) if meta else None
+        if etag is None:
+            return None
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL_SNAPSHOT, "Vary": "Accept-Encoding"}
+        if etag_coincide(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        aceptadas = {c.split(";")[0].strip() for c in (accept_encoding or "").lower().split(",")}
+        base = os.path.join(_directorio(torneo_id), f"{nombre}.json")
+        try:
+            if "br" in aceptadas and os.path.exists(f"{base}.br"):
+                codificacion, ruta = "br", f"{base}.br"
+            else:
+                codificacion, ruta = "gzip", f"{base}.gz"
+            with open(ruta, "rb") as archivo:
+                contenido = archivo.read()
+        except OSError:
+            return None
+
+        if codificacion == "gzip" and "gzip" not in aceptadas:
+            contenido, codificacion = gzip.decompress(contenido), None
+        if codificacion:
+            headers["Content-Encoding"] = codificacion
+        return Response(content=contenido, media_type="application/json", headers=headers)
@@ -0,0 +1,380 @@
+"""
+Vista completa de un torneo en una sola respuesta (GET /torneos/{id}/vista)
+
+Abrir un torneo en la app pedía /torneos/{id}, /categorias, /parejas,
+/zonas, una /tabla por zona, /partidos y /playoffs, y cada uno volvía a
+cargar parejas y perfiles. La vista se arma de un contexto precargado
+compartido, con una query por tabla (torneo, categorías, parejas, perfiles,
+zonas, asignaciones, partidos), y las tablas de posiciones se calculan en
+memoria con las mismas reglas que TorneoZonaService.obtener_tabla_posiciones.
+
+Para no repetir strings:
+
+- nombres: {pareja_id: "Nombre Apellido / Nombre Apellido"} una sola vez;
+  partidos, zonas y tablas solo llevan ids
+- disponibilidades: lista de valores distintos de disponibilidad_horaria;
+  cada pareja lleva el índice (o None)
+- playoffs: {categoria_id: {fase: [id_partido, ...]}} apuntando a partidos
+
+Versión: torneos.version sube (en la misma transacción) con cualquier alta,
+cambio o baja del torneo, sus categorías, parejas, zonas, asignaciones o
+partidos, por ORM o en bloque. El ETag sale de esa versión: si el cliente ya
+la tiene se contesta 304 con una sola query, y la vista armada se cachea
+por (torneo, versión). Cambios de nombre en los perfiles no suben la versión.
+"""
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from ..models.driveplus_models import Partido, PerfilUsuario
+from ..models.torneo_models import Torneo, TorneoCategoria, TorneoPareja, TorneoZona, TorneoZonaPareja
+from ..utils.cache import cache, CACHE_TTL
+
+ESTADOS_PAREJA_INSCRIPTA = ('inscripta', 'confirmada')
+
+# Fases de playoffs tal como las agrupa TorneoPlayoffService.listar_partidos_playoffs
+FASES_PLAYOFF = {
+    '16avos': '16avos', '8vos': '8vos', '4tos': '4tos', 'cuartos': '4tos',
+    'semis': 'semis', 'semifinal': 'semis', 'final': 'final'
+}
+
+# Clave en session.info con los torneos a los que hay que subir la versión
+CLAVE_TORNEOS_VERSION = "torneos_version"
+
+
+def _valor(valor):
+    if hasattr(valor, "value"):
+        return valor.value
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+
+def etag_vista(torneo_id: int, version: int) -> str:
+    return f'"torneo-{torneo_id}-v{version}"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """True si el header If-None-Match incluye el ETag (o es *)"""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato in ("*", etag):
+            return True
+    return False
+
+
+def _tabla_zona(asignaciones: List[TorneoZonaPareja], parejas: Dict[int, TorneoPareja],
+                partidos: List[Partido]) -> List[Dict]:
+    """Tabla de posiciones de una zona a partir de sus partidos ya cargados"""
+    tabla = []
+    indices = {}
+    for asignacion in asignaciones:
+        indices[asignacion.pareja_id] = len(tabla)
+        tabla.append({
+            'pareja_id': asignacion.pareja_id,
+            'eliminada': asignacion.pareja_id not in parejas,
+            'partidos_jugados': 0,
+            'partidos_ganados': 0,
+            'partidos_perdidos': 0,
+            'sets_ganados': 0,
+            'sets_perdidos': 0,
+            'games_ganados': 0,
+            'games_perdidos': 0,
+            'puntos': 0
+        })
+
+    # Solo partidos confirmados con las dos parejas en la zona
+    for partido in partidos:
+        if partido.estado != 'confirmado' or partido.pareja1_id not in indices or partido.pareja2_id not in indices:
+            continue
+        con_resultado = partido.sets_eq1 is not None
+        lados = (
+            (partido.pareja1_id, partido.pareja2_id, partido.sets_eq1, partido.sets_eq2,
+             partido.games_eq1, partido.games_eq2),
+            (partido.pareja2_id, partido.pareja1_id, partido.sets_eq2, partido.sets_eq1,
+             partido.games_eq2, partido.games_eq1),
+        )
+        for pareja_id, rival_id, sets_propios, sets_rival, games_propios, games_rival in lados:
+            item = tabla[indices[pareja_id]]
+            ganado = con_resultado and partido.ganador_pareja_id == pareja_id
+            perdido = con_resultado and partido.ganador_pareja_id == rival_id
+            item['partidos_jugados'] += 1
+            item['partidos_ganados'] += int(ganado)
+            item['partidos_perdidos'] += int(perdido)
+            item['sets_ganados'] += sets_propios or 0
+            item['sets_perdidos'] += sets_rival or 0
+            item['games_ganados'] += games_propios or 0
+            item['games_perdidos'] += games_rival or 0
+            item['puntos'] += 3 * int(ganado)
+
+    tabla.sort(key=lambda x: (
+        -x['puntos'],
+        -(x['sets_ganados'] - x['sets_perdidos']),
+        -(x['games_ganados'] - x['games_perdidos'])
+    ))
+    for i, item in enumerate(tabla):
+        item['posicion'] = i + 1
+    return tabla
+
+
+class TorneoVistaService:
+    """Vista agregada y versionada de un torneo"""
+
+    @staticmethod
+    def version(db: Session, torneo_id: int) -> Optional[int]:
+        """Versión actual del torneo (None si no existe)"""
+        return db.query(Torneo.version).filter(Torneo.id == torneo_id).scalar()
+
+    @staticmethod
+    def obtener(db: Session, torneo_id: int, version: Optional[int] = None) -> Optional[Dict]:
+        """Vista del torneo, desde el caché si ya se armó para esa versión"""
+        if version is not None:
+            vista = cache.get(f"torneo:{torneo_id}:vista:{version}")
+            if vista is not None:
+                return vista
+
+        vista = TorneoVistaService.armar(db, torneo_id)
+        if vista is not None:
+            cache.set(f"torneo:{torneo_id}:vista:{vista['version']}", vista, CACHE_TTL["torneo_vista"])
+        return vista
+
+    @staticmethod
+    def armar(db: Session, torneo_id: int) -> Optional[Dict]:
+        """Arma la vista con una query por tabla"""
+        torneo = db.query(Torneo).filter(Torneo.id == torneo_id).first()
+        if not torneo:
+            return None
+
+        categorias = db.query(TorneoCategoria).filter(
+            TorneoCategoria.torneo_id == torneo_id
+        ).order_by(TorneoCategoria.orden, TorneoCategoria.id).all()
+        parejas = db.query(TorneoPareja).filter(
+            TorneoPareja.torneo_id == torneo_id
+        ).order_by(TorneoPareja.id).all()
+        zonas = db.query(TorneoZona).filter(
+            TorneoZona.torneo_id == torneo_id
+        ).order_by(TorneoZona.numero_orden, TorneoZona.id).all()
+        asignaciones = db.query(TorneoZonaPareja).filter(
+            TorneoZonaPareja.zona_id.in_([z.id for z in zonas])
+        ).order_by(TorneoZonaPareja.id).all() if zonas else []
+        partidos = db.query(Partido).filter(
+            Partido.id_torneo == torneo_id
+        ).order_by(Partido.numero_partido, Partido.id_partido).all()
+
+        jugadores_ids = {p.jugador1_id for p in parejas} | {p.jugador2_id for p in parejas}
+        perfiles = {
+            p.id_usuario: p for p in db.query(PerfilUsuario).filter(
+                PerfilUsuario.id_usuario.in_(jugadores_ids)
+            ).all()
+        } if jugadores_ids else {}
+
+        # Nombres una sola vez
+        jugadores = {}
+        for id_usuario in sorted(jugadores_ids):
+            perfil = perfiles.get(id_usuario)
+            jugadores[str(id_usuario)] = f"{perfil.nombre} {perfil.apellido}" if perfil else f"Usuario {id_usuario}"
+        nombres = {
+            str(p.id): f"{jugadores[str(p.jugador1_id)]} / {jugadores[str(p.jugador2_id)]}" for p in parejas
+        }
+
+        # Disponibilidades distintas; cada pareja guarda el índice
+        disponibilidades = []
+        indice_disponibilidad = {}
+        parejas_dict = {}
+        parejas_por_categoria = {}
+        for pareja in parejas:
+            indice = None
+            if pareja.disponibilidad_horaria is not None:
+                clave = json.dumps(pareja.disponibilidad_horaria, sort_keys=True, default=str)
+                if clave not in indice_disponibilidad:
+                    indice_disponibilidad[clave] = len(disponibilidades)
+                    disponibilidades.append(pareja.disponibilidad_horaria)
+                indice = indice_disponibilidad[clave]
+            parejas_dict[pareja.id] = {
+                "id": pareja.id,
+                "categoria_id": pareja.categoria_id,
+                "jugador1_id": pareja.jugador1_id,
+                "jugador2_id": pareja.jugador2_id,
+                "estado": _valor(pareja.estado),
+                "categoria_asignada": pareja.categoria_asignada,
+                "disponibilidad": indice,
+                "created_at": _valor(pareja.created_at)
+            }
+            if pareja.estado in ESTADOS_PAREJA_INSCRIPTA:
+                parejas_por_categoria[pareja.categoria_id] = parejas_por_categoria.get(pareja.categoria_id, 0) + 1
+
+        parejas_modelo = {p.id: p for p in parejas}
+        asignaciones_por_zona = {}
+        for asignacion in asignaciones:
+            asignaciones_por_zona.setdefault(asignacion.zona_id, []).append(asignacion)
+        partidos_por_zona = {}
+        playoffs = {}
+        for partido in partidos:
+            if partido.zona_id is not None:
+                partidos_por_zona.setdefault(partido.zona_id, []).append(partido)
+            fase = FASES_PLAYOFF.get(partido.fase)
+            if fase:
+                por_fase = playoffs.setdefault(str(partido.categoria_id or ''), {})
+                por_fase.setdefault(fase, []).append(partido.id_partido)
+
+        return {
+            "version": torneo.version,
+            "torneo": {
+                "id": torneo.id,
+                "nombre": torneo.nombre,
+                "descripcion": torneo.descripcion,
+                "tipo": _valor(torneo.tipo),
+                "categoria": torneo.categoria,
+                "genero": torneo.genero or 'masculino',
+                "estado": _valor(torneo.estado),
+                "fecha_inicio": _valor(torneo.fecha_inicio),
+                "fecha_fin": _valor(torneo.fecha_fin),
+                "lugar": torneo.lugar,
+                "reglas_json": torneo.reglas_json,
+                "horarios_disponibles": torneo.horarios_disponibles,
+                "creado_por": torneo.creado_por,
+                "created_at": _valor(torneo.created_at),
+                "updated_at": _valor(torneo.updated_at),
+                "parejas_inscritas": sum(parejas_por_categoria.values())
+            },
+            "categorias": [
+                {
+                    "id": c.id,
+                    "nombre": c.nombre,
+                    "genero": c.genero,
+                    "max_parejas": c.max_parejas,
+                    "estado": c.estado,
+                    "orden": c.orden,
+                    "parejas_inscritas": parejas_por_categoria.get(c.id, 0)
+                }
+                for c in categorias
+            ],
+            "jugadores": jugadores,
+            "nombres": nombres,
+            "disponibilidades": disponibilidades,
+            "parejas": list(parejas_dict.values()),
+            "zonas": [
+                {
+                    "id": z.id,
+                    "nombre": z.nombre,
+                    "numero": z.numero_orden,
+                    "categoria_id": z.categoria_id,
+                    "parejas": [a.pareja_id for a in asignaciones_por_zona.get(z.id, [])],
+                    "tabla": _tabla_zona(asignaciones_por_zona.get(z.id, []), parejas_modelo,
+                                         partidos_por_zona.get(z.id, []))
+                }
+                for z in zonas
+            ],
+            "partidos": [
+                {
+                    "id_partido": p.id_partido,
+                    "numero_partido": p.numero_partido,
+                    "pareja1_id": p.pareja1_id,
+                    "pareja2_id": p.pareja2_id,
+                    "zona_id": p.zona_id,
+                    "categoria_id": p.categoria_id,
+                    "fase": p.fase,
+                    "estado": _valor(p.estado),
+                    "fecha_hora": _valor(p.fecha_hora),
+                    "cancha_id": p.cancha_id,
+                    "ganador_pareja_id": p.ganador_pareja_id,
+                    "resultado_padel": p.resultado_padel
+                }
+                for p in partidos
+            ],
+            "playoffs": playoffs
+        }
+
+
+# ------------------------- versión -------------------------
+
+def _marcar(session: Session, torneos_ids) -> None:
+    ids = {t for t in torneos_ids if t is not None}
+    if ids:
+        session.info.setdefault(CLAVE_TORNEOS_VERSION, set()).update(ids)
+
+
+def _torneo_de(session: Session, objeto) -> Optional[int]:
+    if isinstance(objeto, Torneo):
+        return objeto.id
+    if isinstance(objeto, (TorneoCategoria, TorneoPareja, TorneoZona)):
+        return objeto.torneo_id
+    if isinstance(objeto, Partido):
+        return objeto.id_torneo
+    if isinstance(objeto, TorneoZonaPareja):
+        zona = session.get(TorneoZona, objeto.zona_id) if objeto.zona_id else None
+        return zona.torneo_id if zona else None
+    return None
+
+
+@event.listens_for(Session, "before_flush")
+def _antes_de_flush(session, contexto, instancias):
+    objetos = list(session.new) + list(session.deleted) + [
+        o for o in session.dirty if session.is_modified(o, include_collections=False)
+    ]
+    # El alta de un torneo ya nace con versión 1
+    _marcar(session, (_torneo_de(session, o) for o in objetos if not (isinstance(o, Torneo) and o in session.new)))
+
+
+# Tablas cuyos cambios en bloque suben la versión, con la query que dice de qué torneos son
+_TORNEOS_DE_TABLA = {
+    Torneo.__tablename__: lambda: select(Torneo.id),
+    TorneoCategoria.__tablename__: lambda: select(TorneoCategoria.torneo_id),
+    TorneoPareja.__tablename__: lambda: select(TorneoPareja.torneo_id),
+    TorneoZona.__tablename__: lambda: select(TorneoZona.torneo_id),
+    TorneoZonaPareja.__tablename__: lambda: select(TorneoZona.torneo_id).join(
+        TorneoZonaPareja, TorneoZonaPareja.zona_id == TorneoZona.id),
+    Partido.__tablename__: lambda: select(Partido.id_torneo).where(Partido.id_torneo.isnot(None)),
+}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _cambio_en_bloque(estado):
+    if not (estado.is_update or estado.is_delete):
+        return
+    tabla = getattr(estado.statement, "table", None)
+    consulta = _TORNEOS_DE_TABLA.get(getattr(tabla, "name", None))
+    if consulta is None:
+        return
+    # Antes de ejecutar: las filas borradas todavía están
+    consulta = consulta().distinct()
+    if estado.statement.whereclause is not None:
+        consulta = consulta.where(estado.statement.whereclause)
+    _marcar(estado.session, estado.session.execute(consulta).scalars().all())
+
+
+def _subir_versiones(session: Session) -> None:
+    ids = session.info.pop(CLAVE_TORNEOS_VERSION, None)
+    if not ids:
+        return
+    session.connection().execute(
+        update(Torneo.__table__).where(Torneo.__table__.c.id.in_(ids)).values(
+            version=Torneo.__table__.c.version + 1,
+            updated_at=Torneo.__table__.c.updated_at  # no cuenta como edición del torneo
+        )
+    )
+    for torneo_id in ids:
+        torneo = session.identity_map.get(session.identity_key(Torneo, torneo_id))
+        if torneo is not None:
+            session.expire(torneo, ["version"])
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _despues_de_flush(session, contexto):
+    _subir_versiones(session)
+
+
+@event.listens_for(Session, "before_commit")
+def _antes_de_commit(session):
+    # Cambios en bloque después del último flush
+    _subir_versiones(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _despues_de_rollback(session, transaccion_previa):
+    if transaccion_previa.parent is None:
+        session.info.pop(CLAVE_TORNEOS_VERSION, None)
@@ -2,7 +2,7 @@
 Servicio para gestión de zonas en torneos
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, union_all
 from typing import List, Optional
 import random
 from ..models.torneo_models import Torneo, TorneoZona, TorneoPareja, TorneoZonaPareja
@@ -298,6 +298,56 @@ class TorneoZonaService:
         
         return resultado
     
+    @staticmethod
+    def _estadisticas_partidos_zona(db: Session, zona: TorneoZona, parejas_ids: List[int]):
+        """
+        Una fila por pareja con jugados, ganados, perdidos, sets y games de
+        los partidos confirmados de la zona. Solo cuenta partidos cuyas dos
+        parejas están en la zona; sets/games/ganador solo si hay resultado.
+        """
+        from ..models.driveplus_models import Partido
+        
+        if not parejas_ids:
+            return []
+        
+        base = db.query(Partido).filter(
+            Partido.id_torneo == zona.torneo_id,
+            Partido.zona_id == zona.id,
+            Partido.estado == 'confirmado',
+            Partido.pareja1_id.in_(parejas_ids),
+            Partido.pareja2_id.in_(parejas_ids)
+        )
+        con_resultado = Partido.sets_eq1.isnot(None)
+        
+        def lado(pareja_col, rival_col, sets_propios, sets_rival, games_propios, games_rival):
+            return base.with_entities(
+                pareja_col.label('pareja_id'),
+                case((con_resultado & (Partido.ganador_pareja_id == pareja_col), 1), else_=0).label('ganado'),
+                case((con_resultado & (Partido.ganador_pareja_id == rival_col), 1), else_=0).label('perdido'),
+                func.coalesce(sets_propios, 0).label('sets_ganados'),
+                func.coalesce(sets_rival, 0).label('sets_perdidos'),
+                func.coalesce(games_propios, 0).label('games_ganados'),
+                func.coalesce(games_rival, 0).label('games_perdidos')
+            )
+        
+        lados = union_all(
+            lado(Partido.pareja1_id, Partido.pareja2_id, Partido.sets_eq1, Partido.sets_eq2,
+                 Partido.games_eq1, Partido.games_eq2).statement,
+            lado(Partido.pareja2_id, Partido.pareja1_id, Partido.sets_eq2, Partido.sets_eq1,
+                 Partido.games_eq2, Partido.games_eq1).statement
+        ).subquery()
+        
+        return db.query(
+            lados.c.pareja_id,
+            func.count().label('jugados'),
+            func.sum(lados.c.ganado).label('ganados'),
+            func.sum(lados.c.perdido).label('perdidos'),
+            func.sum(lados.c.sets_ganados).label('sets_ganados'),
+            func.sum(lados.c.sets_perdidos).label('sets_perdidos'),
+            func.sum(lados.c.games_ganados).label('games_ganados'),
+            func.sum(lados.c.games_perdidos).label('games_perdidos')
+        ).group_by(lados.c.pareja_id).all()
+    
     @staticmethod
     def obtener_tabla_posiciones(db: Session, zona_id: int) -> dict:
         """
@@ -310,8 +360,6 @@ class TorneoZonaService:
         - Games ganados/perdidos
         - Puntos
         """
-        from ..models.driveplus_models import Partido
-        
         zona = db.query(TorneoZona).filter(TorneoZona.id == zona_id).first()
         if not zona:
             raise ValueError("Zona no encontrada")
@@ -361,77 +409,20 @@ class TorneoZonaService:
                     'puntos': 0
                 })
         
-        # Obtener partidos de la zona (confirmados = finalizados)
-        partidos = db.query(Partido).filter(
-            Partido.id_torneo == zona.torneo_id,
-            Partido.zona_id == zona_id,
-            Partido.estado == 'confirmado'
-        ).all()
-        
-        # Calcular estadísticas
-        for partido in partidos:
-            # Usar pareja1_id y pareja2_id directamente
-            pareja_a_id = partido.pareja1_id
-            pareja_b_id = partido.pareja2_id
-            
-            if not pareja_a_id or not pareja_b_id:
-                continue
-            
-            # Encontrar índices en tabla
-            idx_a = next((i for i, p in enumerate(tabla) if p['pareja_id'] == pareja_a_id), None)
-            idx_b = next((i for i, p in enumerate(tabla) if p['pareja_id'] == pareja_b_id), None)
-            
-            if idx_a is None or idx_b is None:
-                continue
-            
-            # Actualizar partidos jugados
-            tabla[idx_a]['partidos_jugados'] += 1
-            tabla[idx_b]['partidos_jugados'] += 1
-            
-            # Obtener resultado
-            if partido.resultado_padel:
-                resultado = partido.resultado_padel
-                sets = resultado.get('sets', [])
-                
-                # Contar sets y games
-                sets_a = 0
-                sets_b = 0
-                games_a = 0
-                games_b = 0
-                
-                for set_data in sets:
-                    if set_data.get('completado'):
-                        games_eq_a = set_data.get('gamesEquipoA', 0)
-                        games_eq_b = set_data.get('gamesEquipoB', 0)
-                        
-                        games_a += games_eq_a
-                        games_b += games_eq_b
-                        
-                        if set_data.get('ganador') == 'equipoA':
-                            sets_a += 1
-                        elif set_data.get('ganador') == 'equipoB':
-                            sets_b += 1
-                
-                # Actualizar estadísticas
-                tabla[idx_a]['sets_ganados'] += sets_a
-                tabla[idx_a]['sets_perdidos'] += sets_b
-                tabla[idx_a]['games_ganados'] += games_a
-                tabla[idx_a]['games_perdidos'] += games_b
-                
-                tabla[idx_b]['sets_ganados'] += sets_b
-                tabla[idx_b]['sets_perdidos'] += sets_a
-                tabla[idx_b]['games_ganados'] += games_b
-                tabla[idx_b]['games_perdidos'] += games_a
-                
-                # Actualizar ganados/perdidos y puntos usando ganador_pareja_id
-                if partido.ganador_pareja_id == pareja_a_id:
-                    tabla[idx_a]['partidos_ganados'] += 1
-                    tabla[idx_a]['puntos'] += 3
-                    tabla[idx_b]['partidos_perdidos'] += 1
-                elif partido.ganador_pareja_id == pareja_b_id:
-                    tabla[idx_b]['partidos_ganados'] += 1
-                    tabla[idx_b]['puntos'] += 3
-                    tabla[idx_a]['partidos_perdidos'] += 1
+        # Estadísticas de los partidos de la zona (confirmados = finalizados),
+        # agregadas en SQL desde las columnas numéricas del resultado
+        indices = {item['pareja_id']: i for i, item in enumerate(tabla)}
+        
+        for fila in TorneoZonaService._estadisticas_partidos_zona(db, zona, list(indices)):
+            item = tabla[indices[fila.pareja_id]]
+            item['partidos_jugados'] += fila.jugados
+            item['partidos_ganados'] += fila.ganados
+            item['partidos_perdidos'] += fila.perdidos
+            item['sets_ganados'] += fila.sets_ganados
+            item['sets_perdidos'] += fila.sets_perdidos
+            item['games_ganados'] += fila.games_ganados
+            item['games_perdidos'] += fila.games_perdidos
+            item['puntos'] += 3 * fila.ganados
         
         # Ordenar tabla por puntos, diferencia de sets, diferencia de games
         tabla.sort(key=lambda x: (
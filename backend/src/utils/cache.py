@@ -95,6 +95,9 @@ CACHE_TTL = {
     "estadisticas": 120,     # Estadísticas globales: 2 minutos
     "torneos_activos": 30,   # Lista de torneos: 30 segundos
     "perfil_usuario": 300,   # Perfil de usuario: 5 minutos
+    "salas_abiertas": 10,    # Página compartida de salas abiertas: 10 segundos
+    "rating_historia": 3600, # Serie reducida (la clave incluye el último id_historial): 1 hora
+    "torneo_vista": 300,     # Vista completa de un torneo (la clave incluye la versión): 5 minutos
     "default": 60
 }
 
@@ -0,0 +1,161 @@
+"""
+Parser único de resultados de pádel
+Convierte los distintos formatos JSON de resultados a valores numéricos
+(sets, games, ganador y supertiebreak por equipo) que se guardan en
+columnas de `partidos` para poder agregar en SQL sin re-parsear el JSON.
+
+Formatos aceptados:
+- Marcador / torneos (`Partido.resultado_padel`):
+  {"sets": [{"gamesEquipoA": 6, "gamesEquipoB": 4, "esSuperTiebreak": false}, ...],
+   "supertiebreak": {"puntosEquipoA": 10, "puntosEquipoB": 8, "completado": true}}
+- Resultados de salas (`ResultadoPartido.detalle_sets`):
+  [{"set": 1, "juegos_eq1": 6, "juegos_eq2": 4}, ...]
+- Resultados de confirmación: [{"equipo1": 6, "equipo2": 4}, ...]
+"""
+from typing import Dict, List, Optional
+
+from .padel_validator import PadelValidator
+
+# Un set con más de 7 games solo puede ser un supertiebreak (a 10 puntos)
+MAX_GAMES_SET_NORMAL = 7
+
+# Columnas de `partidos` que se completan con el resultado
+COLUMNAS_RESULTADO = (
+    "sets_eq1", "sets_eq2", "games_eq1", "games_eq2",
+    "supertiebreak_eq1", "supertiebreak_eq2", "ganador_equipo"
+)
+
+
+class ResultadoParser:
+    """Parser y normalizador de resultados de pádel"""
+
+    @staticmethod
+    def _games_set(set_data: Dict) -> Optional[tuple]:
+        """Games (eq1, eq2) de un set en cualquiera de los formatos conocidos"""
+        for clave_1, clave_2 in (
+            ("juegos_eq1", "juegos_eq2"),
+            ("gamesEquipoA", "gamesEquipoB"),
+            ("equipo1", "equipo2"),
+            ("games_a", "games_b"),
+        ):
+            if clave_1 in set_data or clave_2 in set_data:
+                return int(set_data.get(clave_1) or 0), int(set_data.get(clave_2) or 0)
+        return None
+
+    @staticmethod
+    def normalizar_sets(resultado) -> List[Dict]:
+        """
+        Lleva el resultado al formato de PadelValidator:
+        [{'juegos_eq1': int, 'juegos_eq2': int, 'esSuperTiebreak': bool}, ...]
+        El supertiebreak en formato antiguo va al final con 'aparte': True
+        """
+        if not resultado:
+            return []
+
+        if isinstance(resultado, dict):
+            sets = resultado.get("sets") or []
+            supertiebreak = resultado.get("supertiebreak")
+        else:
+            sets = resultado
+            supertiebreak = None
+
+        normalizados = []
+        for set_data in sets:
+            if not isinstance(set_data, dict):
+                continue
+            games = ResultadoParser._games_set(set_data)
+            if games is None:
+                continue
+            juegos_eq1, juegos_eq2 = games
+            es_supertiebreak = bool(set_data.get("esSuperTiebreak")) or \
+                max(juegos_eq1, juegos_eq2) > MAX_GAMES_SET_NORMAL
+            normalizados.append({
+                "juegos_eq1": juegos_eq1,
+                "juegos_eq2": juegos_eq2,
+                "esSuperTiebreak": es_supertiebreak
+            })
+
+        # Supertiebreak en formato antiguo (objeto aparte de los sets).
+        # Se marca `aparte` para que no se guarde como un set más en detalle_sets.
+        if isinstance(supertiebreak, dict) and supertiebreak.get("completado"):
+            normalizados.append({
+                "juegos_eq1": int(supertiebreak.get("puntosEquipoA") or 0),
+                "juegos_eq2": int(supertiebreak.get("puntosEquipoB") or 0),
+                "esSuperTiebreak": True,
+                "aparte": True
+            })
+
+        return normalizados
+
+    @staticmethod
+    def parsear(resultado, validar: bool = True) -> Dict:
+        """
+        Parsea un resultado y calcula sus valores numéricos
+
+        Args:
+            resultado: Resultado en cualquiera de los formatos aceptados
+            validar: Si True, valida con PadelValidator y lanza ValueError si es inválido
+
+        Returns:
+            Dict con sets normalizados y las columnas numéricas
+            (los games no incluyen los puntos del supertiebreak)
+        """
+        sets = ResultadoParser.normalizar_sets(resultado)
+
+        if validar:
+            es_valido, errores = PadelValidator.validar_resultado_completo(sets)
+            if not es_valido:
+                raise ValueError(f"Resultado inválido: {'; '.join(errores)}")
+
+        numerico = {
+            "sets": sets,
+            "sets_eq1": 0,
+            "sets_eq2": 0,
+            "games_eq1": 0,
+            "games_eq2": 0,
+            "supertiebreak_eq1": None,
+            "supertiebreak_eq2": None,
+            "ganador_equipo": None
+        }
+
+        for set_data in sets:
+            juegos_eq1 = set_data["juegos_eq1"]
+            juegos_eq2 = set_data["juegos_eq2"]
+
+            if juegos_eq1 > juegos_eq2:
+                numerico["sets_eq1"] += 1
+            elif juegos_eq2 > juegos_eq1:
+                numerico["sets_eq2"] += 1
+
+            if set_data["esSuperTiebreak"]:
+                numerico["supertiebreak_eq1"] = juegos_eq1
+                numerico["supertiebreak_eq2"] = juegos_eq2
+            else:
+                numerico["games_eq1"] += juegos_eq1
+                numerico["games_eq2"] += juegos_eq2
+
+        if numerico["sets_eq1"] > numerico["sets_eq2"]:
+            numerico["ganador_equipo"] = 1
+        elif numerico["sets_eq2"] > numerico["sets_eq1"]:
+            numerico["ganador_equipo"] = 2
+
+        return numerico
+
+    @staticmethod
+    def aplicar_a_partido(partido, numerico: Dict) -> None:
+        """Copia los valores numéricos a las columnas del partido"""
+        for columna in COLUMNAS_RESULTADO:
+            setattr(partido, columna, numerico[columna])
+
+    @staticmethod
+    def desde_partido(partido) -> Optional[Dict]:
+        """
+        Valores numéricos de un partido: desde las columnas o, si todavía
+        no se completaron (filas sin backfill), parseando el JSON guardado.
+        None si el partido no tiene resultado.
+        """
+        if partido.sets_eq1 is not None:
+            return {columna: getattr(partido, columna) for columna in COLUMNAS_RESULTADO}
+        if partido.resultado_padel:
+            return ResultadoParser.parsear(partido.resultado_padel, validar=False)
+        return None
@@ -1,66 +1,208 @@
 """
 WebSocket Connection Manager para actualizaciones en tiempo real
+
+Cada conexión tiene su propia cola de envío acotada y una tarea que la
+drena: el broadcast solo encola (no espera a ningún cliente), así un
+celular lento no demora al resto de la sala. El JSON se serializa una
+sola vez por broadcast.
+
+Los eventos se publican por canal ("sala:<id>", ver pubsub.py): se entregan
+a los clientes de este worker y se reenvían por el broker al resto.
 """
-from typing import Dict, List
+from typing import Callable, Dict, Optional
 from fastapi import WebSocket
+import asyncio
 import json
 import logging
+import os
+
+from .pubsub import canal_sala, crear_broker
 
 logger = logging.getLogger(__name__)
 
+# Mensajes pendientes por conexión antes de aplicar la política de cliente lento
+MAX_MENSAJES_PENDIENTES = int(os.getenv("WS_MAX_MENSAJES_PENDIENTES", "100"))
+
+# Política de cliente lento:
+# - "descartar_antiguo": se descarta el mensaje más viejo de la cola
+# - "desconectar": se cierra la conexión
+POLITICA_DESCARTAR_ANTIGUO = "descartar_antiguo"
+POLITICA_DESCONECTAR = "desconectar"
+POLITICA_CLIENTE_LENTO = os.getenv("WS_POLITICA_CLIENTE_LENTO", POLITICA_DESCARTAR_ANTIGUO)
+
+# Código de cierre cuando el cliente no consume sus mensajes (RFC 6455: 1008 policy violation)
+CODIGO_CIERRE_CLIENTE_LENTO = 1008
+
+
+def serializar_mensaje(message: dict) -> str:
+    """Serializa un mensaje igual que WebSocket.send_json"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ConexionCliente:
+    """Conexión de un cliente con su cola de envío y su tarea emisora"""
+
+    def __init__(self, websocket: WebSocket, canal: str, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.canal = canal
+        self.manager = manager
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=manager.max_pendientes)
+        self.descartados = 0
+        self.cerrada = False
+        self.tarea: Optional[asyncio.Task] = None
+
+    def iniciar(self):
+        self.tarea = asyncio.create_task(self._emisor())
+
+    def encolar(self, texto: str) -> bool:
+        """
+        Encola un mensaje ya serializado sin esperar al cliente.
+        Devuelve False si la conexión se cerró por cliente lento.
+        """
+        if self.cerrada:
+            return False
+
+        try:
+            self.cola.put_nowait(texto)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.manager.politica == POLITICA_DESCONECTAR:
+            logger.warning(
+                f"Cliente lento en {self.canal}: "
+                f"{self.cola.qsize()} mensajes pendientes, se desconecta"
+            )
+            self.manager.disconnect(self.websocket, self.canal)
+            asyncio.create_task(self._cerrar_socket(CODIGO_CIERRE_CLIENTE_LENTO))
+            return False
+
+        # Descartar el más viejo: el cliente recibe el estado más reciente
+        self.cola.get_nowait()
+        self.descartados += 1
+        self.cola.put_nowait(texto)
+        return True
+
+    async def _emisor(self):
+        """Drena la cola enviando de a un mensaje"""
+        try:
+            while True:
+                texto = await self.cola.get()
+                await self.websocket.send_text(texto)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Socket muerto: se detecta al primer envío fallido, sin bloquear a nadie
+            logger.error(f"Error enviando mensaje a cliente: {e}")
+            self.manager.disconnect(self.websocket, self.canal)
+
+    async def _cerrar_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def cerrar(self):
+        """Detiene la tarea emisora (los mensajes pendientes se descartan)"""
+        self.cerrada = True
+        if self.tarea and not self.tarea.done() and self.tarea is not asyncio.current_task():
+            self.tarea.cancel()
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Diccionario de salas activas: {sala_id: [websockets]}
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, max_pendientes: int = MAX_MENSAJES_PENDIENTES,
+                 politica: str = POLITICA_CLIENTE_LENTO, broker=None):
+        # Suscriptores locales por canal: {canal: {websocket: ConexionCliente}}
+        self.active_connections: Dict[str, Dict[WebSocket, ConexionCliente]] = {}
+        self.max_pendientes = max_pendientes
+        self.politica = politica
+        self.broker = broker if broker is not None else crear_broker()
+        # Procesadores por tipo de canal ("torneo" -> feed): reciben los eventos
+        # en lugar de los clientes y deciden qué y cuándo enviarles
+        self.procesadores: Dict[str, Callable[[str, str], None]] = {}
+
+    def registrar_procesador(self, tipo_canal: str, procesador: Callable[[str, str], None]):
+        self.procesadores[tipo_canal] = procesador
+
+    async def iniciar_pubsub(self):
+        """Empieza a recibir los eventos publicados por otros workers"""
+        await self.broker.iniciar(self._entregar_remoto)
 
-    async def connect(self, websocket: WebSocket, sala_id: str):
-        """Conectar un cliente a una sala específica"""
+    async def detener_pubsub(self):
+        await self.broker.detener()
+
+    async def connect(self, websocket: WebSocket, canal: str):
+        """Conectar un cliente a un canal (p. ej. canal_sala(id))"""
         await websocket.accept()
-        
-        if sala_id not in self.active_connections:
-            self.active_connections[sala_id] = []
-        
-        self.active_connections[sala_id].append(websocket)
-        logger.info(f"Cliente conectado a sala {sala_id}. Total: {len(self.active_connections[sala_id])}")
-
-    def disconnect(self, websocket: WebSocket, sala_id: str):
-        """Desconectar un cliente de una sala"""
-        if sala_id in self.active_connections:
-            if websocket in self.active_connections[sala_id]:
-                self.active_connections[sala_id].remove(websocket)
-                logger.info(f"Cliente desconectado de sala {sala_id}. Restantes: {len(self.active_connections[sala_id])}")
-            
-            # Limpiar sala si no hay conexiones
-            if len(self.active_connections[sala_id]) == 0:
-                del self.active_connections[sala_id]
-                logger.info(f"Sala {sala_id} eliminada (sin conexiones)")
+
+        conexion = ConexionCliente(websocket, canal, self)
+        conexion.iniciar()
+        self.active_connections.setdefault(canal, {})[websocket] = conexion
+        logger.info(f"Cliente conectado a {canal}. Total: {len(self.active_connections[canal])}")
+
+    def disconnect(self, websocket: WebSocket, canal: str):
+        """Desconectar un cliente de un canal"""
+        if canal in self.active_connections:
+            conexion = self.active_connections[canal].pop(websocket, None)
+            if conexion:
+                conexion.cerrar()
+                logger.info(f"Cliente desconectado de {canal}. Restantes: {len(self.active_connections[canal])}")
+
+            # Limpiar canal si no hay conexiones
+            if len(self.active_connections[canal]) == 0:
+                del self.active_connections[canal]
+                logger.info(f"Canal {canal} eliminado (sin conexiones)")
+
+    def _buscar_conexion(self, websocket: WebSocket) -> Optional[ConexionCliente]:
+        for conexiones in self.active_connections.values():
+            conexion = conexiones.get(websocket)
+            if conexion:
+                return conexion
+        return None
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Enviar mensaje a un cliente específico"""
+        """Enviar mensaje a un cliente específico (por su cola, respetando el orden)"""
+        conexion = self._buscar_conexion(websocket)
         try:
-            await websocket.send_json(message)
+            if conexion:
+                conexion.encolar(serializar_mensaje(message))
+            else:
+                await websocket.send_json(message)
         except Exception as e:
             logger.error(f"Error enviando mensaje personal: {e}")
 
+    def entregar_local(self, canal: str, texto: str):
+        """Entrega un evento serializado en este worker (procesador del canal o clientes)"""
+        procesador = self.procesadores.get(canal.split(":", 1)[0])
+        if procesador is not None:
+            procesador(canal, texto)
+        else:
+            self.entregar_a_clientes(canal, texto)
+
+    def entregar_a_clientes(self, canal: str, texto: str):
+        """Encola un mensaje serializado en los clientes de este worker (sin esperar a ninguno)"""
+        # Copia: encolar puede desconectar clientes lentos durante el recorrido
+        for conexion in list(self.active_connections.get(canal, {}).values()):
+            conexion.encolar(texto)
+
+    async def _entregar_remoto(self, canal: str, texto: str):
+        self.entregar_local(canal, texto)
+
+    async def publicar(self, canal: str, message: dict):
+        """
+        API única de publicación: entrega a los clientes locales y
+        reenvía a los demás workers por el broker
+        """
+        texto = serializar_mensaje(message)
+        self.entregar_local(canal, texto)
+        try:
+            await self.broker.publicar(canal, texto)
+        except Exception as e:
+            logger.error(f"Error publicando evento de {canal}: {e}")
+
     async def broadcast_to_sala(self, sala_id: str, message: dict):
-        """Enviar mensaje a todos los clientes de una sala"""
-        if sala_id not in self.active_connections:
-            logger.warning(f"Intento de broadcast a sala inexistente: {sala_id}")
-            return
-
-        disconnected = []
-        
-        for connection in self.active_connections[sala_id]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error enviando mensaje a cliente: {e}")
-                disconnected.append(connection)
-        
-        # Limpiar conexiones muertas
-        for connection in disconnected:
-            self.disconnect(connection, sala_id)
+        """Enviar mensaje a todos los clientes de una sala, en cualquier worker"""
+        await self.publicar(canal_sala(sala_id), message)
 
     async def notify_jugador_unido(self, sala_id: str, jugador_data: dict):
         """Notificar que un jugador se unió a la sala"""
@@ -104,6 +246,13 @@ class ConnectionManager:
             "data": confirmacion_data
         })
 
+    async def notify_sala_cerrada(self, sala_id: str, cierre_data: dict):
+        """Notificar que la sala se cerró por inactividad (expirada) o quedó finalizada"""
+        await self.broadcast_to_sala(sala_id, {
+            "type": "sala_cerrada",
+            "data": cierre_data
+        })
+
 
 # Instancia global del manager
 manager = ConnectionManager()
@@ -0,0 +1,143 @@
+"""
+Estado en memoria de cada sala (GET /salas/{id} y WebSocket nuevos)
+
+Antes cada lectura de una sala armaba SalaCompleta con varias queries, y se
+lee después de cada unión, asignación de equipos, acción de resultado y en
+cada polling. Ahora cada worker guarda el último estado por sala con su
+versión (`salas.version`):
+
+- Lectura: si el estado está en memoria se devuelve sin tocar la base;
+  si falta, se arma una vez (SalaService.construir_estado) y se guarda.
+- Cambio: el endpoint sube la versión en su transacción y, después del
+  commit, aplica el cambio sobre la copia en memoria (solo si la copia es
+  exactamente la versión anterior; si no, la descarta).
+- Otros workers: se publica {"id_sala", "version"} por el pub/sub de
+  WebSocket (canal "estado_sala:<id>") y cada worker descarta su copia si
+  es más vieja. Una copia armada con datos viejos nunca se guarda después
+  de que llegó una versión más nueva.
+
+Los estados se reemplazan, no se modifican: quien ya tiene una referencia
+no ve cambios a medias.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..schemas.sala import SalaCompleta
+from .connection_manager import manager
+
+logger = logging.getLogger(__name__)
+
+TIPO_CANAL = "estado_sala"
+
+# Salas con estado en memoria por worker (las menos usadas salen primero)
+MAX_SALAS_EN_MEMORIA = 2000
+
+
+def canal_estado_sala(id_sala) -> str:
+    return f"{TIPO_CANAL}:{id_sala}"
+
+
+class EstadoSalas:
+    """Estados de sala versionados, compartidos por HTTP y WebSocket"""
+
+    def __init__(self, manager_ws=manager, capacidad: int = MAX_SALAS_EN_MEMORIA):
+        self.manager = manager_ws
+        self.capacidad = capacidad
+        self._estados: "OrderedDict[int, SalaCompleta]" = OrderedDict()
+        # Mayor versión conocida por sala (para no guardar copias viejas)
+        self._minimas: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        manager_ws.registrar_procesador(TIPO_CANAL, self._recibir)
+
+    def en_memoria(self, id_sala: int) -> Optional[SalaCompleta]:
+        with self._lock:
+            estado = self._estados.get(id_sala)
+            if estado is not None:
+                self._estados.move_to_end(id_sala)
+            return estado
+
+    def obtener(self, db: Session, id_sala: int) -> Optional[SalaCompleta]:
+        """Estado de la sala; solo consulta la base si no está en memoria"""
+        estado = self.en_memoria(id_sala)
+        if estado is not None:
+            return estado
+
+        from ..services.sala_service import SalaService
+        estado = SalaService.construir_estado(db, id_sala)
+        if estado is not None:
+            self._guardar(id_sala, estado)
+        return estado
+
+    def _guardar(self, id_sala: int, estado: SalaCompleta):
+        with self._lock:
+            if (estado.version or 0) < self._minimas.get(id_sala, 0):
+                return  # se armó antes de un cambio que ya conocemos
+            actual = self._estados.get(id_sala)
+            if actual is not None and (actual.version or 0) > (estado.version or 0):
+                return
+            self._estados[id_sala] = estado
+            self._estados.move_to_end(id_sala)
+            while len(self._estados) > self.capacidad:
+                self._estados.popitem(last=False)
+
+    def _registrar_version(self, id_sala: int, version: int):
+        if version > self._minimas.get(id_sala, 0):
+            self._minimas[id_sala] = version
+        self._minimas.move_to_end(id_sala)
+        while len(self._minimas) > self.capacidad * 2:
+            self._minimas.popitem(last=False)
+
+    def modificar(self, id_sala: int, version: int, cambio: Callable[[SalaCompleta], None]):
+        """
+        Aplica un cambio ya commiteado (que dejó la sala en `version`)
+        sobre la copia en memoria. Si la copia no es la versión anterior,
+        se descarta y la próxima lectura la rearma.
+        """
+        with self._lock:
+            self._registrar_version(id_sala, version)
+            actual = self._estados.get(id_sala)
+            if actual is None:
+                return
+            if actual.version != version - 1:
+                del self._estados[id_sala]
+                return
+            nuevo = actual.model_copy(deep=True)
+            try:
+                cambio(nuevo)
+            except Exception as e:
+                logger.warning(f"No se pudo aplicar el cambio a la sala {id_sala}: {e}")
+                del self._estados[id_sala]
+                return
+            nuevo.version = version
+            self._estados[id_sala] = nuevo
+
+    def descartar(self, id_sala: int, version: int):
+        """Descarta la copia si es anterior a `version`"""
+        with self._lock:
+            self._registrar_version(id_sala, version)
+            actual = self._estados.get(id_sala)
+            if actual is not None and (actual.version or 0) < version:
+                del self._estados[id_sala]
+
+    async def publicar(self, id_sala: int, version: int):
+        """Avisa la nueva versión a los demás workers (y a este)"""
+        try:
+            await self.manager.publicar(canal_estado_sala(id_sala), {"id_sala": id_sala, "version": version})
+        except Exception as e:
+            logger.warning(f"Error publicando versión de la sala {id_sala}: {e}")
+
+    def _recibir(self, canal: str, texto: str):
+        try:
+            evento = json.loads(texto)
+            self.descartar(int(evento["id_sala"]), int(evento["version"]))
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Evento de estado de sala inválido en {canal}")
+
+
+# Instancia global
+estado_salas = EstadoSalas()
@@ -0,0 +1,174 @@
+"""
+Pub/sub de eventos WebSocket entre procesos
+
+Con varios workers cada uno tiene su propio ConnectionManager: un evento
+publicado en el worker A tiene que llegar a los clientes conectados al B.
+El manager entrega primero a sus clientes locales y publica el mensaje
+(ya serializado) en el broker; cada worker recibe lo publicado por los
+demás y lo entrega a sus suscriptores locales.
+
+Brokers:
+- BrokerMemoria: dentro del proceso. Es el de un solo worker y el doble
+  de prueba (varios BrokerMemoria sobre la misma RedMemoria simulan workers).
+- BrokerPostgres: LISTEN/NOTIFY con asyncpg sobre un canal único de Postgres.
+  LISTEN necesita una conexión de sesión: con Neon usar el endpoint directo
+  (sin "-pooler") en WS_PUBSUB_DATABASE_URL.
+
+Nombres de canal: "<tipo>:<id>" (ver canal_sala / canal_torneo).
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Canal de Postgres por el que viajan todos los eventos
+CANAL_POSTGRES = "playt_ws_eventos"
+
+# NOTIFY admite payloads de hasta 8000 bytes
+MAX_PAYLOAD_NOTIFY = 7900
+
+# Callback de entrega local: (canal, texto_json)
+EntregaLocal = Callable[[str, str], Awaitable[None]]
+
+
+def canal_sala(sala_id) -> str:
+    return f"sala:{sala_id}"
+
+
+def canal_torneo(torneo_id) -> str:
+    return f"torneo:{torneo_id}"
+
+
+class BrokerMemoria:
+    """Broker en memoria; los brokers de una misma red se reenvían entre sí"""
+
+    def __init__(self, red: Optional["RedMemoria"] = None):
+        self.origen = uuid.uuid4().hex
+        self.red = red
+        self._entregar: Optional[EntregaLocal] = None
+        if red is not None:
+            red.brokers.append(self)
+
+    async def iniciar(self, entregar: EntregaLocal):
+        self._entregar = entregar
+
+    async def detener(self):
+        self._entregar = None
+
+    async def publicar(self, canal: str, texto: str):
+        if self.red is None:
+            return
+        for broker in self.red.brokers:
+            if broker is not self and broker._entregar is not None:
+                await broker._entregar(canal, texto)
+
+
+class RedMemoria:
+    """Agrupa BrokerMemoria que simulan workers distintos"""
+
+    def __init__(self):
+        self.brokers: List[BrokerMemoria] = []
+
+
+class BrokerPostgres:
+    """Broker sobre LISTEN/NOTIFY (asyncpg), con reconexión automática"""
+
+    def __init__(self, dsn: str, canal: str = CANAL_POSTGRES):
+        # asyncpg no entiende el sufijo de driver de SQLAlchemy
+        self.dsn = dsn.replace("postgresql+pg8000://", "postgresql://").replace(
+            "postgresql+asyncpg://", "postgresql://")
+        self.canal = canal
+        self.origen = uuid.uuid4().hex
+        self._entregar: Optional[EntregaLocal] = None
+        self._conexion = None
+        self._lock = asyncio.Lock()
+        self._tarea: Optional[asyncio.Task] = None
+        self._caida: Optional[asyncio.Event] = None
+
+    async def iniciar(self, entregar: EntregaLocal):
+        self._entregar = entregar
+        self._caida = asyncio.Event()
+        self._tarea = asyncio.create_task(self._mantener_conexion())
+
+    async def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        await self._cerrar_conexion()
+
+    async def _conectar(self):
+        import asyncpg
+        conexion = await asyncpg.connect(self.dsn, timeout=10)
+        await conexion.add_listener(self.canal, self._al_notificar)
+        conexion.add_termination_listener(lambda _c: self._caida.set())
+        self._conexion = conexion
+        logger.info(f"📡 Pub/sub WebSocket escuchando canal {self.canal}")
+
+    async def _cerrar_conexion(self):
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            try:
+                await conexion.close()
+            except Exception:
+                pass
+
+    async def _mantener_conexion(self):
+        espera = 1
+        while True:
+            try:
+                self._caida.clear()
+                await self._conectar()
+                espera = 1
+                await self._caida.wait()
+                logger.warning("⚠️ Conexión de pub/sub WebSocket perdida, reconectando")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error conectando pub/sub WebSocket: {e}")
+            await self._cerrar_conexion()
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 30)
+
+    def _al_notificar(self, _conexion, _pid, _canal_pg, payload: str):
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            logger.warning("Payload de pub/sub inválido")
+            return
+        if evento.get("origen") == self.origen or self._entregar is None:
+            return  # lo propio ya se entregó localmente
+        asyncio.create_task(self._entregar(evento["canal"], evento["texto"]))
+
+    async def publicar(self, canal: str, texto: str):
+        payload = json.dumps({"origen": self.origen, "canal": canal, "texto": texto},
+                             separators=(",", ":"), ensure_ascii=False)
+        if len(payload.encode("utf-8")) > MAX_PAYLOAD_NOTIFY:
+            logger.warning(f"Evento de {canal} demasiado grande para NOTIFY; solo se entregó localmente")
+            return
+        if self._conexion is None:
+            logger.warning(f"Pub/sub sin conexión; evento de {canal} solo entregado localmente")
+            return
+        async with self._lock:
+            await self._conexion.execute("SELECT pg_notify($1, $2)", self.canal, payload)
+
+
+def crear_broker():
+    """
+    Broker según WS_PUBSUB ("postgres" | "memoria").
+    Por defecto usa Postgres si la base es Postgres.
+    """
+    from ..database.config import DATABASE_URL
+
+    dsn = os.getenv("WS_PUBSUB_DATABASE_URL", DATABASE_URL)
+    tipo = os.getenv("WS_PUBSUB", "postgres" if dsn.startswith("postgresql") else "memoria")
+    if tipo == "postgres":
+        return BrokerPostgres(dsn)
+    return BrokerMemoria()
@@ -0,0 +1,223 @@
+"""
+Feed en tiempo real de torneos (/ws/torneos/{torneo_id})
+
+Reemplaza el polling de partidos, tablas y playoffs durante el evento.
+Los servicios publican deltas compactos por entidad:
+
+    {"e": "partido", "id": 812, "k": "resultado", "v": {"estado": "confirmado", ...}}
+    {"e": "tabla", "id": "3:45", "k": "posiciones", "v": {"posicion": 1, "puntos": 6, ...}}
+
+k: resultado | posiciones | cuadro | reprogramacion | torneo
+
+Cada worker recibe los deltas (propios y de otros workers vía pub/sub),
+los junta en ventanas de 250 ms y envía a sus clientes un solo mensaje
+por ventana con número de secuencia:
+
+    {"type": "deltas", "seq": 17, "deltas": [...]}
+
+Solo viajan los campos que cambiaron. Quien se conecta tarde recibe el
+estado completo con la secuencia actual y aplica los deltas con seq mayor:
+
+    {"type": "snapshot", "seq": 17, "entidades": {"partido": {...}, "tabla": {...}}}
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional
+
+from .connection_manager import manager, serializar_mensaje
+from .pubsub import canal_torneo
+
+logger = logging.getLogger(__name__)
+
+# Ventana de agrupación de deltas (segundos)
+VENTANA_DELTAS = 0.25
+
+# Campos de partido y de fila de tabla que viajan en los deltas
+CAMPOS_PARTIDO = (
+    "zona_id", "fase", "numero_partido", "estado", "pareja1_id", "pareja2_id",
+    "ganador_pareja_id", "sets_eq1", "sets_eq2", "games_eq1", "games_eq2",
+    "supertiebreak_eq1", "supertiebreak_eq2", "cancha_id", "fecha_hora"
+)
+CAMPOS_TABLA = (
+    "posicion", "partidos_jugados", "partidos_ganados", "partidos_perdidos",
+    "sets_ganados", "sets_perdidos", "games_ganados", "games_perdidos", "puntos"
+)
+
+
+def _valor(valor):
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+
+def delta_partido(partido, motivo: str, campos=CAMPOS_PARTIDO) -> Dict:
+    """Delta de un Partido con los campos indicados"""
+    return {
+        "e": "partido",
+        "id": partido.id_partido,
+        "k": motivo,
+        "v": {campo: _valor(getattr(partido, campo, None)) for campo in campos}
+    }
+
+
+def deltas_tabla(zona_id: int, tabla: List[Dict]) -> List[Dict]:
+    """Deltas de las filas de una tabla de posiciones (la del TorneoZonaService)"""
+    return [
+        {
+            "e": "tabla",
+            "id": f"{zona_id}:{fila['pareja_id']}",
+            "k": "posiciones",
+            "v": {"zona_id": zona_id, "pareja_id": fila["pareja_id"],
+                  **{campo: fila.get(campo) for campo in CAMPOS_TABLA}}
+        }
+        for fila in tabla
+    ]
+
+
+class EstadoTorneo:
+    """Estado materializado de un torneo en este worker"""
+
+    def __init__(self):
+        self.seq = 0
+        self.entidades: Dict[str, Dict[str, Dict]] = {}
+        self.pendientes: List[Dict] = []
+        self.flush_programado = False
+        self.cargado = False
+
+    def aplicar(self, delta: Dict) -> Optional[Dict]:
+        """Aplica un delta y devuelve solo lo que cambió (None si nada)"""
+        entidad = self.entidades.setdefault(delta["e"], {}).setdefault(str(delta["id"]), {})
+        cambios = {k: v for k, v in delta["v"].items() if entidad.get(k, object()) != v}
+        if not cambios:
+            return None
+        entidad.update(cambios)
+        return {"e": delta["e"], "id": delta["id"], "k": delta.get("k"), "v": cambios}
+
+
+class FeedTorneos:
+    """Agrupa, numera y distribuye los deltas de torneos"""
+
+    def __init__(self, manager_ws=manager, ventana: float = VENTANA_DELTAS):
+        self.manager = manager_ws
+        self.ventana = ventana
+        self.torneos: Dict[int, EstadoTorneo] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def iniciar(self):
+        """Registra el feed en el manager (llamar desde el event loop)"""
+        self.loop = asyncio.get_running_loop()
+        self.manager.registrar_procesador("torneo", self._recibir)
+
+    @property
+    def activo(self) -> bool:
+        """False fuera de la app (scripts, tests): los servicios no arman deltas"""
+        return self.loop is not None and not self.loop.is_closed()
+
+    # ---------- Publicación (desde servicios, en cualquier hilo) ----------
+
+    def publicar(self, torneo_id: int, deltas: List[Dict]):
+        """
+        Publica deltas de un torneo. Se puede llamar desde endpoints sync
+        (threadpool): el envío se agenda en el event loop sin esperarlo.
+        """
+        if not deltas or not self.activo:
+            return
+        mensaje = {"deltas": deltas}
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self.manager.publicar(canal_torneo(torneo_id), mensaje), self.loop
+            )
+        except Exception as e:
+            logger.warning(f"Error publicando deltas del torneo {torneo_id}: {e}")
+
+    # ---------- Recepción y agrupación (event loop) ----------
+
+    def _recibir(self, canal: str, texto: str):
+        torneo_id = int(canal.split(":", 1)[1])
+        estado = self.torneos.get(torneo_id)
+        if estado is None:
+            return  # nadie mira este torneo en este worker
+        estado.pendientes.extend(json.loads(texto)["deltas"])
+        if not estado.flush_programado:
+            estado.flush_programado = True
+            asyncio.get_running_loop().call_later(self.ventana, self._flush, torneo_id)
+
+    def _flush(self, torneo_id: int):
+        estado = self.torneos.get(torneo_id)
+        if estado is None:
+            return
+        estado.flush_programado = False
+        if not estado.cargado:
+            return  # snapshot todavía cargando: los deltas se aplican al terminar
+
+        canal = canal_torneo(torneo_id)
+        if canal not in self.manager.active_connections:
+            # Sin clientes: se descarta el estado (el próximo recarga el snapshot)
+            del self.torneos[torneo_id]
+            return
+
+        pendientes, estado.pendientes = estado.pendientes, []
+
+        # Coalescer: un delta por entidad con los campos que cambiaron en la ventana
+        agrupados: Dict[tuple, Dict] = {}
+        for delta in pendientes:
+            cambios = estado.aplicar(delta)
+            if cambios is None:
+                continue
+            clave = (cambios["e"], str(cambios["id"]))
+            if clave in agrupados:
+                agrupados[clave]["v"].update(cambios["v"])
+                agrupados[clave]["k"] = cambios["k"]
+            else:
+                agrupados[clave] = cambios
+
+        if not agrupados:
+            return
+        estado.seq += 1
+        self.manager.entregar_a_clientes(canal, serializar_mensaje({
+            "type": "deltas",
+            "seq": estado.seq,
+            "deltas": list(agrupados.values())
+        }))
+
+    # ---------- Snapshot para clientes nuevos ----------
+
+    async def preparar(self, torneo_id: int, cargar_base):
+        """
+        Asegura el estado del torneo en este worker.
+        cargar_base: función sync que devuelve la lista de deltas del estado
+        completo (se ejecuta en el threadpool con su propia sesión).
+        """
+        estado = self.torneos.get(torneo_id)
+        if estado is None:
+            estado = self.torneos[torneo_id] = EstadoTorneo()
+        if estado.cargado:
+            return
+
+        from starlette.concurrency import run_in_threadpool
+        try:
+            base = await run_in_threadpool(cargar_base, torneo_id)
+        except Exception:
+            if not estado.cargado and self.torneos.get(torneo_id) is estado:
+                del self.torneos[torneo_id]
+            raise
+        if estado.cargado:
+            return  # otro cliente lo cargó mientras tanto
+        for delta in base:
+            estado.aplicar(delta)
+        estado.cargado = True
+        if estado.pendientes and not estado.flush_programado:
+            estado.flush_programado = True
+            asyncio.get_running_loop().call_later(self.ventana, self._flush, torneo_id)
+
+    def snapshot(self, torneo_id: int) -> Dict:
+        """
+        Estado completo y secuencia actual. Llamar después de connect y
+        preparar, sin await en el medio: los deltas que el cliente haya
+        recibido antes ya están incluidos (seq <= la del snapshot).
+        """
+        estado = self.torneos[torneo_id]
+        return {"type": "snapshot", "seq": estado.seq, "entidades": estado.entidades}
+
+
+# Instancia global del feed
+feed_torneos = FeedTorneos()
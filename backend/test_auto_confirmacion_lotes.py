@@ -0,0 +1,161 @@
+"""
+Test de la auto-confirmación por lotes de resultados viejos
+Usa una base SQLite en memoria (FOR UPDATE / SKIP LOCKED se ignoran en SQLite)
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import (
+    Usuario, Categoria, Partido, PartidoJugador, ResultadoPartido, HistorialRating
+)
+from src.models.confirmacion import Confirmacion
+from src.services.confirmacion_service import ConfirmacionService
+from src.services.cola_confirmaciones_service import ColaConfirmacionesService
+from src.services.relaciones_jugadores_service import RelacionesJugadoresService
+from src.models.driveplus_models import HistorialPartido
+
+
+def crear_partido(db, id_partido, ids_usuarios, creado_en, con_resultado=True):
+    db.add(Partido(
+        id_partido=id_partido,
+        fecha=creado_en,
+        estado="pendiente",
+        id_creador=ids_usuarios[0],
+        creado_por=ids_usuarios[0],
+        creado_en=creado_en,
+        estado_confirmacion="pendiente_confirmacion",
+        ganador_equipo=1,
+        elo_aplicado=False
+    ))
+    for i, id_usuario in enumerate(ids_usuarios):
+        db.add(PartidoJugador(id_partido=id_partido, id_usuario=id_usuario, equipo=1 if i < 2 else 2))
+    if con_resultado:
+        db.add(ResultadoPartido(
+            id_partido=id_partido,
+            id_reportador=ids_usuarios[0],
+            sets_eq1=0,
+            sets_eq2=2,
+            detalle_sets=[
+                {"set": 1, "juegos_eq1": 3, "juegos_eq2": 6},
+                {"set": 2, "juegos_eq1": 4, "juegos_eq2": 6}
+            ]
+        ))
+
+
+def preparar_escenario():
+    db, contador = crear_db_pruebas()
+    db.add(Categoria(id_categoria=1, nombre="7ma", rating_min=0, rating_max=5000, sexo="masculino"))
+    for id_usuario in range(1, 9):
+        db.add(Usuario(
+            id_usuario=id_usuario,
+            nombre_usuario=f"jugador{id_usuario}",
+            email=f"jugador{id_usuario}@test.com",
+            rating=1200,
+            partidos_jugados=10,
+            sexo="masculino"
+        ))
+    viejo = datetime.now() - timedelta(hours=72)
+    # 5 partidos viejos (uno repite jugadores del anterior), 1 reportado, 1 reciente, 1 sin resultado
+    crear_partido(db, 1, [1, 2, 3, 4], viejo)
+    crear_partido(db, 2, [5, 6, 7, 8], viejo)
+    crear_partido(db, 3, [1, 2, 5, 6], viejo)
+    crear_partido(db, 4, [3, 4, 7, 8], viejo)
+    crear_partido(db, 5, [1, 3, 5, 7], viejo)
+    crear_partido(db, 6, [2, 4, 6, 8], viejo)
+    db.add(Confirmacion(id_partido=6, id_usuario=8, tipo="reporte", motivo="resultado incorrecto"))
+    crear_partido(db, 7, [1, 2, 3, 4], datetime.now())
+    crear_partido(db, 8, [5, 6, 7, 8], viejo, con_resultado=False)
+    db.commit()
+    return db, contador
+
+
+def test_auto_confirmacion_por_lotes():
+    """Confirma solo los elegibles, en varios lotes, y deja el historial consistente"""
+    db, _ = preparar_escenario()
+
+    metricas = ConfirmacionService.auto_confirmar_partidos_antiguos(db, tamano_lote=2)
+    print(f"Métricas: {metricas}")
+
+    assert metricas["auto_confirmados"] == 5
+    assert metricas["errores"] == 1  # partido 8 sin resultado
+    assert metricas["lotes"] == 3
+
+    estados = {p.id_partido: p.estado_confirmacion for p in db.query(Partido).all()}
+    assert [i for i, e in estados.items() if e == "auto_confirmado"] == [1, 2, 3, 4, 5]
+    assert estados[6] == "pendiente_confirmacion"  # tiene reporte
+    assert estados[7] == "pendiente_confirmacion"  # reciente
+    assert estados[8] == "pendiente_confirmacion"  # falló, sin resultado
+
+    # El rating final de cada jugador debe coincidir con la cadena de su historial
+    for usuario in db.query(Usuario).all():
+        historial = db.query(HistorialRating).filter(
+            HistorialRating.id_usuario == usuario.id_usuario
+        ).order_by(HistorialRating.id_partido).all()
+        rating = 1200
+        for h in historial:
+            assert h.rating_antes == rating
+            rating = h.rating_despues
+        assert usuario.rating == rating
+
+    # Los auto-confirmados entran al historial y a los récords entre jugadores
+    assert {h.id_partido for h in db.query(HistorialPartido).all()} == {1, 2, 3, 4, 5}
+    cara = RelacionesJugadoresService.cara_a_cara(db, 1, 5)
+    assert (cara["como_rivales"]["jugados"], cara["como_rivales"]["ganados"]) == (2, 2)
+    assert RelacionesJugadoresService.cara_a_cara(db, 1, 2)["como_companeros"]["jugados"] == 2
+
+    # Una segunda pasada no vuelve a aplicar nada
+    metricas = ConfirmacionService.auto_confirmar_partidos_antiguos(db, tamano_lote=2)
+    assert metricas["auto_confirmados"] == 0
+    assert RelacionesJugadoresService.cara_a_cara(db, 1, 5)["como_rivales"]["jugados"] == 2
+
+
+def test_carga_en_bloque_no_depende_del_tamano_del_lote():
+    """Las queries de carga del lote no crecen con la cantidad de partidos"""
+    db, contador = preparar_escenario()
+    partidos = db.query(Partido).filter(Partido.id_partido.in_([1, 2, 3, 4, 5])).all()
+
+    contador["queries"] = 0
+    ConfirmacionService._cargar_contexto_elo(partidos[:1], db)
+    queries_un_partido = contador["queries"]
+
+    contador["queries"] = 0
+    ConfirmacionService._cargar_contexto_elo(partidos, db)
+    queries_cinco_partidos = contador["queries"]
+
+    print(f"Queries carga: 1 partido={queries_un_partido}, 5 partidos={queries_cinco_partidos}")
+    assert queries_un_partido == queries_cinco_partidos
+
+
+def test_confirmacion_manual_usa_el_mismo_camino():
+    """Cuando confirman los 3 rivales se encola un trabajo que aplica el Elo una sola vez"""
+    db, _ = preparar_escenario()
+
+    for id_usuario in (2, 3, 4):
+        resultado = ConfirmacionService.confirmar_resultado(7, id_usuario, db)
+
+    assert resultado["elo_aplicado"] is False
+    assert resultado["elo_en_cola"] is True
+    assert resultado["trabajo"]["estado"] == "pendiente"
+
+    info = ColaConfirmacionesService.procesar_siguiente(db)
+    assert info["trabajo"]["estado"] == "completado"
+    cambios = info["cambios"]
+    assert set(cambios) == {1, 2, 3, 4}
+    # Compañeros cambian en el mismo sentido, rivales en el opuesto
+    assert cambios[1]["cambio"] * cambios[2]["cambio"] > 0
+    assert cambios[1]["cambio"] * cambios[3]["cambio"] < 0
+    assert db.query(HistorialRating).filter(HistorialRating.id_partido == 7).count() == 4
+
+    partido = db.query(Partido).filter(Partido.id_partido == 7).first()
+    assert ConfirmacionService._aplicar_elo(partido, db) is None
+
+
+if __name__ == "__main__":
+    test_auto_confirmacion_por_lotes()
+    test_carga_en_bloque_no_depende_del_tamano_del_lote()
+    test_confirmacion_manual_usa_el_mismo_camino()
+    print("\n✅ Tests de auto-confirmación por lotes OK")
@@ -0,0 +1,86 @@
+"""
+Test del barrido de salas abandonadas: expira por lotes (un UPDATE por
+lote) y finaliza las salas en juego cuyo partido ya se confirmó
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from db_pruebas import crear_db_pruebas
+from src.database.locks import lock_consultivo, LOCK_BARRIDO_SALAS
+from src.models.driveplus_models import Usuario, Partido, ResultadoPartido
+from src.models.sala import Sala
+from src.services.sala_service import SalaService
+
+
+def test_barrido_por_lotes():
+    db, _ = crear_db_pruebas()
+    ahora = datetime(2026, 3, 1, 12, 0, 0)
+    db.add(Usuario(id_usuario=1, nombre_usuario="j1", email="j1@test.com", rating=1500))
+
+    def sala(id_sala, estado, horas, id_partido=None):
+        db.add(Sala(id_sala=id_sala, nombre=f"Sala {id_sala}", codigo_invitacion=f"C{id_sala}",
+                    fecha=ahora - timedelta(hours=horas), estado=estado, id_creador=1,
+                    max_jugadores=4, id_partido=id_partido))
+
+    def partido(id_partido, estado_confirmacion, con_resultado):
+        db.add(Partido(id_partido=id_partido, fecha=ahora, estado="pendiente", id_creador=1,
+                       estado_confirmacion=estado_confirmacion))
+        if con_resultado:
+            db.add(ResultadoPartido(id_partido=id_partido, id_reportador=1, sets_eq1=2, sets_eq2=0,
+                                    detalle_sets=[]))
+
+    # Esperando: vencidas (más de 6 h) y vigentes
+    for id_sala in range(1, 5):
+        sala(id_sala, "esperando", 10)
+    sala(5, "programada", 7)
+    sala(6, "esperando", 2)       # todavía vigente
+    sala(7, "esperando", -24)     # programada para mañana
+
+    # En juego
+    partido(100, "auto_confirmado", True)
+    sala(8, "en_juego", 3, 100)   # confirmado -> finalizada
+    partido(101, "sin_resultado", False)
+    sala(9, "en_juego", 72, 101)  # sin resultado hace 3 días -> expirada
+    partido(102, "pendiente_confirmacion", True)
+    sala(10, "en_juego", 72, 102) # resultado esperando confirmación: se deja
+    sala(11, "en_juego", 2)       # recién empezada
+    sala(12, "finalizada", 500)
+    db.commit()
+
+    updates = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def registrar(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("UPDATE SALAS"):
+            updates.append(statement)
+
+    resumen = SalaService.barrer_salas(db, ahora=ahora, tamano_lote=3)
+
+    assert resumen["expiradas"] == 6 and resumen["finalizadas"] == 1
+    assert len(updates) == 3  # 7 salas en lotes de 3: un UPDATE por lote
+
+    estados = dict(db.query(Sala.id_sala, Sala.estado).all())
+    assert [estados[i] for i in range(1, 6)] == ["expirada"] * 5
+    assert estados[8] == "finalizada" and estados[9] == "expirada"
+    assert (estados[6], estados[7], estados[10], estados[11]) == ("esperando", "esperando", "en_juego", "en_juego")
+    assert estados[12] == "finalizada"
+
+    # Segunda pasada: nada para hacer
+    assert SalaService.barrer_salas(db, ahora=ahora)["cerradas"] == []
+
+
+def test_lock_fuera_de_postgres():
+    db, _ = crear_db_pruebas()
+    with lock_consultivo(LOCK_BARRIDO_SALAS, engine=db.get_bind()) as obtenido:
+        assert obtenido
+
+
+if __name__ == "__main__":
+    test_barrido_por_lotes()
+    test_lock_fuera_de_postgres()
+    print("\n✅ Tests de barrido de salas OK")
@@ -0,0 +1,174 @@
+"""
+Test del índice de búsqueda de usuarios: sin acentos ni mayúsculas,
+ordenado (usuario exacto, prefijo, contiene, similar), con refrescos y
+autocompletado con un error de tipeo
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, PerfilUsuario, Categoria
+from src.services import busqueda_usuarios_service
+from src.services.busqueda_usuarios_service import IndiceBusquedaUsuarios, MAX_SUGERENCIAS, plegar
+
+
+def _crear_datos(db):
+    db.add(Categoria(id_categoria=5, nombre="5ta", sexo="masculino"))
+    usuarios = [
+        (1, "gomez", "Ana", "Pérez"),
+        (2, "martin_g", "Martín", "Gómez"),
+        (3, "lu_gomezz", "Lucía", "Fernández"),
+        (4, "jperez", "José", "Santagómez"),
+        (5, "facu", "Facundo", "Gomes"),
+        (6, "sinperfil", None, None),
+        (7, "otro", "Pedro", "Ruiz"),
+    ]
+    for id_usuario, nombre_usuario, nombre, apellido in usuarios:
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=nombre_usuario,
+                       email=f"u{id_usuario}@test.com", rating=1500, id_categoria=5))
+        if nombre:
+            db.add(PerfilUsuario(id_usuario=id_usuario, nombre=nombre, apellido=apellido))
+    db.commit()
+
+
+def test_orden_y_acentos():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+    indice = IndiceBusquedaUsuarios()
+    indice.cargar(db)
+
+    assert plegar("  Gómez   PÉREZ ") == "gomez perez"
+
+    antes = contador["queries"]
+    # Usuario exacto, después prefijos (usuario y apellido), contiene y similar
+    ids = [u.id_usuario for u in indice.buscar("Gomez")]
+    assert ids == [1, 2, 3, 4, 5]
+    assert [u.id_usuario for u in indice.buscar("GÓMEZ", solo_con_perfil=True, excluir={1})] == [2, 3, 4, 5]
+    assert [u.id_usuario for u in indice.buscar("martin gom")] == [2]
+    assert [u.id_usuario for u in indice.buscar("sinper")] == [6]
+    assert indice.buscar("sinper", solo_con_perfil=True) == []
+    assert indice.buscar("zzz") == []
+    assert indice.buscar("Gomez", limite=2)[1].categoria == "5ta"
+    assert contador["queries"] == antes  # las búsquedas no tocan la base
+
+
+def test_refrescos():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    indice = IndiceBusquedaUsuarios()
+    indice.cargar(db)
+
+    # Completa el perfil y cambia el rating: se relee solo ese usuario
+    db.add(PerfilUsuario(id_usuario=6, nombre="Ramón", apellido="Gómez"))
+    db.query(Usuario).filter(Usuario.id_usuario == 6).update({"rating": 1700})
+    db.commit()
+    indice.refrescar_usuarios(db, [6])
+    encontrados = {u.id_usuario: u for u in indice.buscar("ramon gomez")}
+    assert list(encontrados) == [6] and encontrados[6].rating == 1700
+
+    # Cambia el apellido: ya no aparece por el anterior
+    db.query(PerfilUsuario).filter(PerfilUsuario.id_usuario == 7).update({"apellido": "Díaz"})
+    db.commit()
+    indice.refrescar_usuarios(db, [7])
+    assert indice.buscar("ruiz") == []
+    assert [u.id_usuario for u in indice.buscar("diaz")] == [7]
+
+
+def test_recarga_vencida_en_segundo_plano():
+    """Con el TTL vencido responde con el índice anterior y lo recarga en un thread"""
+    servicio = busqueda_usuarios_service
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    session_local = servicio.SessionLocal
+    servicio.SessionLocal = sessionmaker(bind=db.get_bind())
+    indice = servicio.indice_busqueda_usuarios
+    try:
+        assert servicio.obtener_indice_busqueda(db).cargado  # primera vez: carga en el request
+
+        db.add(Usuario(id_usuario=8, nombre_usuario="gomez_nuevo", email="u8@test.com"))
+        db.commit()
+        indice.cargado_en -= servicio.TTL_INDICE_BUSQUEDA
+        # Sin sesión: si intentara recargar dentro del request fallaría
+        assert servicio.obtener_indice_busqueda(None) is indice
+
+        assert servicio._lock_carga.acquire(timeout=5)  # se libera al terminar la recarga
+        servicio._lock_carga.release()
+        assert not indice.vencido()
+        assert 8 in [u.id_usuario for u in indice.buscar("gomez_nuevo")]
+    finally:
+        servicio.SessionLocal = session_local
+        indice.invalidar()
+
+
+def _muchos_usuarios(cantidad):
+    random.seed(7)
+    nombres = ["Juan", "María", "José", "Lucía", "Martín", "Sofía", "Facundo", "Valentina", "Matías", "Camila"]
+    apellidos = ["Gómez", "Pérez", "Rodríguez", "Fernández", "López", "Martínez", "González", "García",
+                 "Sánchez", "Romero", "Díaz", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores"]
+    indice = IndiceBusquedaUsuarios()
+    for id_usuario in range(1, cantidad + 1):
+        nombre, apellido = random.choice(nombres), random.choice(apellidos)
+        indice.poner(indice.crear_entrada(id_usuario, f"{plegar(nombre)}{id_usuario}", nombre, apellido))
+    return indice
+
+
+def test_rapido_con_muchos_usuarios():
+    indice = _muchos_usuarios(50000)
+
+    inicio = time.perf_counter()
+    for consulta in ["gomez", "facu", "juan perez", "martines", "tinez"] * 20:
+        assert indice.buscar(consulta)
+    assert (time.perf_counter() - inicio) / 100 < 0.01
+
+    # Autocompletado: una consulta por tecla, menos de 1 ms
+    consultas = ["j", "ju", "jua", "juan", "juan p", "juan pe", "gpmez", "facudno", "valen", "zzzz"]
+    inicio = time.perf_counter()
+    for consulta in consultas * 20:
+        indice.autocompletar(consulta, limite=5, excluir={1, 2})
+    assert (time.perf_counter() - inicio) / (len(consultas) * 20) < 0.001
+
+
+def test_autocompletado():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+    indice = IndiceBusquedaUsuarios()
+    indice.cargar(db)
+    antes = contador["queries"]
+
+    # Prefijo de nombres y apellidos (la palabra más corta primero), después usuarios
+    assert [u.id_usuario for u in indice.autocompletar("gom")] == [5, 2, 1]
+    # Usuario exacto primero; "Gomes" entra por un error de tipeo
+    assert [u.id_usuario for u in indice.autocompletar("gomez")] == [1, 2, 5]
+    assert [u.id_usuario for u in indice.autocompletar("gomez", excluir={1})] == [2, 5]
+    assert [u.id_usuario for u in indice.autocompletar("Martín Gó")] == [2]
+    # Un error de tipeo (cambio, transposición o letra de más) en el apellido
+    assert 2 in [u.id_usuario for u in indice.autocompletar("gpmez")]
+    assert [u.id_usuario for u in indice.autocompletar("fenrandez")] == [3]
+    assert [u.id_usuario for u in indice.autocompletar("martni gomez")] == [2]
+    # Sin perfil no se sugiere (salvo que se pida)
+    assert indice.autocompletar("sinperfil") == []
+    assert [u.id_usuario for u in indice.autocompletar("sinperfil", solo_con_perfil=False)] == [6]
+    assert contador["queries"] == antes
+
+    # Las listas guardadas de palabras frecuentes se actualizan con los cambios
+    indice = _muchos_usuarios(MAX_SUGERENCIAS * 30)
+    primero = indice.autocompletar("juan", limite=1)[0]
+    indice.quitar(primero.id_usuario)
+    assert indice.autocompletar("juan", limite=1)[0].id_usuario != primero.id_usuario
+    indice.poner(primero)
+    assert indice.autocompletar("juan", limite=1)[0] == primero
+
+
+if __name__ == "__main__":
+    test_orden_y_acentos()
+    test_refrescos()
+    test_recarga_vencida_en_segundo_plano()
+    test_rapido_con_muchos_usuarios()
+    test_autocompletado()
+    print("\n✅ Tests de búsqueda de usuarios OK")
@@ -0,0 +1,200 @@
+"""
+Test del caché de autenticación: token y usuario sin queries en los
+requests siguientes, foto de solo lectura fuera de la sesión, cambios
+guardados e invalidación al modificar usuarios
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import time
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import text, update
+from sqlalchemy.orm import sessionmaker
+
+from db_pruebas import crear_db_pruebas
+from src.auth import auth_utils
+from src.auth.cache_auth import CacheAuth, cache_auth, recargar_usuario
+from src.auth.firebase_handler import FirebaseHandler
+from src.auth.jwt_handler import JWTHandler
+from src.models.driveplus_models import Usuario, Partido
+from src.models.torneo_models import Torneo, TorneoPareja
+from src.schemas.torneo_schemas import ParejaInscripcion
+from src.services.torneo_inscripcion_service import TorneoInscripcionService
+from src.services.torneo_resultado_service import TorneoResultadoService
+
+
+def _autenticar(db, token):
+    credenciales = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(auth_utils.get_current_user(credenciales, db))
+
+
+def _crear_datos():
+    cache_auth.limpiar()
+    db, contador = crear_db_pruebas()
+    db.add(Usuario(id_usuario=1, nombre_usuario="j1", email="j1@test.com", rating=1500))
+    db.add(Usuario(id_usuario=2, nombre_usuario="j2", email="j2@test.com", rating=1400))
+    db.commit()
+    nueva_sesion = sessionmaker(bind=db.get_bind(), autoflush=False)
+    return db, contador, nueva_sesion
+
+
+def test_requests_siguientes_sin_queries():
+    _, contador, nueva_sesion = _crear_datos()
+    token = JWTHandler.create_access_token({"sub": "1"})
+
+    assert _autenticar(nueva_sesion(), token).rating == 1500
+
+    # Otro request: ni verificación ni SELECT
+    db = nueva_sesion()
+    antes = contador["queries"]
+    usuario = _autenticar(db, token)
+    assert contador["queries"] == antes
+    assert usuario.id_usuario == 1 and usuario.nombre_usuario == "j1"
+
+    # La foto no queda en la sesión: para modificarlo se recarga
+    assert usuario not in db
+    usuario = recargar_usuario(db, usuario)
+    usuario.fcm_token = "token-fcm"
+    db.commit()
+    assert nueva_sesion().get(Usuario, 1).fcm_token == "token-fcm"
+
+    # ... y el commit descartó la foto: el próximo request la relee
+    antes = contador["queries"]
+    assert _autenticar(nueva_sesion(), token).fcm_token == "token-fcm"
+    assert contador["queries"] == antes + 1
+
+
+def test_invalidacion_por_cambios_de_otros():
+    _, contador, nueva_sesion = _crear_datos()
+    token = JWTHandler.create_access_token({"sub": "2"})
+    _autenticar(nueva_sesion(), token)
+
+    # Rating cambiado por otro proceso (p. ej. el Elo) con el ORM
+    db = nueva_sesion()
+    db.get(Usuario, 2).rating = 1450
+    db.commit()
+    assert _autenticar(nueva_sesion(), token).rating == 1450
+
+    # Update en bloque: descarta todas las fotos
+    db = nueva_sesion()
+    db.execute(update(Usuario).where(Usuario.id_usuario == 2).values(es_administrador=True))
+    db.commit()
+    assert _autenticar(nueva_sesion(), token).es_administrador is True
+
+    # Un rollback no invalida nada
+    db = nueva_sesion()
+    db.get(Usuario, 2).rating = 9999
+    db.flush()
+    db.rollback()
+    antes = contador["queries"]
+    assert _autenticar(nueva_sesion(), token).rating == 1450
+    assert contador["queries"] == antes
+
+
+def _torneo_con_foto_vieja(nueva_sesion):
+    """
+    Sesión de un request cuyo usuario (1) salió de una foto vieja: otro
+    worker le cambió el rating y la categoría después de cachearla
+    """
+    db = nueva_sesion()
+    for id_usuario in (3, 4):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=1400))
+    db.add(Torneo(id=1, nombre="T1", categoria="5ta", fecha_inicio=date(2026, 3, 1),
+                  fecha_fin=date(2026, 3, 2), creado_por=1, estado="inscripcion"))
+    db.commit()
+    token = JWTHandler.create_access_token({"sub": "1"})
+    _autenticar(nueva_sesion(), token)
+
+    otra = nueva_sesion()
+    otra.execute(text("UPDATE usuarios SET rating = 1600, id_categoria = 7 WHERE id_usuario = 1"))
+    otra.commit()
+
+    # current_user sigue vivo durante el request
+    db = nueva_sesion()
+    usuario = _autenticar(db, token)
+    assert usuario.rating == 1500
+    return db, usuario
+
+
+def test_elo_no_lee_la_foto():
+    """El Elo parte del rating de la base aunque el request tenga la foto"""
+    _, _, nueva_sesion = _crear_datos()
+    db, usuario = _torneo_con_foto_vieja(nueva_sesion)
+    db.add(TorneoPareja(id=10, torneo_id=1, jugador1_id=1, jugador2_id=2, estado="confirmada"))
+    db.add(TorneoPareja(id=11, torneo_id=1, jugador1_id=3, jugador2_id=4, estado="confirmada"))
+    db.add(Partido(id_partido=1, fecha=datetime(2026, 3, 1, 18, 0), id_creador=1, tipo="torneo",
+                   id_torneo=1, pareja1_id=10, pareja2_id=11, estado="pendiente"))
+    db.flush()
+
+    cambios = TorneoResultadoService._aplicar_elo_torneo(db, db.get(Partido, 1), {"sets": [
+        {"gamesEquipoA": 6, "gamesEquipoB": 3, "ganador": "equipoA"},
+        {"gamesEquipoA": 6, "gamesEquipoB": 4, "ganador": "equipoA"},
+    ]}, 10)
+    assert cambios[1]["anterior"] == 1600
+    assert usuario.rating == 1500  # la foto no se toca
+
+
+def test_inscripcion_no_lee_la_foto():
+    """Inscribir con el usuario del request lee rating y categoría de la base"""
+    _, _, nueva_sesion = _crear_datos()
+    db, usuario = _torneo_con_foto_vieja(nueva_sesion)
+
+    pareja = TorneoInscripcionService.inscribir_pareja(
+        db, 1, ParejaInscripcion(jugador1_id=1, jugador2_id=2), usuario.id_usuario
+    )
+    assert pareja.jugador1_id == 1
+    jugador = db.query(Usuario).filter(Usuario.id_usuario == 1).first()
+    assert jugador is not usuario
+    assert (jugador.rating, jugador.id_categoria) == (1600, 7)
+
+
+def test_firebase_verifica_una_vez():
+    _, _, nueva_sesion = _crear_datos()
+    llamadas = []
+
+    def verificar(token):
+        llamadas.append(token)
+        return {"firebase": True, "firebase_email": "j1@test.com", "exp": time.time() + 3600}
+
+    original = FirebaseHandler.verify_token
+    FirebaseHandler.verify_token = verificar
+    try:
+        assert _autenticar(nueva_sesion(), "token-firebase").id_usuario == 1
+        assert _autenticar(nueva_sesion(), "token-firebase").id_usuario == 1
+        assert llamadas == ["token-firebase"]
+
+        # Email sin usuario: 404 (y no queda cacheado como válido)
+        FirebaseHandler.verify_token = lambda token: {"firebase": True, "firebase_email": "x@test.com"}
+        try:
+            _autenticar(nueva_sesion(), "otro-token")
+            assert False, "usuario inexistente aceptado"
+        except HTTPException as e:
+            assert e.status_code == 404
+    finally:
+        FirebaseHandler.verify_token = original
+
+
+def test_vencimiento_y_capacidad():
+    cache = CacheAuth(max_tokens=2)
+    cache.guardar_claims("vencido", {"sub": "1", "exp": time.time() - 1})
+    assert cache.claims("vencido") is None
+
+    for token in ("a", "b", "c"):
+        cache.guardar_claims(token, {"sub": token, "exp": time.time() + 60})
+    assert cache.claims("a") is None and cache.claims("c")["sub"] == "c"
+
+
+if __name__ == "__main__":
+    test_requests_siguientes_sin_queries()
+    test_invalidacion_por_cambios_de_otros()
+    test_elo_no_lee_la_foto()
+    test_inscripcion_no_lee_la_foto()
+    test_firebase_verifica_una_vez()
+    test_vencimiento_y_capacidad()
+    print("\n✅ Tests de caché de autenticación OK")
@@ -0,0 +1,113 @@
+"""
+Test del índice de categorías en memoria y de la corrección masiva
+Verifica que den lo mismo que la query original por usuario
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import random
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, Categoria
+from src.services import categoria_service
+from src.controllers.categoria_maintenance_controller import ejecutar_correccion_categorias
+
+
+BANDAS = [
+    # (id, nombre, sexo, rating_min, rating_max)
+    (1, "8va", "M", None, 999),
+    (2, "7ma", "M", 1000, 1199),
+    (3, "6ta", "M", 1200, 1399),
+    (4, "5ta", "M", 1400, 1599),
+    (5, "Libre", "M", 1600, None),
+    (6, "Principiante", "F", None, 1099),
+    (7, "7ma", "F", 1000, 1299),  # se solapa con Principiante: gana la de mayor rating_min
+    (8, "6ta", "F", 1300, 1500),
+]
+
+
+def crear_db_con_categorias():
+    categoria_service.invalidar_indice_categorias()
+    db, contador = crear_db_pruebas()
+    for id_categoria, nombre, sexo, rating_min, rating_max in BANDAS:
+        db.add(Categoria(id_categoria=id_categoria, nombre=nombre, sexo=sexo,
+                         rating_min=rating_min, rating_max=rating_max))
+    db.commit()
+    return db, contador
+
+
+def categoria_por_query(db, rating, sexo):
+    """Query original (una por usuario)"""
+    return db.query(Categoria).filter(
+        Categoria.sexo == sexo,
+        (Categoria.rating_min.is_(None) | (Categoria.rating_min <= rating)),
+        (Categoria.rating_max.is_(None) | (Categoria.rating_max >= rating))
+    ).order_by(Categoria.rating_min.desc().nulls_last(), Categoria.id_categoria).first()
+
+
+def test_indice_igual_a_query():
+    db, _ = crear_db_con_categorias()
+    for sexo in ("M", "F", "X"):
+        for rating in range(0, 2001):
+            esperada = categoria_por_query(db, rating, sexo)
+            obtenida = categoria_service.obtener_categoria_por_rating(db, rating, sexo)
+            assert (obtenida.id_categoria if obtenida else None) == \
+                (esperada.id_categoria if esperada else None), (sexo, rating)
+
+
+def test_actualizacion_por_partido_sin_queries():
+    db, contador = crear_db_con_categorias()
+    usuario = Usuario(id_usuario=1, nombre_usuario="j1", email="j1@test.com", sexo="M", rating=1250)
+    db.add(usuario)
+    db.commit()
+
+    db.refresh(usuario)
+    categoria_service.obtener_indice_categorias(db)  # carga inicial: una query
+    antes = contador["queries"]
+    for rating in (950, 1100, 1250, 1450, 1700):
+        usuario.rating = rating
+        categoria = categoria_service.actualizar_categoria_usuario(db, usuario)
+        assert usuario.id_categoria == categoria.id_categoria
+    assert contador["queries"] == antes
+    assert usuario.id_categoria == 5
+
+
+def test_correccion_masiva_igual_a_por_usuario():
+    db, contador = crear_db_con_categorias()
+    rng = random.Random(7)
+    for id_usuario in range(1, 301):
+        db.add(Usuario(
+            id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}", email=f"j{id_usuario}@test.com",
+            sexo=rng.choice(["M", "F", None]), rating=rng.randint(700, 1800),
+            id_categoria=rng.choice([None, 1, 2, 3, 6, 7])
+        ))
+    db.commit()
+
+    esperado = {}
+    for usuario in db.query(Usuario).all():
+        categoria = categoria_por_query(db, usuario.rating, usuario.sexo) if usuario.sexo else None
+        esperado[usuario.id_usuario] = categoria.id_categoria if categoria else usuario.id_categoria
+
+    antes = contador["queries"]
+    resultado = asyncio.run(ejecutar_correccion_categorias(db))
+    # Índice + usuarios sin sexo + conteo + incorrectas + UPDATE: no depende de la cantidad de usuarios
+    assert contador["queries"] - antes <= 5
+    assert resultado["usuarios_corregidos"] > 0
+    assert resultado["errores"] == sum(1 for u in db.query(Usuario).all() if not u.sexo)
+
+    db.expire_all()
+    obtenido = {u.id_usuario: u.id_categoria for u in db.query(Usuario).all()}
+    assert obtenido == esperado
+
+    # Segunda pasada: nada que corregir
+    assert asyncio.run(ejecutar_correccion_categorias(db))["usuarios_corregidos"] == 0
+    assert categoria_service.listar_categorias_incorrectas(db) == []
+
+
+if __name__ == "__main__":
+    test_indice_igual_a_query()
+    test_actualizacion_por_partido_sin_queries()
+    test_correccion_masiva_igual_a_por_usuario()
+    print("\n✅ Tests de índice de categorías OK")
@@ -0,0 +1,101 @@
+"""
+Test de la cola durable de confirmaciones (trabajos_confirmacion)
+Usa una base SQLite en memoria (FOR UPDATE / SKIP LOCKED se ignoran en SQLite)
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_auto_confirmacion_lotes import preparar_escenario
+from src.models.driveplus_models import Partido, HistorialRating
+from src.models.confirmacion import TrabajoConfirmacion
+from src.services.confirmacion_service import ConfirmacionService
+from src.services.cola_confirmaciones_service import ColaConfirmacionesService
+
+
+def test_encolado_idempotente():
+    """Encolar dos veces el mismo partido devuelve el mismo trabajo"""
+    db, _ = preparar_escenario()
+
+    primero = ColaConfirmacionesService.encolar_aplicacion_elo(7, db)
+    db.commit()
+    segundo = ColaConfirmacionesService.encolar_aplicacion_elo(7, db)
+    db.commit()
+
+    assert primero.id_trabajo == segundo.id_trabajo
+    assert db.query(TrabajoConfirmacion).count() == 1
+
+
+def test_doble_confirmacion_no_duplica_elo():
+    """Procesar el trabajo aplica el Elo una vez; la cola queda vacía"""
+    db, _ = preparar_escenario()
+
+    ColaConfirmacionesService.encolar_aplicacion_elo(7, db)
+    ColaConfirmacionesService.encolar_aplicacion_elo(7, db)
+    db.commit()
+
+    info = ColaConfirmacionesService.procesar_siguiente(db)
+    assert info["trabajo"]["estado"] == "completado"
+    assert info["trabajo"]["resultado"] is not None
+    assert ColaConfirmacionesService.procesar_siguiente(db) is None
+
+    partido = db.query(Partido).filter(Partido.id_partido == 7).first()
+    assert partido.elo_aplicado is True
+    assert partido.estado_confirmacion == "confirmado"
+    assert db.query(HistorialRating).filter(HistorialRating.id_partido == 7).count() == 4
+
+
+def test_fallo_reprograma_con_backoff():
+    """Un trabajo que falla suma un intento y se reprograma a futuro"""
+    db, _ = preparar_escenario()
+
+    # Partido 8 no tiene resultado cargado: aplicar el Elo falla
+    ColaConfirmacionesService.encolar_aplicacion_elo(8, db)
+    db.commit()
+
+    info = ColaConfirmacionesService.procesar_siguiente(db)
+    assert info["trabajo"]["estado"] == "pendiente"
+    assert info["trabajo"]["intentos"] == 1
+    assert info["trabajo"]["error"]
+
+    # Hasta que venza el backoff no se vuelve a tomar
+    assert ColaConfirmacionesService.procesar_siguiente(db) is None
+
+    partido = db.query(Partido).filter(Partido.id_partido == 8).first()
+    assert partido.elo_aplicado is False
+
+
+def test_trabajo_sobre_partido_ya_aplicado():
+    """Si la auto-confirmación ganó la carrera, el trabajo se completa sin cambios"""
+    db, _ = preparar_escenario()
+
+    ColaConfirmacionesService.encolar_aplicacion_elo(1, db)
+    db.commit()
+    ConfirmacionService.auto_confirmar_partidos_antiguos(db)
+    historial_antes = db.query(HistorialRating).count()
+
+    info = ColaConfirmacionesService.procesar_siguiente(db)
+    assert info["trabajo"]["estado"] == "completado"
+    assert info["cambios"] is None
+    assert db.query(HistorialRating).count() == historial_antes
+
+
+if __name__ == "__main__":
+    test_encolado_idempotente()
+    test_doble_confirmacion_no_duplica_elo()
+    test_fallo_reprograma_con_backoff()
+    test_trabajo_sobre_partido_ya_aplicado()
+    print("\n✅ Tests de cola de confirmaciones OK")
+
+
+def test_confirmar_estima_elo_del_que_confirma():
+    """La estimación de Elo usa el equipo de quien confirma, no el del último jugador"""
+    db, _ = preparar_escenario()
+
+    # Partido 7: jugadores 1 y 2 ganan (equipo 1), 3 y 4 pierden; lo creó el 1
+    info = ConfirmacionService.confirmar_resultado(7, 2, db)
+    assert info["cambio_elo_usuario"] == 8
+    assert set(info["jugadores_faltantes"]) == {"jugador3", "jugador4"}
+
+    info = ConfirmacionService.confirmar_resultado(7, 3, db)
+    assert info["cambio_elo_usuario"] == -8
@@ -0,0 +1,108 @@
+"""
+Test de la cola de notificaciones push (notificaciones_pendientes)
+Usa SQLite en memoria y el transporte stub (sin FCM)
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+
+from db_pruebas import crear_db_pruebas
+from test_auto_confirmacion_lotes import preparar_escenario
+from src.models.driveplus_models import Usuario
+from src.models.notificacion import NotificacionPendiente
+from src.services.notification_service import NotificationService
+from src.services.cola_confirmaciones_service import ColaConfirmacionesService
+from src.services.cola_notificaciones_service import (
+    ColaNotificacionesService, TransporteStub, TAMANO_LOTE_FCM
+)
+
+
+def crear_usuarios(db, cantidad, sin_token=()):
+    for id_usuario in range(1, cantidad + 1):
+        db.add(Usuario(
+            id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}", email=f"j{id_usuario}@test.com",
+            fcm_token=None if id_usuario in sin_token else f"token-{id_usuario}"
+        ))
+    db.commit()
+
+
+def test_request_solo_encola():
+    """enviar_notificacion no llama a FCM: deja una fila pendiente"""
+    db, _ = crear_db_pruebas()
+    crear_usuarios(db, 1)
+
+    resultado = NotificationService.enviar_notificacion(
+        db, 1, "🎾 Invitación a torneo", "Te invitaron", {"torneo_id": 5, "codigo": None}
+    )
+    assert resultado["success"] is True
+
+    notificacion = db.query(NotificacionPendiente).one()
+    assert notificacion.estado == "pendiente"
+    assert notificacion.data == {"torneo_id": "5", "codigo": ""}
+
+
+def test_lotes_de_500_y_tokens_en_una_query():
+    db, contador = crear_db_pruebas()
+    crear_usuarios(db, 600, sin_token={3})
+    ColaNotificacionesService.encolar(db, list(range(1, 601)), "Aviso", "Hola")
+    db.commit()
+
+    transporte = TransporteStub()
+    antes = contador["queries"]
+    conteo = ColaNotificacionesService.procesar_lote(db, transporte)
+    # Pendientes + tokens + UPDATE de las notificaciones: no depende de la cantidad
+    assert contador["queries"] - antes <= 3
+
+    assert len(transporte.lotes) == 1 and len(transporte.lotes[0]) == TAMANO_LOTE_FCM - 1
+    assert conteo["enviadas"] == 499 and conteo["sin_token"] == 1
+
+    conteo = ColaNotificacionesService.procesar_lote(db, transporte)
+    assert conteo["enviadas"] == 100
+    assert ColaNotificacionesService.procesar_lote(db, transporte) is None
+    assert db.query(NotificacionPendiente).filter(NotificacionPendiente.estado == "enviada").count() == 599
+
+
+def test_reintento_con_backoff_y_poda_de_tokens():
+    db, _ = crear_db_pruebas()
+    crear_usuarios(db, 3)
+    ColaNotificacionesService.encolar(db, [1, 2, 3], "Aviso", "Hola")
+    db.commit()
+
+    # FCM caído: todo se reprograma a futuro
+    transporte = TransporteStub(tokens_invalidos={"token-2"}, fallos_transitorios=1)
+    conteo = ColaNotificacionesService.procesar_lote(db, transporte)
+    assert conteo["reintentos"] == 3
+    assert ColaNotificacionesService.procesar_lote(db, transporte) is None  # en backoff
+
+    # Vence el backoff: se envían y se poda el token inválido
+    db.query(NotificacionPendiente).update({"disponible_en": datetime(2000, 1, 1)})
+    db.commit()
+    conteo = ColaNotificacionesService.procesar_lote(db, transporte)
+    assert conteo["enviadas"] == 2 and conteo["tokens_eliminados"] == 1
+
+    db.expire_all()
+    assert db.query(Usuario).filter(Usuario.id_usuario == 2).one().fcm_token is None
+    estados = {n.id_usuario: (n.estado, n.intentos) for n in db.query(NotificacionPendiente).all()}
+    assert estados == {1: ("enviada", 2), 2: ("sin_token", 2), 3: ("enviada", 2)}
+
+
+def test_elo_encola_push_en_la_misma_transaccion():
+    """Aplicar el Elo de una confirmación deja una notificación por jugador"""
+    db, _ = preparar_escenario()
+    ColaConfirmacionesService.encolar_aplicacion_elo(7, db)
+    db.commit()
+
+    info = ColaConfirmacionesService.procesar_siguiente(db)
+    notificaciones = db.query(NotificacionPendiente).all()
+    assert {n.id_usuario for n in notificaciones} == set(info["cambios"])
+    assert all(n.data["tipo"] == "elo_actualizado" for n in notificaciones)
+
+
+if __name__ == "__main__":
+    test_request_solo_encola()
+    test_lotes_de_500_y_tokens_en_una_query()
+    test_reintento_con_backoff_y_poda_de_tokens()
+    test_elo_encola_push_en_la_misma_transaccion()
+    print("\n✅ Tests de cola de notificaciones OK")
@@ -0,0 +1,170 @@
+"""
+Test del ConnectionManager con colas de envío por conexión
+Usa sockets falsos: uno rápido, uno lento y uno muerto
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import json
+import time
+from unittest import mock
+
+from src.websocket.connection_manager import (
+    ConnectionManager, POLITICA_DESCARTAR_ANTIGUO, POLITICA_DESCONECTAR
+)
+from src.websocket.pubsub import BrokerMemoria, RedMemoria, canal_sala
+
+
+class SocketFalso:
+    """WebSocket mínimo: acepta, guarda lo enviado y puede demorar o fallar"""
+
+    def __init__(self, demora: float = 0.0, roto: bool = False):
+        self.demora = demora
+        self.roto = roto
+        self.recibidos = []
+        self.cerrado_con = None
+        self.bloqueo = asyncio.Event()
+        self.bloqueo.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, texto):
+        await self.bloqueo.wait()
+        if self.roto:
+            raise RuntimeError("socket cerrado")
+        if self.demora:
+            await asyncio.sleep(self.demora)
+        self.recibidos.append(json.loads(texto))
+
+    async def send_json(self, message):
+        await self.send_text(json.dumps(message))
+
+    async def close(self, code=1000):
+        self.cerrado_con = code
+
+
+async def esperar_colas(manager, canal):
+    for _ in range(200):
+        if all(c.cola.empty() for c in manager.active_connections.get(canal, {}).values()):
+            break
+        await asyncio.sleep(0.005)
+    await asyncio.sleep(0.01)
+
+
+def test_cliente_lento_no_demora_al_resto():
+    async def escenario():
+        manager = ConnectionManager(max_pendientes=50, broker=BrokerMemoria())
+        rapido, lento = SocketFalso(), SocketFalso(demora=0.5)
+        await manager.connect(rapido, canal_sala(1))
+        await manager.connect(lento, canal_sala(1))
+
+        inicio = time.perf_counter()
+        for i in range(5):
+            await manager.notify_marcador_actualizado("1", {"n": i})
+        assert time.perf_counter() - inicio < 0.1  # el broadcast no espera envíos
+
+        await asyncio.sleep(0.05)
+        assert [m["data"]["n"] for m in rapido.recibidos] == [0, 1, 2, 3, 4]
+        assert len(lento.recibidos) < 5
+        manager.disconnect(rapido, canal_sala(1))
+        manager.disconnect(lento, canal_sala(1))
+
+    asyncio.run(escenario())
+
+
+def test_json_serializado_una_vez():
+    async def escenario():
+        manager = ConnectionManager(broker=BrokerMemoria())
+        sockets = [SocketFalso() for _ in range(20)]
+        for ws in sockets:
+            await manager.connect(ws, canal_sala(2))
+        with mock.patch("src.websocket.connection_manager.json.dumps", wraps=json.dumps) as dumps:
+            await manager.notify_jugador_unido("2", {"id": 7})
+        assert dumps.call_count == 1
+        await esperar_colas(manager, canal_sala(2))
+        assert all(ws.recibidos == [{"type": "jugador_unido", "data": {"id": 7}}] for ws in sockets)
+
+    asyncio.run(escenario())
+
+
+def test_politica_descartar_antiguo():
+    async def escenario():
+        manager = ConnectionManager(max_pendientes=3, politica=POLITICA_DESCARTAR_ANTIGUO,
+                                    broker=BrokerMemoria())
+        ws = SocketFalso()
+        ws.bloqueo.clear()
+        await manager.connect(ws, canal_sala(3))
+        for i in range(10):
+            await manager.broadcast_to_sala("3", {"n": i})
+            await asyncio.sleep(0)  # el emisor toma el primer mensaje y queda bloqueado
+        ws.bloqueo.set()
+        await esperar_colas(manager, canal_sala(3))
+        # El mensaje en vuelo + los 3 más recientes
+        assert [m["n"] for m in ws.recibidos] == [0, 7, 8, 9]
+        assert canal_sala(3) in manager.active_connections
+
+    asyncio.run(escenario())
+
+
+def test_politica_desconectar_y_socket_muerto():
+    async def escenario():
+        manager = ConnectionManager(max_pendientes=3, politica=POLITICA_DESCONECTAR,
+                                    broker=BrokerMemoria())
+        lento, muerto, sano = SocketFalso(), SocketFalso(roto=True), SocketFalso()
+        lento.bloqueo.clear()
+        for ws in (lento, muerto, sano):
+            await manager.connect(ws, canal_sala(4))
+        for i in range(10):
+            await manager.broadcast_to_sala("4", {"n": i})
+            await asyncio.sleep(0)
+        await esperar_colas(manager, canal_sala(4))
+
+        conectados = manager.active_connections[canal_sala(4)]
+        assert lento not in conectados and lento.cerrado_con == 1008
+        assert muerto not in conectados
+        assert sano in conectados and len(sano.recibidos) == 10
+
+    asyncio.run(escenario())
+
+
+def test_pubsub_entre_workers():
+    """Un evento publicado en un worker llega a los clientes de los demás, una sola vez"""
+    async def escenario():
+        red = RedMemoria()
+        worker_a = ConnectionManager(broker=BrokerMemoria(red))
+        worker_b = ConnectionManager(broker=BrokerMemoria(red))
+        for worker in (worker_a, worker_b):
+            await worker.iniciar_pubsub()
+
+        en_a, en_b, otra_sala = SocketFalso(), SocketFalso(), SocketFalso()
+        await worker_a.connect(en_a, canal_sala(5))
+        await worker_b.connect(en_b, canal_sala(5))
+        await worker_b.connect(otra_sala, canal_sala(6))
+
+        await worker_a.notify_marcador_actualizado("5", {"games": [6, 4]})
+        await esperar_colas(worker_a, canal_sala(5))
+        await esperar_colas(worker_b, canal_sala(5))
+
+        esperado = [{"type": "marcador_actualizado", "data": {"games": [6, 4]}}]
+        assert en_a.recibidos == esperado
+        assert en_b.recibidos == esperado
+        assert otra_sala.recibidos == []
+
+        await worker_b.detener_pubsub()
+        await worker_a.notify_marcador_actualizado("5", {"games": [6, 5]})
+        await esperar_colas(worker_b, canal_sala(5))
+        assert len(en_a.recibidos) == 2 and len(en_b.recibidos) == 1
+
+    asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    test_cliente_lento_no_demora_al_resto()
+    test_json_serializado_una_vez()
+    test_politica_descartar_antiguo()
+    test_politica_desconectar_y_socket_muerto()
+    test_pubsub_entre_workers()
+    print("\n✅ Tests de ConnectionManager OK")
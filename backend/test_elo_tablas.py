@@ -0,0 +1,178 @@
+"""
+Test de las tablas precalculadas del Elo
+Verifica que las tablas den exactamente (bit a bit) lo mismo que las fórmulas
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import random
+from contextlib import contextmanager
+from unittest import mock
+
+from src.services import elo_tablas
+from src.services.elo_config import EloConfig, apply_custom_config
+from src.services.elo_config_v2 import EloConfigV2
+from src.services.elo_service import EloService
+from src.services.elo_service_v2 import EloServiceV2
+
+
+def partido_aleatorio(rng):
+    """Partido al mejor de 3 con ratings, experiencia y volatilidad aleatorios"""
+    sets = []
+    sets_a = sets_b = 0
+    while sets_a < 2 and sets_b < 2:
+        ganador, perdedor = rng.choice([(6, rng.randint(0, 4)), (7, 5), (7, 6)])
+        if rng.random() < 0.5:
+            sets.append({"games_a": ganador, "games_b": perdedor})
+            sets_a += 1
+        else:
+            sets.append({"games_a": perdedor, "games_b": ganador})
+            sets_b += 1
+
+    def jugador():
+        return {
+            "id": rng.randint(1, 10 ** 6),
+            "rating": rng.randint(500, 2200),
+            "partidos": rng.randint(0, 60),
+            "volatilidad": rng.choice([1.0, rng.uniform(0.6, 1.4)]),
+        }
+
+    return {
+        "team_a_players": [jugador(), jugador()],
+        "team_b_players": [jugador(), jugador()],
+        "sets_a": sets_a,
+        "sets_b": sets_b,
+        "games_a": sum(s["games_a"] for s in sets),
+        "games_b": sum(s["games_b"] for s in sets),
+        "sets_detail": sets,
+        "match_type": rng.choice(["amistoso", "torneo", "zona", "cuartos", "semi", "final"]),
+    }
+
+
+@contextmanager
+def usar_formulas(config):
+    """Reemplaza las búsquedas en tabla por las fórmulas originales"""
+    parches = [
+        mock.patch.object(config, "expected_score", classmethod(
+            lambda cls, diff: elo_tablas.expectativa_formula(diff, cls.ELO_SCALE))),
+        mock.patch.object(config, "get_k_factor", classmethod(
+            lambda cls, p: elo_tablas.k_factor_formula(cls.K_FACTORS, p))),
+    ]
+    if hasattr(config, "calculate_margin_factor_formula"):
+        parches.append(mock.patch.object(config, "calculate_margin_factor", config.calculate_margin_factor_formula))
+    for parche in parches:
+        parche.start()
+    try:
+        yield
+    finally:
+        for parche in parches:
+            parche.stop()
+
+
+def test_expectativa_identica():
+    """Diferencias enteras, medias, fraccionarias y fuera de rango"""
+    rng = random.Random(1)
+    diferencias = [d / 2 for d in range(-4000, 4001)]
+    diferencias += [rng.uniform(-2000, 2000) for _ in range(2000)]
+    diferencias += [-3000, 3000, 0]
+    for config in (EloConfig, EloConfigV2):
+        for diff in diferencias:
+            assert config.expected_score(diff) == elo_tablas.expectativa_formula(diff, config.ELO_SCALE), diff
+
+
+def test_k_factor_identico():
+    for config in (EloConfig, EloConfigV2):
+        for partidos in list(range(-5, 500)) + [5.0, 5.5, 10 ** 9]:
+            assert config.get_k_factor(partidos) == elo_tablas.k_factor_formula(config.K_FACTORS, partidos)
+
+
+def test_factor_margen_identico():
+    """Todas las combinaciones de sets/games y detalles de sets aleatorios"""
+    rng = random.Random(2)
+    for sets_a in range(0, 4):
+        for sets_b in range(0, 4):
+            for games_a in range(0, 30):
+                for games_b in range(0, 30):
+                    args = (sets_a, sets_b, games_a, games_b, None)
+                    assert EloConfigV2.calculate_margin_factor(*args) == EloConfigV2.calculate_margin_factor_formula(*args)
+
+    for _ in range(5000):
+        detalle = [
+            {"games_a": rng.randint(0, 11), "games_b": rng.randint(0, 11)}
+            for _ in range(rng.randint(0, 4))
+        ]
+        args = (rng.randint(0, 3), rng.randint(0, 3), rng.randint(0, 40), rng.randint(0, 40), detalle)
+        assert EloConfigV2.calculate_margin_factor(*args) == EloConfigV2.calculate_margin_factor_formula(*args)
+
+
+def test_escalones_de_margen_compartidos():
+    """Cambiar los escalones del margen y recompilar mueve la fórmula y la tabla juntas"""
+    originales = (EloConfigV2.MARGIN_SCORE_SETS, EloConfigV2.MARGIN_GAMES_RATIOS, EloConfigV2.MARGIN_SCORE_GAMES)
+    args = (2, 0, 12, 9, [{"games_a": 6, "games_b": 4}, {"games_a": 6, "games_b": 5}])  # 12-9: 14% de games
+    factor_original = EloConfigV2.calculate_margin_factor(*args)
+    try:
+        EloConfigV2.MARGIN_SCORE_SETS = (0.25, 0.05, 0.0)
+        EloConfigV2.MARGIN_GAMES_RATIOS = (0.50, 0.35, 0.20, 0.15)
+        EloConfigV2.MARGIN_SCORE_GAMES = (0.35, 0.28, 0.18, 0.08, 0.02)
+        EloConfigV2.compilar_tablas()
+        assert EloConfigV2.calculate_margin_factor(*args) != factor_original
+        assert EloConfigV2.calculate_margin_factor(*args) == EloConfigV2.calculate_margin_factor_formula(*args)
+        for games_a in range(0, 30):
+            for games_b in range(0, 30):
+                args = (2, 1, games_a, games_b, None)
+                assert EloConfigV2.calculate_margin_factor(*args) == EloConfigV2.calculate_margin_factor_formula(*args)
+    finally:
+        (EloConfigV2.MARGIN_SCORE_SETS, EloConfigV2.MARGIN_GAMES_RATIOS,
+         EloConfigV2.MARGIN_SCORE_GAMES) = originales
+        EloConfigV2.compilar_tablas()
+
+
+def test_caps_por_rol_identicos():
+    for match_type in ("amistoso", "torneo", "final", "cuartos", "semi", "zona", "otro"):
+        caps = EloConfigV2.get_caps_for_match_type(match_type)
+        assert EloConfigV2.get_role_caps(1000, 1200, match_type, True) == (caps["underdog_win"], caps["underdog_loss"])
+        assert EloConfigV2.get_role_caps(1200, 1000, match_type, False) == (caps["favorite_win"], caps["favorite_loss"])
+        assert EloConfigV2.get_role_caps(1200, 1200, match_type, True) == (
+            (caps["underdog_win"] + caps["favorite_win"]) / 2,
+            (caps["underdog_loss"] + caps["favorite_loss"]) / 2
+        )
+
+
+def test_partidos_completos_identicos():
+    """Los deltas de partidos completos son idénticos con tablas y con fórmulas"""
+    rng = random.Random(3)
+    partidos = [partido_aleatorio(rng) for _ in range(500)]
+
+    for servicio, config in ((EloServiceV2(), EloConfigV2), (EloService(), EloConfig)):
+        con_tablas = [servicio.calculate_match_ratings(**p) for p in partidos]
+        with usar_formulas(config):
+            con_formulas = [servicio.calculate_match_ratings(**p) for p in partidos]
+        assert con_tablas == con_formulas
+
+
+def test_apply_custom_config_recompila():
+    """Cambiar la escala o los K recompila las tablas"""
+    escala, k_factors = EloConfig.ELO_SCALE, EloConfig.K_FACTORS
+    try:
+        apply_custom_config({"elo_scale": 300, "k_factors": {
+            "nuevo": {"max_partidos": 3, "k_value": 56},
+            "experto": {"max_partidos": float('inf'), "k_value": 32}
+        }})
+        assert EloConfig.expected_score(100) == elo_tablas.expectativa_formula(100, 300)
+        assert EloConfig.get_k_factor(3) == 56
+        assert EloConfig.get_k_factor(4) == 32
+    finally:
+        apply_custom_config({"elo_scale": escala, "k_factors": k_factors})
+    assert EloConfig.get_k_factor(3) == 200
+
+
+if __name__ == "__main__":
+    test_expectativa_identica()
+    test_k_factor_identico()
+    test_factor_margen_identico()
+    test_escalones_de_margen_compartidos()
+    test_caps_por_rol_identicos()
+    test_partidos_completos_identicos()
+    test_apply_custom_config_recompila()
+    print("\n✅ Tests de tablas Elo OK")
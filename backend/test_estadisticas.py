@@ -0,0 +1,90 @@
+"""
+Test de las estadísticas del jugador: una sola query con partidos de sala,
+de torneo, títulos y torneos participados
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, Partido, PartidoJugador, ResultadoPartido
+from src.models.torneo_models import Torneo, TorneoPareja
+from src.services.estadisticas_service import EstadisticasService
+
+
+def _partido_sala(db, id_partido, equipo, sets, estado="confirmado", tipo="amistoso"):
+    db.add(Partido(id_partido=id_partido, fecha=datetime.now(), estado=estado, id_creador=1, tipo=tipo))
+    db.add(PartidoJugador(id_partido=id_partido, id_usuario=1, equipo=equipo))
+    if sets:
+        db.add(ResultadoPartido(id_partido=id_partido, id_reportador=1, sets_eq1=sets[0], sets_eq2=sets[1],
+                                detalle_sets=[]))
+
+
+def _crear_datos(db, partidos_sala):
+    for id_usuario in (1, 2, 3, 4):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}", email=f"j{id_usuario}@test.com"))
+
+    # Sala: ganados y perdidos de los dos lados, uno reportado sin resultado y uno pendiente
+    for i in range(partidos_sala):
+        _partido_sala(db, 100 + i, 1 + i % 2, (2, 0) if i % 3 else (0, 2))
+    _partido_sala(db, 90, 1, None, estado="reportado")
+    _partido_sala(db, 91, 1, None, estado="pendiente")        # no cuenta
+    _partido_sala(db, 92, 2, (2, 1), estado="pendiente", tipo="ranking")
+
+    # Torneos: campeón del 1, eliminado en el 2, baja en el 3
+    for id_torneo in (1, 2, 3):
+        db.add(Torneo(id=id_torneo, nombre=f"T{id_torneo}", categoria="5ta", fecha_inicio=date(2026, 1, 1),
+                      fecha_fin=date(2026, 1, 2), creado_por=1))
+    db.add(TorneoPareja(id=10, torneo_id=1, jugador1_id=1, jugador2_id=2, estado="confirmada"))
+    db.add(TorneoPareja(id=11, torneo_id=1, jugador1_id=3, jugador2_id=4, estado="confirmada"))
+    db.add(TorneoPareja(id=20, torneo_id=2, jugador1_id=3, jugador2_id=1, estado="confirmada"))
+    db.add(TorneoPareja(id=30, torneo_id=3, jugador1_id=1, jugador2_id=4, estado="baja"))
+
+    def partido_torneo(id_partido, id_torneo, pareja1, pareja2, ganador, fase="zona", estado="confirmado"):
+        db.add(Partido(id_partido=id_partido, fecha=datetime.now(), estado=estado, id_creador=1, tipo="torneo",
+                       id_torneo=id_torneo, pareja1_id=pareja1, pareja2_id=pareja2,
+                       ganador_pareja_id=ganador, fase=fase))
+
+    partido_torneo(500, 1, 10, 11, 10)
+    partido_torneo(501, 1, 11, 10, 10, fase="final")
+    partido_torneo(502, 1, 10, None, 10, fase="semis", estado="bye")  # no cuenta
+    partido_torneo(503, 2, 20, 99, 99)
+    partido_torneo(504, 2, 20, 98, None, estado="pendiente")          # sin jugar
+    db.commit()
+
+
+def test_estadisticas_completas():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db, 6)
+
+    e = EstadisticasService.obtener_estadisticas(db, 1)
+    # Sala: 6 + 1 reportado sin resultado = 7 amistosos (3 ganados), 1 de ranking perdido
+    assert e["por_tipo"]["amistoso"] == {"partidos_jugados": 7, "partidos_ganados": 3,
+                                         "partidos_perdidos": 4, "porcentaje_victoria": 42.9}
+    assert e["por_tipo"]["ranking"]["partidos_ganados"] == 0
+    assert e["por_tipo"]["torneo"] == {"partidos_jugados": 3, "partidos_ganados": 2,
+                                       "partidos_perdidos": 1, "porcentaje_victoria": 66.7}
+    assert e["partidos_jugados"] == 11 and e["partidos_ganados"] == 5
+    assert e["torneos_participados"] == 2 and e["titulos"] == 1
+
+    # Jugador 4: perdió los dos partidos del torneo 1; la baja del torneo 3 no cuenta
+    rival = EstadisticasService.obtener_estadisticas(db, 4)
+    assert rival["partidos_jugados"] == 2 and rival["partidos_ganados"] == 0
+    assert rival["torneos_participados"] == 1 and rival["titulos"] == 0
+
+
+def test_una_query_sin_importar_el_historial():
+    for cantidad in (3, 300):
+        db, contador = crear_db_pruebas()
+        _crear_datos(db, cantidad)
+        antes = contador["queries"]
+        EstadisticasService.obtener_estadisticas(db, 1)
+        assert contador["queries"] - antes == 1
+
+
+if __name__ == "__main__":
+    test_estadisticas_completas()
+    test_una_query_sin_importar_el_historial()
+    print("\n✅ Tests de estadísticas OK")
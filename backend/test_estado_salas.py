@@ -0,0 +1,89 @@
+"""
+Test del estado de salas en memoria: lecturas sin queries, cambios
+aplicados sobre la versión anterior e invalidación entre workers
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+from datetime import datetime
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, PerfilUsuario
+from src.models.sala import Sala, SalaJugador
+from src.services.sala_service import SalaService
+from src.websocket.connection_manager import ConnectionManager
+from src.websocket.estado_salas import EstadoSalas
+from src.websocket.pubsub import BrokerMemoria, RedMemoria
+
+
+def _crear_datos(db):
+    for id_usuario in (1, 2):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=1500))
+        db.add(PerfilUsuario(id_usuario=id_usuario, nombre=f"N{id_usuario}", apellido="A"))
+    db.add(Sala(id_sala=1, nombre="Sala 1", codigo_invitacion="SALA1", fecha=datetime.now(),
+                estado="esperando", id_creador=1, max_jugadores=4))
+    db.add(SalaJugador(id_sala=1, id_usuario=1, orden=1))
+    db.commit()
+
+
+def test_lecturas_desde_memoria_y_cambios_en_el_lugar():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+    estados = EstadoSalas(ConnectionManager(broker=BrokerMemoria()))
+
+    estado = estados.obtener(db, 1)
+    assert estado.version == 1 and [j["id_usuario"] for j in estado.jugadores] == [1]
+    assert estados.obtener(db, 999) is None
+
+    # Segunda lectura: sin queries
+    antes = contador["queries"]
+    assert estados.obtener(db, 1) is estado
+    assert contador["queries"] == antes
+
+    # Unión: el cambio se aplica sobre la versión anterior, sin rearmar
+    _, orden = SalaService.unirse(db, "SALA1", 2)
+    estados.modificar(1, 2, lambda e: e.jugadores.append({"id_usuario": 2, "orden": orden}))
+    nuevo = estados.en_memoria(1)
+    assert nuevo.version == 2 and [j["id_usuario"] for j in nuevo.jugadores] == [1, 2]
+    assert [j["id_usuario"] for j in estado.jugadores] == [1]  # la copia anterior no cambia
+
+    # Un salto de versión (cambio que este worker no vio): se descarta y se rearma
+    estados.modificar(1, 4, lambda e: None)
+    assert estados.en_memoria(1) is None
+
+
+def test_version_publicada_descarta_y_no_guarda_copias_viejas():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    red = RedMemoria()
+    worker_a = EstadoSalas(ConnectionManager(broker=BrokerMemoria(red)))
+    worker_b = EstadoSalas(ConnectionManager(broker=BrokerMemoria(red)))
+
+    async def escenario():
+        for worker in (worker_a, worker_b):
+            await worker.manager.iniciar_pubsub()
+
+        vieja = worker_b.obtener(db, 1)
+        assert vieja.version == 1
+
+        # El worker A cambia la sala: el B se entera por el pub/sub y descarta su copia
+        version = SalaService.incrementar_version(db, 1)
+        db.commit()
+        await worker_a.publicar(1, version)
+        assert worker_b.en_memoria(1) is None
+
+        # Una lectura que armó el estado antes del cambio no lo guarda
+        worker_b._guardar(1, vieja)
+        assert worker_b.en_memoria(1) is None
+        assert worker_b.obtener(db, 1).version == 2
+
+    asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    test_lecturas_desde_memoria_y_cambios_en_el_lugar()
+    test_version_publicada_descarta_y_no_guarda_copias_viejas()
+    print("\n✅ Tests de estado de salas OK")
@@ -0,0 +1,118 @@
+"""
+Test del historial de partidos por usuario: línea de tiempo completada al
+confirmar, páginas por cursor y detalle con costo fijo por página
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime, timedelta
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import (
+    Usuario, PerfilUsuario, Partido, PartidoJugador, ResultadoPartido, HistorialRating, HistorialPartido
+)
+from src.models.torneo_models import Torneo, TorneoPareja
+from src.services.historial_partidos_service import HistorialPartidosService
+
+INICIO = datetime(2026, 1, 1, 10, 0)
+
+
+def _crear_datos(db, amistosos):
+    for id_usuario in (1, 2, 3, 4):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=1500))
+        db.add(PerfilUsuario(id_usuario=id_usuario, nombre=f"N{id_usuario}", apellido="A"))
+    db.flush()
+
+    for i in range(amistosos):
+        # Dos partidos por hora: la fecha repetida la desempata id_partido
+        partido = Partido(id_partido=100 + i, fecha=INICIO + timedelta(hours=i // 2),
+                          estado="confirmado", id_creador=1, tipo="amistoso")
+        db.add(partido)
+        for id_usuario in (1, 2, 3, 4):
+            db.add(PartidoJugador(id_partido=partido.id_partido, id_usuario=id_usuario,
+                                  equipo=1 if id_usuario <= 2 else 2))
+        db.add(ResultadoPartido(id_partido=partido.id_partido, id_reportador=1, sets_eq1=2, sets_eq2=0,
+                                detalle_sets=[{"games_eq1": 6, "games_eq2": 4}, {"games_eq1": 6, "games_eq2": 3}]))
+        db.add(HistorialRating(id_usuario=1, id_partido=partido.id_partido, rating_antes=1500,
+                               delta=10, rating_despues=1510))
+        db.flush()
+        HistorialPartidosService.registrar(db, partido)
+
+    # Un partido de torneo: los jugadores salen de las parejas
+    db.add(Torneo(id=1, nombre="T1", categoria="5ta", fecha_inicio=date(2026, 1, 1),
+                  fecha_fin=date(2026, 1, 2), creado_por=1))
+    db.add(TorneoPareja(id=10, torneo_id=1, jugador1_id=1, jugador2_id=3, estado="confirmada"))
+    db.add(TorneoPareja(id=11, torneo_id=1, jugador1_id=2, jugador2_id=4, estado="confirmada"))
+    torneo = Partido(id_partido=900, fecha=INICIO + timedelta(days=30), estado="confirmado", id_creador=1,
+                     tipo="torneo", id_torneo=1, pareja1_id=10, pareja2_id=11, ganador_pareja_id=10,
+                     resultado_padel={"sets": [{"gamesEquipoA": 6, "gamesEquipoB": 2, "ganador": "equipoA"}]})
+    db.add(torneo)
+    db.flush()
+    HistorialPartidosService.registrar(db, torneo)
+    db.commit()
+
+
+def test_paginas_por_cursor():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db, 25)
+
+    vistos = []
+    cursor = None
+    while True:
+        filas, cursor = HistorialPartidosService.pagina(db, 1, cursor, limite=10)
+        vistos += [f.id_partido for f in filas]
+        if not cursor:
+            break
+
+    # El torneo (más reciente) primero; sin repetidos ni faltantes con fechas empatadas
+    assert vistos == [900] + list(range(124, 99, -1))
+
+    try:
+        HistorialPartidosService.pagina(db, 1, "no-es-un-cursor")
+        assert False, "cursor inválido aceptado"
+    except ValueError:
+        pass
+
+    # Registrar de nuevo no duplica
+    HistorialPartidosService.registrar(db, db.get(Partido, 100))
+    db.commit()
+    assert db.query(HistorialPartido).filter(HistorialPartido.id_partido == 100).count() == 4
+
+
+def test_detalle():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db, 3)
+
+    filas, _ = HistorialPartidosService.pagina(db, 1, limite=2)
+    torneo, amistoso = HistorialPartidosService.detalle(db, 1, [f.id_partido for f in filas])
+
+    assert torneo["tipo"] == "torneo" and torneo["resultado"]["sets_eq1"] == 1
+    assert sorted((j["id_usuario"], j["equipo"]) for j in torneo["jugadores"]) == [(1, 1), (2, 2), (3, 1), (4, 2)]
+    assert amistoso["id_partido"] == 102 and len(amistoso["jugadores"]) == 4
+    assert amistoso["resultado"]["detalle_sets"][0] == {
+        "set": 1, "juegos_eq1": 6, "juegos_eq2": 4, "tiebreak_eq1": None, "tiebreak_eq2": None
+    }
+    assert amistoso["historial_rating"]["delta"] == 10
+    assert amistoso["creador"]["nombre_usuario"] == "j1"
+
+
+def test_costo_fijo_por_pagina():
+    consumo = []
+    for amistosos in (5, 300):
+        db, contador = crear_db_pruebas()
+        _crear_datos(db, amistosos)
+        antes = contador["queries"]
+        filas, _ = HistorialPartidosService.pagina(db, 1, limite=5)
+        HistorialPartidosService.detalle(db, 1, [f.id_partido for f in filas])
+        consumo.append(contador["queries"] - antes)
+
+    assert consumo[0] == consumo[1] <= 8
+
+
+if __name__ == "__main__":
+    test_paginas_por_cursor()
+    test_detalle()
+    test_costo_fijo_por_pagina()
+    print("\n✅ Tests de historial de partidos OK")
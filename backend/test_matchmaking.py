@@ -0,0 +1,138 @@
+"""
+Test del índice de matchmaking: salas abiertas y jugadores libres por
+rating (bisect), mantenido con eventos de salas y de Elo
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, PerfilUsuario
+from src.models.sala import Sala, SalaJugador
+from src.services import matchmaking_service
+from src.services.matchmaking_service import IndiceMatchmaking
+
+
+def _crear_datos(db):
+    jugadores = [
+        (1, 1500, "Córdoba"), (2, 1450, "Córdoba"), (3, 1620, "Rosario"),
+        (4, 1900, "Córdoba"), (5, 1480, "córdoba "), (6, 1550, "Córdoba"), (7, 1000, "Córdoba"),
+    ]
+    for id_usuario, rating, ciudad in jugadores:
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=rating, id_categoria=5))
+        db.add(PerfilUsuario(id_usuario=id_usuario, nombre=f"N{id_usuario}", apellido="A", ciudad=ciudad))
+
+    def sala(id_sala, creador, estado, miembros):
+        db.add(Sala(id_sala=id_sala, nombre=f"Sala {id_sala}", codigo_invitacion=f"C{id_sala}",
+                    fecha=datetime.now(), estado=estado, id_creador=creador, max_jugadores=4))
+        for orden, id_usuario in enumerate(miembros, 1):
+            db.add(SalaJugador(id_sala=id_sala, id_usuario=id_usuario, orden=orden))
+
+    sala(1, 2, "esperando", [2])        # rating 1450, Córdoba
+    sala(2, 3, "esperando", [3])        # rating 1620, Rosario
+    sala(3, 4, "en_juego", [4])         # no abierta; el 4 no está libre
+    sala(4, 7, "finalizada", [7])       # el 7 queda libre
+    db.commit()
+
+
+def test_busqueda_por_rango_y_filtros():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+    indice = IndiceMatchmaking()
+    indice.cargar(db)
+
+    antes = contador["queries"]
+    salas = indice.buscar_salas(1500, 150, id_usuario=1)
+    assert [s.id_sala for s in salas] == [1, 2]  # la más cercana primero
+    assert [s.id_sala for s in indice.buscar_salas(1500, 150, ciudad="CÓRDOBA", id_usuario=1)] == [1]
+    assert indice.buscar_salas(1500, 150, id_categoria=9) == []
+
+    libres = indice.buscar_jugadores(1500, 100, id_usuario=1)
+    # El 2 y el 3 están en salas esperando, el 4 jugando; el 7 está lejos
+    assert [j.id_usuario for j in libres] == [5, 6]
+    assert [j.id_usuario for j in indice.buscar_jugadores(1500, 600, ciudad="córdoba", id_usuario=1)] == [5, 6, 7]
+    assert contador["queries"] == antes  # las búsquedas no tocan la base
+
+    # Rápido: 1000 búsquedas muy por debajo de 1 ms cada una
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        indice.buscar_jugadores(1500, 300)
+    assert (time.perf_counter() - inicio) / 1000 < 0.001
+
+
+def test_eventos_de_sala_y_de_rating():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    indice = IndiceMatchmaking()
+    indice.cargar(db)
+
+    # El 1 se une a la sala 1: deja de estar libre y la sala promedia 1475
+    db.add(SalaJugador(id_sala=1, id_usuario=1, orden=2))
+    db.commit()
+    indice.refrescar_salas(db, [1])
+    assert 1 not in [j.id_usuario for j in indice.buscar_jugadores(1500, 500)]
+    assert indice.buscar_salas(1475, 0)[0].jugadores_actuales == 2
+
+    # La sala se inicia: sale de las abiertas; sus jugadores siguen ocupados
+    db.query(Sala).filter(Sala.id_sala == 1).update({"estado": "en_juego"})
+    db.commit()
+    indice.refrescar_salas(db, [1])
+    assert 1 not in [s.id_sala for s in indice.buscar_salas(1500, 500)]
+    assert 1 not in [j.id_usuario for j in indice.buscar_jugadores(1500, 500)]
+
+    # Finaliza y cambia el rating del 1: vuelve libre con el rating nuevo
+    db.query(Sala).filter(Sala.id_sala == 1).update({"estado": "finalizada"})
+    db.query(Usuario).filter(Usuario.id_usuario == 1).update({"rating": 1700})
+    db.commit()
+    indice.refrescar_salas(db, [1])
+    indice.refrescar_jugadores(db, [1])
+    assert [j.id_usuario for j in indice.buscar_jugadores(1700, 10)] == [1]
+    assert 1 not in [j.id_usuario for j in indice.buscar_jugadores(1500, 100)]
+
+    # Sala eliminada: desaparece y su creador queda libre
+    db.query(SalaJugador).filter(SalaJugador.id_sala == 2).delete()
+    db.query(Sala).filter(Sala.id_sala == 2).delete()
+    db.commit()
+    indice.refrescar_salas(db, [2])
+    assert indice.buscar_salas(1620, 0) == []
+    assert [j.id_usuario for j in indice.buscar_jugadores(1620, 0)] == [3]
+
+
+
+def test_recarga_vencida_en_segundo_plano():
+    """Con el TTL vencido responde con el índice anterior y lo recarga en un thread"""
+    servicio = matchmaking_service
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    session_local = servicio.SessionLocal
+    servicio.SessionLocal = sessionmaker(bind=db.get_bind())
+    indice = servicio.indice_matchmaking
+    try:
+        assert servicio.obtener_indice_matchmaking(db).cargado  # primera vez: carga en el request
+
+        db.query(Usuario).filter(Usuario.id_usuario == 7).update({"rating": 1300})
+        db.commit()
+        indice.cargado_en -= servicio.TTL_INDICE_MATCHMAKING
+        # Sin sesión: si intentara recargar dentro del request fallaría
+        assert servicio.obtener_indice_matchmaking(None) is indice
+
+        assert servicio._lock_carga.acquire(timeout=5)  # se libera al terminar la recarga
+        servicio._lock_carga.release()
+        assert not indice.vencido()
+        assert [j.id_usuario for j in indice.buscar_jugadores(1300, 0)] == [7]
+    finally:
+        servicio.SessionLocal = session_local
+        indice.invalidar()
+
+
+if __name__ == "__main__":
+    test_busqueda_por_rango_y_filtros()
+    test_eventos_de_sala_y_de_rating()
+    test_recarga_vencida_en_segundo_plano()
+    print("\n✅ Tests de matchmaking OK")
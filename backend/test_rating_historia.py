@@ -0,0 +1,83 @@
+"""
+Test de la serie de rating para gráficos: LTTB con tamaño fijo, picos
+conservados y caché por último id_historial
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import math
+from datetime import datetime, timedelta
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, Partido, HistorialRating
+from src.services.rating_historia_service import RatingHistoriaService, lttb
+from src.utils.cache import cache
+
+INICIO = datetime(2025, 1, 1)
+
+
+def test_lttb():
+    xs = list(range(1000))
+    ys = [math.sin(x / 50) * 100 for x in xs]
+    ys[500] = 1000  # Un pico aislado
+
+    elegidos = lttb(xs, ys, 50)
+    assert len(elegidos) == 50
+    assert elegidos[0] == 0 and elegidos[-1] == 999
+    assert elegidos == sorted(set(elegidos))
+    assert 500 in elegidos  # el pico no se pierde
+
+    # Menos puntos que el umbral: se devuelven todos
+    assert lttb([1, 2, 3], [1, 2, 3], 10) == [0, 1, 2]
+
+
+def _crear_historial(db, cantidad):
+    db.add(Usuario(id_usuario=1, nombre_usuario="j1", email="j1@test.com", rating=1500))
+    rating = 1500
+    for i in range(cantidad):
+        db.add(Partido(id_partido=i + 1, fecha=INICIO, estado="confirmado", id_creador=1))
+        delta = 12 if i % 3 else -8
+        db.add(HistorialRating(id_historial=i + 1, id_usuario=1, id_partido=i + 1, rating_antes=rating,
+                               delta=delta, rating_despues=rating + delta,
+                               creado_en=INICIO + timedelta(days=i)))
+        rating += delta
+    db.commit()
+    return rating
+
+
+def test_serie_reducida_y_cache():
+    cache.clear()
+    db, contador = crear_db_pruebas()
+    rating_final = _crear_historial(db, 2000)
+
+    serie = RatingHistoriaService.obtener(db, 1, puntos=100)
+    assert serie["total"] == 2000 and len(serie["puntos"]) == 100
+    assert serie["puntos"][0]["id_partido"] == 1
+    assert serie["puntos"][-1]["rating"] == rating_final
+    fechas = [p["fecha"] for p in serie["puntos"]]
+    assert fechas == sorted(fechas)
+
+    # Segunda lectura: solo la búsqueda del último id
+    antes = contador["queries"]
+    assert RatingHistoriaService.obtener(db, 1, puntos=100) is serie
+    assert contador["queries"] - antes == 1
+
+    # Un partido nuevo cambia la clave
+    db.add(Partido(id_partido=5000, fecha=INICIO, estado="confirmado", id_creador=1))
+    db.add(HistorialRating(id_historial=5000, id_usuario=1, id_partido=5000, rating_antes=rating_final,
+                           delta=50, rating_despues=rating_final + 50, creado_en=INICIO + timedelta(days=5000)))
+    db.commit()
+    nueva = RatingHistoriaService.obtener(db, 1, puntos=100)
+    assert nueva["total"] == 2001 and nueva["puntos"][-1]["rating"] == rating_final + 50
+
+    # Desde una fecha y sin historial
+    reciente = RatingHistoriaService.obtener(db, 1, puntos=10, desde=INICIO + timedelta(days=1995))
+    assert reciente["total"] == 6 and len(reciente["puntos"]) == 6
+    assert RatingHistoriaService.obtener(db, 2)["puntos"] == []
+
+
+if __name__ == "__main__":
+    test_lttb()
+    test_serie_reducida_y_cache()
+    print("\n✅ Tests de historia de rating OK")
@@ -0,0 +1,132 @@
+"""
+Test de los récords entre jugadores: sumados una vez por partido
+confirmado (amistoso o de torneo) y leídos con una query
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime, timedelta
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, PerfilUsuario, Partido, PartidoJugador, ResultadoPartido
+from src.models.torneo_models import Torneo, TorneoPareja
+from src.services.historial_partidos_service import HistorialPartidosService
+from src.services.torneo_resultado_service import TorneoResultadoService
+from src.services.relaciones_jugadores_service import RelacionesJugadoresService, COMPANERO, RIVAL
+
+INICIO = datetime(2026, 3, 1, 18, 0)
+
+
+def _amistoso(db, id_partido, equipo1, equipo2, ganador, dias=0, con_ganador_en_partido=True):
+    partido = Partido(id_partido=id_partido, fecha=INICIO + timedelta(days=dias), estado="confirmado",
+                      id_creador=equipo1[0], tipo="amistoso",
+                      ganador_equipo=ganador if con_ganador_en_partido else None)
+    db.add(partido)
+    for equipo, ids in ((1, equipo1), (2, equipo2)):
+        for id_usuario in ids:
+            db.add(PartidoJugador(id_partido=id_partido, id_usuario=id_usuario, equipo=equipo))
+    sets = (2, 1) if ganador == 1 else (0, 2)
+    db.add(ResultadoPartido(id_partido=id_partido, id_reportador=equipo1[0], sets_eq1=sets[0],
+                            sets_eq2=sets[1], detalle_sets=[]))
+    db.flush()
+    return partido
+
+
+def _crear_datos(db):
+    for id_usuario in range(1, 7):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=1500))
+        db.add(PerfilUsuario(id_usuario=id_usuario, nombre=f"N{id_usuario}", apellido="A"))
+    db.flush()
+
+    # 1 juega tres veces con 2 (gana dos) y una con 5
+    HistorialPartidosService.registrar(db, _amistoso(db, 1, (1, 2), (3, 4), 1))
+    HistorialPartidosService.registrar(db, _amistoso(db, 2, (1, 2), (3, 4), 2, dias=1))
+    # Sin ganador_equipo en el partido: sale del resultado
+    HistorialPartidosService.registrar(db, _amistoso(db, 3, (3, 4), (1, 2), 2, dias=2,
+                                                     con_ganador_en_partido=False))
+    # Jugadores pasados por la cola de confirmaciones
+    partido = _amistoso(db, 4, (1, 5), (3, 6), 1, dias=3)
+    HistorialPartidosService.registrar(db, partido, [(1, 1), (5, 1), (3, 2), (6, 2)])
+
+    # Torneo: la pareja de 1 y 4 pierde contra 3 y 6
+    db.add(Torneo(id=1, nombre="T1", categoria="5ta", fecha_inicio=date(2026, 3, 1),
+                  fecha_fin=date(2026, 3, 2), creado_por=1))
+    db.add(TorneoPareja(id=10, torneo_id=1, jugador1_id=1, jugador2_id=4, estado="confirmada"))
+    db.add(TorneoPareja(id=11, torneo_id=1, jugador1_id=3, jugador2_id=6, estado="confirmada"))
+    torneo = Partido(id_partido=50, fecha=INICIO + timedelta(days=10), estado="confirmado", id_creador=1,
+                     tipo="torneo", id_torneo=1, pareja1_id=10, pareja2_id=11, ganador_pareja_id=11)
+    db.add(torneo)
+    db.flush()
+    HistorialPartidosService.registrar(db, torneo)
+    db.commit()
+
+
+def test_records():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+
+    companeros = RelacionesJugadoresService.principales(db, 1, COMPANERO)
+    assert [(c["id_usuario"], c["jugados"], c["ganados"], c["perdidos"]) for c in companeros] == [
+        (2, 3, 2, 1), (5, 1, 1, 0), (4, 1, 0, 1)
+    ]
+    assert companeros[0]["nombre_usuario"] == "j2"
+    assert companeros[0]["ultimo_partido"] == INICIO + timedelta(days=2)
+
+    rivales = RelacionesJugadoresService.principales(db, 1, RIVAL, limite=1)
+    assert [(r["id_usuario"], r["jugados"], r["ganados"]) for r in rivales] == [(3, 5, 3)]
+
+    antes = contador["queries"]
+    cara = RelacionesJugadoresService.cara_a_cara(db, 3, 1)
+    assert contador["queries"] - antes == 1
+    assert cara["como_rivales"]["jugados"] == 5 and cara["como_rivales"]["ganados"] == 2
+    assert cara["como_rivales"]["porcentaje_victoria"] == 40.0
+    assert cara["como_companeros"]["jugados"] == 0
+
+    # Los dos sentidos cuadran
+    assert RelacionesJugadoresService.cara_a_cara(db, 6, 1)["como_rivales"]["ganados"] == 1
+
+
+def test_registrar_dos_veces_no_suma_dos_veces():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+
+    HistorialPartidosService.registrar(db, db.get(Partido, 1))
+    HistorialPartidosService.registrar(db, db.get(Partido, 50))
+    db.commit()
+
+    assert RelacionesJugadoresService.cara_a_cara(db, 1, 2)["como_companeros"]["jugados"] == 3
+    assert RelacionesJugadoresService.cara_a_cara(db, 1, 6)["como_rivales"]["jugados"] == 2
+
+
+def test_corregir_resultado_rehace_records():
+    """Corregir el ganador de un partido de torneo da vuelta su aporte a los récords"""
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    assert RelacionesJugadoresService.cara_a_cara(db, 1, 6)["como_rivales"]["ganados"] == 1
+
+    # Partido 50: ahora gana la pareja de 1 y 4
+    TorneoResultadoService.corregir_resultado(db, 50, {"sets": [
+        {"gamesEquipoA": 6, "gamesEquipoB": 3, "ganador": "equipoA", "completado": True},
+        {"gamesEquipoA": 6, "gamesEquipoB": 4, "ganador": "equipoA", "completado": True},
+    ]}, user_id=1)
+
+    contra_6 = RelacionesJugadoresService.cara_a_cara(db, 1, 6)["como_rivales"]
+    assert (contra_6["jugados"], contra_6["ganados"], contra_6["perdidos"]) == (2, 2, 0)
+    contra_1 = RelacionesJugadoresService.cara_a_cara(db, 3, 1)["como_rivales"]
+    assert (contra_1["jugados"], contra_1["ganados"], contra_1["perdidos"]) == (5, 1, 4)
+    con_4 = RelacionesJugadoresService.cara_a_cara(db, 1, 4)["como_companeros"]
+    assert (con_4["jugados"], con_4["ganados"], con_4["perdidos"]) == (1, 1, 0)
+
+    # Volver a registrar sin cambios no toca los récords
+    HistorialPartidosService.registrar(db, db.get(Partido, 50))
+    db.commit()
+    assert RelacionesJugadoresService.cara_a_cara(db, 1, 6)["como_rivales"]["ganados"] == 2
+
+
+if __name__ == "__main__":
+    test_records()
+    test_registrar_dos_veces_no_suma_dos_veces()
+    test_corregir_resultado_rehace_records()
+    print("\n✅ Tests de récords entre jugadores OK")
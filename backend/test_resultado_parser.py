@@ -0,0 +1,107 @@
+"""
+Test del parser único de resultados y de la tabla de posiciones
+calculada desde las columnas numéricas de partidos
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario, Partido
+from src.models.torneo_models import Torneo, TorneoPareja, TorneoZona, TorneoZonaPareja
+from src.services.torneo_zona_service import TorneoZonaService
+from src.utils.resultado_parser import ResultadoParser
+
+
+def test_formatos_equivalentes():
+    """Marcador, detalle de sala y supertiebreak en formato antiguo dan lo mismo"""
+    marcador = {"sets": [
+        {"gamesEquipoA": 6, "gamesEquipoB": 4, "ganador": "equipoA", "completado": True},
+        {"gamesEquipoA": 3, "gamesEquipoB": 6, "ganador": "equipoB", "completado": True},
+        {"gamesEquipoA": 10, "gamesEquipoB": 8, "esSuperTiebreak": True, "completado": True},
+    ], "ganador": "equipoA"}
+    detalle_sala = [
+        {"set": 1, "juegos_eq1": 6, "juegos_eq2": 4},
+        {"set": 2, "juegos_eq1": 3, "juegos_eq2": 6},
+        {"set": 3, "juegos_eq1": 10, "juegos_eq2": 8},  # sin marca: se detecta por los puntos
+    ]
+    formato_antiguo = {
+        "sets": marcador["sets"][:2],
+        "supertiebreak": {"puntosEquipoA": 10, "puntosEquipoB": 8, "completado": True},
+    }
+
+    esperado = {
+        "sets_eq1": 2, "sets_eq2": 1,
+        "games_eq1": 9, "games_eq2": 10,
+        "supertiebreak_eq1": 10, "supertiebreak_eq2": 8,
+        "ganador_equipo": 1,
+    }
+    for resultado in (marcador, detalle_sala, formato_antiguo):
+        numerico = ResultadoParser.parsear(resultado)
+        assert {k: numerico[k] for k in esperado} == esperado
+
+    # El supertiebreak antiguo se marca aparte: no es un set de detalle_sets
+    sets = ResultadoParser.parsear(formato_antiguo)["sets"]
+    assert [s.get("aparte", False) for s in sets] == [False, False, True]
+    assert not any(s.get("aparte") for s in ResultadoParser.parsear(marcador)["sets"])
+
+
+def test_resultado_invalido():
+    try:
+        ResultadoParser.parsear([{"juegos_eq1": 6, "juegos_eq2": 5}, {"juegos_eq1": 6, "juegos_eq2": 2}])
+        assert False, "Debió rechazar 6-5"
+    except ValueError as e:
+        assert "Set 1" in str(e)
+
+    # Sin validar se parsea igual (backfill de filas viejas)
+    numerico = ResultadoParser.parsear([{"juegos_eq1": 6, "juegos_eq2": 5}], validar=False)
+    assert numerico["sets_eq1"] == 1 and numerico["ganador_equipo"] == 1
+
+
+def test_tabla_posiciones_desde_columnas():
+    db, _ = crear_db_pruebas()
+    for id_usuario in range(1, 7):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=1200))
+    db.add(Torneo(id=1, nombre="Test", categoria="7ma", fecha_inicio=date.today(),
+                  fecha_fin=date.today(), creado_por=1))
+    db.add(TorneoZona(id=1, torneo_id=1, nombre="Zona A", numero_orden=1))
+    for id_pareja, (j1, j2) in enumerate([(1, 2), (3, 4), (5, 6)], 1):
+        db.add(TorneoPareja(id=id_pareja, torneo_id=1, jugador1_id=j1, jugador2_id=j2))
+        db.add(TorneoZonaPareja(zona_id=1, pareja_id=id_pareja))
+
+    def partido(id_partido, pareja1, pareja2, sets, estado="confirmado"):
+        p = Partido(id_partido=id_partido, fecha=datetime.now(), estado=estado, id_creador=1,
+                    tipo="torneo", id_torneo=1, zona_id=1, pareja1_id=pareja1, pareja2_id=pareja2)
+        if sets:
+            resultado = {"sets": [{"gamesEquipoA": a, "gamesEquipoB": b, "completado": True} for a, b in sets]}
+            numerico = ResultadoParser.parsear(resultado)
+            p.resultado_padel = resultado
+            ResultadoParser.aplicar_a_partido(p, numerico)
+            p.ganador_pareja_id = pareja1 if numerico["ganador_equipo"] == 1 else pareja2
+        db.add(p)
+
+    partido(1, 1, 2, [(6, 2), (6, 3)])
+    partido(2, 3, 1, [(6, 4), (3, 6), (10, 7)])
+    partido(3, 2, 3, [(7, 5), (7, 6)])
+    partido(4, 1, 3, [(6, 0), (6, 0)], estado="pendiente")  # no cuenta
+    db.commit()
+
+    tabla = {item["pareja_id"]: item for item in TorneoZonaService.obtener_tabla_posiciones(db, 1)["tabla"]}
+
+    assert tabla[1]["partidos_jugados"] == 2
+    assert tabla[1]["partidos_ganados"] == 1
+    assert tabla[1]["puntos"] == 3
+    assert (tabla[1]["sets_ganados"], tabla[1]["sets_perdidos"]) == (3, 2)
+    assert (tabla[1]["games_ganados"], tabla[1]["games_perdidos"]) == (22, 14)
+    assert tabla[3]["partidos_ganados"] == 1 and tabla[3]["partidos_perdidos"] == 1
+    assert (tabla[2]["games_ganados"], tabla[2]["games_perdidos"]) == (19, 23)
+
+
+if __name__ == "__main__":
+    test_formatos_equivalentes()
+    test_resultado_invalido()
+    test_tabla_posiciones_desde_columnas()
+    print("\n✅ Tests de parser de resultados OK")
@@ -0,0 +1,162 @@
+"""
+Test de los listados de salas paginados por keyset (creado_en, id_sala)
+y de la unión atómica a salas bajo concurrencia
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db_pruebas import crear_db_pruebas
+from src.database.config import Base
+from src.models.driveplus_models import Usuario
+from src.models.sala import Sala, SalaJugador
+from src.services.sala_service import SalaService, invalidar_salas_abiertas
+
+
+def _crear_datos(db):
+    for id_usuario, rating in [(1, 1500), (2, 1520), (3, 1480), (4, 1510), (5, 900), (6, 2400)]:
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=rating))
+
+    base = datetime(2026, 1, 1, 12, 0, 0)
+
+    def sala(id_sala, creador, estado, jugadores, minutos):
+        db.add(Sala(id_sala=id_sala, nombre=f"Sala {id_sala}", codigo_invitacion=f"C{id_sala:05d}",
+                    fecha=base, estado=estado, id_creador=creador, max_jugadores=4,
+                    creado_en=base + timedelta(minutes=minutos)))
+        for orden, id_usuario in enumerate(jugadores, 1):
+            db.add(SalaJugador(id_sala=id_sala, id_usuario=id_usuario, orden=orden))
+
+    # 7 salas activas del usuario 1; dos con el mismo creado_en (desempata id_sala)
+    for i, minutos in enumerate([0, 10, 20, 30, 30, 40, 50], 1):
+        sala(i, 1, "esperando" if i % 2 else "en_juego", [1], minutos)
+    sala(8, 2, "finalizada", [2, 1], 5)
+    sala(9, 2, "finalizada", [2], 6)             # no es del usuario 1
+    sala(10, 2, "esperando", [2, 3, 4, 5], 60)   # llena: no está abierta
+    sala(11, 5, "esperando", [5], 70)            # creador lejos en rating
+    sala(12, 6, "esperando", [6], 80)            # creador lejos en rating
+    db.commit()
+
+
+def test_paginacion_keyset_sin_saltos_ni_repetidos():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+
+    vistas, cursor = [], None
+    while True:
+        pagina = SalaService.listar_mias(db, 1, cursor, limite=3)
+        vistas.extend(int(s.id_sala) for s in pagina["salas"])
+        cursor = pagina["siguiente_cursor"]
+        if cursor is None:
+            break
+
+    assert vistas == [7, 6, 5, 4, 3, 2, 1]
+
+    finalizadas = SalaService.listar_finalizadas(db, 1)
+    assert [s.id_sala for s in finalizadas["salas"]] == ["8"]
+    assert finalizadas["salas"][0].jugadores_actuales == 2
+
+    try:
+        SalaService.listar_mias(db, 1, "no-es-un-cursor")
+        assert False, "Debió rechazar el cursor"
+    except ValueError:
+        pass
+
+
+def test_abiertas_por_banda_de_rating_y_cacheadas():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+    invalidar_salas_abiertas()
+
+    pagina = SalaService.listar_abiertas(db, 1500)
+    ids = [int(s.id_sala) for s in pagina["salas"]]
+    # Esperando, con lugar y creador de rating cercano; sin la llena ni las lejanas
+    assert ids == [7, 5, 3, 1]
+
+    # Misma banda: se sirve del caché, sin queries
+    antes = contador["queries"]
+    assert SalaService.listar_abiertas(db, 1550) is pagina
+    assert contador["queries"] == antes
+
+    # Banda lejana: su propia página
+    assert [s.id_sala for s in SalaService.listar_abiertas(db, 2390)["salas"]] == ["12"]
+
+    invalidar_salas_abiertas()
+    SalaService.listar_abiertas(db, 1500)
+    assert contador["queries"] > antes
+
+
+def test_union_concurrente_sin_sobrecupo():
+    """50 jugadores por sala se unen a la vez: entran exactamente 3, sin órdenes repetidos"""
+    # Base en archivo: cada hilo tiene su propia conexión, como en producción
+    archivo = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    archivo.close()
+    engine = create_engine(f"sqlite:///{archivo.name}", connect_args={"timeout": 30, "check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Sesion = sessionmaker(bind=engine, autoflush=False)
+
+    db = Sesion()
+    for id_usuario in range(1, 103):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}",
+                       email=f"j{id_usuario}@test.com", rating=1500))
+    for id_sala, creador in [(1, 101), (2, 102)]:
+        db.add(Sala(id_sala=id_sala, nombre=f"Sala {id_sala}", codigo_invitacion=f"SALA{id_sala}",
+                    fecha=datetime.now(), estado="esperando", id_creador=creador, max_jugadores=4))
+        db.add(SalaJugador(id_sala=id_sala, id_usuario=creador, orden=1))
+    db.commit()
+    db.close()
+
+    resultados = {"ok": 0, "llena": 0, "otros": []}
+    lock = threading.Lock()
+    barrera = threading.Barrier(100)
+
+    def unirse(id_usuario, codigo):
+        sesion = Sesion()
+        barrera.wait()
+        try:
+            SalaService.unirse(sesion, codigo, id_usuario)
+            clave = "ok"
+        except ValueError as e:
+            clave = "llena" if "llena" in str(e) else None
+            if clave is None:
+                with lock:
+                    resultados["otros"].append(str(e))
+        finally:
+            sesion.close()
+        if clave:
+            with lock:
+                resultados[clave] += 1
+
+    hilos = [
+        threading.Thread(target=unirse, args=(id_usuario, "sala1" if id_usuario <= 50 else "sala2"))
+        for id_usuario in range(1, 101)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados["otros"] == []
+    assert resultados["ok"] == 6 and resultados["llena"] == 94
+
+    db = Sesion()
+    for id_sala in (1, 2):
+        ordenes = sorted(o for (o,) in db.query(SalaJugador.orden).filter(SalaJugador.id_sala == id_sala))
+        assert ordenes == [1, 2, 3, 4]
+    db.close()
+    engine.dispose()
+    os.unlink(archivo.name)
+
+
+if __name__ == "__main__":
+    test_paginacion_keyset_sin_saltos_ni_repetidos()
+    test_abiertas_por_banda_de_rating_y_cacheadas()
+    test_union_concurrente_sin_sobrecupo()
+    print("\n✅ Tests de listados de salas OK")
@@ -0,0 +1,121 @@
+"""
+Test del feed en vivo de torneos: agrupación de deltas por ventana,
+números de secuencia y snapshot para clientes que llegan tarde
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import threading
+
+from src.websocket.connection_manager import ConnectionManager
+from src.websocket.pubsub import BrokerMemoria, RedMemoria, canal_torneo
+from src.websocket.torneo_feed import FeedTorneos, deltas_tabla
+from test_connection_manager import SocketFalso
+
+VENTANA = 0.05
+
+
+def base_torneo(torneo_id):
+    return [
+        {"e": "partido", "id": 1, "k": "resultado", "v": {"estado": "pendiente", "sets_eq1": None}},
+        {"e": "partido", "id": 2, "k": "resultado", "v": {"estado": "pendiente", "sets_eq1": None}},
+    ]
+
+
+async def crear_feed(red=None):
+    manager = ConnectionManager(broker=BrokerMemoria(red))
+    await manager.iniciar_pubsub()
+    feed = FeedTorneos(manager, ventana=VENTANA)
+    feed.iniciar()
+    return manager, feed
+
+
+async def conectar(manager, feed, torneo_id=1):
+    ws = SocketFalso()
+    await manager.connect(ws, canal_torneo(torneo_id))
+    await feed.preparar(torneo_id, base_torneo)
+    await manager.send_personal_message(feed.snapshot(torneo_id), ws)
+    return ws
+
+
+def test_rafaga_agrupada_en_un_mensaje():
+    async def escenario():
+        manager, feed = await crear_feed()
+        ws = await conectar(manager, feed)
+
+        # Ráfaga: resultado + tabla + corrección del mismo partido + delta sin cambios
+        feed.publicar(1, [{"e": "partido", "id": 1, "k": "resultado", "v": {"estado": "confirmado", "sets_eq1": 2}}])
+        feed.publicar(1, deltas_tabla(3, [{"pareja_id": 10, "posicion": 1, "puntos": 3}]))
+        feed.publicar(1, [{"e": "partido", "id": 1, "k": "resultado", "v": {"estado": "confirmado", "sets_eq1": 1}}])
+        feed.publicar(1, [{"e": "partido", "id": 2, "k": "resultado", "v": {"estado": "pendiente"}}])
+        await asyncio.sleep(VENTANA * 4)
+
+        snapshot, *deltas = ws.recibidos
+        assert snapshot["type"] == "snapshot" and snapshot["seq"] == 0
+        assert len(deltas) == 1
+        mensaje = deltas[0]
+        assert mensaje["type"] == "deltas" and mensaje["seq"] == 1
+        por_entidad = {(d["e"], str(d["id"])): d["v"] for d in mensaje["deltas"]}
+        assert por_entidad[("partido", "1")] == {"estado": "confirmado", "sets_eq1": 1}
+        assert por_entidad[("tabla", "3:10")]["puntos"] == 3
+        assert ("partido", "2") not in por_entidad  # no cambió nada
+
+    asyncio.run(escenario())
+
+
+def test_cliente_tarde_recibe_snapshot_y_secuencia():
+    async def escenario():
+        manager, feed = await crear_feed()
+        primero = await conectar(manager, feed)
+        for sets in (1, 2):
+            feed.publicar(1, [{"e": "partido", "id": 1, "k": "resultado", "v": {"sets_eq1": sets}}])
+            await asyncio.sleep(VENTANA * 3)
+
+        tarde = await conectar(manager, feed)
+        await asyncio.sleep(0.01)
+        snapshot = tarde.recibidos[0]
+        assert snapshot["seq"] == 2
+        assert snapshot["entidades"]["partido"]["1"]["sets_eq1"] == 2
+
+        feed.publicar(1, [{"e": "partido", "id": 2, "k": "cuadro", "v": {"pareja1_id": 7}}])
+        await asyncio.sleep(VENTANA * 3)
+        assert tarde.recibidos[-1]["seq"] == 3 and primero.recibidos[-1]["seq"] == 3
+
+    asyncio.run(escenario())
+
+
+def test_publicacion_desde_hilo_y_entre_workers():
+    """Un endpoint sync (threadpool) del worker A llega a los clientes del worker B"""
+    async def escenario():
+        red = RedMemoria()
+        manager_a, feed_a = await crear_feed(red)
+        manager_b, feed_b = await crear_feed(red)
+        ws_b = await conectar(manager_b, feed_b)
+
+        hilo = threading.Thread(target=feed_a.publicar, args=(1, [
+            {"e": "partido", "id": 1, "k": "reprogramacion", "v": {"cancha_id": 4}}
+        ]))
+        hilo.start()
+        hilo.join()
+        await asyncio.sleep(VENTANA * 4)
+
+        assert ws_b.recibidos[-1]["deltas"] == [
+            {"e": "partido", "id": 1, "k": "reprogramacion", "v": {"cancha_id": 4}}
+        ]
+
+        # Sin clientes el estado se descarta
+        manager_b.disconnect(ws_b, canal_torneo(1))
+        feed_b.publicar(1, [{"e": "partido", "id": 1, "k": "resultado", "v": {"sets_eq1": 2}}])
+        await asyncio.sleep(VENTANA * 3)
+        assert 1 not in feed_b.torneos
+
+    asyncio.run(escenario())
+
+
+if __name__ == "__main__":
+    test_rafaga_agrupada_en_un_mensaje()
+    test_cliente_tarde_recibe_snapshot_y_secuencia()
+    test_publicacion_desde_hilo_y_entre_workers()
+    print("\n✅ Tests de feed de torneos OK")
@@ -0,0 +1,184 @@
+"""
+Test de los snapshots de torneos finalizados: se publican al finalizar,
+se sirven precomprimidos sin queries (con ETag y 304) y se rearman solo
+al corregir un resultado
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gzip
+import json
+import tempfile
+import threading
+from datetime import date, datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from db_pruebas import crear_db_pruebas
+from src.controllers import torneo_controller
+from src.database.config import get_db
+from src.models.driveplus_models import Usuario, PerfilUsuario, Partido
+from src.models.torneo_models import Torneo, TorneoCategoria, TorneoPareja, TorneoZona, TorneoZonaPareja
+from src.services import torneo_snapshot_service
+from src.services.torneo_resultado_service import TorneoResultadoService
+from src.services.torneo_service import TorneoService
+from src.schemas.torneo_schemas import TorneoUpdate
+from src.services.torneo_snapshot_service import TorneoSnapshotService
+
+RESULTADO_CORREGIDO = {
+    "sets": [
+        {"gamesEquipoA": 3, "gamesEquipoB": 6, "ganador": "equipoB", "completado": True},
+        {"gamesEquipoA": 4, "gamesEquipoB": 6, "ganador": "equipoB", "completado": True}
+    ]
+}
+
+
+def _crear_datos():
+    torneo_snapshot_service.SNAPSHOTS_DIR = tempfile.mkdtemp()
+    db, contador = crear_db_pruebas()
+    for id_usuario in range(1, 9):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}", email=f"j{id_usuario}@test.com"))
+        db.add(PerfilUsuario(id_usuario=id_usuario, nombre=f"N{id_usuario}", apellido="A"))
+    db.add(Torneo(id=1, nombre="Clausura", categoria="5ta", fecha_inicio=date(2026, 6, 1),
+                  fecha_fin=date(2026, 6, 2), creado_por=1, estado="fase_eliminacion"))
+    db.add(TorneoCategoria(id=1, torneo_id=1, nombre="5ta", orden=1))
+    db.add(TorneoZona(id=1, torneo_id=1, categoria_id=1, nombre="Zona A", numero_orden=1))
+    for i in range(4):
+        db.add(TorneoPareja(id=10 + i, torneo_id=1, categoria_id=1, jugador1_id=2 * i + 1,
+                            jugador2_id=2 * i + 2, estado="confirmada"))
+    db.flush()
+    for pareja_id in (10, 11):
+        db.add(TorneoZonaPareja(zona_id=1, pareja_id=pareja_id))
+    db.add(Partido(id_partido=1, fecha=datetime(2026, 6, 1), estado="confirmado", id_creador=1, tipo="torneo",
+                   id_torneo=1, zona_id=1, fase="zona", categoria_id=1, pareja1_id=10, pareja2_id=11,
+                   ganador_pareja_id=10, sets_eq1=2, sets_eq2=0))
+    db.add(Partido(id_partido=2, fecha=datetime(2026, 6, 2), estado="confirmado", id_creador=1, tipo="torneo",
+                   id_torneo=1, fase="final", numero_partido=1, categoria_id=1, pareja1_id=12,
+                   pareja2_id=13, ganador_pareja_id=12, sets_eq1=2, sets_eq2=1))
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(torneo_controller.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return db, contador, TestClient(app)
+
+
+def test_publica_al_finalizar_y_sirve_sin_queries():
+    db, contador, cliente = _crear_datos()
+
+    # En juego: se sirve de la base, sin snapshot
+    en_juego = cliente.get("/torneos/1/partidos")
+    assert "etag" not in en_juego.headers
+
+    TorneoService.cambiar_estado(db, 1, "finalizado", user_id=1)
+    directorio = os.path.join(torneo_snapshot_service.SNAPSHOTS_DIR, "torneo_1")
+    assert {"partidos.json.gz", "zonas.json.gz", "playoffs.json.gz", "vista.json.gz", "meta.json"} <= set(
+        os.listdir(directorio))
+
+    zonas = torneo_controller.listar_zonas(1, db)
+    antes = contador["queries"]
+    for ruta, desde_base in (("partidos", en_juego.json()), ("zonas", zonas), ("playoffs", None), ("vista", None)):
+        respuesta = cliente.get(f"/torneos/1/{ruta}", headers={"Accept-Encoding": "gzip"})
+        assert respuesta.status_code == 200
+        assert respuesta.headers["content-encoding"] == "gzip"
+        assert respuesta.headers["cache-control"] == torneo_snapshot_service.CACHE_CONTROL_SNAPSHOT
+        if desde_base is not None:
+            # El snapshot es el mismo JSON que arma el endpoint
+            assert respuesta.json() == json.loads(json.dumps(desde_base))
+    assert contador["queries"] == antes
+
+    assert cliente.get("/torneos/1/vista").json()["playoffs"] == {"1": {"final": [2]}}
+
+    # Revalidación: 304 sin cuerpo
+    etag = cliente.get("/torneos/1/partidos").headers["etag"]
+    no_modificado = cliente.get("/torneos/1/partidos", headers={"If-None-Match": etag})
+    assert no_modificado.status_code == 304 and no_modificado.content == b""
+
+    # Cliente sin gzip: JSON plano
+    plano = TorneoSnapshotService.respuesta(1, "partidos", accept_encoding="identity")
+    assert "content-encoding" not in plano.headers
+    assert json.loads(plano.body) == en_juego.json()
+
+    # Con filtros sigue yendo a la base
+    antes = contador["queries"]
+    assert cliente.get("/torneos/1/partidos", params={"zona_id": 1}).json()["total"] == 1
+    assert contador["queries"] > antes
+
+
+def test_corregir_resultado_rearma_el_snapshot():
+    db, _, cliente = _crear_datos()
+    TorneoService.cambiar_estado(db, 1, "finalizado", user_id=1)
+    etag = cliente.get("/torneos/1/partidos").headers["etag"]
+
+    TorneoResultadoService.corregir_resultado(db, 1, RESULTADO_CORREGIDO, user_id=1)
+
+    respuesta = cliente.get("/torneos/1/partidos", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200 and respuesta.headers["etag"] != etag
+    partido = next(p for p in respuesta.json()["partidos"] if p["id_partido"] == 1)
+    assert partido["ganador_pareja_id"] == 11
+
+    tabla = cliente.get("/torneos/1/vista").json()["zonas"][0]["tabla"]
+    assert tabla[0]["pareja_id"] == 11
+
+    # Los archivos son gzip válidos
+    ruta = os.path.join(torneo_snapshot_service.SNAPSHOTS_DIR, "torneo_1", "partidos.json.gz")
+    with open(ruta, "rb") as archivo:
+        assert json.loads(gzip.decompress(archivo.read()))["total"] == 2
+
+
+def test_corregir_en_torneo_sin_snapshot_no_publica():
+    db, _, _ = _crear_datos()
+    TorneoResultadoService.corregir_resultado(db, 1, RESULTADO_CORREGIDO, user_id=1)
+    assert not os.listdir(torneo_snapshot_service.SNAPSHOTS_DIR)
+
+
+def test_reabrir_torneo_descarta_el_snapshot():
+    db, contador, cliente = _crear_datos()
+    TorneoService.cambiar_estado(db, 1, "finalizado", user_id=1)
+
+    # Editar un torneo finalizado rearma el snapshot con los datos nuevos
+    TorneoService.actualizar_torneo(db, 1, TorneoUpdate(nombre="Torneo editado"), user_id=1)
+    assert cliente.get("/torneos/1/vista").json()["torneo"]["nombre"] == "Torneo editado"
+
+    # Reabrirlo lo descarta: las vistas vuelven a la base
+    TorneoService.actualizar_torneo(db, 1, TorneoUpdate(estado="fase_eliminacion"), user_id=1)
+    assert not os.path.exists(os.path.join(torneo_snapshot_service.SNAPSHOTS_DIR, "torneo_1"))
+    antes = contador["queries"]
+    respuesta = cliente.get("/torneos/1/partidos")
+    assert respuesta.status_code == 200 and contador["queries"] > antes
+
+
+def test_escrituras_simultaneas_no_se_pisan():
+    """Cada escritura usa su propio temporal: el archivo final es uno entero y no quedan temporales"""
+    directorio = tempfile.mkdtemp()
+    ruta = os.path.join(directorio, "vista.json.gz")
+    contenidos = [bytes([i]) * 200_000 for i in range(8)]
+    errores = []
+
+    def escribir(contenido):
+        try:
+            torneo_snapshot_service._escribir(ruta, contenido)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=escribir, args=(c,)) for c in contenidos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    with open(ruta, "rb") as archivo:
+        assert archivo.read() in contenidos
+    assert os.listdir(directorio) == ["vista.json.gz"]
+
+
+if __name__ == "__main__":
+    test_publica_al_finalizar_y_sirve_sin_queries()
+    test_corregir_resultado_rearma_el_snapshot()
+    test_corregir_en_torneo_sin_snapshot_no_publica()
+    test_reabrir_torneo_descarta_el_snapshot()
+    test_escrituras_simultaneas_no_se_pisan()
+    print("\n✅ Tests de snapshots de torneos OK")
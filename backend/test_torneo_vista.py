@@ -0,0 +1,178 @@
+"""
+Test de la vista completa del torneo: una query por tabla, nombres y
+disponibilidades sin repetir, tablas iguales a las de TorneoZonaService,
+versión que sube con cada cambio y 304 con el ETag vigente
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from db_pruebas import crear_db_pruebas
+from src.controllers.torneo_controller import obtener_vista_torneo
+from src.models.driveplus_models import Usuario, PerfilUsuario, Partido
+from src.models.torneo_models import Torneo, TorneoCategoria, TorneoPareja, TorneoZona, TorneoZonaPareja
+from src.services.torneo_vista_service import TorneoVistaService
+from src.services.torneo_zona_service import TorneoZonaService
+from src.utils.cache import cache
+
+DISPONIBILIDAD = {"dias": ["sabado"], "desde": "18:00"}
+
+
+def _partido(id_partido, p1, p2, ganador=None, sets=None, zona_id=1, fase="zona", numero=None):
+    return Partido(id_partido=id_partido, fecha=datetime(2026, 5, 1), estado="confirmado" if ganador else "pendiente",
+                   id_creador=1, tipo="torneo", id_torneo=1, zona_id=zona_id, fase=fase, numero_partido=numero,
+                   categoria_id=1, pareja1_id=p1, pareja2_id=p2, ganador_pareja_id=ganador,
+                   sets_eq1=sets[0] if sets else None, sets_eq2=sets[1] if sets else None,
+                   games_eq1=12 if sets else None, games_eq2=8 if sets else None)
+
+
+def _crear_datos(db, parejas_extra=0):
+    cache.clear()
+    for id_usuario in range(1, 9 + 2 * parejas_extra):
+        db.add(Usuario(id_usuario=id_usuario, nombre_usuario=f"j{id_usuario}", email=f"j{id_usuario}@test.com"))
+        if id_usuario != 8:  # sin perfil: "Usuario 8"
+            db.add(PerfilUsuario(id_usuario=id_usuario, nombre=f"N{id_usuario}", apellido="A"))
+    db.add(Torneo(id=1, nombre="Apertura", categoria="5ta", fecha_inicio=date(2026, 5, 1),
+                  fecha_fin=date(2026, 5, 3), creado_por=1, estado="fase_grupos"))
+    db.add(TorneoCategoria(id=1, torneo_id=1, nombre="5ta", orden=1))
+    db.add(TorneoCategoria(id=2, torneo_id=1, nombre="6ta", orden=2))
+    db.flush()
+
+    for i in range(4 + parejas_extra):
+        db.add(TorneoPareja(id=10 + i, torneo_id=1, categoria_id=1, jugador1_id=2 * i + 1, jugador2_id=2 * i + 2,
+                            estado="confirmada", disponibilidad_horaria=dict(DISPONIBILIDAD) if i % 2 else None))
+    db.add(TorneoZona(id=1, torneo_id=1, categoria_id=1, nombre="Zona A", numero_orden=1))
+    db.flush()
+    for pareja_id in (10, 11, 12):
+        db.add(TorneoZonaPareja(zona_id=1, pareja_id=pareja_id))
+    # Asignación de una pareja dada de baja del todo
+    db.add(TorneoZonaPareja(zona_id=1, pareja_id=99))
+
+    db.add(_partido(1, 10, 11, ganador=11, sets=(0, 2)))
+    db.add(_partido(2, 11, 12, ganador=11, sets=(2, 1)))
+    db.add(_partido(3, 10, 12))
+    db.add(_partido(4, 11, 13, zona_id=None, fase="semifinal", numero=1))
+    db.add(_partido(5, None, None, zona_id=None, fase="final", numero=2))
+    db.commit()
+
+
+def test_vista_completa():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+
+    antes = contador["queries"]
+    vista = TorneoVistaService.armar(db, 1)
+    consultas = contador["queries"] - antes
+
+    assert vista["torneo"]["nombre"] == "Apertura" and vista["torneo"]["parejas_inscritas"] == 4
+    assert [(c["nombre"], c["parejas_inscritas"]) for c in vista["categorias"]] == [("5ta", 4), ("6ta", 0)]
+
+    # Nombres una sola vez; los partidos solo llevan ids
+    assert vista["nombres"]["10"] == "N1 A / N2 A"
+    assert vista["nombres"]["13"] == "N7 A / Usuario 8"
+    assert "pareja1_nombre" not in vista["partidos"][0]
+
+    # Disponibilidad repetida en dos parejas: un solo valor
+    assert vista["disponibilidades"] == [DISPONIBILIDAD]
+    assert [p["disponibilidad"] for p in vista["parejas"]] == [None, 0, None, 0]
+
+    # Tabla igual a la de TorneoZonaService (sin los nombres)
+    zona = vista["zonas"][0]
+    assert zona["parejas"] == [10, 11, 12, 99]
+    original = TorneoZonaService.obtener_tabla_posiciones(db, 1)["tabla"]
+    campos = ("posicion", "pareja_id", "eliminada", "partidos_jugados", "partidos_ganados", "partidos_perdidos",
+              "sets_ganados", "sets_perdidos", "games_ganados", "games_perdidos", "puntos")
+    assert [{c: f[c] for c in campos} for f in zona["tabla"]] == [{c: f[c] for c in campos} for f in original]
+    assert zona["tabla"][0]["pareja_id"] == 11 and zona["tabla"][0]["puntos"] == 6
+
+    assert vista["playoffs"] == {"1": {"semis": [4], "final": [5]}}
+
+    # Más parejas, mismas queries
+    db2, contador2 = crear_db_pruebas()
+    _crear_datos(db2, parejas_extra=20)
+    antes = contador2["queries"]
+    assert len(TorneoVistaService.armar(db2, 1)["parejas"]) == 24
+    assert contador2["queries"] - antes == consultas == 7
+
+    assert TorneoVistaService.armar(db, 999) is None
+
+
+def test_version_sube_con_cada_cambio():
+    db, _ = crear_db_pruebas()
+    _crear_datos(db)
+    version = TorneoVistaService.version(db, 1)
+    editado = db.get(Torneo, 1).updated_at
+
+    # Resultado cargado
+    partido = db.get(Partido, 3)
+    partido.estado, partido.ganador_pareja_id, partido.sets_eq1, partido.sets_eq2 = "confirmado", 10, 2, 0
+    db.commit()
+    assert TorneoVistaService.version(db, 1) == version + 1
+    assert db.get(Torneo, 1).updated_at == editado  # no cuenta como edición del torneo
+
+    # Inscripción y asignación a zona en el mismo commit: una sola subida
+    db.add(TorneoPareja(id=20, torneo_id=1, categoria_id=2, jugador1_id=1, jugador2_id=3, estado="inscripta"))
+    db.add(TorneoZonaPareja(zona_id=1, pareja_id=20))
+    db.commit()
+    assert TorneoVistaService.version(db, 1) == version + 2
+
+    # Borrado en bloque (regenerar fixture)
+    db.query(Partido).filter(Partido.zona_id == 1).delete(synchronize_session=False)
+    db.commit()
+    assert TorneoVistaService.version(db, 1) == version + 3
+
+    # Un rollback no sube nada
+    db.get(TorneoCategoria, 2).max_parejas = 8
+    db.flush()
+    db.rollback()
+    assert TorneoVistaService.version(db, 1) == version + 3
+
+    # Partidos amistosos no tocan torneos
+    db.add(Partido(id_partido=100, fecha=datetime(2026, 5, 1), estado="pendiente", id_creador=1))
+    db.commit()
+    assert TorneoVistaService.version(db, 1) == version + 3
+
+
+def test_etag_y_304():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db)
+
+    def pedir(if_none_match=None):
+        headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+        response = Response()
+        resultado = obtener_vista_torneo(1, Request({"type": "http", "headers": headers}), response, db)
+        return resultado, response
+
+    vista, response = pedir()
+    etag = response.headers["etag"]
+    assert vista["zonas"][0]["id"] == 1
+
+    # Misma versión: 304 con una sola query
+    antes = contador["queries"]
+    resultado, _ = pedir(f'W/{etag}, "otro"')
+    assert resultado.status_code == 304 and resultado.headers["etag"] == etag
+    assert contador["queries"] - antes == 1
+
+    # Otro cliente sin ETag: la vista sale del caché (solo la query de versión)
+    antes = contador["queries"]
+    assert pedir()[0] is vista
+    assert contador["queries"] - antes == 1
+
+    # Cambio: ETag nuevo y vista rearmada
+    db.get(TorneoZona, 1).nombre = "Zona Única"
+    db.commit()
+    vista, response = pedir(etag)
+    assert response.headers["etag"] != etag
+    assert vista["zonas"][0]["nombre"] == "Zona Única"
+
+
+if __name__ == "__main__":
+    test_vista_completa()
+    test_version_sube_con_cada_cambio()
+    test_etag_y_304()
+    print("\n✅ Tests de vista de torneo OK")
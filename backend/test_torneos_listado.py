@@ -0,0 +1,101 @@
+"""
+Test del listado de torneos: páginas por cursor, conteo de parejas en una
+query agrupada, caché e invalidación al inscribir o cambiar el estado
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+from db_pruebas import crear_db_pruebas
+from src.models.driveplus_models import Usuario
+from src.models.torneo_models import Torneo, TorneoPareja
+from src.services.torneo_listado_service import TorneoListadoService
+from src.utils.cache import cache
+
+INICIO = datetime(2026, 1, 1)
+
+
+def _crear_datos(db, cantidad):
+    cache.clear()
+    db.add(Usuario(id_usuario=1, nombre_usuario="org", email="org@test.com"))
+    for i in range(1, cantidad + 1):
+        db.add(Torneo(id=i, nombre=f"T{i}", categoria="5ta" if i % 2 else "6ta", fecha_inicio=date(2026, 2, 1),
+                      fecha_fin=date(2026, 2, 2), creado_por=1, estado="inscripcion",
+                      # Dos torneos por día: la fecha repetida la desempata el id
+                      created_at=INICIO + timedelta(days=i // 2)))
+        for j in range(i % 4):
+            db.add(TorneoPareja(torneo_id=i, jugador1_id=1, jugador2_id=1,
+                                estado="baja" if j == 2 else "inscripta"))
+    db.commit()
+
+
+def test_paginas_y_conteos():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db, 25)
+
+    vistos = []
+    cursor = None
+    antes = contador["queries"]
+    while True:
+        torneos, cursor = TorneoListadoService.listar(db, cursor=cursor, limite=10)
+        vistos += torneos
+        if not cursor:
+            break
+
+    assert [t["id"] for t in vistos] == list(range(25, 0, -1))
+    # Dos queries por página (torneos + conteo agrupado), no una por torneo
+    assert contador["queries"] - antes == 6
+    parejas = {t["id"]: t["parejas_inscritas"] for t in vistos}
+    assert parejas[4] == 0 and parejas[1] == 1 and parejas[3] == 2  # la baja no cuenta
+
+    filtrados, _ = TorneoListadoService.listar(db, categoria="6ta", limite=100)
+    assert [t["id"] for t in filtrados] == list(range(24, 0, -2))
+
+    try:
+        TorneoListadoService.listar(db, cursor="no-es-un-cursor")
+        assert False, "cursor inválido aceptado"
+    except ValueError:
+        pass
+
+
+def test_cache_e_invalidacion():
+    db, contador = crear_db_pruebas()
+    _crear_datos(db, 5)
+
+    primera, _ = TorneoListadoService.listar(db)
+    antes = contador["queries"]
+    assert TorneoListadoService.listar(db)[0] is primera
+    assert contador["queries"] == antes
+
+    # Inscripción nueva: la página se rearma con el conteo nuevo
+    db.add(TorneoPareja(torneo_id=4, jugador1_id=1, jugador2_id=1, estado="inscripta"))
+    db.commit()
+    torneos, _ = TorneoListadoService.listar(db)
+    assert {t["id"]: t["parejas_inscritas"] for t in torneos}[4] == 1
+
+    # Cambio de estado (ORM)
+    db.get(Torneo, 5).estado = "fase_grupos"
+    db.commit()
+    assert [t["id"] for t in TorneoListadoService.listar(db, estado="fase_grupos")[0]] == [5]
+
+    # Update en bloque
+    db.execute(update(Torneo).where(Torneo.id == 3).values(estado="fase_grupos"))
+    db.commit()
+    assert [t["id"] for t in TorneoListadoService.listar(db, estado="fase_grupos")[0]] == [5, 3]
+
+    # Sin commit no se invalida (un rollback deja todo igual)
+    cacheada = TorneoListadoService.listar(db)[0]
+    db.get(Torneo, 1).estado = "finalizado"
+    db.flush()
+    db.rollback()
+    assert TorneoListadoService.listar(db)[0] is cacheada
+
+
+if __name__ == "__main__":
+    test_paginas_y_conteos()
+    test_cache_e_invalidacion()
+    print("\n✅ Tests de listado de torneos OK")
@@ -0,0 +1,83 @@
+"""
+Test de regresión: los WebSockets no retienen conexiones del pool
+Antes cada espectador tenía una sesión abierta durante toda la vida del
+socket; con un pool de 5 + 10 se agotaba con 15 espectadores.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from contextlib import ExitStack
+from datetime import datetime
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import db_pruebas  # noqa: F401 (BigInteger -> INTEGER en SQLite)
+from src.database.config import Base
+from src.models.driveplus_models import Usuario
+from src.models.sala import Sala
+from src.controllers import websocket_controller
+from src.websocket.connection_manager import ConnectionManager
+from src.websocket.pubsub import BrokerMemoria
+
+ESPECTADORES = 300
+
+
+def test_espectadores_no_agotan_el_pool():
+    with tempfile.TemporaryDirectory() as directorio:
+        # Pool chico y timeout corto: si un socket retuviera una conexión, fallaría rápido
+        engine = create_engine(
+            f"sqlite:///{directorio}/pool.db",
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool, pool_size=2, max_overflow=1, pool_timeout=1
+        )
+        Base.metadata.create_all(engine)
+        SessionPrueba = sessionmaker(bind=engine)
+
+        db = SessionPrueba()
+        db.add(Usuario(id_usuario=1, nombre_usuario="j1", email="j1@test.com"))
+        db.add(Sala(id_sala=1, nombre="Sala", codigo_invitacion="ABC123",
+                    fecha=datetime.now(), id_creador=1))
+        db.commit()
+        db.close()
+
+        app = FastAPI()
+        app.include_router(websocket_controller.router)
+        manager = ConnectionManager(broker=BrokerMemoria())
+
+        with mock.patch.object(websocket_controller, "SessionLocal", SessionPrueba), \
+                mock.patch.object(websocket_controller, "manager", manager), \
+                TestClient(app) as client, ExitStack() as sockets:
+            for _ in range(ESPECTADORES):
+                ws = sockets.enter_context(client.websocket_connect("/ws/salas/1"))
+                assert ws.receive_json()["type"] == "connected"
+
+            assert len(manager.active_connections["sala:1"]) == ESPECTADORES
+            assert engine.pool.checkedout() == 0
+
+            # Un request HTTP normal todavía consigue conexión
+            db = SessionPrueba()
+            assert db.get(Sala, 1) is not None
+            db.close()
+
+            # Sala inexistente: se rechaza sin dejar conexiones tomadas
+            try:
+                with client.websocket_connect("/ws/salas/999"):
+                    assert False, "Debió cerrarse"
+            except WebSocketDisconnect as e:
+                assert e.code == 4004
+            assert engine.pool.checkedout() == 0
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_espectadores_no_agotan_el_pool()
+    print("\n✅ Test de pool con WebSockets OK")